@@ -7,6 +7,12 @@ from threading import Thread
 import queue
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# 摄像头注册表（作为Web服务的一部分导入时可用，单独运行本文件时回退为每次完整探测）
+try:
+    from modules.camera_registry_module import camera_registry
+except ImportError:
+    camera_registry = None
+
 class rknnPoolExecutor:
     def __init__(self, model_path, TPEs, func):
         self.TPEs = TPEs
@@ -226,12 +232,22 @@ class Detector:
             success = False
             tried_camera_ids = []
             camera_api_preference = cv2.CAP_V4L2  # Linux上使用V4L2后端
+            camera_api_used = camera_api_preference
+            open_start_time = time.time()
+            
+            # 优先使用注册表中上次验证可用的配置，跳过探测、格式优化和帧率测试
+            cached = False
+            if camera_registry is not None:
+                self.cap, profile = camera_registry.open_cached(buffer_size=1, device=self.camera_id)
+                if self.cap is not None:
+                    self.camera_id = profile['device']
+                    success = cached = True
             
-            # 先获取所有可用的摄像头
-            available_cameras = self._find_available_cameras()
+            # 先获取所有可用的摄像头（使用注册表配置时跳过）
+            available_cameras = [] if cached else self._find_available_cameras()
             
             # 尝试1：如果用户明确指定了摄像头ID，先尝试这个ID
-            if self.camera_id is not None:
+            if not success and self.camera_id is not None:
                 try:
                     print(f"尝试打开用户指定的摄像头 ID: {self.camera_id}...")
                     
@@ -332,6 +348,7 @@ class Detector:
                                     ret, test_frame = self.cap.read()
                                     if ret and test_frame is not None:
                                         self.camera_id = camera_id  # 更新为实际使用的摄像头ID
+                                        camera_api_used = api
                                         success = True
                                         print(f"成功打开摄像头 ID: {camera_id} 使用API: {api}")
                                         break
@@ -352,13 +369,21 @@ class Detector:
             if not success:
                 raise IOError(f"无法找到可用的摄像头，尝试过的ID: {tried_camera_ids}")
             
-            # 优化摄像头设置
-            print("开始优化摄像头设置...")
-            self._optimize_camera_settings()
-            
-            # 测试摄像头实际帧率
-            measured_fps = self._test_camera_fps(self.cap, frames=15)
-            print(f"测量的实际摄像头帧率: {measured_fps:.1f} FPS")
+            if cached:
+                camera_registry.record_open('detector', 'cache', time.time() - open_start_time)
+            else:
+                # 优化摄像头设置
+                print("开始优化摄像头设置...")
+                self._optimize_camera_settings()
+                
+                # 测试摄像头实际帧率
+                measured_fps = self._test_camera_fps(self.cap, frames=15)
+                print(f"测量的实际摄像头帧率: {measured_fps:.1f} FPS")
+                
+                # 保存探测结果，下次启动只需打开一次验证
+                if camera_registry is not None:
+                    camera_registry.save(self.cap, self.camera_id, camera_api_used, measured_fps)
+                    camera_registry.record_open('detector', 'probe', time.time() - open_start_time)
             
             print("摄像头打开并优化成功，开始初始化推理管线...")
             
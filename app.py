@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+主应用入口 - 创建Flask应用并注册路由，各服务通过服务注册表在后台预热或首次请求时加载
+
+Web服务启动后立即响应页面和不依赖服务的接口，姿势分析、目标检测、语音助手、串口等服务
+由预热线程按顺序加载，加载完成后打印各服务的导入和初始化耗时（也可通过 /api/services 查看）。
+
+用法：
+    python app.py            # flask_server.service 使用此方式启动
+"""
+import time
+
+from flask import Flask
+
+from config import OPEN_HOST, OPEN_PORT, DEBUG
+from modules.service_registry_module import create_service_registry
+
+
+def create_app(services=None, warmup=True):
+    """创建Flask应用
+
+    Args:
+        services: 服务注册表，None时创建声明了全部服务的注册表
+        warmup: 是否启动预热线程在后台加载服务
+
+    Returns:
+        Flask应用，注册表保存在 app.extensions['service_registry']
+    """
+    start_time = time.time()
+    # 路由模块的导入计入Web应用的启动耗时
+    from modules.routes import routes_bp, setup_service_registry
+
+    app = Flask(__name__)
+    services = services or create_service_registry()
+    setup_service_registry(services)
+    app.register_blueprint(routes_bp)
+    app.extensions['service_registry'] = services
+
+    print(f"Web应用创建完成，耗时 {time.time() - start_time:.3f} 秒，注册的服务: {', '.join(services.services)}")
+    if warmup:
+        # 预热完成后打印各服务的加载耗时
+        services.start_warmup()
+    return app
+
+
+if __name__ == '__main__':
+    app = create_app()
+    # 不使用自动重载，否则服务会在两个进程中各加载一次（摄像头和串口只能被一个进程打开）
+    app.run(host=OPEN_HOST, port=OPEN_PORT, debug=DEBUG, threaded=True, use_reloader=False)
@@ -42,3 +42,39 @@ EXCELENT_POSTURE_THRESHOLD = 45.0  # 优秀坐姿的阈值
 GOOD_POSTURE_THRESHOLD = 60.0  # 良好坐姿的阈值
 FAIR_POSTURE_THRESHOLD = 68.0  # 一般坐姿的阈值
 BAD_POSTURE_THRESHOLD = 75.0  # 不良坐姿的阈值
+
+# 姿势/情绪推理后端：'thread' 在Web进程内的线程中推理，'process' 在独立工作进程中推理（可利用多核，绕开GIL）
+POSTURE_INFERENCE_MODE = 'thread'
+
+# 分析任务调度：各任务的目标频率（Hz）和优先级（数值越小越优先分配CPU预算）
+ANALYZER_SCHEDULE = {
+    'pose': {'target_hz': 15.0, 'priority': 0},              # 头部角度，需要较高频率保证响应
+    'emotion': {'target_hz': 5.0, 'priority': 1},            # 情绪结果本身经过多帧平滑
+    'posture_recording': {'target_hz': 1.0, 'priority': 2},  # 坐姿时间记录，数据库按30秒周期写入
+    'image_capture': {'target_hz': 1.0, 'priority': 3}       # 坐姿图像抓拍
+}
+ANALYZER_CPU_BUDGET = 2.0  # 分析任务可占用的CPU预算（核数）
+
+# 姿势分析的目标端到端延迟（毫秒）：从摄像头采集到分析结果发布，延迟控制器据此调整分辨率、推理频率和模型复杂度
+POSTURE_LATENCY_TARGET_MS = 150
+
+# 摄像头注册表：保存上次验证可用的设备、后端、格式、分辨率和实测帧率，启动时只打开一次验证，失败才完整探测（相对项目根目录）
+CAMERA_REGISTRY_FILE = 'camera_registry.json'
+
+# 采集解码：摄像头输出MJPEG时读取原始JPEG数据，按缩小比例直接解码用于分析，
+# 原始全分辨率JPEG保留用于抓拍保存；摄像头或后端不支持时自动回退为常规解码。
+# 解码帧不会小于最高的处理分辨率（640x480），因此640x480的摄像头按原始分辨率解码，1280x720及以上才缩小
+CAPTURE_RAW_MJPEG = True
+CAPTURE_DECODE_SCALE = 0  # 解码缩小倍数上限：1、2、4、8，0表示按摄像头实际分辨率自动选择
+
+# 坐姿时间记录的本地日志：数据库不可用时暂存批量写入失败的记录，恢复后按顺序补写（相对项目根目录）
+POSTURE_JOURNAL_FILE = 'posture_time_journal.jsonl'
+
+# 多摄像头：默认摄像头的编号（单摄像头部署和加入此功能前的记录都使用此编号），以及同一台主机上额外的摄像头。
+# 每个摄像头运行独立的姿势分析流水线，共享 ANALYZER_CPU_BUDGET，按权重公平分配。
+# 可选字段：device（设备索引或路径）、source（录制视频/图片目录，代替摄像头）、weight（CPU分配权重）、
+# inference_mode（'thread'/'process'）、params（情绪分析参数，覆盖全局默认值）
+DEFAULT_CAMERA_ID = 'default'
+POSTURE_CAMERAS = [
+    # {'id': 'desk2', 'device': '/dev/video2', 'weight': 1.0},
+]
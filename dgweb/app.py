@@ -1,6 +1,8 @@
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, render_template, jsonify, request, send_from_directory, Response
 import os
 import json
+import urllib.request
+import urllib.error
 from datetime import datetime, timedelta
 import random
 
@@ -10,6 +12,10 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = '114514'
 app.config['UPLOAD_FOLDER'] = 'static/mobile/uploads'
 
+# 台灯主服务地址（提供 /api/snapshot 等摄像头接口），监护页面的监控画面通过本服务转发
+LAMP_SERVER_URL = os.environ.get('LAMP_SERVER_URL', 'http://127.0.0.1:5000')
+SNAPSHOT_PROXY_TIMEOUT = 3  # 转发快照请求的超时时间（秒）
+
 # 确保上传目录存在
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -174,6 +180,33 @@ def video_feed():
         # 桌面端可能需要不同的视频流处理
         return jsonify({'url': '/static/placeholder.jpg'})
 
+@app.route('/api/snapshot')
+def api_snapshot():
+    """转发监控画面快照请求到台灯主服务，透传 If-None-Match / ETag，画面未变化时返回304"""
+    url = f"{LAMP_SERVER_URL}/api/snapshot"
+    if request.query_string:
+        url += '?' + request.query_string.decode('utf-8')
+    headers = {}
+    if request.headers.get('If-None-Match'):
+        headers['If-None-Match'] = request.headers['If-None-Match']
+    
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=SNAPSHOT_PROXY_TIMEOUT) as upstream:
+            response = Response(upstream.read(), status=upstream.status,
+                                mimetype=upstream.headers.get('Content-Type', 'image/jpeg'))
+            etag = upstream.headers.get('ETag')
+    except urllib.error.HTTPError as e:
+        # 304也以HTTPError的形式返回
+        response = Response(e.read(), status=e.code, mimetype=e.headers.get('Content-Type'))
+        etag = e.headers.get('ETag')
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'无法连接台灯主服务: {e}'}), 502
+    
+    if etag:
+        response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 # API端点 - 手机端专用
 @app.route('/api/home/stats')
 def api_home_stats():
@@ -4,6 +4,10 @@ class GuardianPage {
         this.isInitialized = false;
         this.videoStream = null;
         this.isVideoPaused = false;
+        this.snapshotEtag = null;
+        this.snapshotUrl = null;
+        this.snapshotFailures = 0;  // 连续获取快照失败的次数，决定下一次重试前的等待时间
+        this.snapshotRetryAt = 0;   // 获取快照失败后，到此时间（毫秒）之前不再请求
         this.messageHistory = [];
         this.scheduledMessages = [];
         this.currentTab = 'push';
@@ -295,15 +299,55 @@ class GuardianPage {
         const videoEl = document.getElementById('guardianVideo');
         if (!videoEl) return;
         
-        // 模拟视频流
+        // 定时刷新监控画面快照
+        this.refreshSnapshot(videoEl);
         this.videoStream = setInterval(() => {
             if (!this.isVideoPaused) {
+                if (Date.now() >= this.snapshotRetryAt) {
+                    this.refreshSnapshot(videoEl);
+                }
                 // 更新视频状态
                 this.updateVideoStatus();
             }
         }, 1000);
     }
     
+    async refreshSnapshot(videoEl) {
+        try {
+            // 带上已有快照的ETag，画面未变化时服务器返回304，不重新下载图像
+            const headers = this.snapshotEtag ? { 'If-None-Match': this.snapshotEtag } : {};
+            const response = await fetch('/api/snapshot?resolution=360p', { headers, cache: 'no-store' });
+            if (response.status === 304) {
+                this.resetSnapshotBackoff();
+                return;
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            
+            const blob = await response.blob();
+            if (this.snapshotUrl) {
+                URL.revokeObjectURL(this.snapshotUrl);
+            }
+            this.snapshotUrl = URL.createObjectURL(blob);
+            this.snapshotEtag = response.headers.get('ETag');
+            videoEl.src = this.snapshotUrl;
+            this.resetSnapshotBackoff();
+        } catch (error) {
+            // 连续失败时（如主服务未启动）逐次加倍重试间隔，不再每秒请求，恢复后回到正常刷新
+            this.snapshotFailures++;
+            const delay = Math.min(GuardianPage.SNAPSHOT_RETRY_MAX_MS,
+                GuardianPage.SNAPSHOT_RETRY_BASE_MS * 2 ** (this.snapshotFailures - 1));
+            this.snapshotRetryAt = Date.now() + delay;
+            console.error(`刷新监控画面失败（连续 ${this.snapshotFailures} 次），${delay / 1000} 秒后重试:`, error);
+        }
+    }
+    
+    resetSnapshotBackoff() {
+        this.snapshotFailures = 0;
+        this.snapshotRetryAt = 0;
+    }
+    
     updateVideoStatus() {
         const statusEl = document.querySelector('.monitor-status');
         if (statusEl) {
@@ -634,6 +678,10 @@ class GuardianPage {
     }
 }
 
+// 获取监控画面失败后的重试间隔：第一次失败后等待 SNAPSHOT_RETRY_BASE_MS，之后每次失败加倍，最长 SNAPSHOT_RETRY_MAX_MS
+GuardianPage.SNAPSHOT_RETRY_BASE_MS = 2000;
+GuardianPage.SNAPSHOT_RETRY_MAX_MS = 60000;
+
 // 初始化监护页面
 document.addEventListener('DOMContentLoaded', () => {
     window.guardianPage = new GuardianPage();
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""关键点特征计算微基准测试
+
+对比原有的逐点实现（check_occlusion、calculate_head_angle、EmotionAnalyzer 的
+_mouth_open_ratio/_eye_open_ratio/_brow_position）与 landmark_features_module 的向量化实现：
+
+    live  - 逐帧计算：每帧从MediaPipe关键点对象转换一次数组再计算全部特征，对应实时分析
+    batch - 批量计算：关键点已经是 (N, 33, 4) / (N, 478, 3) 数组，一次计算所有帧，对应离线统计
+
+关键点由固定随机种子生成，同时校验两种实现的结果是否一致。不需要摄像头和模型文件，
+但需要安装 mediapipe（原有实现和关键点对象来自 mediapipe）。
+
+用法：
+    python landmark_features_benchmark.py
+    python landmark_features_benchmark.py --frames 5000 --repeat 5 --json
+"""
+import sys
+import time
+import json
+import argparse
+
+import numpy as np
+
+from modules.landmark_features_module import (
+    pose_landmarks_to_array, face_feature_array, compact_face_array,
+    occlusion_status, occlusion_codes, head_angle, head_angles, face_features,
+    OCCLUSION_STATUS
+)
+
+# 生成测试关键点的参数
+FACE_MESH_POINTS = 478      # refine_landmarks=True 时的面部关键点数量
+FRAME_SHAPE = (480, 640)    # 计算像素坐标使用的帧尺寸
+RANDOM_SEED = 20240601      # 固定随机种子，保证每次生成相同的关键点
+
+
+def generate_landmarks(frames, seed=RANDOM_SEED):
+    """生成姿势和面部关键点数组，可见度在阈值附近分布，覆盖各种遮挡状态"""
+    rng = np.random.default_rng(seed)
+    pose = np.empty((frames, 33, 4), dtype=np.float32)
+    pose[..., :2] = rng.uniform(0.2, 0.8, size=(frames, 33, 2))
+    pose[..., 2] = rng.uniform(-0.5, 0.5, size=(frames, 33))
+    pose[..., 3] = rng.uniform(0.3, 1.0, size=(frames, 33))
+    face = np.empty((frames, FACE_MESH_POINTS, 3), dtype=np.float32)
+    face[..., :2] = rng.uniform(0.3, 0.7, size=(frames, FACE_MESH_POINTS, 2))
+    face[..., 2] = rng.uniform(-0.1, 0.1, size=(frames, FACE_MESH_POINTS))
+    return pose, face
+
+
+def to_landmark_lists(array, landmark_pb2):
+    """关键点数组转换为NormalizedLandmarkList，模拟MediaPipe的输出"""
+    landmark_lists = []
+    for frame in array:
+        landmark_list = landmark_pb2.NormalizedLandmarkList()
+        for row in frame:
+            landmark = landmark_list.landmark.add()
+            landmark.x, landmark.y, landmark.z = float(row[0]), float(row[1]), float(row[2])
+            if len(row) > 3:
+                landmark.visibility = float(row[3])
+        landmark_lists.append(landmark_list)
+    return landmark_lists
+
+
+def run_legacy(pose_lists, face_lists, analyzer, legacy):
+    """原有实现：逐点访问关键点对象"""
+    h, w = FRAME_SHAPE
+    results = []
+    for pose, face in zip(pose_lists, face_lists):
+        _, status = legacy.check_occlusion(pose.landmark)
+        angle = legacy.calculate_head_angle(pose.landmark, FRAME_SHAPE)[0]
+        mouth = analyzer._mouth_open_ratio(face.landmark, h, w)
+        eye = analyzer._eye_open_ratio(face.landmark, h, w)
+        brow = analyzer._brow_position(face.landmark, h, w)
+        results.append((status, angle, mouth, eye, brow))
+    return results
+
+
+def run_live(pose_lists, face_lists, threshold, angle_threshold):
+    """向量化实现（逐帧）：每帧转换一次数组"""
+    h, w = FRAME_SHAPE
+    results = []
+    for pose, face in zip(pose_lists, face_lists):
+        pose_array = pose_landmarks_to_array(pose)
+        _, status = occlusion_status(pose_array, threshold)
+        angle = head_angle(pose_array, FRAME_SHAPE, angle_threshold)[0]
+        mouth, eye, brow = face_features(face_feature_array(face), h, w)
+        results.append((status, angle, mouth, eye, brow))
+    return results
+
+
+def run_batch(pose_batch, face_batch, threshold):
+    """向量化实现（批量）：所有帧一次计算"""
+    h, w = FRAME_SHAPE
+    pose_batch = pose_landmarks_to_array(pose_batch)
+    codes = occlusion_codes(pose_batch, threshold)
+    angles = head_angles(pose_batch, FRAME_SHAPE)[0]
+    mouth, eye, brow = face_features(compact_face_array(face_batch), h, w)
+    return [(OCCLUSION_STATUS[code], angles[i], mouth[i], eye[i], brow[i]) for i, code in enumerate(codes)]
+
+
+def compare(reference, results):
+    """对比两组结果，返回遮挡状态不一致的帧数和数值特征的最大绝对误差"""
+    status_mismatch = sum(1 for a, b in zip(reference, results) if a[0] != b[0])
+    max_error = 0.0
+    for a, b in zip(reference, results):
+        for x, y in zip(a[1:], b[1:]):
+            max_error = max(max_error, abs(float(x) - float(y)))
+    return status_mismatch, max_error
+
+
+def best_time(func, repeat):
+    """多次运行取最短耗时（秒）和最后一次的结果"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='关键点特征计算微基准测试')
+    parser.add_argument('--frames', type=int, default=2000, help='生成的关键点帧数')
+    parser.add_argument('--repeat', type=int, default=3, help='每种实现重复运行次数（取最短耗时）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    try:
+        from mediapipe.framework.formats import landmark_pb2
+        import modules.realtime_posture_analysis as legacy
+    except ImportError as e:
+        print(f"需要安装 mediapipe 才能对比原有实现: {str(e)}")
+        sys.exit(1)
+
+    pose_batch, face_batch = generate_landmarks(args.frames)
+    pose_lists = to_landmark_lists(pose_batch, landmark_pb2)
+    face_lists = to_landmark_lists(face_batch, landmark_pb2)
+    # 只用到特征计算辅助函数，传入占位对象避免加载Face Mesh模型
+    analyzer = legacy.EmotionAnalyzer(face_mesh=object())
+    threshold, angle_threshold = legacy.VISIBILITY_THRESHOLD, legacy.HEAD_ANGLE_THRESHOLD
+
+    legacy_time, reference = best_time(lambda: run_legacy(pose_lists, face_lists, analyzer, legacy), args.repeat)
+    live_time, live_results = best_time(lambda: run_live(pose_lists, face_lists, threshold, angle_threshold), args.repeat)
+    batch_time, batch_results = best_time(lambda: run_batch(pose_batch, face_batch, threshold), args.repeat)
+
+    report = {'frames': args.frames, 'repeat': args.repeat}
+    for name, elapsed, results in (('legacy', legacy_time, reference),
+                                   ('live', live_time, live_results),
+                                   ('batch', batch_time, batch_results)):
+        status_mismatch, max_error = compare(reference, results)
+        report[name] = {
+            'total_ms': round(elapsed * 1000, 3),
+            'per_frame_us': round(elapsed / args.frames * 1e6, 3),
+            'speedup': round(legacy_time / elapsed, 2) if elapsed else None,
+            'status_mismatch': status_mismatch,
+            'max_abs_error': max_error
+        }
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    print(f"关键点特征计算: {args.frames} 帧, 重复 {args.repeat} 次取最短耗时")
+    for name, label in (('legacy', '原有逐点实现'), ('live', '向量化-逐帧'), ('batch', '向量化-批量')):
+        item = report[name]
+        print(f"  {label:<10} 每帧 {item['per_frame_us']:>9.3f} 微秒  加速 {item['speedup']:>6.2f}x  "
+              f"状态不一致 {item['status_mismatch']} 帧  最大误差 {item['max_abs_error']:.3g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+多摄像头管理模块 - 在同一个服务中运行多条姿势分析流水线，按摄像头编号管理，并在摄像头之间公平分配CPU预算
+
+每个摄像头对应一个 WebPostureMonitor（各自的帧分发器、工作线程或推理进程、分析结果和统计），
+坐姿时间写入器和抓拍保存线程由所有摄像头共用，记录中的 device_id 区分来源摄像头。
+注册了多个摄像头时，均衡线程定期读取各摄像头调度器的CPU需求，按权重用最大最小公平分配总预算，
+需求小的摄像头不占用多余的预算，剩余部分分给其他摄像头。
+"""
+import time
+import threading
+
+from config import ANALYZER_CPU_BUDGET, DEFAULT_CAMERA_ID, POSTURE_CAMERAS, POSTURE_INFERENCE_MODE
+from modules.posture_module import WebPostureMonitor, posture_params
+from modules.scheduler_module import fair_share
+from modules.capture_source_module import open_capture_source
+
+# 多摄像头相关配置
+BALANCE_INTERVAL = 2.0                   # CPU预算重新分配的间隔（秒）
+INFERENCE_MODES = ('thread', 'process')  # 支持的推理后端
+
+
+class CameraManager:
+    """多摄像头姿势分析管理器"""
+    def __init__(self, default_monitor, cpu_budget=ANALYZER_CPU_BUDGET, balance_interval=BALANCE_INTERVAL):
+        """
+        Args:
+            default_monitor: 默认摄像头的分析器（输出视频流和指标），其写入器由其他摄像头共用
+            cpu_budget: 所有摄像头共享的CPU预算（核数）
+            balance_interval: CPU预算重新分配的间隔（秒）
+        """
+        self.default_monitor = default_monitor
+        self.cpu_budget = cpu_budget
+        self.balance_interval = balance_interval
+        self.lock = threading.Lock()
+        self.cameras = {}  # 摄像头编号 -> 摄像头条目（分析器、权重、推理后端、配置）
+        self.balance_thread = None
+        self.is_balancing = False
+
+        # 统计信息
+        self.stats = {
+            'rebalances': 0,
+            'last_rebalance': None,
+            'shares': {}
+        }
+
+        if default_monitor is not None:
+            self.cameras[DEFAULT_CAMERA_ID] = {
+                'monitor': default_monitor,
+                'weight': 1.0,
+                'inference_mode': None,
+                'config': {'id': DEFAULT_CAMERA_ID}
+            }
+
+    def load_config(self, cameras=POSTURE_CAMERAS):
+        """按配置添加额外的摄像头（不启动）"""
+        for camera_config in cameras:
+            try:
+                self.add_camera(camera_config)
+            except ValueError as e:
+                print(f"添加摄像头 {camera_config.get('id')} 失败: {str(e)}")
+
+    def add_camera(self, camera_config):
+        """添加一个摄像头（不启动）
+
+        Args:
+            camera_config: 摄像头配置，字段见 config.POSTURE_CAMERAS
+
+        Returns:
+            新摄像头的分析器
+
+        Raises:
+            ValueError: 配置无效或编号已存在
+        """
+        camera_id = str(camera_config.get('id') or '').strip()
+        if not camera_id:
+            raise ValueError('摄像头编号不能为空')
+        if len(camera_id) > 64:
+            raise ValueError('摄像头编号不能超过64个字符')
+
+        inference_mode = camera_config.get('inference_mode') or POSTURE_INFERENCE_MODE
+        if inference_mode not in INFERENCE_MODES:
+            raise ValueError(f'不支持的推理后端: {inference_mode}')
+        weight = float(camera_config.get('weight', 1.0))
+        if weight <= 0:
+            raise ValueError('权重必须大于0')
+        device = camera_config.get('device')
+        if device is None and not camera_config.get('source'):
+            raise ValueError('需要指定摄像头设备(device)或采集源(source)')
+        if isinstance(device, str) and device.isdigit():
+            device = int(device)  # 接口传入的设备索引
+
+        with self.lock:
+            if camera_id in self.cameras:
+                raise ValueError(f'摄像头 {camera_id} 已存在')
+
+            # 额外的摄像头不输出视频流，与默认摄像头共用写入器
+            shared = self.default_monitor
+            monitor = WebPostureMonitor(
+                camera_id=camera_id,
+                device=device,
+                params=dict(posture_params, **(camera_config.get('params') or {})),
+                posture_writer=shared.posture_writer if shared else None,
+                snapshot_writer=shared.snapshot_writer if shared else None
+            )
+            if camera_config.get('source'):
+                monitor.set_capture_source(open_capture_source(
+                    camera_config['source'], fps=camera_config.get('fps'), loop=camera_config.get('loop', True)))
+
+            self.cameras[camera_id] = {
+                'monitor': monitor,
+                'weight': weight,
+                'inference_mode': inference_mode,
+                'config': dict(camera_config, id=camera_id)
+            }
+
+        print(f"已添加摄像头 {camera_id}（权重 {weight}，推理后端 {inference_mode}）")
+        self._ensure_balancer()
+        return monitor
+
+    def remove_camera(self, camera_id):
+        """停止并移除摄像头（默认摄像头不能移除）"""
+        if camera_id == DEFAULT_CAMERA_ID:
+            raise ValueError('默认摄像头不能移除')
+        with self.lock:
+            entry = self.cameras.pop(camera_id, None)
+            remaining = list(self.cameras.values())
+        if entry is None:
+            return False
+        if entry['monitor'].is_running:
+            entry['monitor'].stop()
+        print(f"已移除摄像头 {camera_id}")
+        if len(remaining) == 1:
+            # 只剩一个摄像头时不再均衡，恢复完整预算
+            remaining[0]['monitor'].scheduler.cpu_budget = self.cpu_budget
+        else:
+            self._rebalance()
+        return True
+
+    def start_camera(self, camera_id):
+        """启动摄像头的分析流水线"""
+        entry = self.cameras.get(camera_id)
+        if entry is None:
+            return False
+        success = entry['monitor'].start(entry['inference_mode'])
+        if success:
+            self._ensure_balancer()
+            self._rebalance()
+        return success
+
+    def stop_camera(self, camera_id):
+        """停止摄像头的分析流水线"""
+        entry = self.cameras.get(camera_id)
+        if entry is None:
+            return False
+        entry['monitor'].stop()
+        self._rebalance()
+        return True
+
+    def start_all(self):
+        """启动配置中添加的所有额外摄像头（默认摄像头由原有接口启动）"""
+        for camera_id in list(self.cameras):
+            if camera_id != DEFAULT_CAMERA_ID:
+                self.start_camera(camera_id)
+
+    def stop_all(self):
+        """停止所有额外摄像头和均衡线程"""
+        for camera_id, entry in list(self.cameras.items()):
+            if camera_id != DEFAULT_CAMERA_ID and entry['monitor'].is_running:
+                entry['monitor'].stop()
+        self.is_balancing = False
+        if self.balance_thread:
+            self.balance_thread.join(timeout=self.balance_interval + 1.0)
+            self.balance_thread = None
+
+    def get(self, camera_id):
+        """获取摄像头的分析器，不存在时返回None"""
+        entry = self.cameras.get(camera_id)
+        return entry['monitor'] if entry else None
+
+    def set_weight(self, camera_id, weight):
+        """设置摄像头的CPU分配权重"""
+        entry = self.cameras.get(camera_id)
+        if entry is None:
+            return False
+        if weight <= 0:
+            raise ValueError('权重必须大于0')
+        entry['weight'] = float(weight)
+        self._rebalance()
+        return True
+
+    def set_cpu_budget(self, cpu_budget):
+        """设置所有摄像头共享的CPU预算（核数）"""
+        self.cpu_budget = max(0.1, float(cpu_budget))
+        print(f"多摄像头CPU总预算设置为 {self.cpu_budget} 核")
+        self._rebalance()
+
+    def _ensure_balancer(self):
+        """注册了多个摄像头时启动均衡线程"""
+        if self.is_balancing or len(self.cameras) < 2:
+            return
+        self.is_balancing = True
+        self.balance_thread = threading.Thread(target=self._balance_loop, name='camera-balancer', daemon=True)
+        self.balance_thread.start()
+
+    def _balance_loop(self):
+        """均衡线程主循环：定期按需求重新分配CPU预算"""
+        while self.is_balancing:
+            time.sleep(self.balance_interval)
+            try:
+                self._rebalance()
+            except Exception as e:
+                print(f"分配摄像头CPU预算时出错: {str(e)}")
+
+    def _rebalance(self):
+        """按各运行中摄像头的CPU需求和权重分配预算
+
+        只有一个摄像头时不调整，保留通过 set_performance_mode 设置的预算。
+        """
+        if len(self.cameras) < 2:
+            return
+        with self.lock:
+            running = {camera_id: entry for camera_id, entry in self.cameras.items()
+                       if entry['monitor'].is_running}
+        if not running:
+            return
+
+        demands = {camera_id: entry['monitor'].scheduler.get_demand() for camera_id, entry in running.items()}
+        weights = {camera_id: entry['weight'] for camera_id, entry in running.items()}
+        shares = fair_share(self.cpu_budget, demands, weights)
+        for camera_id, share in shares.items():
+            running[camera_id]['monitor'].scheduler.cpu_budget = share
+
+        self.stats['rebalances'] += 1
+        self.stats['last_rebalance'] = time.time()
+        self.stats['shares'] = {
+            camera_id: {'demand': round(demands[camera_id], 3), 'share': round(share, 3)}
+            for camera_id, share in shares.items()
+        }
+
+    def list_cameras(self):
+        """获取所有摄像头的概要信息"""
+        cameras = []
+        for camera_id, entry in list(self.cameras.items()):
+            monitor = entry['monitor']
+            cameras.append({
+                'id': camera_id,
+                'is_running': monitor.is_running,
+                'device': monitor.device,
+                'source': entry['config'].get('source'),
+                'weight': entry['weight'],
+                'inference_mode': monitor.inference_mode if monitor.is_running else entry['inference_mode'],
+                'cpu_budget': monitor.scheduler.cpu_budget,
+                'pose_data': monitor.pose_result,
+                'emotion_data': monitor.emotion_result
+            })
+        return cameras
+
+    def get_stats(self):
+        """获取CPU分配统计信息"""
+        return {
+            **self.stats,
+            'cpu_budget': self.cpu_budget,
+            'balancing': self.is_balancing,
+            'camera_count': len(self.cameras),
+            'running_count': sum(1 for entry in self.cameras.values() if entry['monitor'].is_running)
+        }
@@ -0,0 +1,228 @@
+"""
+摄像头注册表模块 - 持久化上次验证可用的摄像头配置，启动时只打开一次验证，失败才回退到完整探测
+
+完整探测需要逐个打开 0-9 号索引和多个设备路径、轮流尝试编码格式和分辨率并测量帧率，
+每次启动要花费数秒。注册表把探测结果（设备、后端、FOURCC、分辨率、实测帧率）保存到JSON文件，
+下次启动直接按保存的参数打开并读取一帧，读取成功且分辨率一致即可使用。
+姿势分析和目标检测共用同一个注册表，同时记录各消费者每次打开摄像头的方式和耗时。
+"""
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+import cv2
+
+from config import CAMERA_REGISTRY_FILE
+from modules.metrics_module import registry
+
+# 注册表文件的绝对路径（配置中为相对项目根目录的路径）
+REGISTRY_PATH = CAMERA_REGISTRY_FILE if os.path.isabs(CAMERA_REGISTRY_FILE) else os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), CAMERA_REGISTRY_FILE)
+
+# 后端名称与OpenCV常量的对应关系
+BACKENDS = {
+    'ANY': cv2.CAP_ANY,
+    'V4L2': cv2.CAP_V4L2,
+    'V4L': cv2.CAP_V4L,
+}
+
+CAMERA_OPEN_SECONDS = registry.gauge('camera_open_seconds', '最近一次打开摄像头的耗时（秒）', ('consumer', 'source'))
+CAMERA_OPENS = registry.counter('camera_opens_total', '打开摄像头的次数', ('consumer', 'source'))
+
+
+def fourcc_to_str(fourcc):
+    """将4字节格式代码转换为可读字符串，如 'MJPG'"""
+    try:
+        return "".join(chr((int(fourcc) >> (8 * i)) & 0xFF) for i in range(4))
+    except Exception:
+        return ''
+
+
+def backend_name(backend):
+    """后端常量转换为名称"""
+    for name, value in BACKENDS.items():
+        if value == backend:
+            return name
+    return str(backend)
+
+
+class CameraRegistry:
+    """摄像头注册表"""
+    def __init__(self, path=REGISTRY_PATH):
+        """
+        Args:
+            path: 注册表JSON文件路径
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.open_stats = {}   # 各消费者最近一次打开摄像头的方式和耗时
+
+    def load(self):
+        """读取保存的摄像头配置，不存在或已损坏时返回None"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                profile = json.load(f)
+            if 'device' not in profile or 'backend' not in profile:
+                return None
+            return profile
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"读取摄像头注册表失败: {e}")
+            return None
+
+    def save(self, cap, device, backend, measured_fps=None):
+        """保存当前可用的摄像头配置
+
+        Args:
+            cap: 已打开并完成设置的VideoCapture
+            device: 设备索引或设备路径
+            backend: OpenCV后端常量
+            measured_fps: 实测帧率，只有完成格式优化并实测帧率的配置才会保存
+        """
+        if not measured_fps:
+            print("摄像头配置未实测帧率，不保存到注册表")
+            return None
+        try:
+            profile = {
+                'device': device,
+                'backend': int(backend),
+                'backend_name': backend_name(backend),
+                'fourcc': fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+                'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                'fps': cap.get(cv2.CAP_PROP_FPS),
+                'measured_fps': round(measured_fps, 1),
+                'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            # 先写临时文件再替换，避免并发启动时读到写了一半的文件
+            tmp_path = f"{self.path}.tmp"
+            with self.lock:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(profile, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            print(f"已保存摄像头配置: {profile}")
+            return profile
+        except Exception as e:
+            print(f"保存摄像头注册表失败: {e}")
+            return None
+
+    def invalidate(self):
+        """删除保存的配置，下次打开时重新完整探测"""
+        with self.lock:
+            try:
+                os.remove(self.path)
+                print("已清除摄像头注册表")
+                return True
+            except FileNotFoundError:
+                return False
+
+    def open_cached(self, buffer_size=1, device=None):
+        """按保存的配置打开摄像头并读取一帧验证
+
+        Args:
+            buffer_size: 摄像头缓冲区大小
+            device: 调用方指定的设备，与保存的设备不同时不使用缓存
+
+        Returns:
+            (VideoCapture, 配置字典)，没有缓存或验证失败时返回 (None, None)
+        """
+        profile = self.load()
+        if profile is None:
+            return None, None
+        if device is not None and str(device) != str(profile['device']):
+            print(f"指定的摄像头 {device} 与注册表中的 {profile['device']} 不同，不使用缓存")
+            return None, None
+
+        cap = None
+        try:
+            cap = cv2.VideoCapture(profile['device'], profile['backend'])
+            if not cap.isOpened():
+                print(f"注册表中的摄像头 {profile['device']} 无法打开，回退到完整探测")
+                cap.release()
+                return None, None
+
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+            if profile.get('fourcc'):
+                cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*profile['fourcc']))
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, profile['width'])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, profile['height'])
+            if profile.get('fps'):
+                cap.set(cv2.CAP_PROP_FPS, profile['fps'])
+
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                print(f"注册表中的摄像头 {profile['device']} 无法读取帧，回退到完整探测")
+                cap.release()
+                return None, None
+            if frame.shape[1] != profile['width'] or frame.shape[0] != profile['height']:
+                print(f"摄像头分辨率 {frame.shape[1]}x{frame.shape[0]} 与注册表中的 "
+                      f"{profile['width']}x{profile['height']} 不一致，回退到完整探测")
+                cap.release()
+                return None, None
+
+            print(f"使用注册表中的摄像头配置: {profile['device']} ({profile['backend_name']}), "
+                  f"{profile['width']}x{profile['height']} {profile.get('fourcc')}")
+            return cap, profile
+        except Exception as e:
+            print(f"按注册表打开摄像头失败: {e}")
+            if cap is not None:
+                cap.release()
+            return None, None
+
+    def record_open(self, consumer, source, seconds):
+        """记录一次打开摄像头的方式和耗时
+
+        Args:
+            consumer: 消费者名称，如 'posture'、'detection'
+            source: 'cache' 表示按注册表打开，'probe' 表示完整探测
+            seconds: 耗时（秒）
+        """
+        self.open_stats[consumer] = {
+            'source': source,
+            'seconds': round(seconds, 3),
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        CAMERA_OPEN_SECONDS.labels(consumer, source).set(seconds)
+        CAMERA_OPENS.labels(consumer, source).inc()
+        print(f"{consumer} 打开摄像头耗时 {seconds:.2f} 秒（{'注册表' if source == 'cache' else '完整探测'}）")
+
+    def get_stats(self):
+        """获取注册表内容和各消费者的打开记录"""
+        return {
+            'path': self.path,
+            'profile': self.load(),
+            'opens': dict(self.open_stats)
+        }
+
+
+# 全局摄像头注册表，姿势分析和目标检测共用
+camera_registry = CameraRegistry()
+
+
+class StartupTimer:
+    """记录服务启动各阶段距启动开始的耗时，用于衡量从启动到第一帧分析结果的时间"""
+    def __init__(self):
+        self.start_time = None
+        self.phases = {}
+
+    def start(self):
+        """开始新一轮计时，清除上一次的记录"""
+        self.start_time = time.time()
+        self.phases = {}
+
+    def mark(self, phase):
+        """记录阶段完成时间（同一轮中只记录第一次），返回距启动开始的秒数"""
+        if self.start_time is None or phase in self.phases:
+            return None
+        elapsed = time.time() - self.start_time
+        self.phases[phase] = round(elapsed, 3)
+        return elapsed
+
+    def is_marked(self, phase):
+        return phase in self.phases
+
+    def get_stats(self):
+        return dict(self.phases)
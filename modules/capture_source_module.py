@@ -0,0 +1,257 @@
+"""
+采集源模块 - 用录制的视频文件或图片目录代替摄像头，提供与cv2.VideoCapture相同的读取接口
+
+采集源实现了帧分发器用到的 isOpened/grab/retrieve/read/release/get/set，
+可以直接交给 FrameBroker.start() 或 WebPostureMonitor.set_capture_source()，
+用于在没有摄像头的机器上复现问题和做可重复的流水线基准测试。
+
+节奏（pacing）：
+    'realtime' - 按源帧率发帧，模拟真实摄像头，帧分发和丢帧行为与线上一致
+    'fast'     - 不等待，尽可能快地发帧，用于测量流水线吞吐量
+"""
+import os
+import time
+
+try:
+    import cv2
+    import numpy as np
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# 采集源相关配置
+PACING_MODES = ('realtime', 'fast')                        # 支持的发帧节奏
+DEFAULT_SOURCE_FPS = 30.0                                  # 无法获取源帧率时使用的默认帧率
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')       # 图片目录中识别的图片格式
+
+
+class _CaptureSource:
+    """采集源基类：负责发帧节奏、循环播放和统计，子类只需实现帧的读取和回绕"""
+    def __init__(self, fps=None, pacing='realtime', loop=False, max_frames=None):
+        """
+        Args:
+            fps: 源帧率，None时使用源自身的帧率
+            pacing: 发帧节奏，'realtime' 或 'fast'
+            loop: 读到末尾后是否从头循环
+            max_frames: 最多发出的帧数，None表示不限制
+        """
+        if pacing not in PACING_MODES:
+            raise ValueError(f"不支持的发帧节奏: {pacing}，可选值: {PACING_MODES}")
+        self.fps = fps
+        self.pacing = pacing
+        self.loop = loop
+        self.max_frames = max_frames
+        self.finished = False       # 源已读完（非循环模式）或达到max_frames
+        self.frame_index = -1       # 最近一次grab成功的帧序号（从0开始，循环播放时持续递增）
+        self._pending = None        # grab()读到、等待retrieve()取走的帧
+        self._start_time = None     # 第一帧发出时的时间，用于realtime节奏
+        self._opened = False
+
+    # ---- 子类实现 ----
+
+    def _next_frame(self):
+        """读取下一帧，读到末尾时返回None"""
+        raise NotImplementedError
+
+    def _rewind(self):
+        """回到第一帧，成功返回True"""
+        raise NotImplementedError
+
+    def _close(self):
+        """释放底层资源"""
+
+    # ---- VideoCapture兼容接口 ----
+
+    def isOpened(self):
+        return self._opened and not self.finished
+
+    def get_timestamp(self):
+        """最近一帧在源中的时间（秒），按帧序号和帧率计算，与墙上时间无关"""
+        return max(self.frame_index, 0) / self.fps
+
+    def _wait_for_frame_time(self, frame_index):
+        """realtime节奏下等到该帧应当出现的时间"""
+        if self._start_time is None:
+            self._start_time = time.time()
+            return
+        if self.pacing != 'realtime':
+            return
+        delay = self._start_time + frame_index / self.fps - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def grab(self):
+        """读取下一帧（保存在内部，由retrieve取出）"""
+        if not self.isOpened():
+            return False
+        if self.max_frames is not None and self.frame_index + 1 >= self.max_frames:
+            self.finished = True
+            return False
+
+        frame = self._next_frame()
+        if frame is None and self.loop and self._rewind():
+            frame = self._next_frame()
+        if frame is None:
+            self.finished = True
+            print(f"采集源已读完，共 {self.frame_index + 1} 帧")
+            return False
+
+        self.frame_index += 1
+        self._wait_for_frame_time(self.frame_index)
+        self._pending = frame
+        return True
+
+    def retrieve(self, image=None, flag=None):
+        """取出grab读到的帧
+
+        Args:
+            image: 可选的输出缓冲区，形状和类型匹配时直接写入，与VideoCapture.retrieve一致
+        """
+        frame = self._pending
+        self._pending = None
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def read(self, image=None):
+        """grab + retrieve"""
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def release(self):
+        """释放采集源"""
+        if self._opened:
+            self._opened = False
+            self._pending = None
+            self._close()
+
+    def get(self, prop_id):
+        """获取属性，支持宽高、帧率、帧序号和毫秒时间戳"""
+        if not CV2_AVAILABLE:
+            return 0
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frame_index + 1)
+        if prop_id == cv2.CAP_PROP_POS_MSEC:
+            return self.get_timestamp() * 1000.0
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frame_count)
+        return 0.0
+
+    def set(self, prop_id, value):
+        """录制源的分辨率和格式是固定的，设置摄像头参数一律返回False"""
+        return False
+
+    def get_stats(self):
+        """获取采集源统计信息"""
+        return {
+            'type': type(self).__name__,
+            'pacing': self.pacing,
+            'fps': self.fps,
+            'loop': self.loop,
+            'frames_read': self.frame_index + 1,
+            'finished': self.finished,
+            'resolution': f"{self.width}x{self.height}"
+        }
+
+
+class VideoFileSource(_CaptureSource):
+    """视频文件采集源"""
+    def __init__(self, path, fps=None, pacing='realtime', loop=False, max_frames=None):
+        """
+        Args:
+            path: 视频文件路径
+            其余参数见 _CaptureSource
+        """
+        super().__init__(fps, pacing, loop, max_frames)
+        if not CV2_AVAILABLE:
+            raise RuntimeError("OpenCV不可用，无法读取视频文件")
+        self.path = path
+        self._cap = cv2.VideoCapture(path)
+        self._opened = self._cap.isOpened()
+        if not self._opened:
+            print(f"无法打开视频文件: {path}")
+            self.width = self.height = self.frame_count = 0
+            self.fps = self.fps or DEFAULT_SOURCE_FPS
+            return
+
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self.fps or self._cap.get(cv2.CAP_PROP_FPS) or DEFAULT_SOURCE_FPS
+        print(f"打开视频文件 {path}: {self.width}x{self.height}, {self.fps:.1f} FPS, {self.frame_count} 帧, 节奏: {pacing}")
+
+    def _next_frame(self):
+        ret, frame = self._cap.read()
+        return frame if ret else None
+
+    def _rewind(self):
+        return self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _close(self):
+        self._cap.release()
+
+
+class ImageDirectorySource(_CaptureSource):
+    """图片目录采集源，按文件名排序依次发出"""
+    def __init__(self, directory, fps=DEFAULT_SOURCE_FPS, pacing='realtime', loop=False, max_frames=None):
+        """
+        Args:
+            directory: 图片目录
+            fps: 模拟的帧率（图片本身没有帧率）
+            其余参数见 _CaptureSource
+        """
+        super().__init__(fps or DEFAULT_SOURCE_FPS, pacing, loop, max_frames)
+        if not CV2_AVAILABLE:
+            raise RuntimeError("OpenCV不可用，无法读取图片")
+        self.directory = directory
+        self.paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ) if os.path.isdir(directory) else []
+        self.frame_count = len(self.paths)
+        self._position = 0
+        self.width = self.height = 0
+
+        # 以第一张图片的尺寸作为源分辨率
+        first = cv2.imread(self.paths[0]) if self.paths else None
+        self._opened = first is not None
+        if self._opened:
+            self.height, self.width = first.shape[:2]
+            print(f"打开图片目录 {directory}: {self.frame_count} 张, {self.width}x{self.height}, 模拟 {self.fps:.1f} FPS, 节奏: {pacing}")
+        else:
+            print(f"图片目录中没有可读取的图片: {directory}")
+
+    def _next_frame(self):
+        while self._position < len(self.paths):
+            path = self.paths[self._position]
+            self._position += 1
+            frame = cv2.imread(path)
+            if frame is None:
+                print(f"跳过无法读取的图片: {path}")
+                continue
+            # 尺寸不一致的图片缩放到源分辨率，保证下游缓冲区形状稳定
+            if frame.shape[0] != self.height or frame.shape[1] != self.width:
+                frame = cv2.resize(frame, (self.width, self.height))
+            return frame
+        return None
+
+    def _rewind(self):
+        self._position = 0
+        return bool(self.paths)
+
+
+def open_capture_source(path, fps=None, pacing='realtime', loop=False, max_frames=None):
+    """根据路径创建采集源：目录使用ImageDirectorySource，文件使用VideoFileSource"""
+    if os.path.isdir(path):
+        return ImageDirectorySource(path, fps=fps, pacing=pacing, loop=loop, max_frames=max_frames)
+    return VideoFileSource(path, fps=fps, pacing=pacing, loop=loop, max_frames=max_frames)
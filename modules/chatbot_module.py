@@ -24,6 +24,13 @@ from config import (SERIAL_BAUDRATE,
                     CHATBOT_MODULE,
                     TIME_OUT,
                     AUTO_RETURN)
+from modules.metrics_module import registry
+
+# 语音助手指标
+CHATBOT_REQUEST_SECONDS = registry.histogram(
+    'chatbot_request_seconds', '语音助手请求耗时（秒）', ('operation',),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0))
+CHATBOT_FAILURES = registry.counter('chatbot_failures_total', '语音助手请求未得到结果的次数', ('operation',))
 
 
 # 修改后的Agent类定义 (直接将声明代码复制过来)
@@ -292,10 +299,12 @@ class ChatbotService:
         if not message:
             return "请提供有效的消息内容。"
         
-        response = self.my_agent.send_message(message)
+        with CHATBOT_REQUEST_SECONDS.labels('send_message').time():
+            response = self.my_agent.send_message(message)
         if response:
             print(f"==>助手响应：{response}<==")
         else:
+            CHATBOT_FAILURES.labels('send_message').inc()
             print("==>助手未能生成响应<==")
         return response
 
@@ -342,7 +351,8 @@ class ChatbotService:
         
     def speak_text(self, text):
         """朗读指定文本，无需进行对话"""
-        return self.my_agent.speak_text(text)
+        with CHATBOT_REQUEST_SECONDS.labels('speak_text').time():
+            return self.my_agent.speak_text(text)
     
 
 
@@ -6,10 +6,15 @@ from datetime import datetime, timedelta
 import pytz
 import json
 import os
-from config import DB_CONFIG
+from config import DB_CONFIG, DEFAULT_CAMERA_ID
 
 # 导入清理功能模块
 from modules.new_cleanup_functions import cleanup_hourly_images, cleanup_daily_images
+from modules.metrics_module import registry, timed
+
+# 数据库指标
+DB_QUERY_SECONDS = registry.histogram('db_query_seconds', '数据库操作耗时（含连接，秒）', ('operation',))
+DB_FAILURES = registry.counter('db_failures_total', '数据库操作失败次数', ('operation',))
 
 # 添加图像存储路径配置
 POSTURE_IMAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'posture_images')
@@ -17,6 +22,9 @@ POSTURE_IMAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspat
 # 确保图像存储目录存在
 os.makedirs(POSTURE_IMAGES_DIR, exist_ok=True)
 
+# JPEG霍夫曼表（DHT）段标记，用于判断摄像头输出的MJPEG帧能否直接保存为独立的JPEG文件
+JPEG_DHT_MARKER = b'\xff\xc4'
+
 def init_database():
     """初始化数据库表结构"""
     try:
@@ -45,7 +53,8 @@ def init_database():
                 posture_status VARCHAR(50),
                 emotion VARCHAR(50),
                 timestamp DATETIME(6),
-                notes TEXT
+                notes TEXT,
+                device_id VARCHAR(64) NOT NULL DEFAULT 'default'
             )
         """)
         
@@ -59,10 +68,15 @@ def init_database():
                 angle FLOAT,
                 posture_type ENUM('good', 'mild', 'moderate', 'severe') NOT NULL,
                 is_active BOOLEAN DEFAULT TRUE,
-                notes TEXT
+                notes TEXT,
+                device_id VARCHAR(64) NOT NULL DEFAULT 'default'
             )
         """)
         
+        # 旧版本创建的表没有摄像头编号列，补充该列（已有记录归属默认摄像头）
+        for table in ('posture_images', 'posture_time_records'):
+            _ensure_device_column(cursor, table)
+        
         conn.commit()
         cursor.close()
         conn.close()
@@ -72,6 +86,15 @@ def init_database():
         print(f"数据库初始化失败: {str(e)}")
         return False
 
+def _ensure_device_column(cursor, table):
+    """表中没有device_id列时添加"""
+    cursor.execute(f"SHOW COLUMNS FROM {table} LIKE 'device_id'")
+    if cursor.fetchone():
+        return
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN device_id VARCHAR(64) NOT NULL DEFAULT %s", (DEFAULT_CAMERA_ID,))
+    print(f"已为 {table} 表添加 device_id 列")
+
+@timed(DB_QUERY_SECONDS.labels('save_record_to_db'))
 def save_record_to_db(sent_data, received_data, status="success", message=""):
     """保存通信记录到数据库"""
     try:
@@ -91,6 +114,7 @@ def save_record_to_db(sent_data, received_data, status="success", message=""):
         conn.close()
         return True
     except Exception as e:
+        DB_FAILURES.labels('save_record_to_db').inc()
         print(f"保存记录到数据库失败: {str(e)}")
         return False
 
@@ -110,7 +134,9 @@ def save_frame_to_db(frame_data):
         print(f"保存帧数据到数据库时出错: {str(e)}")
         return False
 
-def save_posture_image(image, angle, is_bad_posture, posture_status, emotion, notes=""):
+@timed(DB_QUERY_SECONDS.labels('save_posture_image'))
+def save_posture_image(image, angle, is_bad_posture, posture_status, emotion, notes="", jpeg_bytes=None,
+                       device_id=DEFAULT_CAMERA_ID):
     """保存坐姿图像并记录到数据库
     
     Args:
@@ -120,11 +146,14 @@ def save_posture_image(image, angle, is_bad_posture, posture_status, emotion, no
         posture_status: 坐姿状态描述
         emotion: 表情状态
         notes: 附加说明
+        jpeg_bytes: 摄像头输出的原始JPEG数据（可选），提供时直接写入文件，省去重新编码
+        device_id: 拍摄该图像的摄像头编号
         
     Returns:
         成功时返回图像ID和路径，失败时返回None
     """
     import cv2
+    import numpy as np
     from uuid import uuid4
     
     try:
@@ -133,8 +162,20 @@ def save_posture_image(image, angle, is_bad_posture, posture_status, emotion, no
         filename = f"posture_{timestamp.strftime('%Y%m%d_%H%M%S')}_{uuid4().hex[:8]}.jpg"
         image_path = os.path.join(POSTURE_IMAGES_DIR, filename)
         
-        # 保存图像
-        cv2.imwrite(image_path, image)
+        # 保存图像：有完整的原始JPEG数据时直接写入。部分摄像头的MJPEG帧省略了霍夫曼表，
+        # 不是所有查看器都能打开，这种情况按原始分辨率完整解码后重新编码
+        # （传入的image可能是降采样解码的分析帧，不能直接保存）
+        jpeg_data = bytes(jpeg_bytes) if jpeg_bytes is not None else None
+        if jpeg_data and JPEG_DHT_MARKER in jpeg_data:
+            with open(image_path, 'wb') as f:
+                f.write(jpeg_data)
+        else:
+            if jpeg_data:
+                full_image = cv2.imdecode(np.frombuffer(jpeg_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if full_image is None:
+                    raise ValueError("原始JPEG数据解码失败")
+                image = full_image
+            cv2.imwrite(image_path, image)
         
         # 相对路径，用于前端访问
         relative_path = f"/static/posture_images/{filename}"
@@ -144,8 +185,8 @@ def save_posture_image(image, angle, is_bad_posture, posture_status, emotion, no
         cursor = conn.cursor()
         
         sql = """INSERT INTO posture_images 
-                (image_path, angle, is_bad_posture, posture_status, emotion, timestamp, notes) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s)"""
+                (image_path, angle, is_bad_posture, posture_status, emotion, timestamp, notes, device_id) 
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"""
         
         values = (
             relative_path,
@@ -154,7 +195,8 @@ def save_posture_image(image, angle, is_bad_posture, posture_status, emotion, no
             posture_status,
             emotion,
             timestamp,
-            notes
+            notes,
+            device_id
         )
         
         cursor.execute(sql, values)
@@ -170,20 +212,22 @@ def save_posture_image(image, angle, is_bad_posture, posture_status, emotion, no
         current_hour = timestamp.replace(minute=0, second=0, microsecond=0)
         current_date = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
         
-        # 清理当前时间段的图片，保留最新的20张
-        cleanup_hourly_images(current_hour, 20)
+        # 清理该摄像头当前时间段的图片，保留最新的20张（各摄像头分别计算）
+        cleanup_hourly_images(current_hour, 20, device_id=device_id)
         
-        # 清理当天的图片，保留最新的240张
-        cleanup_daily_images(current_date, 240)
+        # 清理该摄像头当天的图片，保留最新的240张
+        cleanup_daily_images(current_date, 240, device_id=device_id)
         
         return {
             "id": image_id,
             "path": relative_path
         }
     except Exception as e:
+        DB_FAILURES.labels('save_posture_image').inc()
         print(f"保存坐姿图像失败: {str(e)}")
         return None
 
+@timed(DB_QUERY_SECONDS.labels('get_posture_images'))
 def get_posture_images(page=1, per_page=10, bad_posture_only=False, date=None, hour=None):
     """获取坐姿图像记录，支持分页、筛选和按日期时间段查询
     
@@ -424,6 +468,7 @@ def clear_posture_images(days_to_keep=None):
         print(f"清空坐姿图像记录失败: {str(e)}")
         return 0
     
+@timed(DB_QUERY_SECONDS.labels('get_history_records'))
 def get_history_records(page=1, per_page=10):
     """获取历史记录，支持分页"""
     try:
@@ -495,7 +540,9 @@ def clear_history():
         print(f"清空历史记录失败: {str(e)}")
         return False
 
-def record_posture_time(start_time, end_time, duration_seconds, angle, posture_type, notes=""):
+@timed(DB_QUERY_SECONDS.labels('record_posture_time'))
+def record_posture_time(start_time, end_time, duration_seconds, angle, posture_type, notes="",
+                        device_id=DEFAULT_CAMERA_ID):
     """记录坐姿时间段
     
     Args:
@@ -505,6 +552,7 @@ def record_posture_time(start_time, end_time, duration_seconds, angle, posture_t
         angle: 头部角度平均值
         posture_type: 坐姿类型('excellent', 'good', 'fair', 'poor')
         notes: 备注信息
+        device_id: 摄像头编号
         
     Returns:
         成功返回记录ID，失败返回None
@@ -514,8 +562,8 @@ def record_posture_time(start_time, end_time, duration_seconds, angle, posture_t
         cursor = conn.cursor()
         
         sql = """INSERT INTO posture_time_records 
-                (start_time, end_time, duration_seconds, angle, posture_type, notes) 
-                VALUES (%s, %s, %s, %s, %s, %s)"""
+                (start_time, end_time, duration_seconds, angle, posture_type, notes, device_id) 
+                VALUES (%s, %s, %s, %s, %s, %s, %s)"""
         
         values = (
             start_time,
@@ -523,7 +571,8 @@ def record_posture_time(start_time, end_time, duration_seconds, angle, posture_t
             duration_seconds,
             angle,
             posture_type,
-            notes
+            notes,
+            device_id
         )
         
         cursor.execute(sql, values)
@@ -537,9 +586,46 @@ def record_posture_time(start_time, end_time, duration_seconds, angle, posture_t
         
         return record_id
     except Exception as e:
+        DB_FAILURES.labels('record_posture_time').inc()
         print(f"记录坐姿时间失败: {str(e)}")
         return None
 
+@timed(DB_QUERY_SECONDS.labels('record_posture_times_batch'))
+def record_posture_times_batch(records):
+    """批量记录坐姿时间段（单个连接、单条executemany语句、单次提交）
+    
+    Args:
+        records: 记录元组列表，每条为 (start_time, end_time, duration_seconds, angle, posture_type, notes, device_id)，
+                 没有device_id的旧格式记录归属默认摄像头
+        
+    Returns:
+        成功返回写入的记录数，失败返回None
+    """
+    if not records:
+        return 0
+    
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+        
+        sql = """INSERT INTO posture_time_records 
+                (start_time, end_time, duration_seconds, angle, posture_type, notes, device_id) 
+                VALUES (%s, %s, %s, %s, %s, %s, %s)"""
+        
+        cursor.executemany(sql, [tuple(record) if len(record) >= 7 else (*record, DEFAULT_CAMERA_ID)
+                                 for record in records])
+        conn.commit()
+        
+        cursor.close()
+        conn.close()
+        
+        return len(records)
+    except Exception as e:
+        DB_FAILURES.labels('record_posture_times_batch').inc()
+        print(f"批量记录坐姿时间失败（{len(records)} 条）: {str(e)}")
+        return None
+
+@timed(DB_QUERY_SECONDS.labels('get_posture_stats'))
 def get_posture_stats(time_range='day', custom_start_date=None, custom_end_date=None, with_hourly_data=False):
     """获取坐姿统计数据
     
@@ -1,9 +1,15 @@
 # filepath: /home/cat/Py-server/modules/detection_module.py
-from Yolo import detector
 import time
 import threading
 import cv2
 import os
+from modules.metrics_module import registry
+from modules.camera_registry_module import camera_registry
+
+# 目标检测指标
+DETECTION_INFERENCE_SECONDS = registry.histogram('detection_inference_seconds', '目标检测单帧推理耗时（提交到取回结果，秒）')
+DETECTION_FRAMES = registry.counter('detection_frames_total', '目标检测处理的帧数', ('result',))
+DETECTION_FPS = registry.gauge('detection_fps', '目标检测帧率')
 
 class DetectionService:
     """检测服务类，用于管理目标检测"""
@@ -36,6 +42,57 @@ class DetectionService:
         self.max_errors = 3
         self.last_error_time = 0
         self.error_cooldown = 5.0  # 错误冷却时间（秒）
+        
+        # 共享帧分发器（设置后不再自行打开摄像头）
+        self.frame_broker = None
+        self.frame_subscriber = None
+        
+        DETECTION_FPS.set_function(lambda: float(self.detector.fps) if self.is_running() else 0.0)
+    
+    def set_frame_broker(self, frame_broker):
+        """设置共享的帧分发器，检测服务将通过订阅获取帧而不是独占摄像头
+        
+        Args:
+            frame_broker: FrameBroker实例
+        """
+        self.frame_broker = frame_broker
+        print("检测服务已连接到共享帧分发器")
+    
+    def _init_frame_source(self):
+        """初始化帧来源：优先订阅共享帧分发器，否则独立打开摄像头"""
+        if self.frame_broker is None:
+            return self._initialize_camera()
+        
+        # 分发器尚未运行时通过其打开函数启动采集
+        if not self.frame_broker.is_running and not self.frame_broker.start():
+            return False
+        
+        if self.frame_subscriber is None:
+            self.frame_subscriber = self.frame_broker.subscribe('detection')
+        self.api_preference = 'FrameBroker'
+        return True
+    
+    def _read_frame(self, timeout=1.0):
+        """读取一帧图像，返回(ret, frame)"""
+        if self.frame_subscriber is not None:
+            packet = self.frame_subscriber.read(timeout=timeout)
+            if packet is None:
+                return False, None
+            # 检测器线程池会异步持有提交的帧，而分发器的帧缓冲区在下一次读取后会被复用，因此这里复制一份
+            return True, packet.frame.copy()
+        return self.cap.read()
+    
+    def _release_frame_source(self):
+        """释放帧来源：取消订阅或释放独占的摄像头"""
+        if getattr(self, 'frame_subscriber', None) is not None:
+            self.frame_subscriber.close()
+            self.frame_subscriber = None
+            if self.frame_broker:
+                self.frame_broker.stop_if_idle()
+        
+        if hasattr(self, 'cap') and self.cap:
+            self.cap.release()
+            self.cap = None
     
     def _try_open_camera(self, camera_id, api_id, api_name, attempt=1):
         """尝试打开单个摄像头
@@ -119,13 +176,36 @@ class DetectionService:
         return None, None
 
     def _initialize_camera(self):
-        """初始化摄像头，尝试不同的摄像头ID和API
+        """初始化摄像头：优先按摄像头注册表中的配置打开，验证失败再完整探测
         
         Returns:
             bool: 是否成功初始化摄像头
         """
         print("\n开始初始化摄像头...")
+        open_start_time = time.time()
         
+        # 优先使用注册表中上次验证可用的配置，只需打开一次
+        cap, profile = camera_registry.open_cached(device=self.camera_id)
+        if cap is not None:
+            self.cap = cap
+            self.camera_id = profile['device']
+            self.api_preference = profile['backend_name']
+            camera_registry.record_open('detection', 'cache', time.time() - open_start_time)
+            return True
+        
+        # 这里只做可用性探测，没有优化格式也没有实测帧率，不写入注册表，
+        # 以免姿势分析下次启动时沿用未经优化的配置
+        if self._probe_camera():
+            camera_registry.record_open('detection', 'probe', time.time() - open_start_time)
+            return True
+        return False
+    
+    def _probe_camera(self):
+        """完整探测摄像头，尝试不同的摄像头ID和API
+        
+        Returns:
+            bool: 是否找到可用摄像头
+        """
         # 如果指定了摄像头ID，优先尝试
         if self.camera_id is not None:
             print(f"尝试使用指定的摄像头ID: {self.camera_id}")
@@ -353,9 +433,7 @@ class DetectionService:
                 self.detector = None
             
             # 释放摄像头资源
-            if hasattr(self, 'cap') and self.cap:
-                self.cap.release()
-                self.cap = None
+            self._release_frame_source()
             
             # 重置状态
             self.initialized = False
@@ -371,8 +449,9 @@ class DetectionService:
             bool: 是否成功初始化
         """
         try:
-            # 初始化摄像头
-            if not self._initialize_camera():
+            init_start_time = time.time()
+            # 初始化摄像头（或订阅共享帧分发器）
+            if not self._init_frame_source():
                 print("初始化检测服务失败: 无法初始化摄像头")
                 return False
             
@@ -389,6 +468,9 @@ class DetectionService:
                 return False
                 
             try:
+                # 检测器依赖ultralytics，初始化时才导入，避免导入本模块就加载模型框架
+                from Yolo import detector
+                
                 # 创建检测器实例
                 self.detector = detector.rknnPoolExecutor(
                     model_path=self.model_path,
@@ -407,14 +489,14 @@ class DetectionService:
                 
                 # 预热检测器
                 print("预热检测器...")
-                ret, frame = self.cap.read()
+                ret, frame = self._read_frame(timeout=2.0)
                 if ret:
                     self.detector.put(frame)
                     result, success = self.detector.get()
                     if not success:
                         print("警告: 预热过程中无法获取检测结果")
                 
-                print("检测器初始化成功")
+                print(f"检测器初始化成功，耗时 {time.time() - init_start_time:.2f} 秒")
                 self.initialized = True
                 return True
                 
@@ -437,7 +519,8 @@ class DetectionService:
             if self.detector:
                 self.detector.cleanup()
                 self.detector = None
-                
+            
+            self._release_frame_source()
             self.initialized = False
     
     def __del__(self):
@@ -531,17 +614,17 @@ class DetectionService:
         while self.detector and self.detector.running:
             try:
                 # 获取一帧图像
-                ret, frame = self.cap.read()
+                ret, frame = self._read_frame()
                 if not ret:
                     print("无法获取摄像头帧")
                     time.sleep(0.01)
                     continue
                     
-                # 将帧提交给检测器
+                # 将帧提交给检测器并获取检测结果
+                inference_start = time.perf_counter()
                 self.detector.put(frame)
-                
-                # 获取检测结果
                 result, success = self.detector.get()
+                DETECTION_INFERENCE_SECONDS.observe(time.perf_counter() - inference_start)
                 if not success or result is None:
                     print("无法获取检测结果")
                     time.sleep(0.01)
@@ -569,6 +652,8 @@ class DetectionService:
                         self.detector.detected = True
                         detected = True
                 
+                DETECTION_FRAMES.labels('detected' if detected else 'none').inc()
+                
                 if not detected:
                     self.detector.position = [0.0, 0.0]
                     self.detector.width = 0.0
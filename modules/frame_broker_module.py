@@ -0,0 +1,679 @@
+"""
+帧分发模块 - 作为摄像头的唯一读取者，将带时间戳的帧发布到环形缓冲区供多个消费者订阅
+"""
+import time
+import threading
+from collections import deque
+import cv2
+from modules.frame_pool_module import FrameBufferPool
+from modules.trace_module import tracer
+
+# 帧分发相关配置
+FRAME_RING_SIZE = 4              # 环形缓冲区保留的最近帧数
+READ_FAILURE_SLEEP = 0.01        # 读取失败后的等待时间（秒）
+MAX_CONSECUTIVE_FAILURES = 5     # 连续读取失败多少次后尝试重连
+RECONNECT_INTERVAL = 10.0        # 两次重连之间的最小间隔（秒）
+
+# MJPEG原始数据模式下按缩小比例直接解码（libjpeg在解码时按DCT缩放，比全尺寸解码后再缩小快得多）
+MJPEG_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+DECODE_SCALE_AUTO = 0  # 解码缩小倍数取此值时按摄像头实际分辨率和最小解码尺寸自动选择
+
+
+class FramePacket:
+    """帧数据包
+
+    发布到环形缓冲区后的帧视为只读，多个消费者共享同一个数组，
+    需要在帧上绘制的消费者必须先自行复制。帧数据位于池化缓冲区中，
+    环形缓冲区和每个订阅者各持有一次引用；需要在订阅者下一次读取之后
+    继续使用该帧的消费者（如跨线程传递）必须先调用retain()，用完后release()。
+
+    MJPEG原始数据模式下frame是按缩小比例解码的图像，jpeg_bytes保留摄像头输出的
+    原始全分辨率JPEG数据（一维uint8数组），保存抓拍图像时可直接写入文件而无需重新编码。
+    """
+    __slots__ = ('seq', 'timestamp', 'frame', 'buffer', 'jpeg_bytes', 'decode_scale')
+
+    def __init__(self, seq, timestamp, frame, buffer=None, jpeg_bytes=None, decode_scale=1):
+        self.seq = seq                    # 单调递增的帧序号
+        self.timestamp = timestamp        # 采集时间戳（time.time()）
+        self.frame = frame                # 帧图像
+        self.buffer = buffer              # 帧所在的池化缓冲区（PooledFrame）
+        self.jpeg_bytes = jpeg_bytes      # 原始JPEG数据，非MJPEG原始数据模式时为None
+        self.decode_scale = decode_scale  # frame相对摄像头原始分辨率的缩小倍数
+
+    def retain(self):
+        """增加一次帧缓冲区引用"""
+        if self.buffer is not None:
+            self.buffer.retain()
+        return self
+
+    def release(self):
+        """释放一次帧缓冲区引用"""
+        if self.buffer is not None:
+            self.buffer.release()
+
+
+class FrameSubscriber:
+    """帧订阅者，每个消费者持有一个，按自己的速率读取最新帧
+
+    订阅者始终持有最近一次读取到的帧，直到下一次读取或取消订阅
+    """
+    def __init__(self, broker, name, max_fps=None):
+        """
+        Args:
+            broker: 所属的FrameBroker
+            name: 订阅者名称（用于统计）
+            max_fps: 最大读取帧率，None表示不限制
+        """
+        self.broker = broker
+        self.name = name
+        self.max_fps = max_fps
+        self.last_seq = 0
+        self.last_read_time = 0
+        self.frames_read = 0
+        self.frames_missed = 0  # 因读取速率低于发布速率而跳过的帧数
+        self.closed = False
+        self._held = None       # 当前持有引用的帧
+
+    def read(self, timeout=1.0):
+        """阻塞等待一帧比上次读取更新的帧
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            FramePacket，超时或分发器停止时返回None
+        """
+        if self.closed:
+            return None
+
+        # 按订阅者自身的帧率限制读取节奏
+        if self.max_fps:
+            wait_time = self.last_read_time + 1.0 / self.max_fps - time.time()
+            if wait_time > 0:
+                time.sleep(wait_time)
+
+        packet = self.broker.wait_for_frame(self.last_seq, timeout, retain=True)
+        if packet is None:
+            return None
+        self._hold(packet)
+
+        if self.last_seq and packet.seq > self.last_seq + 1:
+            self.frames_missed += packet.seq - self.last_seq - 1
+        self.last_seq = packet.seq
+        self.last_read_time = time.time()
+        self.frames_read += 1
+        return packet
+
+    def latest(self):
+        """非阻塞获取最新帧（可能与上次读取的是同一帧）"""
+        packet = self.broker.get_latest(retain=True)
+        if packet is not None:
+            self._hold(packet)
+            self.last_seq = max(self.last_seq, packet.seq)
+        return packet
+
+    def _hold(self, packet):
+        """持有新帧（已由调用方增加引用）并释放之前持有的帧"""
+        previous, self._held = self._held, packet
+        if previous is not None:
+            previous.release()
+
+    def close(self):
+        """取消订阅"""
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+            if self._held is not None:
+                self._held.release()
+                self._held = None
+
+    def get_stats(self):
+        """获取订阅者统计信息"""
+        return {
+            'name': self.name,
+            'max_fps': self.max_fps,
+            'frames_read': self.frames_read,
+            'frames_missed': self.frames_missed,
+            'last_seq': self.last_seq
+        }
+
+
+class FrameBroker:
+    """摄像头帧分发器
+
+    唯一持有并读取摄像头句柄的组件。采集线程将每一帧连同时间戳发布到
+    加锁保护的环形缓冲区，姿势分析、情绪分析、家长监护原始流和目标检测
+    等消费者通过订阅按各自的速率取帧，不会产生额外的设备读取。
+    """
+    def __init__(self, ring_size=FRAME_RING_SIZE, frame_callback=None):
+        """
+        Args:
+            ring_size: 环形缓冲区大小
+            frame_callback: 每采集到一帧时调用的回调，参数为FramePacket
+        """
+        self._ring = deque(maxlen=ring_size)
+        self._cond = threading.Condition()
+        self.frame_pool = FrameBufferPool('capture')
+        self._frame_shape = None  # 最近一次采集的帧尺寸，用于从缓冲池取同尺寸缓冲区
+        self._seq = 0
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+
+        self.cap = None
+        self.opener = None        # 打开/重新打开摄像头的函数，返回已打开的VideoCapture
+        self.frame_callback = frame_callback
+        self.is_running = False
+        self.thread = None
+
+        # 采集参数
+        self.use_separate_grab_retrieve = True
+        self.raw_mjpeg = False        # 是否请求MJPEG原始数据并自行按缩小比例解码
+        self.decode_scale = 1         # 请求的解码缩小倍数（1/2/4/8，DECODE_SCALE_AUTO表示自动）
+        self.min_decode_size = None   # 解码后的最小尺寸 (宽, 高)，缩小倍数不会使解码帧小于此尺寸
+        self.active_decode_scale = 1  # 在当前摄像头上实际使用的解码缩小倍数
+        self._raw_active = False      # 原始数据模式是否已在当前摄像头上生效
+        self._decode_mode_dirty = False
+
+        # 统计信息
+        self.stats = {
+            'frames_published': 0,
+            'read_failures': 0,
+            'reconnects': 0,
+            'last_reconnect_time': 0,
+            'raw_decode_failures': 0
+        }
+
+    def set_decode_mode(self, raw_mjpeg=None, decode_scale=None, min_decode_size=None):
+        """设置采集解码模式，运行中修改时由采集线程在下一帧前生效
+
+        Args:
+            raw_mjpeg: 是否从摄像头读取MJPEG原始数据并自行解码（摄像头不支持时自动回退）
+            decode_scale: 原始数据模式下的解码缩小倍数，可选1、2、4、8，或DECODE_SCALE_AUTO
+            min_decode_size: 解码后的最小尺寸 (宽, 高)，通常为最高的处理分辨率
+        """
+        if raw_mjpeg is not None:
+            self.raw_mjpeg = bool(raw_mjpeg)
+        if decode_scale is not None:
+            if decode_scale != DECODE_SCALE_AUTO and decode_scale not in MJPEG_DECODE_FLAGS:
+                print(f"不支持的解码缩小倍数: {decode_scale}，可选值: {[DECODE_SCALE_AUTO] + list(MJPEG_DECODE_FLAGS)}")
+                return False
+            self.decode_scale = decode_scale
+        if min_decode_size is not None:
+            self.min_decode_size = tuple(min_decode_size)
+        self._decode_mode_dirty = True
+        return True
+
+    def resolve_decode_scale(self, capture_width, capture_height):
+        """按摄像头实际分辨率选择解码缩小倍数：不超过请求的倍数，且解码帧不小于最小解码尺寸
+
+        例如最小解码尺寸为640x480时，640x480的摄像头按原始分辨率解码，1280x720及以上才按1/2解码。
+        """
+        limit = max(MJPEG_DECODE_FLAGS) if self.decode_scale == DECODE_SCALE_AUTO else self.decode_scale
+        min_width, min_height = self.min_decode_size or (0, 0)
+        scale = 1
+        for candidate in sorted(MJPEG_DECODE_FLAGS):
+            if candidate > limit:
+                break
+            if capture_width // candidate >= min_width and capture_height // candidate >= min_height:
+                scale = candidate
+        return scale
+
+    def _apply_decode_mode(self):
+        """在当前摄像头上应用解码模式（只在采集线程或启动时调用）"""
+        self._decode_mode_dirty = False
+        self._raw_active = False
+        if not self.cap:
+            return
+        try:
+            if self.raw_mjpeg:
+                fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+                fourcc_str = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4))
+                if fourcc_str != 'MJPG':
+                    print(f"摄像头输出格式为 {fourcc_str or '未知'}，不是MJPG，使用常规解码")
+                elif self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0):
+                    width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                    height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                    self.active_decode_scale = self.resolve_decode_scale(width, height)
+                    self._raw_active = True
+                    print(f"采集使用MJPEG原始数据，{width}x{height} 按 1/{self.active_decode_scale} 分辨率解码")
+                    return
+                else:
+                    print("摄像头后端不支持输出原始数据，使用常规解码")
+            self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        except Exception as e:
+            print(f"设置采集解码模式失败: {str(e)}")
+
+    def set_opener(self, opener):
+        """设置摄像头打开函数，供按需启动和断线重连使用"""
+        self.opener = opener
+
+    def start(self, cap=None):
+        """启动采集线程
+
+        Args:
+            cap: 已打开的VideoCapture，为None时调用opener打开
+
+        Returns:
+            是否成功启动
+        """
+        if self.is_running:
+            return True
+
+        if cap is None and self.opener:
+            cap = self.opener()
+
+        if cap is None or not cap.isOpened():
+            print("帧分发器启动失败：没有可用的摄像头")
+            return False
+
+        self.cap = cap
+        self._decode_mode_dirty = True
+        self.is_running = True
+        self.thread = threading.Thread(target=self._capture_loop, name='frame-broker', daemon=True)
+        self.thread.start()
+        print("帧分发器已启动")
+        return True
+
+    def stop(self):
+        """停止采集线程并释放摄像头"""
+        self.is_running = False
+
+        # 唤醒所有等待中的订阅者
+        with self._cond:
+            self._cond.notify_all()
+
+        if self.thread:
+            try:
+                self.thread.join(timeout=2.0)
+            except Exception:
+                pass
+            self.thread = None
+
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+
+        with self._cond:
+            while self._ring:
+                self._ring.popleft().release()
+
+        print("帧分发器已停止")
+        return True
+
+    def stop_if_idle(self):
+        """没有订阅者时停止采集，返回是否已停止"""
+        with self._subscribers_lock:
+            idle = not self._subscribers
+        if idle and self.is_running:
+            self.stop()
+        return not self.is_running
+
+    def subscribe(self, name, max_fps=None):
+        """创建一个订阅者
+
+        Args:
+            name: 订阅者名称
+            max_fps: 最大读取帧率，None表示跟随采集帧率
+
+        Returns:
+            FrameSubscriber
+        """
+        subscriber = FrameSubscriber(self, name, max_fps)
+        with self._subscribers_lock:
+            self._subscribers.append(subscriber)
+        print(f"帧分发器新增订阅者: {name}")
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """移除订阅者"""
+        with self._subscribers_lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+                print(f"帧分发器移除订阅者: {subscriber.name}")
+
+    def get_latest(self, retain=False):
+        """非阻塞获取最新一帧，没有帧时返回None
+
+        Args:
+            retain: 是否为调用方增加一次帧缓冲区引用（调用方负责release）
+        """
+        with self._cond:
+            if not self._ring:
+                return None
+            packet = self._ring[-1]
+            return packet.retain() if retain else packet
+
+    def wait_for_frame(self, last_seq, timeout=1.0, retain=False):
+        """等待序号大于last_seq的帧
+
+        Args:
+            last_seq: 调用方上次读取的帧序号
+            timeout: 最长等待时间（秒）
+            retain: 是否为调用方增加一次帧缓冲区引用（调用方负责release）
+
+        Returns:
+            最新的FramePacket，超时或停止时返回None
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: not self.is_running or (self._ring and self._ring[-1].seq > last_seq),
+                timeout
+            )
+            if self._ring and self._ring[-1].seq > last_seq:
+                packet = self._ring[-1]
+                return packet.retain() if retain else packet
+            return None
+
+    def _publish(self, frame, timestamp, buffer=None, jpeg_bytes=None):
+        """将一帧发布到环形缓冲区并通知订阅者"""
+        with self._cond:
+            self._seq += 1
+            packet = FramePacket(self._seq, timestamp, frame, buffer, jpeg_bytes,
+                                 self.active_decode_scale if jpeg_bytes is not None else 1)
+            # 环形缓冲区已满时，被挤出的最旧帧释放环形缓冲区持有的引用
+            if len(self._ring) == self._ring.maxlen:
+                self._ring[0].release()
+            self._ring.append(packet)
+            self._cond.notify_all()
+        self.stats['frames_published'] += 1
+        return packet
+
+    def _read_raw_frame(self):
+        """读取MJPEG原始数据并按缩小比例解码
+
+        Returns:
+            (是否成功, 帧图像, 原始JPEG数据)；摄像头实际没有输出原始数据时回退到常规解码
+        """
+        if self.use_separate_grab_retrieve:
+            with tracer.span('capture.grab', 'capture'):
+                ret = self.cap.grab()
+            if ret:
+                with tracer.span('capture.retrieve', 'capture'):
+                    ret, raw = self.cap.retrieve()
+        else:
+            with tracer.span('capture.read', 'capture'):
+                ret, raw = self.cap.read()
+
+        if not ret or raw is None:
+            return False, None, None
+
+        # 后端忽略CONVERT_RGB时仍会返回解码后的图像，此时退回常规模式
+        if raw.ndim == 3 or (raw.ndim == 2 and raw.shape[0] != 1):
+            print("摄像头未输出MJPEG原始数据，回退到常规解码")
+            self._raw_active = False
+            return True, raw, None
+
+        raw = raw.reshape(-1)
+        with tracer.span('capture.decode', 'capture'):
+            frame = cv2.imdecode(raw, MJPEG_DECODE_FLAGS[self.active_decode_scale])
+        if frame is None:
+            self.stats['raw_decode_failures'] += 1
+            return False, None, None
+        # imdecode不支持写入已有缓冲区，记录分配以保持缓冲池统计完整
+        self.frame_pool.record_allocation(frame.nbytes)
+        return True, frame, raw
+
+    def _read_frame(self):
+        """从摄像头读取一帧，直接解码到池化缓冲区
+
+        Returns:
+            (是否成功, 帧图像, PooledFrame)
+        """
+        buffer = self.frame_pool.acquire(self._frame_shape) if self._frame_shape else None
+        target = buffer.array if buffer is not None else None
+
+        if self.use_separate_grab_retrieve:
+            with tracer.span('capture.grab', 'capture'):
+                ret = self.cap.grab()
+            if ret:
+                with tracer.span('capture.retrieve', 'capture'):
+                    ret, frame = self.cap.retrieve(target)
+        else:
+            with tracer.span('capture.read', 'capture'):
+                ret, frame = self.cap.read(target)
+
+        if not ret or frame is None:
+            if buffer is not None:
+                buffer.release()
+            return False, None, None
+
+        # 首帧或尺寸变化时OpenCV会分配新数组，将其纳入缓冲池管理
+        if buffer is None or frame.ctypes.data != buffer.array.ctypes.data:
+            if buffer is not None:
+                buffer.release()
+            buffer = self.frame_pool.adopt(frame)
+            self._frame_shape = frame.shape
+
+        return True, frame, buffer
+
+    def _reconnect(self):
+        """尝试重新打开摄像头"""
+        current_time = time.time()
+        if not self.opener or (current_time - self.stats['last_reconnect_time']) < RECONNECT_INTERVAL:
+            return False
+
+        self.stats['last_reconnect_time'] = current_time
+        print("帧分发器连续读取失败，尝试重新初始化摄像头...")
+        try:
+            if self.cap:
+                self.cap.release()
+            cap = self.opener()
+        except Exception as e:
+            print(f"重新初始化摄像头异常: {str(e)}")
+            cap = None
+
+        if cap is None or not cap.isOpened():
+            print("重新初始化摄像头失败，暂停1秒后重试")
+            time.sleep(1)
+            return False
+
+        self.cap = cap
+        self._decode_mode_dirty = True
+        self.stats['reconnects'] += 1
+        return True
+
+    def _capture_loop(self):
+        """采集主循环 - 唯一调用摄像头读取的地方"""
+        consecutive_failures = 0
+
+        while self.is_running and self.cap:
+            try:
+                if consecutive_failures > MAX_CONSECUTIVE_FAILURES:
+                    if self._reconnect():
+                        consecutive_failures = 0
+                    else:
+                        time.sleep(READ_FAILURE_SLEEP)
+                        continue
+
+                if self._decode_mode_dirty:
+                    self._apply_decode_mode()
+
+                jpeg_bytes = None
+                if self._raw_active:
+                    buffer = None
+                    ret, frame, jpeg_bytes = self._read_raw_frame()
+                else:
+                    ret, frame, buffer = self._read_frame()
+                timestamp = time.time()
+                if not ret or frame is None:
+                    consecutive_failures += 1
+                    self.stats['read_failures'] += 1
+                    time.sleep(READ_FAILURE_SLEEP)
+                    continue
+
+                consecutive_failures = 0
+                packet = self._publish(frame, timestamp, buffer, jpeg_bytes)
+
+                if self.frame_callback:
+                    self.frame_callback(packet)
+            except Exception as e:
+                print(f"帧分发器采集异常: {str(e)}")
+                consecutive_failures += 1
+                time.sleep(0.1)
+
+    def get_stats(self):
+        """获取分发器统计信息"""
+        with self._subscribers_lock:
+            subscribers = [s.get_stats() for s in self._subscribers]
+        return {
+            'running': self.is_running,
+            'frames_published': self.stats['frames_published'],
+            'read_failures': self.stats['read_failures'],
+            'reconnects': self.stats['reconnects'],
+            'raw_mjpeg': self._raw_active,
+            'decode_scale': self.active_decode_scale if self._raw_active else 1,
+            'raw_decode_failures': self.stats['raw_decode_failures'],
+            'subscribers': subscribers,
+            'frame_pool': self.frame_pool.get_stats()
+        }
+
+
+class LatestFrameSlot:
+    """单槽位"最新优先"队列，用于连接流水线的各个阶段
+
+    生产者放入新数据时直接覆盖尚未被取走的旧数据（计为丢弃），
+    消费者总是拿到最新的数据，慢阶段不会堆积延迟，也不会阻塞上游。
+    """
+    def __init__(self, name, on_discard=None):
+        """
+        Args:
+            name: 槽位名称（用于统计）
+            on_discard: 数据被覆盖或随槽位关闭丢弃时的回调，用于释放其持有的缓冲区
+        """
+        self.name = name
+        self.on_discard = on_discard
+        self._item = None
+        self._has_item = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {
+            'put': 0,
+            'taken': 0,
+            'dropped': 0  # 未被消费就被新数据覆盖的次数
+        }
+
+    def put(self, item):
+        """放入数据，覆盖尚未被取走的旧数据"""
+        with self._cond:
+            discarded = self._item if self._has_item else None
+            if self._has_item:
+                self.stats['dropped'] += 1
+            self._item = item
+            self._has_item = True
+            self.stats['put'] += 1
+            self._cond.notify()
+        if discarded is not None and self.on_discard:
+            self.on_discard(discarded)
+
+    def get(self, timeout=1.0):
+        """阻塞等待并取走最新数据
+
+        Returns:
+            数据，超时或槽位关闭时返回None
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._has_item or self._closed, timeout)
+            if not self._has_item:
+                return None
+            item = self._item
+            self._item = None
+            self._has_item = False
+            self.stats['taken'] += 1
+            return item
+
+    def _clear(self):
+        """清空残留数据，返回被清掉的数据"""
+        discarded = self._item if self._has_item else None
+        self._item = None
+        self._has_item = False
+        return discarded
+
+    def open(self):
+        """重新打开槽位并清空残留数据"""
+        with self._cond:
+            discarded = self._clear()
+            self._closed = False
+        if discarded is not None and self.on_discard:
+            self.on_discard(discarded)
+
+    def close(self):
+        """关闭槽位，唤醒所有等待的消费者"""
+        with self._cond:
+            self._closed = True
+            discarded = self._clear()
+            self._cond.notify_all()
+        if discarded is not None and self.on_discard:
+            self.on_discard(discarded)
+
+    def get_stats(self):
+        """获取槽位统计信息"""
+        return {'name': self.name, **self.stats}
+
+
+class FrameMailbox:
+    """带版本号的单槽位"最新帧"信箱，用于向多个视频流观看者发布同一路分析帧
+
+    生产者每发布一帧版本号加一并唤醒所有等待的消费者。与LatestFrameSlot不同，读取不会取走数据：
+    每个消费者记住自己上次发送的版本号，阻塞等待比它更新的版本，同一帧不会被同一消费者重复发送，
+    也不需要按固定间隔轮询。
+    """
+    def __init__(self, name, frame=None):
+        """
+        Args:
+            name: 信箱名称（用于统计）
+            frame: 初始帧（版本号0）
+        """
+        self.name = name
+        self._frame = frame
+        self._version = 0
+        self._cond = threading.Condition()
+        self.stats = {
+            'published': 0,
+            'idle_wakeups': 0  # 等待超时或被唤醒时没有新帧的次数
+        }
+
+    @property
+    def version(self):
+        """最新帧的版本号"""
+        return self._version
+
+    def publish(self, frame):
+        """发布新帧并唤醒所有等待者，返回新帧的版本号"""
+        with self._cond:
+            self._frame = frame
+            self._version += 1
+            self.stats['published'] += 1
+            self._cond.notify_all()
+            return self._version
+
+    def latest(self):
+        """获取最新帧 (版本号, 帧)，不等待"""
+        with self._cond:
+            return self._version, self._frame
+
+    def wait_newer(self, version, timeout=None):
+        """阻塞等待比version更新的帧
+
+        Returns:
+            (版本号, 帧)；超时或被wake_all唤醒时返回当前的最新帧，其版本号可能仍等于version
+        """
+        with self._cond:
+            if self._version <= version:
+                self._cond.wait(timeout)
+                if self._version <= version:
+                    self.stats['idle_wakeups'] += 1
+            return self._version, self._frame
+
+    def wake_all(self):
+        """唤醒所有等待者（如视频流被禁用时让生成器及时退出）"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def get_stats(self):
+        """获取信箱统计信息"""
+        return {'name': self.name, 'version': self._version, **self.stats}
@@ -0,0 +1,139 @@
+"""
+帧缓冲池模块 - 预分配并复用帧缓冲区，避免分析循环中每帧都分配新的numpy数组
+"""
+import time
+import threading
+from collections import deque
+import numpy as np
+
+# 缓冲池相关配置
+POOL_MAX_FREE_BUFFERS = 8        # 每种尺寸最多保留的空闲缓冲区数量
+ALLOCATION_RATE_WINDOW = 10.0    # 统计分配速率的时间窗口（秒）
+
+
+class PooledFrame:
+    """带引用计数的池化帧缓冲区
+
+    引用计数归零时缓冲区自动归还缓冲池。持有者在不再使用时必须调用release()，
+    需要把缓冲区交给其他线程时先调用retain()增加引用。
+    """
+    __slots__ = ('pool', 'array', 'refs')
+
+    def __init__(self, pool, array):
+        self.pool = pool
+        self.array = array
+        self.refs = 1
+
+    def retain(self):
+        """增加一次引用"""
+        with self.pool.lock:
+            self.refs += 1
+        return self
+
+    def release(self):
+        """释放一次引用，归零时归还缓冲池"""
+        self.pool._release(self)
+
+
+class FrameBufferPool:
+    """按尺寸分组的帧缓冲池"""
+    def __init__(self, name, max_free_buffers=POOL_MAX_FREE_BUFFERS):
+        """
+        Args:
+            name: 缓冲池名称（用于统计）
+            max_free_buffers: 每种尺寸最多保留的空闲缓冲区数量
+        """
+        self.name = name
+        self.max_free_buffers = max_free_buffers
+        self.lock = threading.Lock()
+        self._free = {}  # (shape, dtype) -> 空闲缓冲区列表
+        self._allocation_events = deque()  # (时间戳, 字节数)
+
+        # 统计信息
+        self.stats = {
+            'allocations': 0,      # 新分配的缓冲区数
+            'reuses': 0,           # 复用空闲缓冲区的次数
+            'allocated_bytes': 0,  # 累计分配的字节数
+            'in_use': 0            # 当前被持有的缓冲区数
+        }
+
+    def acquire(self, shape, dtype=np.uint8):
+        """获取一个指定尺寸的缓冲区（内容未初始化）
+
+        Returns:
+            PooledFrame，引用计数为1
+        """
+        key = (tuple(shape), np.dtype(dtype))
+        with self.lock:
+            free_list = self._free.get(key)
+            if free_list:
+                buffer = free_list.pop()
+                buffer.refs = 1
+                self.stats['reuses'] += 1
+                self.stats['in_use'] += 1
+                return buffer
+
+        array = np.empty(shape, dtype=dtype)
+        buffer = PooledFrame(self, array)
+        with self.lock:
+            self._record_allocation_locked(array.nbytes)
+            self.stats['in_use'] += 1
+        return buffer
+
+    def acquire_like(self, array):
+        """获取一个与给定数组尺寸和类型相同的缓冲区"""
+        return self.acquire(array.shape, array.dtype)
+
+    def adopt(self, array):
+        """将池外分配的数组纳入缓冲池管理（记为一次分配）
+
+        Returns:
+            PooledFrame，引用计数为1
+        """
+        buffer = PooledFrame(self, array)
+        with self.lock:
+            self._record_allocation_locked(array.nbytes)
+            self.stats['in_use'] += 1
+        return buffer
+
+    def record_allocation(self, nbytes):
+        """记录一次池外的数组分配，使分配速率统计覆盖无法池化的路径"""
+        with self.lock:
+            self._record_allocation_locked(nbytes)
+
+    def _record_allocation_locked(self, nbytes):
+        self.stats['allocations'] += 1
+        self.stats['allocated_bytes'] += nbytes
+        self._allocation_events.append((time.time(), nbytes))
+
+    def _release(self, buffer):
+        with self.lock:
+            buffer.refs -= 1
+            if buffer.refs > 0:
+                return
+            self.stats['in_use'] -= 1
+            key = (buffer.array.shape, buffer.array.dtype)
+            free_list = self._free.setdefault(key, [])
+            if len(free_list) < self.max_free_buffers:
+                free_list.append(buffer)
+
+    def get_allocated_bytes_per_sec(self):
+        """获取最近时间窗口内的平均分配速率（字节/秒）"""
+        with self.lock:
+            cutoff = time.time() - ALLOCATION_RATE_WINDOW
+            while self._allocation_events and self._allocation_events[0][0] < cutoff:
+                self._allocation_events.popleft()
+            total = sum(nbytes for _, nbytes in self._allocation_events)
+        return total / ALLOCATION_RATE_WINDOW
+
+    def get_stats(self):
+        """获取缓冲池统计信息"""
+        allocated_bytes_per_sec = self.get_allocated_bytes_per_sec()
+        with self.lock:
+            free_buffers = sum(len(free_list) for free_list in self._free.values())
+            return {
+                'name': self.name,
+                **self.stats,
+                'free_buffers': free_buffers,
+                'allocated_bytes_per_sec': round(allocated_bytes_per_sec, 1)
+            }
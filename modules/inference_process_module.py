@@ -0,0 +1,299 @@
+"""
+推理进程模块 - 在独立工作进程中运行MediaPipe Pose和FaceMesh，绕开主进程的GIL
+
+主进程通过共享内存（multiprocessing.shared_memory）传递帧数据，工作进程只返回
+关键点数组；主进程侧的适配器再把数组还原为MediaPipe的NormalizedLandmarkList，
+因此 ProcessPose / ProcessFaceMesh 可以直接替换 mp_pose.Pose / FaceMesh 使用。
+"""
+import time
+import queue
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing import shared_memory
+import numpy as np
+import cv2
+
+try:
+    from mediapipe.framework.formats import landmark_pb2
+    LANDMARK_PB2_AVAILABLE = True
+except ImportError as e:
+    print(f"导入MediaPipe关键点格式失败：{str(e)}")
+    LANDMARK_PB2_AVAILABLE = False
+
+# 推理进程相关配置
+MAX_FRAME_SHAPE = (480, 640, 3)    # 共享内存可容纳的最大帧尺寸（高, 宽, 通道）
+STARTUP_TIMEOUT = 30.0             # 等待工作进程加载模型的最长时间（秒）
+RESULT_TIMEOUT = 2.0               # 等待单帧推理结果的最长时间（秒）
+MAX_CONSECUTIVE_TIMEOUTS = 3       # 连续超时多少次后认为工作进程已失效
+
+# 工作进程的种类
+KIND_POSE = 'pose'
+KIND_FACE_MESH = 'face_mesh'
+
+
+def _landmarks_to_array(landmark_list, with_visibility):
+    """将NormalizedLandmarkList转换为float32数组"""
+    if with_visibility:
+        return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmark_list.landmark], dtype=np.float32)
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmark_list.landmark], dtype=np.float32)
+
+
+def _inference_worker(kind, shm_name, options, request_queue, result_queue):
+    """工作进程入口：加载模型，循环处理主进程写入共享内存的帧
+
+    Args:
+        kind: 模型种类（KIND_POSE 或 KIND_FACE_MESH）
+        shm_name: 共享内存名称
+        options: 传给MediaPipe模型构造函数的参数
+        request_queue: 请求队列，元素为 (请求序号, 高, 宽)，None表示退出
+        result_queue: 结果队列，元素为 (请求序号, 关键点数组或None)
+    """
+    import mediapipe as mp
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        if kind == KIND_POSE:
+            model = mp.solutions.pose.Pose(**options)
+        else:
+            model = mp.solutions.face_mesh.FaceMesh(**options)
+        result_queue.put(('ready', None))
+
+        while True:
+            request = request_queue.get()
+            if request is None:
+                break
+
+            seq, height, width = request
+            # 共享内存中保存的是RGB帧，直接以视图方式读取，不复制
+            frame = np.ndarray((height, width, 3), dtype=np.uint8, buffer=shm.buf)
+            try:
+                results = model.process(frame)
+                if kind == KIND_POSE:
+                    landmarks = (_landmarks_to_array(results.pose_landmarks, True)
+                                 if results.pose_landmarks else None)
+                else:
+                    landmarks = ([_landmarks_to_array(face, False) for face in results.multi_face_landmarks]
+                                 if results.multi_face_landmarks else None)
+            except Exception as e:
+                print(f"推理进程({kind})处理帧异常: {str(e)}")
+                landmarks = None
+            del frame
+            result_queue.put((seq, landmarks))
+
+        model.close()
+    finally:
+        shm.close()
+
+
+class InferenceResult:
+    """与MediaPipe的process()返回值保持相同属性的结果对象"""
+    def __init__(self, pose_landmarks=None, multi_face_landmarks=None, pose_landmark_array=None):
+        self.pose_landmarks = pose_landmarks
+        self.multi_face_landmarks = multi_face_landmarks
+        self.pose_landmark_array = pose_landmark_array  # 工作进程返回的原始关键点数组，特征计算直接使用
+
+
+class InferenceProcess:
+    """单个推理工作进程的主进程侧代理"""
+    kind = None
+
+    def __init__(self, max_frame_shape=MAX_FRAME_SHAPE, **options):
+        """
+        Args:
+            max_frame_shape: 共享内存可容纳的最大帧尺寸
+            options: 传给MediaPipe模型构造函数的参数
+        """
+        self.options = options
+        self.max_frame_shape = max_frame_shape
+        self.lock = threading.Lock()
+        self.shm = None
+        self.process = None
+        self.request_queue = None
+        self.result_queue = None
+        self._seq = 0
+        self._pending_seq = None   # 已超时但结果尚未返回的请求序号，期间工作进程可能仍在读取共享内存
+        self._consecutive_timeouts = 0
+
+        # 统计信息
+        self.stats = {
+            'requests': 0,
+            'timeouts': 0,
+            'downscaled_frames': 0,
+            'late_results': 0,
+            'roundtrip_times': deque(maxlen=100)
+        }
+
+    def start(self):
+        """启动工作进程并等待模型加载完成
+
+        Returns:
+            是否成功启动
+        """
+        if not LANDMARK_PB2_AVAILABLE:
+            return False
+
+        try:
+            # 使用spawn避免fork继承主进程中已初始化的MediaPipe和摄像头句柄
+            ctx = multiprocessing.get_context('spawn')
+            self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.max_frame_shape)))
+            self.request_queue = ctx.Queue()
+            self.result_queue = ctx.Queue()
+            self.process = ctx.Process(
+                target=_inference_worker,
+                args=(self.kind, self.shm.name, self.options, self.request_queue, self.result_queue),
+                daemon=True
+            )
+            self.process.start()
+
+            tag, _ = self.result_queue.get(timeout=STARTUP_TIMEOUT)
+            if tag != 'ready':
+                raise RuntimeError(f"推理进程返回了意外的启动消息: {tag}")
+            print(f"推理进程({self.kind})已启动, PID={self.process.pid}")
+            return True
+        except Exception as e:
+            print(f"启动推理进程({self.kind})失败: {str(e)}")
+            self.close()
+            return False
+
+    def is_alive(self):
+        """工作进程是否仍可用"""
+        return (self.process is not None and self.process.is_alive()
+                and self._consecutive_timeouts < MAX_CONSECUTIVE_TIMEOUTS)
+
+    def _fit_frame(self, image):
+        """超出共享内存大小的帧按比例缩小后再送入工作进程（关键点为归一化坐标，不受缩放影响）"""
+        if image.nbytes <= self.shm.size:
+            return image
+        scale = (self.shm.size / image.nbytes) ** 0.5
+        height, width = image.shape[:2]
+        self.stats['downscaled_frames'] += 1
+        return cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    def _wait_late_result(self, deadline):
+        """等待之前超时请求的迟到结果（调用方持有self.lock）
+
+        迟到结果返回之前工作进程可能仍在读取共享内存，此时写入新帧会让它读到一半新一半旧的帧。
+
+        Returns:
+            共享内存是否已空闲
+        """
+        while self._pending_seq is not None:
+            try:
+                result_seq, _ = self.result_queue.get(timeout=max(0.001, deadline - time.time()))
+            except queue.Empty:
+                return False
+            if result_seq == self._pending_seq:
+                self._pending_seq = None
+                self.stats['late_results'] += 1
+        return True
+
+    def _infer(self, image):
+        """把RGB帧写入共享内存并等待工作进程返回关键点数组"""
+        if self.shm is None:
+            return None
+        image = self._fit_frame(image)
+
+        with self.lock:
+            start_time = time.time()
+            deadline = start_time + RESULT_TIMEOUT
+            if not self._wait_late_result(deadline):
+                # 工作进程仍在处理超时的请求，跳过本帧
+                self.stats['timeouts'] += 1
+                self._consecutive_timeouts += 1
+                return None
+
+            height, width = image.shape[:2]
+            shared_frame = np.ndarray((height, width, 3), dtype=np.uint8, buffer=self.shm.buf)
+            np.copyto(shared_frame, image)
+            del shared_frame
+
+            self._seq += 1
+            seq = self._seq
+            self.request_queue.put((seq, height, width))
+            self.stats['requests'] += 1
+
+            # 同一时间只有一个请求在处理，超时后记下序号，等其结果返回后才能写入下一帧
+            try:
+                result_seq, landmarks = self.result_queue.get(timeout=max(0.001, deadline - time.time()))
+            except queue.Empty:
+                result_seq = None
+            if result_seq != seq:
+                self._pending_seq = seq
+                self.stats['timeouts'] += 1
+                self._consecutive_timeouts += 1
+                return None
+
+            self._consecutive_timeouts = 0
+            self.stats['roundtrip_times'].append(time.time() - start_time)
+            return landmarks
+
+    def close(self):
+        """停止工作进程并释放共享内存"""
+        if self.process is not None:
+            try:
+                self.request_queue.put(None, timeout=1.0)
+            except Exception:
+                pass
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+
+        if self.shm is not None:
+            try:
+                self.shm.close()
+                self.shm.unlink()
+            except Exception:
+                pass
+            self.shm = None
+
+    def get_stats(self):
+        """获取推理进程统计信息"""
+        times = self.stats['roundtrip_times']
+        return {
+            'kind': self.kind,
+            'alive': self.is_alive(),
+            'pid': self.process.pid if self.process else None,
+            'requests': self.stats['requests'],
+            'timeouts': self.stats['timeouts'],
+            'downscaled_frames': self.stats['downscaled_frames'],
+            'late_results': self.stats['late_results'],
+            'avg_roundtrip_ms': round(sum(times) / len(times) * 1000, 2) if times else 0
+        }
+
+
+def _array_to_landmark_list(array):
+    """将关键点数组还原为NormalizedLandmarkList"""
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for row in array:
+        landmark = landmark_list.landmark.add()
+        landmark.x, landmark.y, landmark.z = float(row[0]), float(row[1]), float(row[2])
+        if len(row) > 3:
+            landmark.visibility = float(row[3])
+    return landmark_list
+
+
+class ProcessPose(InferenceProcess):
+    """在独立进程中运行的MediaPipe Pose，接口与 mp_pose.Pose 一致"""
+    kind = KIND_POSE
+
+    def process(self, image):
+        """处理一帧RGB图像，返回带有pose_landmarks属性的结果"""
+        landmarks = self._infer(image)
+        if landmarks is None:
+            return InferenceResult()
+        return InferenceResult(pose_landmarks=_array_to_landmark_list(landmarks), pose_landmark_array=landmarks)
+
+
+class ProcessFaceMesh(InferenceProcess):
+    """在独立进程中运行的MediaPipe FaceMesh，接口与 mp_face_mesh.FaceMesh 一致"""
+    kind = KIND_FACE_MESH
+
+    def process(self, image):
+        """处理一帧RGB图像，返回带有multi_face_landmarks属性的结果"""
+        faces = self._infer(image)
+        if not faces:
+            return InferenceResult()
+        return InferenceResult(multi_face_landmarks=[_array_to_landmark_list(face) for face in faces])
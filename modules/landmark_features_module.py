@@ -0,0 +1,201 @@
+"""
+关键点特征模块 - 把姿势/面部关键点一次性转换为连续的numpy数组，用向量化运算计算遮挡、头部角度和面部特征
+
+原来的 check_occlusion / calculate_head_angle / EmotionAnalyzer 辅助函数每次计算都逐个访问
+protobuf关键点对象的属性，同一帧的关键点在遮挡检测、角度计算、面部区域定位中被重复读取。
+本模块每帧只做一次转换（姿势关键点 33x4，面部只取情绪特征用到的 20 个点），之后所有特征都在数组上计算。
+
+所有计算函数同时支持单帧数组和批量数组（最前面多一维帧序号），
+可用于实时分析，也可用于对保存下来的关键点做离线批量统计。计算结果与原有函数一致。
+"""
+import numpy as np
+
+# 关键点数组的数据类型（float64与原有逐点计算时的Python浮点精度一致）
+FEATURE_DTYPE = np.float64
+
+# 姿势关键点索引（与 mp_pose.PoseLandmark 一致，不依赖mediapipe即可使用）
+POSE_LANDMARK_COUNT = 33   # 姿势关键点数量
+POSE_NOSE = 0              # 鼻子
+POSE_LEFT_EYE = 2          # 左眼
+POSE_RIGHT_EYE = 5         # 右眼
+POSE_LEFT_SHOULDER = 11    # 左肩
+POSE_RIGHT_SHOULDER = 12   # 右肩
+
+SHOULDER_POINTS = [POSE_LEFT_SHOULDER, POSE_RIGHT_SHOULDER]   # 肩部遮挡检测使用的关键点
+FACE_POINTS = [POSE_NOSE, POSE_LEFT_EYE, POSE_RIGHT_EYE]      # 面部遮挡检测使用的关键点
+
+# 遮挡状态编码，批量计算时返回编码数组，OCCLUSION_STATUS[编码] 即状态描述
+OCCLUSION_CLEAR = 0
+OCCLUSION_SHOULDER = 1
+OCCLUSION_FACE = 2
+OCCLUSION_FULL = 3
+OCCLUSION_STATUS = ("Clear", "Shoulder Occluded", "Face Occluded", "Full Occlusion")
+
+# 面部特征点索引（与 EmotionAnalyzer 中的配置一致）
+FACE_LIPS = [61, 291, 78, 308]           # 上唇、下唇、两侧嘴角
+FACE_LEFT_EYE = [33, 160, 158, 133]      # 左眼特征点
+FACE_RIGHT_EYE = [362, 385, 386, 263]    # 右眼特征点
+FACE_LEFT_BROW = [70, 63, 105, 66]       # 左眉毛特征点
+FACE_RIGHT_BROW = [300, 293, 334, 296]   # 右眉毛特征点
+
+# 情绪特征用到的面部关键点，紧凑数组按此顺序只保存这些点的 (x, y)
+FACE_FEATURE_INDICES = FACE_LIPS + FACE_LEFT_EYE + FACE_RIGHT_EYE + FACE_LEFT_BROW + FACE_RIGHT_BROW
+# 紧凑数组中各部位所在的行
+_LIPS_ROWS = slice(0, 4)
+_LEFT_EYE_ROWS = slice(4, 8)
+_LEFT_BROW_ROWS = slice(12, 16)
+_RIGHT_BROW_ROWS = slice(16, 20)
+
+
+def _landmark_sequence(landmarks):
+    """取出关键点序列：支持 NormalizedLandmarkList 或其 .landmark 列表"""
+    return getattr(landmarks, 'landmark', landmarks)
+
+
+# ---- 关键点转换 ----
+
+def pose_landmarks_to_array(landmarks):
+    """姿势关键点转换为 (33, 4) 数组，列为 x, y, z, visibility
+
+    Args:
+        landmarks: NormalizedLandmarkList、其 .landmark 列表，或已经是数组（直接返回）
+
+    Returns:
+        连续的float64数组，关键点缺失时返回None
+    """
+    if landmarks is None:
+        return None
+    if isinstance(landmarks, np.ndarray):
+        return np.ascontiguousarray(landmarks, dtype=FEATURE_DTYPE)
+    points = _landmark_sequence(landmarks)
+    if len(points) == 0:
+        return None
+    return np.array([(p.x, p.y, p.z, p.visibility) for p in points], dtype=FEATURE_DTYPE)
+
+
+def face_feature_array(landmarks):
+    """面部关键点转换为情绪特征用的紧凑数组 (20, 2)，列为 x, y
+
+    只读取 FACE_FEATURE_INDICES 中的点，不转换整个面部网格。
+
+    Args:
+        landmarks: NormalizedLandmarkList、其 .landmark 列表，或完整网格数组 (..., 468+, 2+)
+
+    Returns:
+        连续的float64数组，关键点缺失时返回None
+    """
+    if landmarks is None:
+        return None
+    if isinstance(landmarks, np.ndarray):
+        return compact_face_array(landmarks)
+    points = _landmark_sequence(landmarks)
+    if len(points) == 0:
+        return None
+    return np.array([(points[i].x, points[i].y) for i in FACE_FEATURE_INDICES], dtype=FEATURE_DTYPE)
+
+
+def compact_face_array(mesh_array):
+    """完整面部网格数组 (..., 468+, 2+) 提取为紧凑数组 (..., 20, 2)，可用于批量数据"""
+    return np.ascontiguousarray(np.asarray(mesh_array, dtype=FEATURE_DTYPE)[..., FACE_FEATURE_INDICES, :2])
+
+
+# ---- 姿势特征 ----
+
+def occlusion_codes(pose_array, threshold):
+    """计算遮挡状态编码
+
+    Args:
+        pose_array: (33, 4) 或 (N, 33, 4) 数组
+        threshold: 关键点可见度阈值
+
+    Returns:
+        单帧时返回int，批量时返回 (N,) 数组；编码含义见 OCCLUSION_STATUS
+    """
+    visibility = pose_array[..., 3]
+    shoulder = (visibility[..., SHOULDER_POINTS] < threshold).any(axis=-1)
+    face = (visibility[..., FACE_POINTS] < threshold).any(axis=-1)
+    codes = shoulder * OCCLUSION_SHOULDER + face * OCCLUSION_FACE
+    return int(codes) if np.ndim(codes) == 0 else codes.astype(np.int8)
+
+
+def occlusion_status(pose_array, threshold):
+    """单帧遮挡检测，返回值与 check_occlusion 一致：(是否被遮挡, 遮挡类型描述)"""
+    if pose_array is None or pose_array.shape[0] < POSE_LANDMARK_COUNT:
+        return True, "Detection Failed"
+    code = occlusion_codes(pose_array, threshold)
+    return code != OCCLUSION_CLEAR, OCCLUSION_STATUS[code]
+
+
+def head_angles(pose_array, frame_shape):
+    """计算头部偏转角度（鼻子相对双肩中点的向量与竖直方向的夹角）
+
+    Args:
+        pose_array: (33, 4) 或 (N, 33, 4) 数组
+        frame_shape: 帧尺寸，角度按像素坐标计算
+
+    Returns:
+        (角度, 双肩中点像素坐标, 鼻子像素坐标)，单帧时角度为float，批量时为 (N,) 数组
+    """
+    h, w = frame_shape[:2]
+    scale = np.array([w, h], dtype=FEATURE_DTYPE)
+    mid_shoulder = (pose_array[..., POSE_LEFT_SHOULDER, :2] + pose_array[..., POSE_RIGHT_SHOULDER, :2]) / 2 * scale
+    nose = pose_array[..., POSE_NOSE, :2] * scale
+    vector = nose - mid_shoulder
+    angles = np.abs(np.degrees(np.arctan2(vector[..., 0], -vector[..., 1])))
+    return (float(angles) if np.ndim(angles) == 0 else angles), mid_shoulder, nose
+
+
+def head_angle(pose_array, frame_shape, threshold):
+    """单帧头部角度，返回值与 calculate_head_angle 一致：(角度, 是否超过阈值, 绘制用关键点坐标)"""
+    if pose_array is None or pose_array.shape[0] < POSE_LANDMARK_COUNT:
+        return None, False, {}
+    angle, mid_shoulder, nose = head_angles(pose_array, frame_shape)
+    return angle, angle > threshold, {
+        'mid_shoulder': mid_shoulder.astype(int),
+        'nose': nose.astype(int)
+    }
+
+
+def visible_points(pose_array, indices, threshold, frame_shape):
+    """取出可见度达标的关键点像素坐标，返回 (K, 2) 数组"""
+    h, w = frame_shape[:2]
+    points = pose_array[indices]
+    visible = points[points[:, 3] >= threshold]
+    return visible[:, :2] * np.array([w, h], dtype=FEATURE_DTYPE)
+
+
+# ---- 面部特征 ----
+
+def _safe_ratio(numerator, denominator):
+    """分母为0时结果为0，与原有实现一致"""
+    denominator = np.asarray(denominator)
+    safe = np.where(denominator != 0, denominator, 1.0)
+    return np.where(denominator != 0, np.asarray(numerator) / safe, 0.0)
+
+
+def face_features(face_array, h, w):
+    """计算情绪判断用的面部特征
+
+    Args:
+        face_array: face_feature_array/compact_face_array 得到的 (20, 2) 或 (N, 20, 2) 数组
+        h, w: 帧高度和宽度
+
+    Returns:
+        (嘴部开合比, 眼睛开合比, 眉毛平均位置)，单帧时为float，批量时为 (N,) 数组
+    """
+    lips = face_array[..., _LIPS_ROWS, :]
+    mouth = _safe_ratio(np.abs(lips[..., 0, 1] * h - lips[..., 1, 1] * h),
+                        np.abs(lips[..., 2, 0] - lips[..., 3, 0]) * w)
+
+    # 与原有实现一致，只使用左眼
+    eye = face_array[..., _LEFT_EYE_ROWS, :]
+    eye_ratio = _safe_ratio(np.abs(eye[..., 1, 1] - eye[..., 3, 1]) * h,
+                            np.abs(eye[..., 0, 0] - eye[..., 2, 0]) * w)
+
+    left = face_array[..., _LEFT_BROW_ROWS, 1].mean(axis=-1) * h
+    right = face_array[..., _RIGHT_BROW_ROWS, 1].mean(axis=-1) * h
+    brow = (left + right) / 2
+
+    if np.ndim(mouth) == 0:
+        return float(mouth), float(eye_ratio), float(brow)
+    return mouth, eye_ratio, brow
@@ -0,0 +1,178 @@
+"""
+延迟控制模块 - 以端到端延迟（采集时间戳到结果发布）为目标，联合选择处理分辨率、推理频率和模型复杂度
+"""
+import time
+import threading
+from collections import deque
+
+# 延迟控制相关配置
+LATENCY_EMA_ALPHA = 0.1          # 延迟指数滑动平均系数
+DEGRADE_RATIO = 1.2              # 平均延迟超过目标的此倍数时考虑降档
+UPGRADE_RATIO = 0.6              # 平均延迟低于目标的此倍数时考虑升档
+DEGRADE_HOLD_SECONDS = 2.0       # 持续超标这么久才降档（秒）
+UPGRADE_HOLD_SECONDS = 10.0      # 持续有余量这么久才升档（秒），比降档更保守以避免来回振荡
+MIN_DWELL_SECONDS = 3.0          # 每次换档后至少保持的时间（秒），等待新档位的延迟稳定
+CONTROL_HISTORY_SIZE = 200       # 保留的决策历史条数
+LATENCY_SAMPLE_SIZE = 300        # 用于计算分位数的最近延迟样本数
+
+
+class LatencyLevel:
+    """控制档位：一组处理参数的组合"""
+    __slots__ = ('resolution_index', 'rate_scale', 'model_complexity')
+
+    def __init__(self, resolution_index, rate_scale, model_complexity):
+        """
+        Args:
+            resolution_index: 处理分辨率级别索引（RESOLUTION_LEVELS）
+            rate_scale: 推理任务频率缩放比例（1.0为目标频率）
+            model_complexity: MediaPipe Pose的model_complexity
+        """
+        self.resolution_index = resolution_index
+        self.rate_scale = rate_scale
+        self.model_complexity = model_complexity
+
+    def to_dict(self):
+        return {
+            'resolution_index': self.resolution_index,
+            'rate_scale': self.rate_scale,
+            'model_complexity': self.model_complexity
+        }
+
+
+class LatencyController:
+    """端到端延迟反馈控制器
+
+    控制器维护一个从高质量到低开销排列的档位阶梯。平均延迟持续超过目标时
+    向低开销方向移动一档，持续明显低于目标时向高质量方向移动一档。
+    降档与升档使用不同的阈值和保持时间，并且每次换档后有最短停留时间（滞回），
+    避免负载波动时在相邻档位之间来回切换。
+    """
+    def __init__(self, ladder, target_latency_ms, initial_level=0):
+        """
+        Args:
+            ladder: LatencyLevel列表，从高质量到低开销排列
+            target_latency_ms: 目标端到端延迟（毫秒）
+            initial_level: 初始档位
+        """
+        self.ladder = ladder
+        self.target_latency = target_latency_ms / 1000.0
+        self.level = max(0, min(initial_level, len(ladder) - 1))
+        self.enabled = True
+        self.lock = threading.Lock()
+
+        self.latency_ema = None
+        self._samples = deque(maxlen=LATENCY_SAMPLE_SIZE)
+        self._over_since = None      # 开始持续超标的时间
+        self._under_since = None     # 开始持续有余量的时间
+        self._last_change_time = 0
+        self.history = deque(maxlen=CONTROL_HISTORY_SIZE)
+
+    def observe(self, latency):
+        """记录一次端到端延迟样本（秒）"""
+        with self.lock:
+            self._samples.append(latency)
+            if self.latency_ema is None:
+                self.latency_ema = latency
+            else:
+                self.latency_ema += LATENCY_EMA_ALPHA * (latency - self.latency_ema)
+
+    def update(self, now=None):
+        """根据平均延迟判断是否换档
+
+        Returns:
+            换档后的LatencyLevel，未换档时返回None
+        """
+        now = now or time.time()
+        with self.lock:
+            if not self.enabled or self.latency_ema is None:
+                return None
+            if now - self._last_change_time < MIN_DWELL_SECONDS:
+                return None
+
+            if self.latency_ema > self.target_latency * DEGRADE_RATIO:
+                self._under_since = None
+                if self._over_since is None:
+                    self._over_since = now
+                if now - self._over_since >= DEGRADE_HOLD_SECONDS and self.level < len(self.ladder) - 1:
+                    return self._change_level_locked(self.level + 1, 'degrade', now)
+            elif self.latency_ema < self.target_latency * UPGRADE_RATIO:
+                self._over_since = None
+                if self._under_since is None:
+                    self._under_since = now
+                if now - self._under_since >= UPGRADE_HOLD_SECONDS and self.level > 0:
+                    return self._change_level_locked(self.level - 1, 'upgrade', now)
+            else:
+                # 在滞回区间内保持当前档位
+                self._over_since = None
+                self._under_since = None
+            return None
+
+    def _change_level_locked(self, level, reason, now):
+        self.history.append({
+            'time': now,
+            'from_level': self.level,
+            'to_level': level,
+            'reason': reason,
+            'latency_ema_ms': round(self.latency_ema * 1000, 1) if self.latency_ema is not None else None,
+            'target_latency_ms': round(self.target_latency * 1000, 1),
+            **self.ladder[level].to_dict()
+        })
+        self.level = level
+        self._over_since = None
+        self._under_since = None
+        self._last_change_time = now
+        return self.ladder[level]
+
+    def set_level(self, level, reason='manual'):
+        """手动指定档位
+
+        Returns:
+            指定的LatencyLevel，档位无效时返回None
+        """
+        if not 0 <= level < len(self.ladder):
+            return None
+        with self.lock:
+            return self._change_level_locked(level, reason, time.time())
+
+    def set_ladder(self, ladder):
+        """替换档位阶梯（如推理后端不支持切换模型复杂度时），当前档位超出范围时取最后一档"""
+        with self.lock:
+            self.ladder = ladder
+            self.level = min(self.level, len(ladder) - 1)
+
+    def set_target(self, target_latency_ms):
+        """设置目标端到端延迟（毫秒）"""
+        with self.lock:
+            self.target_latency = max(1.0, float(target_latency_ms)) / 1000.0
+            self._over_since = None
+            self._under_since = None
+
+    def get_current_level(self):
+        """获取当前档位"""
+        return self.ladder[self.level]
+
+    def _percentile_locked(self, ratio):
+        if not self._samples:
+            return 0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+    def get_state(self, history_limit=50):
+        """获取控制器状态和最近的决策记录
+
+        Args:
+            history_limit: 返回的决策记录条数
+        """
+        with self.lock:
+            history = list(self.history)[-history_limit:] if history_limit else []
+            return {
+                'enabled': self.enabled,
+                'target_latency_ms': round(self.target_latency * 1000, 1),
+                'latency_ema_ms': round(self.latency_ema * 1000, 1) if self.latency_ema is not None else None,
+                'latency_p50_ms': round(self._percentile_locked(0.5) * 1000, 1),
+                'latency_p95_ms': round(self._percentile_locked(0.95) * 1000, 1),
+                'level': self.level,
+                'current': self.ladder[self.level].to_dict(),
+                'ladder': [level.to_dict() for level in self.ladder],
+                'history': history
+            }
@@ -0,0 +1,359 @@
+"""
+指标模块 - 统一的计数器、仪表和固定分桶直方图注册表，以Prometheus文本格式导出
+
+各子系统（姿势分析、视频流、串口、目标检测、数据库、语音助手）都注册到全局的 registry，
+/metrics 路由调用 registry.expose() 输出。直方图的桶边界在创建时固定，observe()
+只做二分查找和计数自增，不分配新的容器，可以放在逐帧处理路径上。
+"""
+import math
+import time
+import functools
+import threading
+from bisect import bisect_left
+from collections import deque
+
+# 默认延迟分桶边界（秒）：覆盖从亚毫秒的缩放/转换到秒级的数据库和网络请求
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    """格式化指标值"""
+    if value is None:
+        return 'NaN'
+    if isinstance(value, (bool, int)):
+        return str(int(value))
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    """格式化标签，如 {stage="pose",le="0.1"}"""
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class _CounterChild:
+    """计数器（单组标签值）"""
+    __slots__ = ('_value', '_lock')
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """增加计数"""
+        with self._lock:
+            self._value += amount
+
+    def get(self):
+        return self._value
+
+
+class _GaugeChild:
+    """仪表（单组标签值），可以直接设置值，也可以在导出时调用函数取值"""
+    __slots__ = ('_value', '_function', '_lock')
+
+    def __init__(self):
+        self._value = 0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        """设置当前值"""
+        self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, function):
+        """导出时调用function()取值，适合桥接已有的统计字典和帧率计数器"""
+        self._function = function
+
+    def get(self):
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception:
+                return float('nan')
+        return self._value
+
+
+class _Timer:
+    """直方图计时上下文管理器（每次使用创建一个对象，逐帧路径上请直接observe(perf_counter差值)）"""
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+        self._start = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _HistogramChild:
+    """固定分桶直方图（单组标签值）
+
+    每个桶保存落在 (上一个边界, 本边界] 内的样本数，导出时再累加为Prometheus要求的累计计数。
+    """
+    __slots__ = ('_bounds', '_counts', '_sum', '_count', '_lock')
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # 最后一个桶对应 +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """记录一个样本"""
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self):
+        """返回计时上下文管理器，退出时记录经过的秒数（会创建计时对象，不用于逐帧路径）"""
+        return _Timer(self)
+
+    def snapshot(self):
+        """获取 (累计桶计数列表, 总和, 样本数)"""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class _Metric:
+    """指标族：同一名称下按标签值区分的多个子指标"""
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._get_child(())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _get_child(self, labelvalues):
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.get(labelvalues)
+                if child is None:
+                    child = self._new_child()
+                    self._children[labelvalues] = child
+        return child
+
+    def labels(self, *labelvalues, **labelkwargs):
+        """获取指定标签值的子指标（热路径上应在初始化时取出并保存子指标）"""
+        if labelkwargs:
+            labelvalues = tuple(str(labelkwargs[name]) for name in self.labelnames)
+        else:
+            labelvalues = tuple(str(value) for value in labelvalues)
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}")
+        return self._get_child(labelvalues)
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def expose(self):
+        """输出该指标族的文本格式行"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        for labelvalues, child in self._items():
+            lines.extend(self._expose_child(labelvalues, child))
+        return lines
+
+    def _expose_child(self, labelvalues, child):
+        return [f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(child.get())}']
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    metric_type = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """可增可减的仪表"""
+    metric_type = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+
+class Histogram(_Metric):
+    """固定分桶直方图"""
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != float('inf')))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def _expose_child(self, labelvalues, child):
+        cumulative, total, count = child.snapshot()
+        lines = []
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), cumulative):
+            labels = _format_labels(self.labelnames, labelvalues, ('le', _format_value(bound)))
+            lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+        labels = _format_labels(self.labelnames, labelvalues)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表
+
+    counter()/gauge()/histogram() 按名称获取或创建指标，同名重复注册返回已有指标，
+    因此服务对象重建（如重新启动姿势分析）时不会产生重复的指标族。
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标 {name} 已以不同的类型或标签注册")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """获取或创建计数器"""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        """获取或创建仪表"""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        """获取或创建直方图"""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def expose(self):
+        """输出全部指标的Prometheus文本格式"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+def timed(histogram):
+    """装饰器：用直方图（或其子指标）记录函数每次调用的耗时"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start_time)
+        return wrapper
+    return decorator
+
+
+# 帧率计算类
+class FPSCounter:
+    """计算并跟踪帧率（姿势分析和视频流共用）"""
+    def __init__(self, window_size=10):  # 减小窗口大小为10以获得更实时的帧率
+        """
+        Args:
+            window_size: 计算平均帧率的时间窗口大小（帧数）
+        """
+        self.window_size = window_size
+        self.timestamps = deque(maxlen=window_size)
+        self.last_fps = 0
+        self.total_frames = 0
+
+    def update(self):
+        """记录一帧的时间戳并更新帧率"""
+        self.timestamps.append(time.time())
+        self.total_frames += 1
+
+        # 至少需要2个时间戳才能计算帧率
+        if len(self.timestamps) >= 2:
+            time_diff = self.timestamps[-1] - self.timestamps[0]
+            if time_diff > 0:
+                # n个时间戳之间只有n-1个帧间隔
+                self.last_fps = (len(self.timestamps) - 1) / time_diff
+            else:
+                self.last_fps = 0
+
+        return self.last_fps
+
+    def get_fps(self):
+        """获取当前帧率"""
+        return self.last_fps
+
+    def get_total_frames(self):
+        """获取总帧数"""
+        return self.total_frames
+
+    def reset(self):
+        """重置帧率计数器"""
+        self.timestamps.clear()
+        self.last_fps = 0
+        # 不重置total_frames，这样可以保留总计数
+
+
+# 全局指标注册表
+registry = MetricsRegistry()
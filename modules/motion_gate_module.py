@@ -0,0 +1,97 @@
+"""
+运动门控模块 - 通过低分辨率帧差判断画面是否变化，静止场景下跳过MediaPipe推理
+"""
+import time
+import cv2
+
+# 运动门控相关配置
+MOTION_THRESHOLD = 3.0              # 灰度平均绝对差阈值（0-255），低于此值视为画面静止
+MOTION_REFRESH_INTERVAL = 2.0       # 强制刷新间隔（秒），静止时也至少这么久推理一次
+MOTION_THUMBNAIL_SIZE = (32, 24)    # 帧差比较用的缩略图尺寸（宽, 高）
+
+
+class MotionGate:
+    """运动门控
+
+    对已缩放的分析帧再降采样为小尺寸灰度图，与上一次放行时的参考图做平均绝对差。
+    差异低于阈值且未到强制刷新时间时判定为静止，调用方可直接复用上一次的分析结果。
+    """
+    def __init__(self, threshold=MOTION_THRESHOLD, refresh_interval=MOTION_REFRESH_INTERVAL,
+                 thumbnail_size=MOTION_THUMBNAIL_SIZE):
+        """
+        Args:
+            threshold: 灰度平均绝对差阈值
+            refresh_interval: 强制刷新间隔（秒）
+            thumbnail_size: 比较用缩略图尺寸（宽, 高）
+        """
+        self.enabled = True
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.thumbnail_size = thumbnail_size
+        self._reference = None
+        self._last_pass_time = 0
+        self.last_diff = 0.0
+
+        # 统计信息
+        self.stats = {
+            'checks': 0,
+            'hits': 0,               # 判定为静止而跳过推理的次数
+            'forced_refreshes': 0    # 静止但因到达刷新间隔而放行的次数
+        }
+
+    def should_process(self, frame, now=None):
+        """判断这一帧是否需要推理
+
+        Args:
+            frame: 已缩放的BGR分析帧
+            now: 当前时间，None时使用time.time()（回放录制源时可传入媒体时间）
+
+        Returns:
+            True表示画面有变化（或需要强制刷新），False表示可以复用上一次结果
+        """
+        if not self.enabled:
+            return True
+
+        self.stats['checks'] += 1
+        thumbnail = cv2.cvtColor(
+            cv2.resize(frame, self.thumbnail_size, interpolation=cv2.INTER_AREA),
+            cv2.COLOR_BGR2GRAY
+        )
+        current_time = time.time() if now is None else now
+
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            return self._pass(thumbnail, current_time)
+
+        self.last_diff = float(cv2.absdiff(thumbnail, self._reference).mean())
+        if self.last_diff >= self.threshold:
+            return self._pass(thumbnail, current_time)
+
+        if current_time - self._last_pass_time >= self.refresh_interval:
+            self.stats['forced_refreshes'] += 1
+            return self._pass(thumbnail, current_time)
+
+        self.stats['hits'] += 1
+        return False
+
+    def _pass(self, thumbnail, current_time):
+        """放行当前帧并更新参考图"""
+        self._reference = thumbnail
+        self._last_pass_time = current_time
+        return True
+
+    def reset(self):
+        """清除参考图，下一帧必定放行"""
+        self._reference = None
+        self._last_pass_time = 0
+
+    def get_stats(self):
+        """获取运动门控统计信息"""
+        checks = self.stats['checks']
+        return {
+            'enabled': self.enabled,
+            'threshold': self.threshold,
+            'refresh_interval': self.refresh_interval,
+            'last_diff': round(self.last_diff, 2),
+            **self.stats,
+            'hit_rate': round(self.stats['hits'] / checks, 3) if checks else 0
+        }
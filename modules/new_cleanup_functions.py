@@ -10,12 +10,19 @@ from config import DB_CONFIG
 # 添加图像存储路径配置
 POSTURE_IMAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'posture_images')
 
-def cleanup_hourly_images(hour_datetime, max_images=20):
+def _device_filter(device_id):
+    """按摄像头筛选的SQL条件和参数，device_id为None时不筛选"""
+    if device_id is None:
+        return "", ()
+    return " AND device_id = %s", (device_id,)
+
+def cleanup_hourly_images(hour_datetime, max_images=20, device_id=None):
     """清理指定小时内的图片，只保留最新的指定数量图片
     
     Args:
         hour_datetime: 小时的datetime对象，精确到小时
         max_images: 该小时内最多保留的图片数量
+        device_id: 只清理该摄像头的图片（各摄像头分别计算保留数量），为None时不区分摄像头
         
     Returns:
         删除的图片数量
@@ -29,10 +36,11 @@ def cleanup_hourly_images(hour_datetime, max_images=20):
         hour_end = hour_start + timedelta(hours=1)
         
         # 获取该小时内的图片总数
+        device_sql, device_params = _device_filter(device_id)
         cursor.execute("""
             SELECT COUNT(*) FROM posture_images
-            WHERE timestamp >= %s AND timestamp < %s
-        """, (hour_start, hour_end))
+            WHERE timestamp >= %s AND timestamp < %s""" + device_sql,
+            (hour_start, hour_end) + device_params)
         
         total_images = cursor.fetchone()[0]
         
@@ -49,10 +57,10 @@ def cleanup_hourly_images(hour_datetime, max_images=20):
         # 获取需要删除的图片记录，按时间升序（最老的先删）
         cursor.execute("""
             SELECT id, image_path FROM posture_images
-            WHERE timestamp >= %s AND timestamp < %s
+            WHERE timestamp >= %s AND timestamp < %s""" + device_sql + """
             ORDER BY timestamp ASC
             LIMIT %s
-        """, (hour_start, hour_end, images_to_delete))
+        """, (hour_start, hour_end) + device_params + (images_to_delete,))
         
         delete_records = cursor.fetchall()
         deleted_count = 0
@@ -75,7 +83,7 @@ def cleanup_hourly_images(hour_datetime, max_images=20):
                 os.remove(full_path)
             
             # 删除数据库记录
-            cursor.execute("DELETE FROM posture_images WHERE id = %s", (image_id,))
+            cursor.execute("DELETE FROM posture_images WHERE id = %s" + device_sql, (image_id,) + device_params)
             deleted_count += 1
         
         conn.commit()
@@ -91,12 +99,13 @@ def cleanup_hourly_images(hour_datetime, max_images=20):
         traceback.print_exc()
         return 0
 
-def cleanup_daily_images(date_datetime, max_images=240):
+def cleanup_daily_images(date_datetime, max_images=240, device_id=None):
     """清理指定日期内的图片，只保留最新的指定数量图片
     
     Args:
         date_datetime: 日期的datetime对象，精确到日
         max_images: 该日期内最多保留的图片数量
+        device_id: 只清理该摄像头的图片（各摄像头分别计算保留数量），为None时不区分摄像头
         
     Returns:
         删除的图片数量
@@ -110,10 +119,11 @@ def cleanup_daily_images(date_datetime, max_images=240):
         date_end = date_start + timedelta(days=1)
         
         # 获取该日期内的图片总数
+        device_sql, device_params = _device_filter(device_id)
         cursor.execute("""
             SELECT COUNT(*) FROM posture_images
-            WHERE timestamp >= %s AND timestamp < %s
-        """, (date_start, date_end))
+            WHERE timestamp >= %s AND timestamp < %s""" + device_sql,
+            (date_start, date_end) + device_params)
         
         total_images = cursor.fetchone()[0]
         
@@ -130,10 +140,10 @@ def cleanup_daily_images(date_datetime, max_images=240):
         # 获取需要删除的图片记录，按时间升序（最老的先删）
         cursor.execute("""
             SELECT id, image_path FROM posture_images
-            WHERE timestamp >= %s AND timestamp < %s
+            WHERE timestamp >= %s AND timestamp < %s""" + device_sql + """
             ORDER BY timestamp ASC
             LIMIT %s
-        """, (date_start, date_end, images_to_delete))
+        """, (date_start, date_end) + device_params + (images_to_delete,))
         
         delete_records = cursor.fetchall()
         deleted_count = 0
@@ -156,7 +166,7 @@ def cleanup_daily_images(date_datetime, max_images=240):
                 os.remove(full_path)
             
             # 删除数据库记录
-            cursor.execute("DELETE FROM posture_images WHERE id = %s", (image_id,))
+            cursor.execute("DELETE FROM posture_images WHERE id = %s" + device_sql, (image_id,) + device_params)
             deleted_count += 1
         
         conn.commit()
@@ -9,12 +9,36 @@ from datetime import datetime
 import threading
 import queue
 from collections import deque
+import numpy as np
 from config import DB_CONFIG
+from modules.frame_broker_module import FrameBroker, LatestFrameSlot
+from modules.frame_pool_module import FrameBufferPool
+from modules.motion_gate_module import MotionGate
+from modules.inference_process_module import ProcessPose, ProcessFaceMesh
+from modules.scheduler_module import AnalyzerScheduler
+from modules.latency_controller_module import LatencyController, LatencyLevel
+from modules.trace_module import tracer
+from modules.metrics_module import registry, FPSCounter
+from modules.camera_registry_module import camera_registry, StartupTimer
+from modules.posture_writer_module import PostureTimeWriter
+from modules.snapshot_module import PostureSnapshotWriter
+from modules.posture_signal_module import PostureSignalEngine
+from modules.landmark_features_module import (
+    pose_landmarks_to_array, visible_points,
+    occlusion_status as landmark_occlusion_status, head_angle as landmark_head_angle
+)
 from config import (
     EXCELENT_POSTURE_THRESHOLD,
     GOOD_POSTURE_THRESHOLD,
     FAIR_POSTURE_THRESHOLD,
     BAD_POSTURE_THRESHOLD,
+    POSTURE_INFERENCE_MODE,
+    ANALYZER_SCHEDULE,
+    ANALYZER_CPU_BUDGET,
+    POSTURE_LATENCY_TARGET_MS,
+    CAPTURE_RAW_MJPEG,
+    CAPTURE_DECODE_SCALE,
+    DEFAULT_CAMERA_ID,
 )
 
 # 尝试导入posture_analysis模块
@@ -28,9 +52,9 @@ try:
         EMOTION_SMOOTHING_WINDOW, MOUTH_OPEN_RATIO_THRESHOLD,
         EYE_OPEN_RATIO_THRESHOLD, BROW_DOWN_THRESHOLD,
         CAMERA_WIDTH, CAMERA_HEIGHT, PROCESS_WIDTH, PROCESS_HEIGHT,
-        mp_pose, mp_face_mesh, check_occlusion, calculate_head_angle, 
+        mp_pose, mp_face_mesh,
         mp_drawing, mp_drawing_styles, VISIBILITY_THRESHOLD, HEAD_ANGLE_THRESHOLD,
-        OCCLUSION_FRAMES_THRESHOLD, CLEAR_FRAMES_THRESHOLD
+        OCCLUSION_FRAMES_THRESHOLD, CLEAR_FRAMES_THRESHOLD, FACE_MESH_OPTIONS
     )
     POSTURE_MODULE_AVAILABLE = True
 except ImportError as e:
@@ -75,9 +99,35 @@ RESOLUTION_LEVELS = [
     (320, 240)    # 最低分辨率 - 不再使用更低的分辨率以保证分析质量
 ]
 TARGET_FPS = 25.0  # 目标帧率
-FPS_THRESHOLD_LOW = 15.0  # 低帧率阈值，低于此值降低分辨率
-FPS_THRESHOLD_HIGH = 28.0  # 高帧率阈值，高于此值可以尝试提高分辨率
-RESOLUTION_ADJUST_INTERVAL = 5.0  # 分辨率调整间隔（秒）
+
+# 延迟控制档位：(处理分辨率索引, 推理频率缩放比例, 姿势模型复杂度)，从高质量到低开销排列
+LATENCY_LADDER = [
+    (0, 1.0, 1),
+    (1, 1.0, 1),
+    (2, 1.0, 1),
+    (2, 1.0, 0),
+    (2, 0.75, 0),
+    (2, 0.5, 0)
+]
+LATENCY_INITIAL_LEVEL = 1  # 从中等分辨率开始
+PIPELINE_STAGES = ('dispatch', 'pose', 'emotion')  # 流水线阶段：取帧缩放、姿势推理、情绪推理
+INFERENCE_TASKS = ('pose', 'emotion')  # 由分发阶段按调度送帧的推理任务
+LIVE_STATS_RANGES = ('minute', 'hour')  # 由进程内滚动统计直接提供、不查询数据库的统计范围
+
+# 面部区域（ROI）推理参数 - 根据姿势关键点裁剪面部区域后再运行Face Mesh
+FACE_ROI_LANDMARKS = slice(0, 11)   # 用于定位面部的姿势关键点：鼻子、眼睛、耳朵、嘴角
+FACE_ROI_SCALE = 2.2                # 面部框边长相对关键点范围的放大倍数（包含额头和下巴）
+FACE_ROI_MAX_AGE = 0.5              # 面部区域的最长有效时间（秒），过期则整帧推理
+FACE_ROI_MIN_SIZE = 48              # 面部框最小边长（像素），过小时整帧推理
+
+# MediaPipe姿势检测参数（进程内和推理进程共用）
+POSE_OPTIONS = {
+    'static_image_mode': False,        # 视频流模式
+    'model_complexity': 1,             # 模型复杂度（0-2）降低以提高性能
+    'smooth_landmarks': True,          # 启用关键点平滑
+    'min_detection_confidence': 0.6,   # 降低到0.6以提高检测率
+    'min_tracking_confidence': 0.5
+}
 
 # 摄像头优化配置
 CAMERA_BUFFER_SIZE = 1  # 摄像头缓冲区大小
@@ -85,66 +135,98 @@ CAMERA_API_PREFERENCE = cv2.CAP_V4L2  # Linux上使用V4L2后端
 CAMERA_FPS_TARGET = 30  # 摄像头目标帧率
 CAMERA_FOURCC_OPTIONS = ['MJPG', 'YUYV', 'RGB3']  # 优先使用MJPG编码
 
-# 帧率计算类
-class FPSCounter:
-    """计算并跟踪帧率"""
-    def __init__(self, window_size=10):  # 减小窗口大小为10以获得更实时的帧率
+# 姿势分析指标
+POSTURE_STAGE_SECONDS = registry.histogram(
+    'posture_stage_seconds', '姿势分析流水线各阶段的单帧处理耗时（秒）', ('stage',))
+POSTURE_LATENCY_SECONDS = registry.histogram(
+    'posture_end_to_end_latency_seconds', '从摄像头采集到姿势结果发布的端到端延迟（秒）')
+POSTURE_SKIPPED_FRAMES = registry.counter(
+    'posture_skipped_frames_total', '没有推理任务到期而未分发的帧数')
+POSTURE_MOTION_GATE_SKIPS = registry.counter(
+    'posture_motion_gate_skips_total', '运动门控判定画面静止而跳过推理的帧数')
+POSTURE_FPS = registry.gauge('posture_fps', '姿势分析各环节的帧率', ('stage',))
+POSTURE_LATENCY_LEVEL = registry.gauge('posture_latency_level', '延迟控制器当前档位')
+POSTURE_STARTUP_SECONDS = registry.gauge(
+    'posture_startup_seconds', '最近一次启动姿势分析时各阶段距启动开始的耗时（秒）', ('phase',))
+
+class WebPostureMonitor:
+    """适配Web服务的姿势监测器（每个摄像头一个实例，多摄像头由CameraManager管理）"""
+    def __init__(self, video_stream_handler=None, camera_id=DEFAULT_CAMERA_ID, device=None, params=None,
+                 posture_writer=None, snapshot_writer=None):
         """
         Args:
-            window_size: 计算平均帧率的时间窗口大小（帧数）
+            video_stream_handler: 视频流处理器，None表示不输出分析视频流
+            camera_id: 摄像头编号，写入坐姿记录的device_id列
+            device: 摄像头设备索引或路径，None时按注册表/完整探测查找（仅适用于单摄像头）
+            params: 本摄像头的情绪分析参数，None时使用全局的posture_params
+            posture_writer: 共用的坐姿时间写入器，None时创建自己的写入器
+            snapshot_writer: 共用的抓拍保存线程，None时创建自己的保存线程
         """
-        self.window_size = window_size
-        self.timestamps = deque(maxlen=window_size)
-        self.last_fps = 0
-        self.total_frames = 0
-    
-    def update(self):
-        """记录一帧的时间戳并更新帧率"""
-        self.timestamps.append(time.time())
-        self.total_frames += 1
-        
-        # 至少需要2个时间戳才能计算帧率
-        if len(self.timestamps) >= 2:
-            # 计算时间差（秒）
-            time_diff = self.timestamps[-1] - self.timestamps[0]
-            if time_diff > 0:
-                # 修正帧率计算公式: 在窗口内完成的帧数除以时间差
-                self.last_fps = len(self.timestamps) / time_diff  # 移除了 -1
-            else:
-                self.last_fps = 0
-        
-        return self.last_fps
-    
-    def get_fps(self):
-        """获取当前帧率"""
-        return self.last_fps
-    
-    def get_total_frames(self):
-        """获取总帧数"""
-        return self.total_frames
-    
-    def reset(self):
-        """重置帧率计数器"""
-        self.timestamps.clear()
-        self.last_fps = 0
-        # 不重置total_frames，这样可以保留总计数
-
-class WebPostureMonitor:
-    """适配Web服务的姿势监测器"""
-    def __init__(self, video_stream_handler=None):
+        self.camera_id = camera_id
+        self.device = device
+        self.posture_params = posture_params if params is None else params
         self.cap = None
         self.pose = None
         self.emotion_analyzer = None
+        self.inference_mode = 'thread'  # 实际使用的推理后端：'thread' 或 'process'
         self.is_running = False
         self.thread = None
+        self.pose_thread = None
+        self.emotion_thread = None
         self.video_stream_handler = video_stream_handler
         
+        # 帧分发器 - 摄像头的唯一读取者，姿势分析、原始视频流和目标检测都从这里订阅帧
+        self.frame_broker = FrameBroker(frame_callback=self._on_frame_captured)
+        self.frame_broker.set_opener(self._reopen_camera)
+        # 解码帧不小于最高的处理分辨率，避免分析和视频流把缩小解码的帧再放大
+        self.frame_broker.set_decode_mode(CAPTURE_RAW_MJPEG, CAPTURE_DECODE_SCALE,
+                                          min_decode_size=max(RESOLUTION_LEVELS, key=lambda size: size[0] * size[1]))
+        self.frame_subscriber = None
+        # 替代摄像头的采集源（录制视频/图片目录），为None时使用真实摄像头
+        self.capture_source = None
+        # 启动计时：摄像头就绪、模型就绪、第一帧、第一个分析结果
+        self.startup_timer = StartupTimer()
+        # 坐姿时间记录的后台批量写入器，姿势线程不直接访问数据库
+        self.posture_writer = posture_writer or PostureTimeWriter()
+        # 坐姿抓拍的保存线程，编码、写盘、插入和清理都不占用姿势线程
+        self.snapshot_writer = snapshot_writer or PostureSnapshotWriter()
+        self.writers_started = False  # 本实例是否已启动写入器（写入器可能与其他摄像头共用）
+        # 角度和情绪结果的进程内滚动统计，近期统计不查询数据库
+        self.posture_signals = PostureSignalEngine()
+        if video_stream_handler and hasattr(video_stream_handler, 'set_frame_broker'):
+            video_stream_handler.set_frame_broker(self.frame_broker)
+        
+        # 流水线阶段之间的"最新优先"单槽队列：分发线程 -> 姿势线程 / 情绪线程
+        self.pose_slot = LatestFrameSlot('pose', on_discard=self._release_stage_item)
+        self.emotion_slot = LatestFrameSlot('emotion', on_discard=self._release_stage_item)
+        self.stage_slots = {'pose': self.pose_slot, 'emotion': self.emotion_slot}
+        
+        # 分析任务调度器 - 姿势、情绪、坐姿时间记录和图像抓拍按各自的目标频率和优先级在CPU预算内执行
+        self.scheduler = AnalyzerScheduler(cpu_budget=ANALYZER_CPU_BUDGET)
+        for name, schedule in ANALYZER_SCHEDULE.items():
+            self.scheduler.register(name, schedule['target_hz'], schedule['priority'])
+        
+        # 分析循环使用的帧缓冲池（缩放帧、RGB转换帧和叠加绘制帧）
+        self.frame_pool = FrameBufferPool('analysis')
+        
+        # 运动门控 - 画面静止时跳过推理，复用上一次的姿势和情绪结果
+        self.motion_gate = MotionGate()
+        
+        # 面部区域推理 - 由姿势阶段根据关键点更新，情绪阶段只对该区域运行Face Mesh
+        self.face_roi_enabled = True
+        self.face_roi = None  # (归一化面部框 (x0, y0, x1, y1), 更新时间)
+        
         # 初始化处理分辨率
         self.process_width = DEFAULT_PROCESS_WIDTH
         self.process_height = DEFAULT_PROCESS_HEIGHT
-        self.current_resolution_index = 1  # 从中等分辨率开始
-        self.last_resolution_adjust_time = 0
-        self.adaptive_resolution = True  # 是否启用自适应分辨率
+        self.current_resolution_index = LATENCY_INITIAL_LEVEL  # 从中等分辨率开始
+        
+        # 延迟控制器 - 以端到端延迟为目标，联合调整处理分辨率、推理频率和姿势模型复杂度
+        self.latency_controller = LatencyController(
+            self._build_latency_ladder(), POSTURE_LATENCY_TARGET_MS, initial_level=LATENCY_INITIAL_LEVEL
+        )
+        self.pose_model_complexity = POSE_OPTIONS['model_complexity']  # 控制器期望的模型复杂度
+        self.active_pose_model_complexity = POSE_OPTIONS['model_complexity']  # 当前姿势模型实际使用的复杂度
         
         # 初始化摄像头参数
         self.camera_fps = CAMERA_FPS_TARGET
@@ -157,6 +239,15 @@ class WebPostureMonitor:
         self.pose_process_fps = FPSCounter()  # 姿势处理帧率
         self.emotion_process_fps = FPSCounter()  # 情绪处理帧率
         
+        # 注册到指标注册表（帧率计数器在启动时会重建，因此导出时再取当前对象）
+        # 指标只导出默认摄像头，其他摄像头的数据通过 /api/cameras/<camera_id>/stats 获取
+        self.stage_histograms = {stage: POSTURE_STAGE_SECONDS.labels(stage) for stage in PIPELINE_STAGES}
+        if camera_id == DEFAULT_CAMERA_ID:
+            POSTURE_FPS.labels('capture').set_function(lambda: self.capture_fps.get_fps())
+            POSTURE_FPS.labels('pose').set_function(lambda: self.pose_process_fps.get_fps())
+            POSTURE_FPS.labels('emotion').set_function(lambda: self.emotion_process_fps.get_fps())
+            POSTURE_LATENCY_LEVEL.set_function(lambda: self.latency_controller.level)
+        
         # 存储最新分析结果
         self.pose_result = {
             'angle': 0,
@@ -184,17 +275,12 @@ class WebPostureMonitor:
         
         # 性能优化参数
         self.use_separate_grab_retrieve = True  # 使用分离的grab和retrieve操作提高性能
-        self.skip_frames_when_slow = True  # 在处理过慢时允许跳帧
-        self.skip_count = 0  # 当前跳帧计数
-        self.max_consecutive_skips = 3  # 最大连续跳帧数
         
         # 性能监控
+        # 摄像头错误和重连统计由帧分发器维护，处理耗时按流水线阶段分别统计
         self.performance_stats = {
-            'camera_errors': 0,
-            'processing_times': deque(maxlen=100),
-            'skipped_frames': 0,
-            'last_reconnect_time': 0,
-            'reconnect_interval': 10.0  # 重连间隔（秒）
+            'processing_times': {stage: deque(maxlen=100) for stage in PIPELINE_STAGES},
+            'skipped_frames': 0  # 没有任何推理任务到期而未分发的帧数
         }
         
         # 采样策略
@@ -232,13 +318,14 @@ class WebPostureMonitor:
         self.posture_time_recording_enabled = True  # 是否启用坐姿时间记录
     
     # 新增跳采样方法
-    def _resize_with_subsampling(self, frame, target_width, target_height):
+    def _resize_with_subsampling(self, frame, target_width, target_height, dst=None):
         """使用跳采样而非直接缩放来调整分辨率，保持原始视角
         
         Args:
             frame: 原始帧图像
             target_width: 目标宽度
             target_height: 目标高度
+            dst: 可选的输出缓冲区，提供时结果写入其中而不分配新数组
         
         Returns:
             调整后的帧图像
@@ -258,50 +345,81 @@ class WebPostureMonitor:
         # 如果跳采样后的尺寸与目标尺寸不完全匹配，进行最小程度的缩放调整
         actual_h, actual_w = subsampled.shape[:2]
         if actual_w != target_width or actual_h != target_height:
-            return cv2.resize(subsampled, (target_width, target_height), 
+            return cv2.resize(subsampled, (target_width, target_height), dst=dst,
                              interpolation=cv2.INTER_NEAREST)
         
+        if dst is not None:
+            np.copyto(dst, subsampled)
+            return dst
         return subsampled
     
-    def start(self):
-        """启动姿势分析线程"""
+    def start(self, inference_mode=None):
+        """启动姿势分析线程
+        
+        Args:
+            inference_mode: 推理后端，'thread' 在本进程内推理，'process' 在独立工作进程中推理，
+                            为None时使用配置中的POSTURE_INFERENCE_MODE
+        """
         if self.is_running:
             print("分析系统已经在运行中")
             return True
             
         self.is_running = True
-        success = self._init_camera()
+        self.startup_timer.start()
+        # 新一轮监测从空的滚动窗口开始，不沿用上一轮的统计
+        self.posture_signals.reset()
+        
+        # 如果帧分发器已经由其他消费者（如目标检测）启动，直接复用同一个摄像头
+        if self.frame_broker.is_running:
+            success = True
+        elif self.capture_source is not None:
+            # 使用录制的采集源代替摄像头，跳过摄像头探测和参数优化
+            self.cap = self.capture_source
+            success = self.frame_broker.start(self.cap)
+        else:
+            success = self._init_camera() and self.frame_broker.start(self.cap)
         
         if not success or not self.cap or not self.cap.isOpened():
             self.is_running = False
             print("无法初始化摄像头，姿势分析系统启动失败")
             return False
+        self._mark_startup('camera_ready')
             
         if POSTURE_MODULE_AVAILABLE:
             try:
                 print("正在初始化姿势分析和情绪分析组件...")
                 
-                # 使用正确的MediaPipe姿势检测
-                self.pose = mp_pose.Pose(
-                    static_image_mode=False,    # 视频流模式
-                    model_complexity=1,         # 模型复杂度（0-2）降低以提高性能
-                    smooth_landmarks=True,      # 启用关键点平滑
-                    min_detection_confidence=0.6, # 降低到0.6以提高检测率
-                    min_tracking_confidence=0.5
-                )
-                
-                # 创建情绪分析器实例
-                self.emotion_analyzer = EmotionAnalyzer()
+                # 创建姿势检测模型和情绪分析器
+                self.inference_mode = self._create_inference_models(inference_mode or POSTURE_INFERENCE_MODE)
+                self._mark_startup('models_ready')
                 
                 # 重置计数器和性能统计
                 self.capture_fps.reset()
                 self.pose_process_fps.reset()
                 self.emotion_process_fps.reset()
-                self.performance_stats['camera_errors'] = 0
                 self.performance_stats['skipped_frames'] = 0
                 
-                # 启动处理线程
-                self.thread = threading.Thread(target=self._process_frames)
+                for times in self.performance_stats['processing_times'].values():
+                    times.clear()
+                self.motion_gate.reset()
+                self.face_roi = None
+                
+                # 订阅帧分发器
+                self.frame_subscriber = self.frame_broker.subscribe('posture_analysis')
+                if not self.writers_started:
+                    self.posture_writer.start()
+                    self.snapshot_writer.start()
+                    self.writers_started = True
+                
+                # 启动流水线：姿势和情绪工作线程并行推理，分发线程只负责取帧和缩放
+                self.pose_slot.open()
+                self.emotion_slot.open()
+                self.pose_thread = threading.Thread(target=self._pose_worker, name='posture-pose', daemon=True)
+                self.emotion_thread = threading.Thread(target=self._emotion_worker, name='posture-emotion', daemon=True)
+                self.pose_thread.start()
+                self.emotion_thread.start()
+                
+                self.thread = threading.Thread(target=self._process_frames, name='posture-dispatch')
                 self.thread.daemon = True
                 self.thread.start()
                 
@@ -309,12 +427,14 @@ class WebPostureMonitor:
                 return True
             except Exception as e:
                 self.is_running = False
+                self.frame_broker.stop_if_idle()
                 print(f"启动姿势分析系统失败，错误详情: {e}")
                 import traceback
                 traceback.print_exc()  # 打印详细错误堆栈
                 return False
         else:
             self.is_running = False
+            self.frame_broker.stop_if_idle()
             print("姿势分析模块不可用，请检查posture_analysis包是否正确安装")
             return False
     
@@ -322,143 +442,56 @@ class WebPostureMonitor:
         """停止姿势分析线程"""
         self.is_running = False
         
-        if self.thread:
-            try:
-                self.thread.join(timeout=2.0)
-            except Exception:
-                pass
-            self.thread = None
-            
-        if self.cap:
-            self.cap.release()
+        # 关闭阶段队列，唤醒等待中的工作线程
+        self.pose_slot.close()
+        self.emotion_slot.close()
+        
+        for thread in (self.thread, self.pose_thread, self.emotion_thread):
+            if thread:
+                try:
+                    thread.join(timeout=2.0)
+                except Exception:
+                    pass
+        self.thread = None
+        self.pose_thread = None
+        self.emotion_thread = None
+        
+        self._close_inference_models()
+        # 写入队列中剩余的坐姿时间记录和抓拍（与其他摄像头共用时由最后一个使用者停止）
+        if self.writers_started:
+            self.posture_writer.stop()
+            self.snapshot_writer.stop()
+            self.writers_started = False
+        
+        if self.frame_subscriber:
+            self.frame_subscriber.close()
+            self.frame_subscriber = None
+        
+        # 只有在没有其他订阅者时才真正关闭摄像头
+        if self.frame_broker.stop_if_idle():
             self.cap = None
             
         print("姿势分析系统已停止")
         return True
     
     def _init_camera(self):
-        """初始化摄像头设备"""
+        """初始化摄像头设备：指定了设备时直接打开；否则优先按注册表中保存的配置打开，验证失败才完整探测"""
         try:
-            # 先使用_find_available_cameras找到所有可用的摄像头
-            available_cameras = self._find_available_cameras()
-            camera_found = False
-            
-            if available_cameras:
-                # 首先尝试available_cameras中的相机
-                for camera_index in available_cameras:
-                    try:
-                        print(f"尝试初始化摄像头索引 {camera_index}...")
-                        self.cap = cv2.VideoCapture(camera_index, self.camera_api)
-                        if self.cap.isOpened():
-                            # 读取一帧验证相机是否真正可用
-                            ret, test_frame = self.cap.read()
-                            if ret and test_frame is not None:
-                                print(f"找到可用摄像头：索引 {camera_index}")
-                                camera_found = True
-                                break
-                            else:
-                                print(f"摄像头索引 {camera_index} 无法读取帧")
-                                self.cap.release()
-                    except Exception as e:
-                        print(f"尝试摄像头索引 {camera_index} 失败: {e}")
-                        if self.cap:
-                            self.cap.release()
-            
-            # 如果上面的方法没找到摄像头，尝试直接使用索引6（对应Bus 006）
-            if not camera_found:
-                try:
-                    print("尝试直接访问Bus 006上的摄像头 (索引6)...")
-                    # 使用V4L2后端，这在Linux上对USB摄像头效果更好
-                    self.cap = cv2.VideoCapture(6, self.camera_api)
-                    if self.cap.isOpened():
-                        ret, test_frame = self.cap.read()
-                        if ret and test_frame is not None:
-                            print("成功连接到索引6的摄像头")
-                            camera_found = True
-                    else:
-                        print("无法打开索引6的摄像头")
-                except Exception as e:
-                    print(f"尝试访问索引6摄像头失败: {e}")
-            
-            # 继续尝试更多相机索引
-            if not camera_found:
-                for camera_index in range(10):
-                    if camera_index in available_cameras:
-                        continue  # 已经尝试过
-                    try:
-                        print(f"尝试初始化扩展搜索摄像头索引 {camera_index}...")
-                        self.cap = cv2.VideoCapture(camera_index, self.camera_api)
-                        if self.cap.isOpened():
-                            ret, test_frame = self.cap.read()
-                            if ret and test_frame is not None:
-                                print(f"扩展搜索找到可用摄像头：索引 {camera_index}")
-                                camera_found = True
-                                break
-                            else:
-                                self.cap.release()
-                    except Exception as e:
-                        print(f"扩展搜索摄像头索引 {camera_index} 失败: {e}")
-                        if self.cap:
-                            self.cap.release()
-            
-            # 最后尝试直接设备路径
-            if not camera_found:
-                for dev_path in ["/dev/video0", "/dev/video1", "/dev/video2", "/dev/video6"]:
-                    try:
-                        print(f"尝试使用设备路径 {dev_path} 访问摄像头...")
-                        self.cap = cv2.VideoCapture(dev_path, self.camera_api)
-                        if self.cap.isOpened():
-                            ret, test_frame = self.cap.read()
-                            if ret and test_frame is not None:
-                                print(f"通过设备路径 {dev_path} 找到可用摄像头")
-                                camera_found = True
-                                break
-                            else:
-                                self.cap.release()
-                    except Exception as e:
-                        print(f"尝试设备路径 {dev_path} 失败: {e}")
-                        if self.cap:
-                            self.cap.release()
-            
-            if not camera_found or not self.cap or not self.cap.isOpened():
-                print("未找到可用摄像头")
-                return False
-                
-            # 获取摄像头原始属性
-            original_width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-            original_height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            original_fps = self.cap.get(cv2.CAP_PROP_FPS)
-            
-            print(f"摄像头原始属性: {original_width}x{original_height}@{original_fps}fps")
-            
-            # 优化摄像头配置以提高捕获帧率
-            self._optimize_camera_settings()
-            
-            # 验证摄像头是否能够正常读取帧
-            ret, test_frame = self.cap.read()
-            if not ret or test_frame is None:
-                print("摄像头无法读取帧，初始化失败")
-                if self.cap:
-                    self.cap.release()
-                    self.cap = None
-                return False
-                
-            # 获取实际的摄像头属性
-            actual_width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-            actual_height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            actual_fps = self.cap.get(cv2.CAP_PROP_FPS)
-            actual_format = int(self.cap.get(cv2.CAP_PROP_FOURCC))
-            
-            # 将4字节格式代码转换为可读字符串
-            try:
-                format_chars = "".join([chr((int(actual_format) >> (8 * i)) & 0xFF) for i in range(4)])
-                print(f"摄像头最终配置: {actual_width}x{actual_height}@{actual_fps}fps, 格式: {format_chars}")
-            except:
-                print(f"摄像头最终配置: {actual_width}x{actual_height}@{actual_fps}fps")
-            
-            # 测试实际帧率
-            measured_fps = self._test_camera_fps(self.cap, frames=15)
-            print(f"测量的实际摄像头帧率: {measured_fps:.1f} FPS")
+            open_start_time = time.time()
+            if self.device is not None:
+                # 多摄像头部署中每个分析器使用固定的设备，不探测（否则会抢占其他摄像头）
+                if not self._open_device(self.device):
+                    return False
+                camera_registry.record_open(self._consumer_name(), 'device', time.time() - open_start_time)
+            else:
+                self.cap, profile = camera_registry.open_cached(self.camera_buffer_size)
+                if self.cap is not None:
+                    self.camera_fourcc = cv2.VideoWriter_fourcc(*profile['fourcc']) if profile.get('fourcc') else None
+                    camera_registry.record_open(self._consumer_name(), 'cache', time.time() - open_start_time)
+                else:
+                    if not self._probe_camera():
+                        return False
+                    camera_registry.record_open(self._consumer_name(), 'probe', time.time() - open_start_time)
             
             # 重置帧率计数器
             self.capture_fps = FPSCounter()
@@ -478,6 +511,265 @@ class WebPostureMonitor:
                 self.cap = None
             return False
     
+    def _consumer_name(self):
+        """摄像头注册表中记录打开耗时使用的消费者名称"""
+        return 'posture' if self.camera_id == DEFAULT_CAMERA_ID else f'posture:{self.camera_id}'
+    
+    def _open_device(self, device):
+        """打开指定的摄像头设备并优化参数（不探测其他设备，也不写入注册表）
+        
+        Returns:
+            是否打开成功（成功时self.cap为已打开的摄像头）
+        """
+        print(f"摄像头 {self.camera_id}: 打开设备 {device}...")
+        self.cap = cv2.VideoCapture(device, self.camera_api)
+        if not self.cap.isOpened():
+            print(f"摄像头 {self.camera_id}: 无法打开设备 {device}")
+            self.cap.release()
+            self.cap = None
+            return False
+        
+        self._optimize_camera_settings()
+        ret, test_frame = self.cap.read()
+        if not ret or test_frame is None:
+            print(f"摄像头 {self.camera_id}: 设备 {device} 无法读取帧")
+            self.cap.release()
+            self.cap = None
+            return False
+        
+        print(f"摄像头 {self.camera_id}: 设备 {device} 已打开，分辨率 {test_frame.shape[1]}x{test_frame.shape[0]}")
+        return True
+    
+    def _probe_camera(self):
+        """完整探测可用摄像头并优化参数，成功后把配置保存到摄像头注册表
+        
+        Returns:
+            是否找到可用摄像头（成功时self.cap为已打开的摄像头）
+        """
+        # 先使用_find_available_cameras找到所有可用的摄像头
+        available_cameras = self._find_available_cameras()
+        camera_found = False
+        device = None
+        
+        if available_cameras:
+            # 首先尝试available_cameras中的相机
+            for camera_index in available_cameras:
+                try:
+                    print(f"尝试初始化摄像头索引 {camera_index}...")
+                    self.cap = cv2.VideoCapture(camera_index, self.camera_api)
+                    if self.cap.isOpened():
+                        # 读取一帧验证相机是否真正可用
+                        ret, test_frame = self.cap.read()
+                        if ret and test_frame is not None:
+                            print(f"找到可用摄像头：索引 {camera_index}")
+                            camera_found = True
+                            device = camera_index
+                            break
+                        else:
+                            print(f"摄像头索引 {camera_index} 无法读取帧")
+                            self.cap.release()
+                except Exception as e:
+                    print(f"尝试摄像头索引 {camera_index} 失败: {e}")
+                    if self.cap:
+                        self.cap.release()
+        
+        # 如果上面的方法没找到摄像头，尝试直接使用索引6（对应Bus 006）
+        if not camera_found:
+            try:
+                print("尝试直接访问Bus 006上的摄像头 (索引6)...")
+                # 使用V4L2后端，这在Linux上对USB摄像头效果更好
+                self.cap = cv2.VideoCapture(6, self.camera_api)
+                if self.cap.isOpened():
+                    ret, test_frame = self.cap.read()
+                    if ret and test_frame is not None:
+                        print("成功连接到索引6的摄像头")
+                        camera_found = True
+                        device = 6
+                else:
+                    print("无法打开索引6的摄像头")
+            except Exception as e:
+                print(f"尝试访问索引6摄像头失败: {e}")
+        
+        # 继续尝试更多相机索引
+        if not camera_found:
+            for camera_index in range(10):
+                if camera_index in available_cameras:
+                    continue  # 已经尝试过
+                try:
+                    print(f"尝试初始化扩展搜索摄像头索引 {camera_index}...")
+                    self.cap = cv2.VideoCapture(camera_index, self.camera_api)
+                    if self.cap.isOpened():
+                        ret, test_frame = self.cap.read()
+                        if ret and test_frame is not None:
+                            print(f"扩展搜索找到可用摄像头：索引 {camera_index}")
+                            camera_found = True
+                            device = camera_index
+                            break
+                        else:
+                            self.cap.release()
+                except Exception as e:
+                    print(f"扩展搜索摄像头索引 {camera_index} 失败: {e}")
+                    if self.cap:
+                        self.cap.release()
+        
+        # 最后尝试直接设备路径
+        if not camera_found:
+            for dev_path in ["/dev/video0", "/dev/video1", "/dev/video2", "/dev/video6"]:
+                try:
+                    print(f"尝试使用设备路径 {dev_path} 访问摄像头...")
+                    self.cap = cv2.VideoCapture(dev_path, self.camera_api)
+                    if self.cap.isOpened():
+                        ret, test_frame = self.cap.read()
+                        if ret and test_frame is not None:
+                            print(f"通过设备路径 {dev_path} 找到可用摄像头")
+                            camera_found = True
+                            device = dev_path
+                            break
+                        else:
+                            self.cap.release()
+                except Exception as e:
+                    print(f"尝试设备路径 {dev_path} 失败: {e}")
+                    if self.cap:
+                        self.cap.release()
+        
+        if not camera_found or not self.cap or not self.cap.isOpened():
+            print("未找到可用摄像头")
+            return False
+            
+        # 获取摄像头原始属性
+        original_width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        original_height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        original_fps = self.cap.get(cv2.CAP_PROP_FPS)
+        
+        print(f"摄像头原始属性: {original_width}x{original_height}@{original_fps}fps")
+        
+        # 优化摄像头配置以提高捕获帧率
+        self._optimize_camera_settings()
+        
+        # 验证摄像头是否能够正常读取帧
+        ret, test_frame = self.cap.read()
+        if not ret or test_frame is None:
+            print("摄像头无法读取帧，初始化失败")
+            if self.cap:
+                self.cap.release()
+                self.cap = None
+            return False
+            
+        # 获取实际的摄像头属性
+        actual_width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        actual_height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        actual_fps = self.cap.get(cv2.CAP_PROP_FPS)
+        actual_format = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        
+        # 将4字节格式代码转换为可读字符串
+        try:
+            format_chars = "".join([chr((int(actual_format) >> (8 * i)) & 0xFF) for i in range(4)])
+            print(f"摄像头最终配置: {actual_width}x{actual_height}@{actual_fps}fps, 格式: {format_chars}")
+        except:
+            print(f"摄像头最终配置: {actual_width}x{actual_height}@{actual_fps}fps")
+        
+        # 测试实际帧率
+        measured_fps = self._test_camera_fps(self.cap, frames=15)
+        print(f"测量的实际摄像头帧率: {measured_fps:.1f} FPS")
+        
+        # 保存探测结果，下次启动只需打开一次验证
+        camera_registry.save(self.cap, device, self.camera_api, measured_fps)
+        return True
+    
+    def _create_inference_models(self, inference_mode):
+        """创建姿势检测模型和情绪分析器
+        
+        Args:
+            inference_mode: 期望的推理后端
+            
+        Returns:
+            实际使用的推理后端，推理进程启动失败时回退为'thread'
+        """
+        if inference_mode == 'process':
+            pose = ProcessPose(**POSE_OPTIONS)
+            face_mesh = ProcessFaceMesh(**FACE_MESH_OPTIONS)
+            if pose.start() and face_mesh.start():
+                self.pose = pose
+                self.emotion_analyzer = EmotionAnalyzer(face_mesh=face_mesh)
+                # 推理进程中的模型不支持在线切换复杂度，延迟控制器只调整分辨率和推理频率
+                self.pose_model_complexity = self.active_pose_model_complexity = POSE_OPTIONS['model_complexity']
+                self.latency_controller.set_ladder(self._build_latency_ladder(POSE_OPTIONS['model_complexity']))
+                print("姿势和情绪模型运行在独立推理进程中")
+                return 'process'
+            
+            pose.close()
+            face_mesh.close()
+            print("推理进程启动失败，回退到进程内推理")
+        
+        self.pose = mp_pose.Pose(**{**POSE_OPTIONS, 'model_complexity': self.pose_model_complexity})
+        self.active_pose_model_complexity = self.pose_model_complexity
+        self.emotion_analyzer = EmotionAnalyzer()
+        self.latency_controller.set_ladder(self._build_latency_ladder())
+        return 'thread'
+    
+    def _close_inference_models(self):
+        """关闭推理进程（进程内模型随对象释放，无需处理）"""
+        if self.inference_mode != 'process':
+            return
+        if self.pose:
+            self.pose.close()
+        if self.emotion_analyzer:
+            self.emotion_analyzer.face_mesh.close()
+    
+    def _get_inference_stats(self):
+        """获取推理进程统计信息"""
+        if self.inference_mode != 'process' or not self.pose or not self.emotion_analyzer:
+            return []
+        return [self.pose.get_stats(), self.emotion_analyzer.face_mesh.get_stats()]
+    
+    def _reopen_camera(self):
+        """供帧分发器调用的摄像头（重新）打开函数
+        
+        Returns:
+            已打开的VideoCapture，失败时返回None
+        """
+        # 录制的采集源读完即结束，不回退到真实摄像头
+        if self.capture_source is not None:
+            return None
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+        if self._init_camera():
+            return self.cap
+        return None
+    
+    def set_capture_source(self, source):
+        """设置替代摄像头的采集源，需要在start()之前调用
+        
+        Args:
+            source: capture_source_module中的VideoFileSource/ImageDirectorySource，
+                    或任何提供VideoCapture读取接口的对象；None表示恢复使用摄像头
+            
+        Returns:
+            是否设置成功（分析系统运行中时不能更换）
+        """
+        if self.is_running or self.frame_broker.is_running:
+            print("帧分发器运行中，无法更换采集源")
+            return False
+        self.capture_source = source
+        print(f"采集源设置为: {type(source).__name__ if source is not None else '摄像头'}")
+        return True
+    
+    def _on_frame_captured(self, packet):
+        """帧分发器每采集一帧时的回调，用于统计捕获帧率"""
+        self.capture_fps.update()
+        if not self.startup_timer.is_marked('first_frame'):
+            self._mark_startup('first_frame')
+    
+    def _mark_startup(self, phase):
+        """记录启动阶段耗时，第一个分析结果发布时输出从启动到出结果的总时间"""
+        elapsed = self.startup_timer.mark(phase)
+        if elapsed is None:
+            return
+        POSTURE_STARTUP_SECONDS.labels(phase).set(elapsed)
+        if phase == 'first_result':
+            print(f"姿势分析启动完成：从启动到第一个分析结果耗时 {elapsed:.2f} 秒，各阶段: {self.startup_timer.get_stats()}")
+    
     def _optimize_camera_settings(self):
         """优化摄像头设置以提高性能"""
         try:
@@ -579,257 +871,364 @@ class WebPostureMonitor:
         else:
             return 0
     
-    def _adjust_processing_resolution(self):
-        """根据当前帧率动态调整处理分辨率"""
-        current_time = time.time()
-        
-        # 检查是否到达调整间隔
-        if not self.adaptive_resolution or (current_time - self.last_resolution_adjust_time) < RESOLUTION_ADJUST_INTERVAL:
-            return
-            
-        capture_fps = self.capture_fps.get_fps()
-        process_fps = min(self.pose_process_fps.get_fps(), self.emotion_process_fps.get_fps())
-        
-        # 当帧率过低时降低分辨率
-        if process_fps < FPS_THRESHOLD_LOW and self.current_resolution_index < len(RESOLUTION_LEVELS) - 1:
-            self.current_resolution_index += 1
-            self.process_width, self.process_height = RESOLUTION_LEVELS[self.current_resolution_index]
-            print(f"帧率过低 ({process_fps:.1f} FPS)，降低处理分辨率至 {self.process_width}x{self.process_height}")
-            self.last_resolution_adjust_time = current_time
-            
-            # 重置帧率计数器
-            self.pose_process_fps.reset()
-            self.emotion_process_fps.reset()
+    @staticmethod
+    def _build_latency_ladder(fixed_model_complexity=None):
+        """构建延迟控制档位阶梯
         
-        # 当帧率足够高时提高分辨率
-        elif process_fps > FPS_THRESHOLD_HIGH and self.current_resolution_index > 0:
-            self.current_resolution_index -= 1
-            self.process_width, self.process_height = RESOLUTION_LEVELS[self.current_resolution_index]
-            print(f"帧率足够高 ({process_fps:.1f} FPS)，提高处理分辨率至 {self.process_width}x{self.process_height}")
-            self.last_resolution_adjust_time = current_time
-            
-            # 重置帧率计数器
-            self.pose_process_fps.reset()
-            self.emotion_process_fps.reset()
+        Args:
+            fixed_model_complexity: 推理后端不支持切换模型时固定使用的复杂度，重复的档位会被合并
+        """
+        ladder = []
+        seen = set()
+        for resolution_index, rate_scale, model_complexity in LATENCY_LADDER:
+            if fixed_model_complexity is not None:
+                model_complexity = fixed_model_complexity
+            key = (resolution_index, rate_scale, model_complexity)
+            if key not in seen:
+                seen.add(key)
+                ladder.append(LatencyLevel(resolution_index, rate_scale, model_complexity))
+        return ladder
     
-    def _adjust_skip_frame_strategy(self):
-        """根据当前处理性能调整跳帧策略"""
-        if not self.skip_frames_when_slow:
-            self.skip_count = 0
-            return False
-        
-        # 计算平均处理时间
-        avg_processing_time = 0
-        if self.performance_stats['processing_times']:
-            avg_processing_time = sum(self.performance_stats['processing_times']) / len(self.performance_stats['processing_times'])
+    def _apply_latency_level(self, level):
+        """应用延迟控制器选出的档位
         
-        # 处理时间超过帧间时间的90%时需要跳帧
-        frame_time = 1.0 / self.camera_fps if self.camera_fps > 0 else 0.033  # 默认30fps
-        
-        if avg_processing_time > frame_time * 0.9:
-            # 需要跳帧但不超过最大连续跳帧数
-            if self.skip_count < self.max_consecutive_skips:
-                self.skip_count += 1
-                self.performance_stats['skipped_frames'] += 1
-                return True
-            else:
-                # 达到最大跳帧数，重置计数并处理这一帧
-                self.skip_count = 0
-                return False
-        else:
-            # 处理时间可接受，不需要跳帧
-            self.skip_count = 0
-            return False
+        分辨率和推理频率立即生效；模型复杂度由姿势线程在下一帧推理前切换，
+        避免与正在进行的推理并发访问模型。
+        """
+        self.current_resolution_index = level.resolution_index
+        self.process_width, self.process_height = RESOLUTION_LEVELS[level.resolution_index]
+        self.scheduler.set_rate_scale(level.rate_scale, INFERENCE_TASKS)
+        self.pose_model_complexity = level.model_complexity
+        print(f"延迟控制换档：处理分辨率 {self.process_width}x{self.process_height}，"
+              f"推理频率 x{level.rate_scale}，模型复杂度 {level.model_complexity}")
+        
+        # 重置帧率计数器
+        self.pose_process_fps.reset()
+        self.emotion_process_fps.reset()
+    
+    def _sync_pose_model_complexity(self):
+        """在姿势线程中按控制器的选择重建进程内姿势模型"""
+        if self.pose_model_complexity == self.active_pose_model_complexity or self.inference_mode != 'thread':
+            return
+        complexity = self.pose_model_complexity
+        try:
+            new_pose = mp_pose.Pose(**{**POSE_OPTIONS, 'model_complexity': complexity})
+        except Exception as e:
+            print(f"切换姿势模型复杂度失败: {str(e)}")
+            self.pose_model_complexity = self.active_pose_model_complexity
+            return
+        old_pose, self.pose = self.pose, new_pose
+        self.active_pose_model_complexity = complexity
+        try:
+            old_pose.close()
+        except Exception:
+            pass
+        print(f"姿势模型复杂度已切换为 {complexity}")
+    
+    def _avg_stage_time(self, stage):
+        """获取某个流水线阶段的平均处理时间（秒）"""
+        times = self.performance_stats['processing_times'][stage]
+        if not times:
+            return 0
+        return sum(times) / len(times)
+    
+    def _get_bottleneck_time(self):
+        """获取最慢推理阶段的平均处理时间（秒），即流水线的单帧瓶颈"""
+        return max(self._avg_stage_time('pose'), self._avg_stage_time('emotion'))
+    
+    def _get_stage_times_ms(self):
+        """获取各流水线阶段的平均处理时间（毫秒）"""
+        return {stage: round(self._avg_stage_time(stage) * 1000, 2) for stage in PIPELINE_STAGES}
+    
+    def _update_fps_info(self):
+        """更新帧率信息"""
+        self.fps_info = {
+            'capture_fps': round(self.capture_fps.get_fps(), 1),
+            'pose_process_fps': round(self.pose_process_fps.get_fps(), 1),
+            'emotion_process_fps': round(self.emotion_process_fps.get_fps(), 1),
+            'process_resolution': f"{self.process_width}x{self.process_height}",
+            'avg_process_time_ms': round(self._get_bottleneck_time() * 1000, 1),
+            'stage_process_time_ms': self._get_stage_times_ms()
+        }
     
     def _process_frames(self):
-        """处理视频帧的主循环"""
+        """流水线分发阶段：从帧分发器取帧，按调度器安排缩放后交给到期的姿势/情绪工作线程"""
         if not POSTURE_MODULE_AVAILABLE:
             return
         
         last_fps_update_time = time.time()
-        consecutive_read_failures = 0
-        last_frame_time = time.time()
-        last_reconnect_time = time.time()
         
-        while self.is_running and self.cap and self.cap.isOpened():
+        while self.is_running and self.frame_subscriber:
             try:
+                # 从帧分发器获取最新帧，摄像头读取和断线重连由分发器统一负责
+                packet = self.frame_subscriber.read(timeout=1.0)
+                if packet is None:
+                    if not self.frame_broker.is_running:
+                        time.sleep(0.1)
+                    continue
+                frame = packet.frame
                 current_time = time.time()
                 
-                # 如果摄像头出现多次错误，尝试重新连接摄像头
-                if consecutive_read_failures > 5 and (current_time - self.performance_stats['last_reconnect_time']) > self.performance_stats['reconnect_interval']:
-                    print(f"连续 {consecutive_read_failures} 次读取失败，尝试重新初始化摄像头...")
-                    self.cap.release()
-                    success = self._init_camera()
-                    if not success:
-                        print("重新初始化摄像头失败，暂停1秒后重试")
-                        time.sleep(1)
-                        continue
-                    consecutive_read_failures = 0
-                    self.performance_stats['last_reconnect_time'] = current_time
-                
-                # 使用分离的grab和retrieve方法提高性能
-                if self.use_separate_grab_retrieve:
-                    grabbed = self.cap.grab()
-                    if not grabbed:
-                        consecutive_read_failures += 1
-                        self.performance_stats['camera_errors'] += 1
-                        time.sleep(0.01)
-                        continue
-                    
-                    ret, frame = self.cap.retrieve()
-                    if not ret:
-                        consecutive_read_failures += 1
-                        self.performance_stats['camera_errors'] += 1
-                        print("无法读取摄像头帧")
-                        time.sleep(0.01)
-                        continue
-                else:
-                    # 常规读取模式
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        consecutive_read_failures += 1
-                        self.performance_stats['camera_errors'] += 1
-                        print("无法读取摄像头帧")
-                        time.sleep(0.01)
-                        continue
-                
-                # 重置错误计数器
-                consecutive_read_failures = 0
-                
-                # 更新捕获帧率
-                self.capture_fps.update()
-                
-                # 计算帧间隔
-                frame_interval = current_time - last_frame_time
-                last_frame_time = current_time
-                
-                # 检查是否需要跳过这一帧以提高性能
-                if self._adjust_skip_frame_strategy():
-                    # 跳过这一帧，但仍提供最后处理的结果给视频流
+                # 询问调度器哪些推理任务到期，都未到期时直接跳过这一帧（视频流继续使用最后处理的结果）
+                due_tasks = self.scheduler.due(INFERENCE_TASKS, current_time)
+                if not due_tasks:
+                    self.performance_stats['skipped_frames'] += 1
+                    POSTURE_SKIPPED_FRAMES.inc()
                     continue
                 
-                # 每隔一段时间检查并调整处理分辨率
-                self._adjust_processing_resolution()
+                # 延迟控制器根据端到端延迟决定是否换档（分辨率、推理频率、模型复杂度）
+                level = self.latency_controller.update(current_time)
+                if level is not None:
+                    self._apply_latency_level(level)
                 
                 # 记录处理开始时间
-                process_start_time = time.time()
+                dispatch_start_time = time.time()
                 
-                # 调整帧尺寸进行处理 - 根据设置使用跳采样或传统缩放
+                # 调整帧尺寸进行处理 - 结果直接写入池化缓冲区，根据设置使用跳采样或传统缩放
+                processed = self.frame_pool.acquire((self.process_height, self.process_width, 3), frame.dtype)
                 if self.resize_method == 'subsampling':
                     # 使用跳采样方法以保持原始视角
-                    processed_frame = self._resize_with_subsampling(frame, self.process_width, self.process_height)
+                    with tracer.span('dispatch.subsample', 'dispatch'):
+                        self._resize_with_subsampling(frame, self.process_width, self.process_height, dst=processed.array)
                 else:
                     # 使用传统缩放方法
-                    processed_frame = cv2.resize(frame, (self.process_width, self.process_height))
-                
-                pose_frame = processed_frame.copy()
-                emotion_frame = processed_frame.copy()
-                
-                # 处理姿势
-                pose_results = self._process_pose(pose_frame)
-                self.pose_process_fps.update()  # 更新姿势处理帧率
-                
-                # 处理情绪
-                emotion_results = self._process_emotion(emotion_frame)
-                self.emotion_process_fps.update()  # 更新情绪处理帧率
-                
-                # 记录处理时间
-                process_time = time.time() - process_start_time
-                self.performance_stats['processing_times'].append(process_time)
-                
-                # 添加处理时间和分辨率信息到显示帧
-                # 姿势帧显示处理信息
-                size_text = f"{self.process_width}x{self.process_height}"
-                cv2.putText(pose_results['display_frame'], 
-                          f"Proc: {process_time*1000:.1f}ms {size_text}", 
-                          (pose_results['display_frame'].shape[1] - 200, 25), 
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+                    with tracer.span('dispatch.resize', 'dispatch'):
+                        cv2.resize(frame, (self.process_width, self.process_height), dst=processed.array)
                 
-                # 将处理后的帧放入队列供Web端点使用
-                if self.video_stream_handler:
-                    self.video_stream_handler.add_pose_frame(pose_results['display_frame'])
-                    self.video_stream_handler.add_emotion_frame(emotion_results['display_frame'])
+                # 运动门控：画面相对上次推理没有明显变化时，跳过这一帧并保留上一次的结果
+                with tracer.span('dispatch.motion_gate', 'dispatch'):
+                    should_process = self.motion_gate.should_process(processed.array)
+                if not should_process:
+                    POSTURE_MOTION_GATE_SKIPS.inc()
+                    processed.release()
+                    continue
                 
-                # 更新结果状态
-                self.pose_result = {
-                    'angle': pose_results['angle'] if pose_results['angle'] is not None else 0,
-                    'is_bad_posture': pose_results['is_bad_posture'],
-                    'is_occluded': pose_results['is_occluded'],
-                    'status': pose_results['status']
-                }
+                # 通过运动门控才算执行，被门控跳过的帧不占用任务的执行时隙，下一帧仍然到期
+                for name in due_tasks:
+                    self.scheduler.mark_run(name, current_time)
                 
-                self.emotion_result = {
-                    'emotion': emotion_results['emotion'].name if emotion_results['emotion'] else 'UNKNOWN',
-                    'emotion_code': emotion_results['emotion'].value if emotion_results['emotion'] else -1
-                }
+                # 到期的推理阶段共享同一个缩放后的只读帧，各持有一次引用，处理完后释放；
+                # 某个阶段还没处理完上一帧时，旧帧会被直接覆盖并释放，不会积压延迟
+                # （processed获取时已带一次引用，交给第一个阶段；其余阶段各增加一次）
+                for i, name in enumerate(due_tasks):
+                    if i > 0:
+                        processed.retain()
+                    self.stage_slots[name].put((packet.retain(), processed))
                 
-                # 检查并记录不良坐姿
-                self._check_and_record_bad_posture(frame, pose_results)
+                dispatch_time = time.time() - dispatch_start_time
+                self.performance_stats['processing_times']['dispatch'].append(dispatch_time)
+                self.stage_histograms['dispatch'].observe(dispatch_time)
                 
-                # 每秒更新一次帧率信息
                 # 每0.5秒更新一次帧率信息
-                if current_time - last_fps_update_time >= 0.5:  # 从1.0改为0.5秒
-                    self.fps_info = {
-                        'capture_fps': round(self.capture_fps.get_fps(), 1),
-                        'pose_process_fps': round(self.pose_process_fps.get_fps(), 1),
-                        'emotion_process_fps': round(self.emotion_process_fps.get_fps(), 1),
-                        'process_resolution': f"{self.process_width}x{self.process_height}",
-                        'avg_process_time_ms': round(sum(self.performance_stats['processing_times']) / 
-                                                   max(1, len(self.performance_stats['processing_times'])) * 1000, 1)
-                        if self.performance_stats['processing_times'] else 0
-                    }
+                if current_time - last_fps_update_time >= 0.5:
+                    self._update_fps_info()
                     last_fps_update_time = current_time
-                
-                # 根据实际帧率动态调整延迟时间
-                current_fps = min(self.pose_process_fps.get_fps(), self.emotion_process_fps.get_fps())
-                target_interval = 1.0 / TARGET_FPS
-                
-                # 如果处理太快，增加一点延迟以减少CPU使用
-                # 如果处理太慢，不增加延迟
-                if process_time < target_interval * 0.8:  # 如果处理时间远小于目标间隔
-                    time.sleep(min(0.001, (target_interval - process_time) * 0.5))
             except Exception as e:
                 print(f"处理帧异常: {str(e)}")
                 import traceback
                 traceback.print_exc()
                 time.sleep(0.1)
     
+    @staticmethod
+    def _release_stage_item(item):
+        """释放流水线阶段数据持有的帧引用"""
+        packet, processed = item
+        packet.release()
+        processed.release()
+    
+    def _pose_worker(self):
+        """流水线姿势阶段：姿势推理、坐姿记录，有观看者时输出姿势视频帧"""
+        while self.is_running:
+            try:
+                item = self.pose_slot.get(timeout=1.0)
+                if item is None:
+                    continue
+                packet, processed = item
+                try:
+                    processed_frame = processed.array
+                    self._sync_pose_model_complexity()
+                    
+                    stage_start_time = time.time()
+                    pose_results = self._process_pose(processed_frame)
+                    self._update_face_roi(pose_results['landmark_array'], processed_frame.shape)
+                    process_time = time.time() - stage_start_time
+                    self.pose_process_fps.update()  # 更新姿势处理帧率
+                    self.performance_stats['processing_times']['pose'].append(process_time)
+                    self.stage_histograms['pose'].observe(process_time)
+                    self.scheduler.record_cost('pose', process_time)
+                    
+                    # 只有在有人观看姿势视频流时才绘制叠加层并送入视频流
+                    if self._has_stream_viewers('pose'):
+                        with tracer.span('pose.draw', 'pose'):
+                            display_buffer = self._render_pose_overlay(processed_frame, pose_results, process_time)
+                        try:
+                            # 视频流处理器会保存自己的副本
+                            self.video_stream_handler.add_pose_frame(display_buffer.array)
+                        finally:
+                            display_buffer.release()
+                    
+                    # 更新结果状态
+                    self.pose_result = {
+                        'angle': pose_results['angle'] if pose_results['angle'] is not None else 0,
+                        'is_bad_posture': pose_results['is_bad_posture'],
+                        'is_occluded': pose_results['is_occluded'],
+                        'status': pose_results['status'],
+                        'posture_type': pose_results['posture_type']
+                    }
+                    self.posture_signals.observe_pose(pose_results['raw_angle'], pose_results['posture_type'],
+                                                      now=packet.timestamp)
+                    if not self.startup_timer.is_marked('first_result'):
+                        self._mark_startup('first_result')
+                    # 端到端延迟：从摄像头采集到姿势结果发布
+                    latency = time.time() - packet.timestamp
+                    self.latency_controller.observe(latency)
+                    POSTURE_LATENCY_SECONDS.observe(latency)
+                    
+                    # 坐姿时间记录和图像抓拍不需要逐帧执行，由调度器按各自频率触发
+                    self._run_recording_tasks(packet.frame, pose_results, packet=packet)
+                finally:
+                    # 归还本阶段持有的帧缓冲区
+                    self._release_stage_item(item)
+            except Exception as e:
+                print(f"姿势处理线程异常: {str(e)}")
+                import traceback
+                traceback.print_exc()
+                time.sleep(0.1)
+    
+    def _run_recording_tasks(self, frame, pose_results, now=None, packet=None):
+        """执行到期的坐姿时间记录和坐姿图像抓拍任务
+        
+        Args:
+            frame: 采集帧（用于保存图像）
+            pose_results: 本帧的姿势分析结果
+            now: 调度使用的当前时间，None时使用墙上时间
+            packet: frame所属的FramePacket，抓拍时交给保存线程持有引用（无需复制帧），
+                    其中的原始JPEG数据可直接保存
+        """
+        if pose_results['raw_angle'] is not None and self.scheduler.try_run('posture_recording', now):
+            task_start_time = time.time()
+            with tracer.span('db.record_posture_time', 'db'):
+                self._record_posture_time(pose_results['raw_angle'], pose_results['posture_type'])
+            self.scheduler.record_cost('posture_recording', time.time() - task_start_time)
+        
+        if self.scheduler.try_run('image_capture', now):
+            task_start_time = time.time()
+            with tracer.span('db.image_capture', 'db'):
+                self._check_and_record_bad_posture(frame, pose_results, packet)
+            self.scheduler.record_cost('image_capture', time.time() - task_start_time)
+    
+    def _emotion_worker(self):
+        """流水线情绪阶段：面部网格推理，有观看者时输出情绪视频帧"""
+        while self.is_running:
+            try:
+                item = self.emotion_slot.get(timeout=1.0)
+                if item is None:
+                    continue
+                try:
+                    processed_frame = item[1].array
+                    
+                    stage_start_time = time.time()
+                    emotion_results = self._process_emotion(processed_frame)
+                    process_time = time.time() - stage_start_time
+                    self.emotion_process_fps.update()  # 更新情绪处理帧率
+                    self.performance_stats['processing_times']['emotion'].append(process_time)
+                    self.stage_histograms['emotion'].observe(process_time)
+                    self.scheduler.record_cost('emotion', process_time)
+                    
+                    if self._has_stream_viewers('emotion'):
+                        with tracer.span('emotion.draw', 'emotion'):
+                            display_buffer = self._render_emotion_overlay(processed_frame, emotion_results)
+                        try:
+                            self.video_stream_handler.add_emotion_frame(display_buffer.array)
+                        finally:
+                            display_buffer.release()
+                    
+                    self.emotion_result = {
+                        'emotion': emotion_results['emotion'].name if emotion_results['emotion'] else 'UNKNOWN',
+                        'emotion_code': emotion_results['emotion'].value if emotion_results['emotion'] else -1
+                    }
+                    self.posture_signals.observe_emotion(self.emotion_result['emotion'], now=item[0].timestamp)
+                finally:
+                    self._release_stage_item(item)
+            except Exception as e:
+                print(f"情绪处理线程异常: {str(e)}")
+                import traceback
+                traceback.print_exc()
+                time.sleep(0.1)
+    
+    def _has_stream_viewers(self, stream):
+        """是否有客户端正在观看指定的分析视频流（'pose' 或 'emotion'）"""
+        return bool(self.video_stream_handler and self.video_stream_handler.has_viewers(stream))
+    
+    def _acquire_overlay_buffer(self, frame):
+        """从缓冲池获取叠加绘制用的缓冲区，并复制输入帧内容
+        
+        Returns:
+            PooledFrame，调用方用完后需要release()
+        """
+        buffer = self.frame_pool.acquire_like(frame)
+        np.copyto(buffer.array, frame)
+        return buffer
+    
+    def _acquire_rgb_buffer(self, frame):
+        """从缓冲池获取缓冲区并写入输入帧的RGB版本（供MediaPipe使用）
+        
+        Returns:
+            PooledFrame，调用方用完后需要release()
+        """
+        buffer = self.frame_pool.acquire_like(frame)
+        with tracer.span('cvtColor', 'convert'):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buffer.array)
+        return buffer
+    
     def _process_pose(self, frame):
-        """处理姿势检测"""
-        if not POSTURE_MODULE_AVAILABLE:
-            return {
-                'display_frame': frame,
-                'angle': None,
-                'is_bad_posture': False,
-                'is_occluded': True,
-                'status': 'Module Not Available',
-                'posture_type': 'unknown'
-            }
+        """处理姿势检测（只做推理和结果计算，不绘制）
         
+        Returns:
+            结果字典，其中landmarks、points等字段供_render_pose_overlay按需绘制
+        """
         results = {
-            'display_frame': frame,
             'angle': None,
             'is_bad_posture': False,
             'is_occluded': True,
             'status': 'No Detection',
-            'posture_type': 'unknown'
+            'posture_type': 'unknown',
+            'landmarks': None,
+            'landmark_array': None,
+            'points': {},
+            'valid_detection': False,
+            'raw_angle': None
         }
         
+        if not POSTURE_MODULE_AVAILABLE:
+            results['status'] = 'Module Not Available'
+            return results
+        
         try:
             # 姿势检测
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            pose_results = self.pose.process(frame_rgb)
+            rgb_buffer = self._acquire_rgb_buffer(frame)
+            try:
+                with tracer.span('pose.process', 'pose'):
+                    pose_results = self.pose.process(rgb_buffer.array)
+            finally:
+                rgb_buffer.release()
             if not pose_results.pose_landmarks:
                 return results
             
+            # 关键点每帧只转换一次数组，遮挡检测、角度计算和面部区域定位共用
+            # （推理进程返回的结果自带关键点数组，无需再从protobuf转换）
+            landmark_array = getattr(pose_results, 'pose_landmark_array', None)
+            landmark_array = pose_landmarks_to_array(
+                landmark_array if landmark_array is not None else pose_results.pose_landmarks)
+            
             # 遮挡检测
-            is_occluded, occlusion_status = check_occlusion(pose_results.pose_landmarks.landmark)
+            is_occluded, occlusion_status = landmark_occlusion_status(landmark_array, VISIBILITY_THRESHOLD)
             self._update_occlusion_counters(is_occluded)
             final_occlusion = self.occlusion_counter >= OCCLUSION_FRAMES_THRESHOLD
             valid_detection = self.clear_counter >= CLEAR_FRAMES_THRESHOLD
             
             # 头部角度计算
-            angle_info = calculate_head_angle(pose_results.pose_landmarks.landmark, frame.shape)
+            angle_info = landmark_head_angle(landmark_array, frame.shape, HEAD_ANGLE_THRESHOLD)
             angle = None
             is_bad_posture = False
             points = {}
@@ -848,21 +1247,93 @@ class WebPostureMonitor:
                     posture_type = 'fair'  # 一般坐姿
                 else:
                     posture_type = 'poor'  # 不良坐姿
-                
-                # 记录坐姿时间
-                self._record_posture_time(angle, posture_type)
             
-            # 绘制姿势关键点和信息
-            display_frame = frame.copy()
+            # 更新结果
+            results = {
+                'angle': angle if angle is not None else (self.last_valid_angle if final_occlusion else None),
+                'is_bad_posture': is_bad_posture,
+                'is_occluded': final_occlusion,
+                'status': occlusion_status if final_occlusion else 'Tracking',
+                'posture_type': posture_type,
+                'landmarks': pose_results.pose_landmarks,
+                'landmark_array': landmark_array,
+                'points': points,
+                'valid_detection': valid_detection,
+                'raw_angle': angle
+            }
+            
+            return results
+        except Exception as e:
+            print(f"姿势处理异常: {str(e)}")
+            return results
+    
+    def _update_face_roi(self, landmark_array, frame_shape):
+        """根据姿势关键点更新面部区域，姿势跟踪丢失时清除
+        
+        Args:
+            landmark_array: 姿势关键点数组（_process_pose结果中的landmark_array），None表示未检测到
+            frame_shape: 分析帧尺寸，用于把面部框调整为像素意义上的正方形
+        """
+        if not self.face_roi_enabled or landmark_array is None:
+            self.face_roi = None
+            return
+        
+        visible = visible_points(landmark_array, FACE_ROI_LANDMARKS, VISIBILITY_THRESHOLD, frame_shape)
+        if len(visible) < 3:
+            self.face_roi = None
+            return
+        
+        h, w = frame_shape[:2]
+        (min_x, min_y), (max_x, max_y) = visible.min(axis=0), visible.max(axis=0)
+        center_x = float(min_x + max_x) / 2
+        center_y = float(min_y + max_y) / 2
+        half_side = float(max(max_x - min_x, max_y - min_y)) * FACE_ROI_SCALE / 2
+        
+        self.face_roi = (
+            (max(0.0, (center_x - half_side) / w), max(0.0, (center_y - half_side) / h),
+             min(1.0, (center_x + half_side) / w), min(1.0, (center_y + half_side) / h)),
+            time.time()
+        )
+    
+    def _get_face_roi_pixels(self, frame_shape):
+        """获取当前有效的面部区域（像素坐标），不可用时返回None表示整帧推理"""
+        face_roi = self.face_roi
+        if not self.face_roi_enabled or face_roi is None:
+            return None
+        
+        box, update_time = face_roi
+        if time.time() - update_time > FACE_ROI_MAX_AGE:
+            return None
+        
+        h, w = frame_shape[:2]
+        x0, y0 = int(box[0] * w), int(box[1] * h)
+        x1, y1 = int(box[2] * w), int(box[3] * h)
+        if x1 - x0 < FACE_ROI_MIN_SIZE or y1 - y0 < FACE_ROI_MIN_SIZE:
+            return None
+        return (x0, y0, x1, y1)
+    
+    def _render_pose_overlay(self, frame, results, process_time):
+        """在池化缓冲区上绘制姿势关键点和状态信息（仅在有观看者时调用）
+        
+        Args:
+            frame: 分析用的帧（只读）
+            results: _process_pose的结果
+            process_time: 本阶段处理耗时（秒）
             
+        Returns:
+            PooledFrame，调用方用完后需要release()
+        """
+        display_buffer = self._acquire_overlay_buffer(frame)
+        display_frame = display_buffer.array
+        
+        if POSTURE_MODULE_AVAILABLE and results['landmarks'] is not None:
             # 根据当前帧率优化绘制效果
-            drawing_style = None
             current_fps = min(self.pose_process_fps.get_fps(), self.emotion_process_fps.get_fps())
             if current_fps < 10:
                 # 帧率低，使用简化绘制模式
                 mp_drawing.draw_landmarks(
                     display_frame,
-                    pose_results.pose_landmarks,
+                    results['landmarks'],
                     mp_pose.POSE_CONNECTIONS,
                     mp_drawing.DrawingSpec(color=(0,255,0), thickness=1, circle_radius=1),
                     mp_drawing.DrawingSpec(color=(255,0,0), thickness=1)
@@ -871,18 +1342,21 @@ class WebPostureMonitor:
                 # 帧率正常，使用标准绘制模式
                 mp_drawing.draw_landmarks(
                     display_frame,
-                    pose_results.pose_landmarks,
+                    results['landmarks'],
                     mp_pose.POSE_CONNECTIONS,
                     landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
                 )
             
             # 绘制状态信息
+            final_occlusion = results['is_occluded']
             state_text = f"State: {'Occluded' if final_occlusion else 'Tracking'}"
             color = (0, 0, 255) if final_occlusion else (0, 255, 0)
             cv2.putText(display_frame, state_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
             
             # 绘制角度信息
-            if angle is not None and valid_detection and not final_occlusion:
+            angle = results['raw_angle']
+            posture_type = results['posture_type']
+            if angle is not None and results['valid_detection'] and not final_occlusion:
                 # 根据不同坐姿类型设置不同颜色
                 posture_color = {
                     'excellent': (0, 255, 0),   # 绿色
@@ -901,81 +1375,50 @@ class WebPostureMonitor:
                 text = f"Angle: {angle:.1f}° [{posture_text}]"
                 cv2.putText(display_frame, text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, posture_color, 2)
                 
+                points = results['points']
                 if points:
                     cv2.line(display_frame, tuple(points['mid_shoulder']), tuple(points['nose']), (0, 255, 0), 2)
             elif final_occlusion and self.last_valid_angle:
                 text = f"Occluded | Last: {self.last_valid_angle:.1f}°"
                 cv2.putText(display_frame, text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-            
-            # 更新结果
-            results = {
-                'display_frame': display_frame,
-                'angle': angle if angle is not None else (self.last_valid_angle if final_occlusion else None),
-                'is_bad_posture': is_bad_posture,
-                'is_occluded': final_occlusion,
-                'status': occlusion_status if final_occlusion else 'Tracking',
-                'posture_type': posture_type
-            }
-            
-            return results
-        except Exception as e:
-            print(f"姿势处理异常: {str(e)}")
-            return results
+        
+        # 显示本阶段处理时间和分辨率信息
+        size_text = f"{frame.shape[1]}x{frame.shape[0]}"
+        cv2.putText(display_frame, 
+                  f"Proc: {process_time*1000:.1f}ms {size_text}", 
+                  (display_frame.shape[1] - 200, 25), 
+                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+        
+        return display_buffer
     
     def _process_emotion(self, frame):
-        """处理情绪分析"""
-        if not POSTURE_MODULE_AVAILABLE:
-            return {
-                'display_frame': frame,
-                'emotion': None,
-                'face_landmarks': None
-            }
-        
+        """处理情绪分析（只做推理，不绘制）"""
         results = {
-            'display_frame': frame,
             'emotion': None,
             'face_landmarks': None
         }
         
+        if not POSTURE_MODULE_AVAILABLE:
+            return results
+        
         try:
             # 更新情绪分析器的所有参数
-            self.emotion_analyzer.emotion_smoothing_window = posture_params['emotion_smoothing_window']
-            self.emotion_analyzer.mouth_open_ratio_threshold = posture_params['mouth_open_ratio_threshold']
-            self.emotion_analyzer.eye_open_ratio_threshold = posture_params['eye_open_ratio_threshold']
-            self.emotion_analyzer.brow_down_threshold = posture_params['brow_down_threshold']
-            
-            # 分析情绪
-            emotion_state, face_landmarks, _ = self.emotion_analyzer.analyze(frame)
-            
-            # 绘制情绪界面
-            display_frame = frame.copy()
-            if face_landmarks:
-                # 根据当前帧率优化绘制效果
-                current_fps = min(self.pose_process_fps.get_fps(), self.emotion_process_fps.get_fps())
-                if current_fps < 10:
-                    # 帧率低，使用简化绘制
-                    mp_drawing.draw_landmarks(
-                        image=display_frame,
-                        landmark_list=face_landmarks,
-                        connections=mp_face_mesh.FACEMESH_CONTOURS,
-                        landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0,255,0), thickness=1, circle_radius=1),
-                        connection_drawing_spec=mp_drawing.DrawingSpec(color=(0,255,0), thickness=1)
-                    )
-                else:
-                    # 帧率正常，使用标准绘制
-                    mp_drawing.draw_landmarks(
-                        image=display_frame,
-                        landmark_list=face_landmarks,
-                        connections=mp_face_mesh.FACEMESH_CONTOURS,
-                        connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_contours_style()
-                    )
-                
-                # 显示当前情绪状态
-                emotion_text = f"Emotion: {emotion_state.name}"
-                cv2.putText(display_frame, emotion_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 250), 2)
+            self.emotion_analyzer.emotion_smoothing_window = self.posture_params['emotion_smoothing_window']
+            self.emotion_analyzer.mouth_open_ratio_threshold = self.posture_params['mouth_open_ratio_threshold']
+            self.emotion_analyzer.eye_open_ratio_threshold = self.posture_params['eye_open_ratio_threshold']
+            self.emotion_analyzer.brow_down_threshold = self.posture_params['brow_down_threshold']
+            
+            # 分析情绪 - 有可用的面部区域时只对该区域推理
+            roi = self._get_face_roi_pixels(frame.shape)
+            rgb_buffer = self._acquire_rgb_buffer(frame)
+            try:
+                with tracer.span('face_mesh.process', 'emotion'):
+                    emotion_state, face_landmarks, _ = self.emotion_analyzer.analyze(
+                        frame, rgb_frame=rgb_buffer.array, roi=roi)
+            finally:
+                rgb_buffer.release()
             
             results = {
-                'display_frame': display_frame,
                 'emotion': emotion_state,
                 'face_landmarks': face_landmarks
             }
@@ -985,6 +1428,43 @@ class WebPostureMonitor:
             print(f"情绪处理异常: {str(e)}")
             return results
     
+    def _render_emotion_overlay(self, frame, results):
+        """在池化缓冲区上绘制面部网格和情绪状态（仅在有观看者时调用）
+        
+        Returns:
+            PooledFrame，调用方用完后需要release()
+        """
+        display_buffer = self._acquire_overlay_buffer(frame)
+        display_frame = display_buffer.array
+        face_landmarks = results['face_landmarks']
+        
+        if POSTURE_MODULE_AVAILABLE and face_landmarks:
+            # 根据当前帧率优化绘制效果
+            current_fps = min(self.pose_process_fps.get_fps(), self.emotion_process_fps.get_fps())
+            if current_fps < 10:
+                # 帧率低，使用简化绘制
+                mp_drawing.draw_landmarks(
+                    image=display_frame,
+                    landmark_list=face_landmarks,
+                    connections=mp_face_mesh.FACEMESH_CONTOURS,
+                    landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0,255,0), thickness=1, circle_radius=1),
+                    connection_drawing_spec=mp_drawing.DrawingSpec(color=(0,255,0), thickness=1)
+                )
+            else:
+                # 帧率正常，使用标准绘制
+                mp_drawing.draw_landmarks(
+                    image=display_frame,
+                    landmark_list=face_landmarks,
+                    connections=mp_face_mesh.FACEMESH_CONTOURS,
+                    connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_contours_style()
+                )
+            
+            # 显示当前情绪状态
+            emotion_text = f"Emotion: {results['emotion'].name}"
+            cv2.putText(display_frame, emotion_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 250), 2)
+        
+        return display_buffer
+    
     def _update_occlusion_counters(self, is_occluded):
         """更新遮挡状态计数器"""
         if is_occluded:
@@ -997,39 +1477,38 @@ class WebPostureMonitor:
     def get_emotion_params(self):
         """获取当前情绪分析参数"""
         return {
-            'emotion_smoothing_window': posture_params['emotion_smoothing_window'],
-            'mouth_open_ratio_threshold': posture_params['mouth_open_ratio_threshold'],
-            'eye_open_ratio_threshold': posture_params['eye_open_ratio_threshold'],
-            'brow_down_threshold': posture_params['brow_down_threshold']
+            'emotion_smoothing_window': self.posture_params['emotion_smoothing_window'],
+            'mouth_open_ratio_threshold': self.posture_params['mouth_open_ratio_threshold'],
+            'eye_open_ratio_threshold': self.posture_params['eye_open_ratio_threshold'],
+            'brow_down_threshold': self.posture_params['brow_down_threshold']
         }
     
     def update_emotion_params(self, params):
-        """更新情绪分析参数"""
-        global posture_params
+        """更新情绪分析参数（只影响本摄像头；默认摄像头使用全局参数）"""
         try:
             if 'emotion_smoothing_window' in params:
                 value = int(params['emotion_smoothing_window'])
                 if 1 <= value <= 30:
-                    posture_params['emotion_smoothing_window'] = value
+                    self.posture_params['emotion_smoothing_window'] = value
             
             if 'mouth_open_ratio_threshold' in params:
                 value = float(params['mouth_open_ratio_threshold'])
                 if 0.1 <= value <= 1.0:
-                    posture_params['mouth_open_ratio_threshold'] = value
+                    self.posture_params['mouth_open_ratio_threshold'] = value
             
             if 'eye_open_ratio_threshold' in params:
                 value = float(params['eye_open_ratio_threshold'])
                 if 0.05 <= value <= 0.5:
-                    posture_params['eye_open_ratio_threshold'] = value
+                    self.posture_params['eye_open_ratio_threshold'] = value
             
             if 'brow_down_threshold' in params:
                 value = float(params['brow_down_threshold'])
                 if 0.01 <= value <= 0.2:
-                    posture_params['brow_down_threshold'] = value
+                    self.posture_params['brow_down_threshold'] = value
             
             # 如果分析器已启动，同步更新参数
             if self.is_running and self.emotion_analyzer:
-                self.emotion_analyzer.emotion_smoothing_window = posture_params['emotion_smoothing_window']
+                self.emotion_analyzer.emotion_smoothing_window = self.posture_params['emotion_smoothing_window']
             
             return True
         except Exception as e:
@@ -1042,9 +1521,9 @@ class WebPostureMonitor:
         extended_info = {
             **self.fps_info,
             'skipped_frames': self.performance_stats['skipped_frames'],
-            'camera_errors': self.performance_stats['camera_errors'],
-            'adaptive_resolution': self.adaptive_resolution,
-            'skip_frames_enabled': self.skip_frames_when_slow
+            'camera_errors': self.frame_broker.stats['read_failures'],
+            'adaptive_resolution': self.latency_controller.enabled,
+            'skip_frames_enabled': self.scheduler.budget_enabled
         }
         return extended_info
     
@@ -1052,10 +1531,10 @@ class WebPostureMonitor:
         """设置分辨率模式
         
         Args:
-            adaptive: 是否启用自适应分辨率调整
+            adaptive: 是否启用延迟控制器自动调整分辨率、推理频率和模型复杂度
             resolution_index: 如果不使用自适应模式，设置固定分辨率索引
         """
-        self.adaptive_resolution = adaptive
+        self.latency_controller.enabled = adaptive
         
         if resolution_index is not None and 0 <= resolution_index < len(RESOLUTION_LEVELS):
             self.current_resolution_index = resolution_index
@@ -1068,39 +1547,142 @@ class WebPostureMonitor:
         
         return True
     
-    def set_performance_mode(self, skip_frames=None, use_separate_grab=None):
+    def set_latency_control(self, enabled=None, target_latency_ms=None, level=None):
+        """设置延迟控制器
+        
+        Args:
+            enabled: 是否启用自动换档
+            target_latency_ms: 目标端到端延迟（毫秒）
+            level: 手动指定档位索引
+            
+        Returns:
+            是否设置成功（档位无效时返回False）
+        """
+        if enabled is not None:
+            self.latency_controller.enabled = enabled
+            print(f"{'启用' if enabled else '禁用'}延迟控制器")
+        
+        if target_latency_ms is not None:
+            self.latency_controller.set_target(target_latency_ms)
+            print(f"目标端到端延迟设置为 {target_latency_ms} 毫秒")
+        
+        if level is not None:
+            latency_level = self.latency_controller.set_level(int(level))
+            if latency_level is None:
+                print(f"无效的延迟控制档位: {level}")
+                return False
+            self._apply_latency_level(latency_level)
+        
+        return True
+    
+    def get_latency_control_state(self, history_limit=50):
+        """获取延迟控制器的状态和决策历史"""
+        return {
+            **self.latency_controller.get_state(history_limit),
+            'current_resolution': f"{self.process_width}x{self.process_height}",
+            'active_model_complexity': self.active_pose_model_complexity
+        }
+    
+    def set_performance_mode(self, skip_frames=None, use_separate_grab=None, motion_gate=None,
+                             motion_threshold=None, motion_refresh_interval=None, face_roi=None,
+                             cpu_budget=None, analyzer_rates=None, raw_mjpeg=None, decode_scale=None):
         """设置性能优化模式
         
         Args:
-            skip_frames: 是否在处理过慢时跳帧
+            skip_frames: 是否启用CPU预算（超出预算时降低低优先级任务的频率）
             use_separate_grab: 是否使用分离的grab/retrieve操作
+            motion_gate: 是否启用运动门控（静止画面跳过推理）
+            motion_threshold: 运动门控的灰度平均绝对差阈值
+            motion_refresh_interval: 运动门控的强制刷新间隔（秒）
+            face_roi: 是否根据姿势关键点只对面部区域运行Face Mesh
+            cpu_budget: 分析任务的CPU预算（核数）
+            analyzer_rates: 各分析任务的调度参数，如 {'emotion': {'target_hz': 3, 'priority': 1}}
+            raw_mjpeg: 是否读取MJPEG原始数据并按缩小比例解码
+            decode_scale: MJPEG原始数据的解码缩小倍数上限（1、2、4、8，0表示自动），解码帧不小于最高处理分辨率
         """
         if skip_frames is not None:
-            self.skip_frames_when_slow = skip_frames
-            print(f"{'启用' if skip_frames else '禁用'}处理过慢时跳帧")
+            self.scheduler.budget_enabled = skip_frames
+            print(f"{'启用' if skip_frames else '禁用'}分析任务CPU预算")
+        
+        if cpu_budget is not None:
+            self.scheduler.cpu_budget = max(0.1, float(cpu_budget))
+            print(f"分析任务CPU预算设置为 {self.scheduler.cpu_budget} 核")
+        
+        if analyzer_rates:
+            for name, schedule in analyzer_rates.items():
+                if self.scheduler.set_task(name, schedule.get('target_hz'), schedule.get('priority'),
+                                           schedule.get('enabled')):
+                    print(f"分析任务 {name} 调度参数已更新: {schedule}")
+                else:
+                    print(f"未知的分析任务: {name}")
         
         if use_separate_grab is not None:
             self.use_separate_grab_retrieve = use_separate_grab
+            self.frame_broker.use_separate_grab_retrieve = use_separate_grab
             print(f"{'启用' if use_separate_grab else '禁用'}分离的grab/retrieve操作")
         
+        if motion_gate is not None:
+            self.motion_gate.enabled = motion_gate
+            self.motion_gate.reset()
+            print(f"{'启用' if motion_gate else '禁用'}运动门控")
+        
+        if motion_threshold is not None:
+            self.motion_gate.threshold = max(0.0, float(motion_threshold))
+            print(f"运动门控阈值设置为 {self.motion_gate.threshold}")
+        
+        if face_roi is not None:
+            self.face_roi_enabled = face_roi
+            self.face_roi = None
+            print(f"{'启用' if face_roi else '禁用'}面部区域推理")
+        
+        if motion_refresh_interval is not None:
+            self.motion_gate.refresh_interval = max(0.1, float(motion_refresh_interval))
+            print(f"运动门控强制刷新间隔设置为 {self.motion_gate.refresh_interval} 秒")
+        
+        if raw_mjpeg is not None or decode_scale is not None:
+            if not self.frame_broker.set_decode_mode(raw_mjpeg, int(decode_scale) if decode_scale is not None else None):
+                return False
+            print(f"采集解码模式更新: MJPEG原始数据 {self.frame_broker.raw_mjpeg}, 缩小倍数上限 {self.frame_broker.decode_scale}")
+        
         return True
     
     def get_performance_stats(self):
         """获取性能统计信息"""
-        avg_processing_ms = 0
-        if self.performance_stats['processing_times']:
-            avg_processing_ms = sum(self.performance_stats['processing_times']) / len(self.performance_stats['processing_times']) * 1000
+        avg_processing_ms = self._get_bottleneck_time() * 1000
         
         return {
             'skipped_frames': self.performance_stats['skipped_frames'],
-            'camera_errors': self.performance_stats['camera_errors'],
+            'camera_errors': self.frame_broker.stats['read_failures'],
             'avg_processing_time_ms': round(avg_processing_ms, 2),
+            'stage_processing_time_ms': self._get_stage_times_ms(),
+            'pipeline_slots': [self.pose_slot.get_stats(), self.emotion_slot.get_stats()],
+            'allocated_bytes_per_sec': round(self.frame_pool.get_allocated_bytes_per_sec() +
+                                             self.frame_broker.frame_pool.get_allocated_bytes_per_sec(), 1),
+            'frame_pools': [self.frame_broker.frame_pool.get_stats(), self.frame_pool.get_stats()],
+            'motion_gate_hit_rate': self.motion_gate.get_stats()['hit_rate'],
+            'motion_gate': self.motion_gate.get_stats(),
+            'face_roi': {
+                'enabled': self.face_roi_enabled,
+                **(self.emotion_analyzer.roi_stats if self.emotion_analyzer else {})
+            },
+            'inference_mode': self.inference_mode,
+            'inference_processes': self._get_inference_stats(),
             'capture_fps': round(self.capture_fps.get_fps(), 1),
             'pose_process_fps': round(self.pose_process_fps.get_fps(), 1),
             'emotion_process_fps': round(self.emotion_process_fps.get_fps(), 1),
             'current_resolution': f"{self.process_width}x{self.process_height}",
-            'adaptive_mode': self.adaptive_resolution,
-            'skip_frames_enabled': self.skip_frames_when_slow
+            'adaptive_mode': self.latency_controller.enabled,
+            'latency_controller': self.latency_controller.get_state(history_limit=10),
+            'skip_frames_enabled': self.scheduler.budget_enabled,
+            'scheduler': self.scheduler.get_stats(),
+            'trace': tracer.get_stats(),
+            'frame_broker': self.frame_broker.get_stats(),
+            'posture_writer': self.posture_writer.get_stats(),
+            'snapshot_writer': self.snapshot_writer.get_stats(),
+            'startup': {
+                'phases': self.startup_timer.get_stats(),
+                'camera_open': camera_registry.open_stats.get(self._consumer_name())
+            }
         }
 
     def _find_available_cameras(self):
@@ -1129,7 +1711,7 @@ class WebPostureMonitor:
         
         return available_cameras
 
-    def _check_and_record_bad_posture(self, frame, pose_results):
+    def _check_and_record_bad_posture(self, frame, pose_results, packet=None):
         """检查并记录不良坐姿
         逻辑：如果坐姿变为不良保存一次，每十分钟只允许保存一次，如果十分钟内没有不良坐姿则保存一次良好坐姿
         每个时间段最多允许存在20张图片，每天最多允许存在240张图片
@@ -1147,7 +1729,6 @@ class WebPostureMonitor:
         
         angle = pose_results['angle']
         current_time = time.time()
-        current_datetime = datetime.now()  # 当前时间的datetime对象
         recorded = False
         max_interval = 600  # 10分钟
         
@@ -1174,24 +1755,15 @@ class WebPostureMonitor:
                 if current_time - self.last_any_recording_time >= max_interval:
                     recorded = self._save_posture_image(
                         frame=frame,
+                        packet=packet,
                         angle=angle,
                         is_bad_posture=True,
                         posture_type="Bad",
                         record_type="auto"
                     )
                     if recorded:
+                        # 图片数量限制由保存线程在插入后执行一次
                         self.last_any_recording_time = current_time
-                        
-                        # 获取当前小时和日期
-                        current_hour = current_datetime.replace(minute=0, second=0, microsecond=0)
-                        current_date = current_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
-                        
-                        # 清理当前时间段的图片，保留最新的20张
-                        from modules.new_cleanup_functions import cleanup_hourly_images, cleanup_daily_images
-                        cleanup_hourly_images(current_hour, 20)
-                        
-                        # 清理当天的图片，保留最新的240张
-                        cleanup_daily_images(current_date, 240)
             
             # 重置良好坐姿状态
             self.continuous_good_posture = False
@@ -1211,32 +1783,24 @@ class WebPostureMonitor:
                 if (self.good_posture_start_time and current_time - self.last_any_recording_time >= max_interval):
                     recorded = self._save_posture_image(
                         frame=frame,
+                        packet=packet,
                         angle=angle,
                         is_bad_posture=False,
                         posture_type="Good",
                         record_type="auto"
                     )
                     if recorded:
+                        # 图片数量限制由保存线程在插入后执行一次
                         self.last_any_recording_time = current_time
-                        
-                        # 获取当前小时和日期
-                        current_hour = current_datetime.replace(minute=0, second=0, microsecond=0)
-                        current_date = current_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
-                        
-                        # 清理当前时间段的图片，保留最新的20张
-                        from modules.new_cleanup_functions import cleanup_hourly_images, cleanup_daily_images
-                        cleanup_hourly_images(current_hour, 20)
-                        
-                        # 清理当天的图片，保留最新的240张
-                        cleanup_daily_images(current_date, 240)
             else:
                 self.continuous_good_posture = False
                 self.good_posture_start_time = None
                 
         return recorded
         
-    def _save_posture_image(self, frame, angle, is_bad_posture, posture_type="Unknown", record_type="manual"):
-        """保存坐姿图像
+    def _save_posture_image(self, frame, angle, is_bad_posture, posture_type="Unknown", record_type="manual",
+                            packet=None):
+        """提交坐姿图像到保存线程
         
         Args:
             frame: 原始视频帧
@@ -1244,13 +1808,12 @@ class WebPostureMonitor:
             is_bad_posture: 是否是不良坐姿
             posture_type: 坐姿类型描述
             record_type: 记录类型，如'auto'或'manual'
+            packet: frame所属的FramePacket（可选），保存线程持有其引用并优先使用其中的原始JPEG数据
             
         Returns:
-            是否成功保存
+            是否已提交保存（保存结果由保存线程输出）
         """
         try:
-            from modules.database_module import save_posture_image
-            
             # 获取状态信息
             posture_status = f"{posture_type} Posture - Angle: {angle:.1f}°"
             emotion = self.emotion_result['emotion']
@@ -1263,25 +1826,22 @@ class WebPostureMonitor:
                 f"姿势处理帧率: {self.pose_process_fps.get_fps():.1f} FPS"
             )
             
-            # 保存图像记录
-            result = save_posture_image(
-                image=frame,             # 使用原始未处理帧以获得最佳图像质量
-                angle=angle,
-                is_bad_posture=is_bad_posture,
-                posture_status=posture_status,
-                emotion=emotion,
-                notes=notes
+            # 交给保存线程：使用原始未处理帧以获得最佳图像质量
+            return self.snapshot_writer.submit(
+                frame,
+                {
+                    'angle': angle,
+                    'is_bad_posture': is_bad_posture,
+                    'posture_status': posture_status,
+                    'emotion': emotion,
+                    'notes': notes,
+                    'device_id': self.camera_id
+                },
+                packet=packet,
+                label=posture_type
             )
-            
-            if result:
-                print(f"记录{posture_type}坐姿图像成功，ID: {result['id']}")
-                return True
-            else:
-                print(f"记录{posture_type}坐姿图像失败")
-                return False
-                
         except Exception as e:
-            print(f"记录坐姿图像时出错: {str(e)}")
+            print(f"提交坐姿图像时出错: {str(e)}")
             return False
         
     def set_posture_recording(self, enabled=True, duration_threshold=None, interval=None, 
@@ -1356,7 +1916,6 @@ class WebPostureMonitor:
             posture_type: 当前坐姿类型 ('excellent', 'good', 'fair', 'poor')
         """
         from datetime import datetime
-        from modules.database_module import record_posture_time
         
         if not self.posture_time_recording_enabled:
             return
@@ -1378,14 +1937,15 @@ class WebPostureMonitor:
             duration = time_since_last_record
             
             try:
-                # 记录到数据库
-                record_posture_time(
+                # 提交到后台写入器，由其批量写入数据库
+                self.posture_writer.submit(
                     start_time=self.last_periodic_record_time,
                     end_time=current_time,
                     duration_seconds=duration,
                     angle=angle,
                     posture_type=self.current_posture_type,
-                    notes=f"周期性记录的坐姿时间，角度：{angle:.1f}°"
+                    notes=f"周期性记录的坐姿时间，角度：{angle:.1f}°",
+                    device_id=self.camera_id
                 )
                 print(f"周期性记录坐姿：{self.current_posture_type}，持续时间：{duration:.1f}秒")
                 
@@ -1404,14 +1964,15 @@ class WebPostureMonitor:
                 # 只记录持续超过1秒的姿势
                 if duration >= 1.0:
                     try:
-                        # 记录到数据库
-                        record_posture_time(
+                        # 提交到后台写入器，由其批量写入数据库
+                        self.posture_writer.submit(
                             start_time=self.posture_start_time,
                             end_time=current_time,
                             duration_seconds=duration,
                             angle=self.last_valid_angle,
                             posture_type=self.current_posture_type,
-                            notes=f"状态变化记录的坐姿时间，角度：{self.last_valid_angle:.1f}°"
+                            notes=f"状态变化记录的坐姿时间，角度：{self.last_valid_angle:.1f}°",
+                            device_id=self.camera_id
                         )
                         print(f"状态变化记录坐姿：{self.current_posture_type} -> {posture_type}，持续时间：{duration:.1f}秒")
                     except Exception as e:
@@ -1455,6 +2016,15 @@ class WebPostureMonitor:
               
         return self.get_posture_time_recording_settings()
     
+    def get_posture_signals(self, window_names=None, with_series=False):
+        """获取进程内滚动统计（角度滑动平均、各窗口的均值/分位数/坐姿类型时长/情绪次数）
+        
+        Args:
+            window_names: 要输出的窗口名称列表，None表示全部
+            with_series: 是否输出各窗口按桶的时间序列
+        """
+        return self.posture_signals.get_summary(window_names, with_series)
+    
     def get_posture_time_recording_settings(self):
         """获取坐姿时间记录设置"""
         return {
@@ -1466,7 +2036,8 @@ class WebPostureMonitor:
         """获取坐姿统计数据
         
         Args:
-            time_range: 时间范围 'day', 'week', 'month', 'custom'
+            time_range: 时间范围 'day', 'week', 'month', 'custom'，
+                        或进程内滚动统计的窗口 'minute'、'hour'（不查询数据库）
             custom_start_date: 自定义开始日期，仅当time_range为'custom'时有效
             custom_end_date: 自定义结束日期，仅当time_range为'custom'时有效
             with_hourly_data: 是否返回每小时数据统计
@@ -1474,6 +2045,9 @@ class WebPostureMonitor:
         Returns:
             坐姿统计数据字典
         """
+        if time_range in LIVE_STATS_RANGES:
+            return self.posture_signals.get_posture_stats(time_range)
+        
         from modules.database_module import get_posture_stats
         
         try:
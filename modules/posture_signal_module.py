@@ -0,0 +1,330 @@
+"""
+坐姿信号统计模块 - 在进程内对头部角度和情绪结果做增量滚动统计，近期数据的统计不需要查询数据库
+
+每个结果只做O(1)的更新：指数滑动平均、各滚动窗口的累计值（角度和、角度直方图、各坐姿类型时长、
+各情绪次数）。滚动窗口由固定时长的桶组成，桶移出窗口时从累计值中减去，读取时只需遍历直方图求分位数。
+
+坐姿类型与前端统计口径一致（excellent/good -> good，fair -> mild，poor -> moderate），
+时长按相邻两次有效结果的间隔计入前一次结果的类型，间隔超过 SIGNAL_MAX_GAP 时视为中断不计入。
+"""
+import math
+import time
+import threading
+from collections import deque
+
+# 信号统计相关配置
+SIGNAL_EMA_TIME_CONSTANT = 5.0   # 角度指数滑动平均的时间常数（秒），与帧率无关
+SIGNAL_MAX_GAP = 2.0             # 相邻两次结果的最大有效间隔（秒），超过时视为中断（暂停、遮挡、离开）
+ANGLE_HISTOGRAM_BIN = 1.0        # 角度直方图的分辨率（度）
+ANGLE_HISTOGRAM_MAX = 120.0      # 直方图覆盖的最大角度，超过的计入最后一格
+ANGLE_PERCENTILES = (50, 90, 95) # 输出的角度分位数
+
+# 滚动窗口：名称 -> (窗口时长, 桶时长)，单位秒
+SIGNAL_WINDOWS = {
+    'recent': (10, 1),       # 最近10秒
+    'minute': (60, 5),       # 最近1分钟
+    'hour': (3600, 60)       # 最近1小时（每个桶即一分钟，可作为分钟级曲线）
+}
+
+# 坐姿类型到前端统计类型的映射（与 database_module.get_posture_stats 一致）
+POSTURE_CATEGORY_MAPPING = {
+    'excellent': 'good',
+    'good': 'good',
+    'fair': 'mild',
+    'poor': 'moderate'
+    # 其他类型计入severe
+}
+POSTURE_CATEGORIES = ('good', 'mild', 'moderate', 'severe')
+
+
+def format_seconds(seconds):
+    """秒数格式化为 "2h 30m" / "45m"，与 database_module.format_seconds 一致"""
+    if not seconds:
+        return "0m"
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    return f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
+
+
+class RollingVote:
+    """固定长度的滚动多数投票：追加和淘汰时增量维护计数，不需要每次重新统计整个窗口"""
+    def __init__(self, keys, maxlen):
+        """
+        Args:
+            keys: 所有可能的取值（顺序决定票数相同时的优先级）
+            maxlen: 窗口长度
+        """
+        self.counts = {key: 0 for key in keys}
+        self.values = deque()
+        self.maxlen = maxlen
+
+    def append(self, value):
+        """追加一个值，窗口已满时淘汰最早的值"""
+        while len(self.values) >= self.maxlen:
+            self.counts[self.values.popleft()] -= 1
+        self.values.append(value)
+        self.counts[value] += 1
+
+    def resize(self, maxlen):
+        """调整窗口长度，缩短时淘汰最早的值"""
+        self.maxlen = max(1, int(maxlen))
+        while len(self.values) > self.maxlen:
+            self.counts[self.values.popleft()] -= 1
+
+    def most_common(self):
+        """票数最多的值，票数相同时取keys中靠前的"""
+        return max(self.counts, key=self.counts.get)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+
+class _SignalBucket:
+    """滚动窗口中一个桶的累计值"""
+    __slots__ = ('start', 'angle_sum', 'angle_count', 'histogram', 'posture_seconds', 'emotion_counts')
+
+    def __init__(self, start, bins):
+        self.start = start
+        self.angle_sum = 0.0
+        self.angle_count = 0
+        self.histogram = [0] * bins
+        self.posture_seconds = dict.fromkeys(POSTURE_CATEGORIES, 0.0)
+        self.emotion_counts = {}
+
+
+class RollingWindow:
+    """由固定时长的桶组成的滚动窗口，维护窗口内的累计值"""
+    def __init__(self, span, bucket_seconds):
+        """
+        Args:
+            span: 窗口时长（秒）
+            bucket_seconds: 桶时长（秒），决定窗口边界的精度
+        """
+        self.span = span
+        self.bucket_seconds = bucket_seconds
+        self.bins = int(ANGLE_HISTOGRAM_MAX / ANGLE_HISTOGRAM_BIN) + 1
+        self.buckets = deque()
+        # 窗口累计值 = 窗口内所有桶的和
+        self.total = _SignalBucket(None, self.bins)
+
+    def _current_bucket(self, now):
+        """淘汰过期的桶，返回当前时间所在的桶"""
+        self.expire(now)
+        start = math.floor(now / self.bucket_seconds) * self.bucket_seconds
+        if not self.buckets or self.buckets[-1].start < start:
+            self.buckets.append(_SignalBucket(start, self.bins))
+        return self.buckets[-1]
+
+    def expire(self, now):
+        """把已移出窗口的桶从累计值中减去"""
+        total = self.total
+        expired = False
+        while self.buckets and self.buckets[0].start + self.bucket_seconds <= now - self.span:
+            bucket = self.buckets.popleft()
+            expired = True
+            total.angle_sum -= bucket.angle_sum
+            total.angle_count -= bucket.angle_count
+            for index, count in enumerate(bucket.histogram):
+                if count:
+                    total.histogram[index] -= count
+            for category, seconds in bucket.posture_seconds.items():
+                total.posture_seconds[category] -= seconds
+            for emotion, count in bucket.emotion_counts.items():
+                total.emotion_counts[emotion] -= count
+        if expired and not self.buckets:
+            # 窗口清空时重置，避免浮点误差累积
+            self.total = _SignalBucket(None, self.bins)
+
+    def add_angle(self, now, angle):
+        bucket = self._current_bucket(now)
+        index = min(int(angle / ANGLE_HISTOGRAM_BIN), self.bins - 1)
+        for target in (bucket, self.total):
+            target.angle_sum += angle
+            target.angle_count += 1
+            target.histogram[index] += 1
+
+    def add_posture_seconds(self, now, category, seconds):
+        bucket = self._current_bucket(now)
+        bucket.posture_seconds[category] += seconds
+        self.total.posture_seconds[category] += seconds
+
+    def add_emotion(self, now, emotion):
+        bucket = self._current_bucket(now)
+        for target in (bucket, self.total):
+            target.emotion_counts[emotion] = target.emotion_counts.get(emotion, 0) + 1
+
+    def percentile(self, percent):
+        """按直方图计算角度分位数（最近秩法，取所在格的中点）"""
+        total = self.total
+        if total.angle_count <= 0:
+            return None
+        rank = max(1, math.ceil(percent / 100.0 * total.angle_count))
+        cumulative = 0
+        for index, count in enumerate(total.histogram):
+            cumulative += count
+            if cumulative >= rank:
+                return round((index + 0.5) * ANGLE_HISTOGRAM_BIN, 1)
+        return round(ANGLE_HISTOGRAM_MAX, 1)
+
+    def summary(self):
+        """窗口内的角度均值、分位数、各坐姿类型时长和各情绪次数"""
+        total = self.total
+        posture_seconds = {category: max(0.0, seconds) for category, seconds in total.posture_seconds.items()}
+        total_seconds = sum(posture_seconds.values())
+        return {
+            'window_seconds': self.span,
+            'samples': total.angle_count,
+            'angle_mean': round(total.angle_sum / total.angle_count, 1) if total.angle_count > 0 else None,
+            'angle_percentiles': {f"p{p}": self.percentile(p) for p in ANGLE_PERCENTILES},
+            'posture_seconds': {category: round(seconds, 1) for category, seconds in posture_seconds.items()},
+            'posture_percentage': {
+                category: round(seconds / total_seconds * 100, 1) if total_seconds > 0 else 0
+                for category, seconds in posture_seconds.items()
+            },
+            'tracked_seconds': round(total_seconds, 1),
+            'emotion_counts': {emotion: count for emotion, count in total.emotion_counts.items() if count > 0}
+        }
+
+    def series(self):
+        """按桶输出的时间序列（每个桶的起始时间、角度均值和各坐姿类型时长）"""
+        return [{
+            'start': bucket.start,
+            'angle_mean': round(bucket.angle_sum / bucket.angle_count, 1) if bucket.angle_count else None,
+            'posture_seconds': {category: round(seconds, 1) for category, seconds in bucket.posture_seconds.items()},
+            'emotion_counts': dict(bucket.emotion_counts)
+        } for bucket in self.buckets]
+
+
+class PostureSignalEngine:
+    """头部角度和情绪结果的增量滚动统计"""
+    def __init__(self, windows=SIGNAL_WINDOWS):
+        """
+        Args:
+            windows: 滚动窗口配置，名称 -> (窗口时长, 桶时长)
+        """
+        self.lock = threading.Lock()
+        self.windows = {name: RollingWindow(span, bucket) for name, (span, bucket) in windows.items()}
+        self.reset()
+
+    def reset(self):
+        """清空所有统计（重新启动分析时调用）"""
+        with self.lock:
+            for name, window in self.windows.items():
+                self.windows[name] = RollingWindow(window.span, window.bucket_seconds)
+            self.angle_ema = None
+            self.last_pose_time = None
+            self.last_category = None
+            self.last_emotion = None
+            self.start_time = time.time()
+
+    def observe_pose(self, angle, posture_type, now=None):
+        """记录一次姿势结果
+
+        Args:
+            angle: 头部角度，None表示本帧没有有效角度（未检测到人或遮挡）
+            posture_type: 坐姿类型（excellent/good/fair/poor）
+            now: 结果时间，None时使用墙上时间
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            # 上一次结果到本次的时长计入上一次结果的坐姿类型
+            if self.last_category is not None and self.last_pose_time is not None:
+                elapsed = now - self.last_pose_time
+                if 0 < elapsed <= SIGNAL_MAX_GAP:
+                    for window in self.windows.values():
+                        window.add_posture_seconds(now, self.last_category, elapsed)
+
+            if angle is None:
+                self.last_category = None
+                self.last_pose_time = now
+                return
+
+            if self.angle_ema is None or self.last_pose_time is None:
+                self.angle_ema = angle
+            else:
+                elapsed = max(0.0, now - self.last_pose_time)
+                alpha = 1.0 - math.exp(-elapsed / SIGNAL_EMA_TIME_CONSTANT)
+                self.angle_ema += alpha * (angle - self.angle_ema)
+
+            for window in self.windows.values():
+                window.add_angle(now, angle)
+            self.last_category = POSTURE_CATEGORY_MAPPING.get(posture_type, 'severe')
+            self.last_pose_time = now
+
+    def observe_emotion(self, emotion, now=None):
+        """记录一次情绪结果（情绪名称，如 'HAPPY'）"""
+        now = time.time() if now is None else now
+        with self.lock:
+            for window in self.windows.values():
+                window.add_emotion(now, emotion)
+            self.last_emotion = emotion
+
+    def get_current(self, now=None):
+        """当前信号的简要数据（供 /api/get_pose_status 使用）"""
+        now = time.time() if now is None else now
+        with self.lock:
+            for window in self.windows.values():
+                window.expire(now)
+            recent = self.windows['recent'] if 'recent' in self.windows else None
+            minute = self.windows['minute'] if 'minute' in self.windows else None
+            return {
+                'angle_ema': round(self.angle_ema, 1) if self.angle_ema is not None else None,
+                'angle_mean_recent': recent.summary()['angle_mean'] if recent else None,
+                'angle_mean_minute': minute.summary()['angle_mean'] if minute else None,
+                'angle_p90_minute': minute.percentile(90) if minute else None,
+                'posture_category': self.last_category,
+                'emotion': self.last_emotion
+            }
+
+    def get_summary(self, window_names=None, with_series=False, now=None):
+        """各滚动窗口的统计
+
+        Args:
+            window_names: 要输出的窗口名称，None表示全部
+            with_series: 是否输出每个窗口按桶的时间序列
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            windows = {}
+            for name, window in self.windows.items():
+                if window_names is not None and name not in window_names:
+                    continue
+                window.expire(now)
+                windows[name] = window.summary()
+                if with_series:
+                    windows[name]['series'] = window.series()
+            return {
+                'angle_ema': round(self.angle_ema, 1) if self.angle_ema is not None else None,
+                'since': self.start_time,
+                'windows': windows
+            }
+
+    def get_posture_stats(self, window_name, now=None):
+        """窗口统计转换为与 database_module.get_posture_stats 相同的格式，供统计接口直接返回"""
+        now = time.time() if now is None else now
+        summary = self.get_summary([window_name], now=now)['windows'].get(window_name)
+        if summary is None:
+            return None
+        total_seconds = summary['tracked_seconds']
+        stats = {
+            category: {
+                'seconds': summary['posture_seconds'][category],
+                'percentage': summary['posture_percentage'][category],
+                'formatted_time': format_seconds(summary['posture_seconds'][category])
+            } for category in POSTURE_CATEGORIES
+        }
+        stats.update({
+            'total_time': {'seconds': total_seconds, 'formatted_time': format_seconds(total_seconds)},
+            'good_posture_percentage': summary['posture_percentage']['good'],
+            'time_range': window_name,
+            'start_time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now - summary['window_seconds'])),
+            'end_time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)),
+            'angle_mean': summary['angle_mean'],
+            'angle_percentiles': summary['angle_percentiles'],
+            'emotion_counts': summary['emotion_counts'],
+            'source': 'memory'
+        })
+        return stats
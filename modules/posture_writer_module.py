@@ -0,0 +1,313 @@
+"""
+坐姿时间写入模块 - 后台批量写入坐姿时间记录，数据库不可用时暂存到本地日志文件，恢复后补写
+
+姿势线程只把记录放入有界队列（不等待数据库），写入线程按数量或时间阈值攒批，
+用一条 executemany 语句写入 posture_time_records。写入失败时整批追加到本地
+JSON-lines 日志（只追加），之后每隔一段时间重试，数据库恢复后先按原顺序补写日志中的记录。
+"""
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+
+from config import POSTURE_JOURNAL_FILE, DEFAULT_CAMERA_ID
+from modules.metrics_module import registry
+
+# 写入队列相关配置
+WRITER_QUEUE_SIZE = 1000        # 队列最多缓存的记录数，满时直接写入日志文件
+WRITER_BATCH_SIZE = 20          # 攒够多少条记录立即写入
+WRITER_FLUSH_INTERVAL = 5.0     # 队列中最早的记录最多等待多久就写入（秒）
+WRITER_RETRY_INTERVAL = 30.0    # 数据库不可用时重试的间隔（秒）
+JOURNAL_REPLAY_BATCH = 200      # 补写日志时每批写入的记录数
+
+# 日志文件的绝对路径（配置中为相对项目根目录的路径）
+JOURNAL_PATH = POSTURE_JOURNAL_FILE if os.path.isabs(POSTURE_JOURNAL_FILE) else os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), POSTURE_JOURNAL_FILE)
+
+# 记录字段顺序，与 record_posture_times_batch 的参数顺序一致
+RECORD_FIELDS = ('start_time', 'end_time', 'duration_seconds', 'angle', 'posture_type', 'notes', 'device_id')
+
+WRITER_QUEUE_DEPTH = registry.gauge('posture_writer_queue_depth', '坐姿时间写入队列中等待的记录数')
+WRITER_JOURNAL_PENDING = registry.gauge('posture_writer_journal_pending', '本地日志中等待补写的记录数')
+WRITER_FLUSH_SECONDS = registry.histogram('posture_writer_flush_seconds', '坐姿时间记录单批写入数据库的耗时（秒）')
+WRITER_RECORDS = registry.counter('posture_writer_records_total', '坐姿时间记录的处理结果', ('result',))
+
+
+def _encode_record(record):
+    """记录转换为日志中的一行JSON"""
+    return json.dumps({
+        field: value.isoformat() if isinstance(value, datetime) else value
+        for field, value in zip(RECORD_FIELDS, record)
+    }, ensure_ascii=False)
+
+
+def _decode_record(line):
+    """日志中的一行JSON转换为记录"""
+    item = json.loads(line)
+    return (
+        datetime.fromisoformat(item['start_time']),
+        datetime.fromisoformat(item['end_time']),
+        item['duration_seconds'],
+        item['angle'],
+        item['posture_type'],
+        item.get('notes', ''),
+        item.get('device_id', DEFAULT_CAMERA_ID)  # 加入多摄像头前写入的日志没有摄像头编号
+    )
+
+
+class PostureTimeWriter:
+    """坐姿时间记录的后台批量写入器
+
+    多个摄像头的分析器共用同一个写入器（同一个日志文件），start/stop按使用者计数，
+    最后一个使用者停止时才真正停止写入线程。
+    """
+    def __init__(self, journal_path=JOURNAL_PATH, queue_size=WRITER_QUEUE_SIZE,
+                 batch_size=WRITER_BATCH_SIZE, flush_interval=WRITER_FLUSH_INTERVAL,
+                 retry_interval=WRITER_RETRY_INTERVAL):
+        """
+        Args:
+            journal_path: 本地日志文件路径
+            queue_size: 队列容量
+            batch_size: 批量写入的记录数阈值
+            flush_interval: 批量写入的时间阈值（秒）
+            retry_interval: 数据库不可用时的重试间隔（秒）
+        """
+        self.journal_path = journal_path
+        self.replay_path = f"{journal_path}.replay"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.journal_lock = threading.Lock()
+        self.is_running = False
+        self.thread = None
+        self.users = 0
+        # 保护使用者计数和线程的启动/停止，多个摄像头的分析器可能同时调用start/stop
+        self.users_lock = threading.Lock()
+        self.db_available = True
+        self.last_failure_time = 0
+        self.journal_pending = self._count_journal_records()
+
+        # 统计信息
+        self.stats = {
+            'submitted': 0,
+            'written': 0,
+            'journaled': 0,
+            'replayed': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'last_flush_ms': 0.0
+        }
+
+        WRITER_QUEUE_DEPTH.set_function(self.queue.qsize)
+        WRITER_JOURNAL_PENDING.set_function(lambda: self.journal_pending)
+
+    def start(self):
+        """启动写入线程（已在运行时只增加使用者计数）"""
+        with self.users_lock:
+            self.users += 1
+            if self.is_running:
+                return True
+            self.is_running = True
+            self.thread = threading.Thread(target=self._run, name='posture-writer', daemon=True)
+            self.thread.start()
+        if self.journal_pending:
+            print(f"坐姿时间写入器已启动，本地日志中有 {self.journal_pending} 条记录待补写")
+        else:
+            print("坐姿时间写入器已启动")
+        return True
+
+    def stop(self, timeout=5.0):
+        """停止写入线程，退出前写入队列中剩余的记录（数据库不可用时写入日志）
+
+        还有其他使用者时只减少计数，不停止线程
+        """
+        with self.users_lock:
+            self.users = max(0, self.users - 1)
+            if not self.is_running or self.users > 0:
+                return
+            self.is_running = False
+            # 持有锁等待线程退出，避免旧线程还在写入剩余记录时又启动新线程
+            if self.thread:
+                self.thread.join(timeout=timeout)
+                self.thread = None
+        print("坐姿时间写入器已停止")
+
+    def submit(self, start_time, end_time, duration_seconds, angle, posture_type, notes="",
+               device_id=DEFAULT_CAMERA_ID):
+        """提交一条坐姿时间记录（不阻塞）
+
+        Returns:
+            True表示已放入队列，False表示队列已满、记录已直接写入本地日志
+        """
+        record = (start_time, end_time, duration_seconds, angle, posture_type, notes, device_id)
+        self.stats['submitted'] += 1
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            print("坐姿时间写入队列已满，记录写入本地日志")
+            self._append_journal([record])
+            return False
+
+    def _run(self):
+        """写入线程主循环：攒批后写入，队列为空且到了重试时间时补写日志"""
+        batch = []
+        deadline = None
+        while self.is_running or not self.queue.empty():
+            try:
+                timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.time())
+                record = self.queue.get(timeout=min(timeout, 1.0))
+                batch.append(record)
+                if deadline is None:
+                    deadline = time.time() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            try:
+                if batch and (len(batch) >= self.batch_size or time.time() >= deadline or not self.is_running):
+                    self._flush(batch)
+                    batch = []
+                    deadline = None
+                elif not batch and self.journal_pending and self._should_retry():
+                    self._replay_journal()
+            except Exception as e:
+                print(f"坐姿时间写入线程异常: {str(e)}")
+                if batch:
+                    self._append_journal(batch)
+                    batch = []
+                    deadline = None
+
+        if batch:
+            self._flush(batch)
+
+    def _should_retry(self):
+        """数据库可用或距离上次失败已超过重试间隔"""
+        return self.db_available or time.time() - self.last_failure_time >= self.retry_interval
+
+    def _write_batch(self, records):
+        """写入一批记录，成功返回True"""
+        from modules.database_module import record_posture_times_batch
+
+        start_time = time.time()
+        result = record_posture_times_batch(records)
+        elapsed = time.time() - start_time
+        WRITER_FLUSH_SECONDS.observe(elapsed)
+        self.stats['last_flush_ms'] = round(elapsed * 1000, 2)
+        self.stats['batches'] += 1
+
+        if result is None:
+            self.stats['failed_batches'] += 1
+            if self.db_available:
+                print("坐姿时间批量写入失败，数据库恢复前记录暂存到本地日志")
+            self.db_available = False
+            self.last_failure_time = time.time()
+            return False
+
+        if not self.db_available:
+            print("数据库已恢复，继续批量写入坐姿时间记录")
+        self.db_available = True
+        return True
+
+    def _flush(self, batch):
+        """写入一批记录；数据库不可用或日志中还有更早的记录时，先处理日志以保持记录顺序"""
+        if not self._should_retry():
+            self._append_journal(batch)
+            return
+
+        if self.journal_pending and not self._replay_journal():
+            self._append_journal(batch)
+            return
+
+        if self._write_batch(batch):
+            self.stats['written'] += len(batch)
+            WRITER_RECORDS.labels('written').inc(len(batch))
+        else:
+            self._append_journal(batch)
+
+    def _append_journal(self, records):
+        """把记录追加到本地日志"""
+        try:
+            with self.journal_lock:
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    for record in records:
+                        f.write(_encode_record(record) + '\n')
+                self.journal_pending += len(records)
+            self.stats['journaled'] += len(records)
+            WRITER_RECORDS.labels('journaled').inc(len(records))
+        except Exception as e:
+            WRITER_RECORDS.labels('dropped').inc(len(records))
+            print(f"写入坐姿时间本地日志失败，丢弃 {len(records)} 条记录: {str(e)}")
+
+    def _replay_journal(self):
+        """按原顺序补写本地日志中的记录
+
+        先把日志改名为补写文件，补写期间新的失败记录写入新日志；
+        中途失败时把剩余记录写回补写文件，下次从剩余部分继续，已写入的记录不会重复。
+
+        Returns:
+            日志中的记录是否已全部写入
+        """
+        with self.journal_lock:
+            if not os.path.exists(self.replay_path) and os.path.exists(self.journal_path):
+                os.replace(self.journal_path, self.replay_path)
+
+        if not os.path.exists(self.replay_path):
+            self.journal_pending = self._count_journal_records()
+            return True
+
+        with open(self.replay_path, 'r', encoding='utf-8') as f:
+            lines = [line for line in f if line.strip()]
+
+        records = []
+        for line in lines:
+            try:
+                records.append(_decode_record(line))
+            except Exception as e:
+                print(f"跳过无法解析的日志记录: {str(e)}")
+
+        for offset in range(0, len(records), JOURNAL_REPLAY_BATCH):
+            chunk = records[offset:offset + JOURNAL_REPLAY_BATCH]
+            if not self._write_batch(chunk):
+                remaining = records[offset:]
+                with open(self.replay_path, 'w', encoding='utf-8') as f:
+                    for record in remaining:
+                        f.write(_encode_record(record) + '\n')
+                with self.journal_lock:
+                    self.journal_pending = self._count_journal_records()
+                return False
+            self.stats['replayed'] += len(chunk)
+            WRITER_RECORDS.labels('replayed').inc(len(chunk))
+
+        os.remove(self.replay_path)
+        print(f"已补写本地日志中的 {len(records)} 条坐姿时间记录")
+        with self.journal_lock:
+            self.journal_pending = self._count_journal_records()
+        # 补写期间可能又有记录写入了新日志，留到下一轮处理
+        return self.journal_pending == 0
+
+    def _count_journal_records(self):
+        """统计日志和补写文件中的记录数"""
+        count = 0
+        for path in (self.replay_path, self.journal_path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    count += sum(1 for line in f if line.strip())
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"读取坐姿时间本地日志失败: {str(e)}")
+        return count
+
+    def get_stats(self):
+        """获取写入器统计信息"""
+        return {
+            **self.stats,
+            'running': self.is_running,
+            'users': self.users,
+            'queue_depth': self.queue.qsize(),
+            'journal_pending': self.journal_pending,
+            'db_available': self.db_available
+        }
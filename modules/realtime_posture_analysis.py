@@ -16,6 +16,14 @@ from enum import Enum
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # 关闭TensorFlow信息日志(0-3级，2=WARNING)
 os.environ['GLOG_minloglevel'] = '2'      # 关闭mediapipe的GLOG日志
 
+try:
+    from modules.landmark_features_module import face_feature_array, face_features
+    from modules.posture_signal_module import RollingVote
+except ImportError:
+    # 直接在modules目录下运行本文件时
+    from landmark_features_module import face_feature_array, face_features
+    from posture_signal_module import RollingVote
+
 class EmotionState(Enum):
     """面部情绪状态枚举"""
     NEUTRAL = 0    # 中性
@@ -48,6 +56,14 @@ mp_face_mesh = mp.solutions.face_mesh
 mp_drawing = mp.solutions.drawing_utils
 mp_drawing_styles = mp.solutions.drawing_styles
 
+# Face Mesh模型参数（进程内和推理进程共用）
+FACE_MESH_OPTIONS = {
+    'max_num_faces': 1,               # 最大检测人脸数
+    'refine_landmarks': True,         # 使用精细模式（包含虹膜检测）
+    'min_detection_confidence': 0.7,  # 检测置信度阈值
+    'min_tracking_confidence': 0.5    # 跟踪置信度阈值
+}
+
 def check_occlusion(landmarks):
     """
     检测身体遮挡状态
@@ -125,14 +141,13 @@ def calculate_head_angle(landmarks, frame_shape):
 
 class EmotionAnalyzer:
     """面部情绪分析器"""
-    def __init__(self):
+    def __init__(self, face_mesh=None):
+        """
+        Args:
+            face_mesh: 外部提供的Face Mesh模型（需实现process方法），为None时在本进程内创建
+        """
         # 初始化Face Mesh模型
-        self.face_mesh = mp_face_mesh.FaceMesh(
-            max_num_faces=1,          # 最大检测人脸数
-            refine_landmarks=True,    # 使用精细模式（包含虹膜检测）
-            min_detection_confidence=0.7,  # 检测置信度阈值
-            min_tracking_confidence=0.5     # 跟踪置信度阈值
-        )
+        self.face_mesh = face_mesh or mp_face_mesh.FaceMesh(**FACE_MESH_OPTIONS)
         
         # 使用实例属性而非全局常量，便于动态调整
         self.emotion_smoothing_window = EMOTION_SMOOTHING_WINDOW
@@ -140,7 +155,15 @@ class EmotionAnalyzer:
         self.eye_open_ratio_threshold = EYE_OPEN_RATIO_THRESHOLD
         self.brow_down_threshold = BROW_DOWN_THRESHOLD
         
-        self.emotion_history = deque(maxlen=self.emotion_smoothing_window)
+        # 情绪历史的滚动计数，追加时增量更新，多数投票不需要重新统计整个窗口
+        self.emotion_history = RollingVote(EmotionState, self.emotion_smoothing_window)
+        
+        # 面部区域（ROI）推理统计
+        self.roi_stats = {
+            'roi_hits': 0,       # 在面部区域内找到人脸的次数
+            'roi_fallbacks': 0,  # 面部区域内未找到人脸、回退到整帧的次数
+            'full_frame': 0      # 未提供面部区域、直接整帧推理的次数
+        }
         
         # 面部特征点索引配置
         self.LIPS = [61, 291, 78, 308]    # 上下唇和嘴角点（61:上唇，291:下唇，78/308:嘴角）
@@ -149,28 +172,72 @@ class EmotionAnalyzer:
         self.LEFT_BROW = [70, 63, 105, 66]   # 左眉毛特征点
         self.RIGHT_BROW = [300, 293, 334, 296] # 右眉毛特征点
 
-    def analyze(self, frame):
-        """分析当前帧面部情绪"""
+    def analyze(self, frame, rgb_frame=None, roi=None):
+        """分析当前帧面部情绪
+        
+        Args:
+            frame: BGR帧
+            rgb_frame: 调用方已转换好的RGB帧（可选），提供时不再重复转换
+            roi: 面部区域 (x0, y0, x1, y1)，单位像素（可选）。提供时只对该区域运行Face Mesh，
+                 区域内未找到人脸时回退到整帧；返回的关键点均为整帧归一化坐标
+        """
         start_time = time.time()
-        results = self.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if rgb_frame is None:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        
+        face_landmarks = None
+        if roi is not None:
+            face_landmarks = self._process_face_roi(rgb_frame, roi)
+            if face_landmarks is not None:
+                self.roi_stats['roi_hits'] += 1
+            else:
+                self.roi_stats['roi_fallbacks'] += 1
+        else:
+            self.roi_stats['full_frame'] += 1
+        
+        if face_landmarks is None:
+            results = self.face_mesh.process(rgb_frame)
+            if results.multi_face_landmarks:
+                face_landmarks = results.multi_face_landmarks[0]
         process_time = time.time() - start_time
         
-        if not results.multi_face_landmarks:
+        if face_landmarks is None:
             return EmotionState.NEUTRAL, None, process_time
         
-        landmarks = results.multi_face_landmarks[0].landmark
+        landmarks = face_landmarks.landmark
         h, w = frame.shape[:2]
         
-        # 计算各部位特征参数
-        mouth_ratio = self._mouth_open_ratio(landmarks, h, w)
-        eye_ratio = self._eye_open_ratio(landmarks, h, w)
-        brow_pos = self._brow_position(landmarks, h, w)
+        # 计算各部位特征参数（只把用到的关键点转换为数组一次，向量化计算）
+        mouth_ratio, eye_ratio, brow_pos = face_features(face_feature_array(landmarks), h, w)
         
         # 判断当前情绪
         emotion = self._determine_emotion(mouth_ratio, eye_ratio, brow_pos)
+        if self.emotion_history.maxlen != self.emotion_smoothing_window:
+            self.emotion_history.resize(self.emotion_smoothing_window)
         self.emotion_history.append(emotion)
         
-        return self._smooth_emotion(), results.multi_face_landmarks[0], process_time
+        return self._smooth_emotion(), face_landmarks, process_time
+
+    def _process_face_roi(self, rgb_frame, roi):
+        """只对面部区域运行Face Mesh，并把关键点映射回整帧归一化坐标
+        
+        Returns:
+            NormalizedLandmarkList，区域内未找到人脸时返回None
+        """
+        x0, y0, x1, y1 = roi
+        crop = np.ascontiguousarray(rgb_frame[y0:y1, x0:x1])
+        results = self.face_mesh.process(crop)
+        if not results.multi_face_landmarks:
+            return None
+        
+        face_landmarks = results.multi_face_landmarks[0]
+        h, w = rgb_frame.shape[:2]
+        crop_w, crop_h = x1 - x0, y1 - y0
+        for landmark in face_landmarks.landmark:
+            landmark.x = (x0 + landmark.x * crop_w) / w
+            landmark.y = (y0 + landmark.y * crop_h) / h
+            landmark.z = landmark.z * crop_w / w  # z与x使用相同的尺度
+        return face_landmarks
 
     def _mouth_open_ratio(self, landmarks, h, w):
         """计算嘴部开合比例（垂直距离/水平宽度）"""
@@ -211,10 +278,7 @@ class EmotionAnalyzer:
 
     def _smooth_emotion(self):
         """基于历史帧的多数投票平滑情绪状态"""
-        counts = {e:0 for e in EmotionState}
-        for e in self.emotion_history:
-            counts[e] += 1
-        return max(counts, key=counts.get)
+        return self.emotion_history.most_common()
 
 class PostureMonitor:
     """姿势监测主程序"""
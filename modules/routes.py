@@ -1,16 +1,19 @@
 """
 路由模块 - 处理所有API路由请求
 """
-from flask import Blueprint, render_template, jsonify, request, Response, stream_with_context
+from flask import Blueprint, render_template, jsonify, request, Response, stream_with_context, current_app
 import json
 import queue
 import time
+import threading
 import traceback
 import importlib.util
 import numpy as np
 import cv2
 from modules.database_module import save_record_to_db, get_history_records, clear_history, clear_all_posture_records
-from modules.posture_module import WebPostureMonitor, posture_params
+from modules.trace_module import tracer
+from modules.metrics_module import registry
+from modules.camera_registry_module import camera_registry
 from config import DEBUG_BUTTON_VISIBLE  # 从config导入调试按钮显示配置
 
 # 尝试导入虚拟检测服务模块
@@ -30,18 +33,92 @@ video_stream_handler = None
 serial_handler = None
 detection_service = None
 chatbot_service = None
+camera_manager = None
+service_registry = None  # 服务注册表，使用时服务在首次请求或后台预热时才加载
+
+SERVICE_WAIT_SECONDS = 30.0  # 请求等待所需服务加载的最长时间（秒），超时后按服务未初始化处理
+_connect_lock = threading.Lock()  # 保证并发请求绑定服务时只创建一个CameraManager
+
+def requires(*services):
+    """声明视图函数依赖的服务（服务注册表中的名称），请求前先等待这些服务加载完成
+
+    用在 @routes_bp.route 之下，未声明的视图（页面、只访问数据库的接口）不等待任何服务。
+    """
+    def decorator(view):
+        view.required_services = services
+        return view
+    return decorator
 
 # 设置依赖服务
 def setup_services(posture_monitor_instance=None, video_stream_instance=None, 
                   serial_handler_instance=None, detection_service_instance=None,
                   chatbot_service_instance=None):
     """设置各个服务模块实例"""
-    global posture_monitor, video_stream_handler, serial_handler, detection_service, chatbot_service
+    global posture_monitor, video_stream_handler, serial_handler, detection_service, chatbot_service, camera_manager
     posture_monitor = posture_monitor_instance
     video_stream_handler = video_stream_instance
     serial_handler = serial_handler_instance
     detection_service = detection_service_instance
     chatbot_service = chatbot_service_instance
+    camera_manager = None
+    _connect_services()
+
+def setup_service_registry(registry_instance):
+    """使用服务注册表代替直接传入的服务实例，服务加载完成后自动绑定到对应的全局变量"""
+    global service_registry
+    service_registry = registry_instance
+
+def _connect_services():
+    """建立服务之间的关联（服务绑定后调用，可重复调用）"""
+    global camera_manager
+    
+    # 多摄像头管理：默认摄像头即posture_monitor，配置中的其他摄像头只添加不启动
+    if posture_monitor and camera_manager is None:
+        with _connect_lock:
+            if camera_manager is None:
+                from modules.camera_manager_module import CameraManager
+                manager = CameraManager(posture_monitor)
+                manager.load_config()
+                camera_manager = manager
+    
+    # 目标检测与姿势分析共享同一个帧分发器，避免两个服务同时读取摄像头
+    if (detection_service and posture_monitor and
+            hasattr(detection_service, 'set_frame_broker') and hasattr(posture_monitor, 'frame_broker') and
+            getattr(detection_service, 'frame_broker', None) is not posture_monitor.frame_broker):
+        detection_service.set_frame_broker(posture_monitor.frame_broker)
+
+def _bind_services():
+    """把注册表中已加载完成、尚未绑定的服务赋给全局变量"""
+    global posture_monitor, video_stream_handler, serial_handler, detection_service, chatbot_service
+    bound = False
+    if video_stream_handler is None and service_registry.peek('video_stream') is not None:
+        video_stream_handler = service_registry.peek('video_stream')
+        bound = True
+    if posture_monitor is None and service_registry.peek('posture') is not None:
+        posture_monitor = service_registry.peek('posture')
+        bound = True
+    if serial_handler is None and service_registry.peek('serial') is not None:
+        serial_handler = service_registry.peek('serial')
+        bound = True
+    if detection_service is None and service_registry.peek('detection') is not None:
+        detection_service = service_registry.peek('detection')
+        bound = True
+    if chatbot_service is None and service_registry.peek('chatbot') is not None:
+        chatbot_service = service_registry.peek('chatbot')
+        bound = True
+    if bound:
+        _connect_services()
+
+@routes_bp.before_request
+def load_request_services():
+    """使用服务注册表时，先加载当前请求用到的服务；页面和不依赖服务的接口不等待"""
+    if service_registry is None or request.endpoint is None:
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    for name in getattr(view, 'required_services', ()):
+        service_registry.get(name, timeout=SERVICE_WAIT_SECONDS)
+    _bind_services()
+    return None
 
 # 页面路由
 @routes_bp.route('/')
@@ -50,6 +127,7 @@ def index():
 
 # 目标检测页面路由
 @routes_bp.route('/detection')
+@requires('detection')
 def detection_page():
     """渲染目标检测控制页面"""
     print("\n==== 访问目标检测页面 ====")
@@ -69,6 +147,7 @@ def detection_page():
 # 目标检测相关API
 
 @routes_bp.route('/api/detection/status', methods=['GET'])
+@requires('detection')
 def get_detection_status():
     """获取目标检测服务状态"""
     if not detection_service:
@@ -84,6 +163,7 @@ def get_detection_status():
     })
 
 @routes_bp.route('/api/detection/position', methods=['GET'])
+@requires('detection')
 def get_detection_position():
     """获取当前检测到的目标位置"""
     global detection_service
@@ -129,6 +209,7 @@ def get_detection_position():
     })
 
 @routes_bp.route('/api/detection/auto_send/start', methods=['POST'])
+@requires('detection', 'serial')
 def start_detection_auto_send():
     """启动检测坐标自动发送"""
     if not detection_service:
@@ -168,6 +249,7 @@ def start_detection_auto_send():
         })
 
 @routes_bp.route('/api/detection/auto_send/stop', methods=['POST'])
+@requires('detection')
 def stop_detection_auto_send():
     """停止检测坐标自动发送"""
     if not detection_service:
@@ -190,6 +272,7 @@ def stop_detection_auto_send():
         })
 
 @routes_bp.route('/api/detection/auto_send/status', methods=['GET'])
+@requires('detection')
 def get_detection_auto_send_status():
     """获取检测坐标自动发送状态"""
     if not detection_service:
@@ -215,6 +298,7 @@ def debug():
 
 # 路由：发送文本数据
 @routes_bp.route('/api/send_data', methods=['POST'])
+@requires('serial')
 def send_data():
     data = request.json.get('data')
     response = "未连接"
@@ -257,6 +341,7 @@ def clear_history_route():
 
 # 路由：发送帧数据
 @routes_bp.route('/api/send_frame', methods=['POST'])
+@requires('serial')
 def send_frame():
     """发送按照帧格式打包的yaw和pitch数据"""
     try:
@@ -300,6 +385,7 @@ def send_frame():
 
 # 路由：读取帧数据
 @routes_bp.route('/api/read_frame', methods=['GET'])
+@requires('serial')
 def read_frame_api():
     """读取一帧数据并解析"""
     try:
@@ -329,6 +415,7 @@ def read_frame_api():
 
 # 路由：SSE帧数据事件流
 @routes_bp.route('/api/frame_events')
+@requires('serial')
 def frame_events():
     """SSE端点，向前端推送接收到的帧数据"""
     def event_stream():
@@ -371,6 +458,7 @@ def frame_events():
 
 # 路由：启动姿势分析
 @routes_bp.route('/api/start_posture_analysis', methods=['POST'])
+@requires('posture')
 def start_posture_analysis():
     """启动姿势分析系统"""
     global posture_monitor
@@ -388,12 +476,22 @@ def start_posture_analysis():
                 'message': '姿势分析系统已经在运行中'
             })
         
-        success = posture_monitor.start()
+        # 可选参数：推理后端（'thread' 或 'process'）
+        data = request.get_json(silent=True) or {}
+        inference_mode = data.get('inference_mode')
+        if inference_mode not in (None, 'thread', 'process'):
+            return jsonify({
+                'status': 'error',
+                'message': f'无效的推理模式: {inference_mode}'
+            })
+        
+        success = posture_monitor.start(inference_mode=inference_mode)
         
         if success:
             return jsonify({
                 'status': 'success',
-                'message': '姿势分析系统启动成功'
+                'message': '姿势分析系统启动成功',
+                'inference_mode': posture_monitor.inference_mode
             })
         else:
             return jsonify({
@@ -408,6 +506,7 @@ def start_posture_analysis():
 
 # 路由：停止姿势分析
 @routes_bp.route('/api/stop_posture_analysis', methods=['POST'])
+@requires('posture')
 def stop_posture_analysis():
     """停止姿势分析系统"""
     global posture_monitor
@@ -439,6 +538,7 @@ def stop_posture_analysis():
 
 # 路由：获取姿势状态
 @routes_bp.route('/api/get_pose_status')
+@requires('posture', 'video_stream')
 def get_pose_status():
     """获取当前姿势分析状态"""
     global posture_monitor, video_stream_handler
@@ -477,7 +577,8 @@ def get_pose_status():
             'message': '获取姿势分析状态成功',
             'is_running': posture_monitor.is_running,
             'pose_data': posture_monitor.pose_result,
-            'emotion_data': posture_monitor.emotion_result
+            'emotion_data': posture_monitor.emotion_result,
+            'signals': posture_monitor.posture_signals.get_current()
         })
     except Exception as e:
         print(f"ERROR: 获取姿势分析状态出错: {str(e)}")
@@ -493,6 +594,7 @@ def get_pose_status():
 
 # 路由：获取帧率信息
 @routes_bp.route('/api/get_fps_info')
+@requires('posture', 'video_stream')
 def get_fps_info():
     """获取所有帧率信息（包括捕获帧率、处理帧率和视频流帧率）"""
     global posture_monitor, video_stream_handler
@@ -539,14 +641,16 @@ def get_fps_info():
 
 # 路由：获取情绪参数
 @routes_bp.route('/api/get_emotion_params')
+@requires('posture')
 def get_emotion_params():
     """获取情绪分析参数"""
-    global posture_monitor, posture_params
+    global posture_monitor
     
     try:
+        from modules.posture_module import posture_params
         return jsonify({
             'status': 'success',
-            'params': posture_params
+            'params': posture_monitor.posture_params if posture_monitor else posture_params
         })
     except Exception as e:
         return jsonify({
@@ -556,6 +660,7 @@ def get_emotion_params():
 
 # 路由：更新情绪参数
 @routes_bp.route('/api/update_emotion_params', methods=['POST'])
+@requires('posture')
 def update_emotion_params():
     """更新情绪分析参数"""
     global posture_monitor
@@ -591,6 +696,7 @@ def update_emotion_params():
 
 # 路由：姿势检测视频流
 @routes_bp.route('/api/video_pose')
+@requires('video_stream')
 def video_pose():
     """姿势检测视频流端点"""
     print("DEBUG: 请求姿势检测视频流")
@@ -602,12 +708,14 @@ def video_pose():
     
     print("DEBUG: 开始生成姿势视频流响应")
     return Response(
-        video_stream_handler.generate_video_frames(video_stream_handler.get_pose_frame_queue(), is_pose_stream=True),
+        video_stream_handler.generate_video_frames(video_stream_handler.get_pose_frame_queue(), is_pose_stream=True,
+                                                    client=request.remote_addr),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
 # 路由：情绪分析视频流
 @routes_bp.route('/api/video_emotion')
+@requires('video_stream')
 def video_emotion():
     """情绪分析视频流端点"""
     print("DEBUG: 请求情绪分析视频流")
@@ -619,12 +727,14 @@ def video_emotion():
     
     print("DEBUG: 开始生成情绪视频流响应")
     return Response(
-        video_stream_handler.generate_video_frames(video_stream_handler.get_emotion_frame_queue(), is_pose_stream=False),
+        video_stream_handler.generate_video_frames(video_stream_handler.get_emotion_frame_queue(), is_pose_stream=False,
+                                                    client=request.remote_addr),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
 # 路由：获取串口状态
 @routes_bp.route('/api/get_serial_status')
+@requires('serial')
 def get_serial_status():
     """获取串口连接状态"""
     global serial_handler
@@ -657,6 +767,7 @@ def get_serial_status():
 
 # 路由：连接串口
 @routes_bp.route('/api/connect_serial', methods=['POST'])
+@requires('serial')
 def connect_serial():
     """连接指定的串口"""
     global serial_handler
@@ -710,6 +821,7 @@ def connect_serial():
 
 # 视频流路由别名 - 兼容前端
 @routes_bp.route('/pose_video_feed')
+@requires('video_stream')
 def pose_video_feed_alias():
     """姿势分析视频流别名"""
     print("DEBUG: 通过别名请求姿势分析视频流")
@@ -719,11 +831,13 @@ def pose_video_feed_alias():
         return Response("视频流处理器未初始化", status=500)
     
     return Response(
-        video_stream_handler.generate_video_frames(video_stream_handler.get_pose_frame_queue(), is_pose_stream=True),
+        video_stream_handler.generate_video_frames(video_stream_handler.get_pose_frame_queue(), is_pose_stream=True,
+                                                    client=request.remote_addr),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
 @routes_bp.route('/emotion_video_feed')
+@requires('video_stream')
 def emotion_video_feed_alias():
     """情绪分析视频流别名"""
     print("DEBUG: 通过别名请求情绪分析视频流")
@@ -733,12 +847,14 @@ def emotion_video_feed_alias():
         return Response("视频流处理器未初始化", status=500)
     
     return Response(
-        video_stream_handler.generate_video_frames(video_stream_handler.get_emotion_frame_queue(), is_pose_stream=False),
+        video_stream_handler.generate_video_frames(video_stream_handler.get_emotion_frame_queue(), is_pose_stream=False,
+                                                    client=request.remote_addr),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
 # 添加串口指令发送路由
 @routes_bp.route('/api/send_serial_command', methods=['POST'])
+@requires('serial')
 def send_serial_command():
     """向串口发送命令"""
     global serial_handler
@@ -781,6 +897,7 @@ def send_serial_command():
 
 # 设置分辨率模式
 @routes_bp.route('/api/set_resolution_mode', methods=['POST'])
+@requires('posture', 'video_stream')
 def set_resolution_mode():
     """设置分辨率调整模式"""
     global posture_monitor, video_stream_handler
@@ -825,14 +942,54 @@ def set_resolution_mode():
             'message': f'设置分辨率模式失败: {str(e)}'
         })
 
+# 路由：延迟控制器状态与设置
+@routes_bp.route('/api/latency_controller', methods=['GET', 'POST'])
+@requires('posture')
+def latency_controller():
+    """GET返回延迟控制器的状态和决策历史；POST设置启用状态、目标延迟或手动档位"""
+    global posture_monitor
+
+    if not posture_monitor:
+        return jsonify({
+            'status': 'error',
+            'message': '姿势分析服务不可用'
+        })
+
+    try:
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            if not posture_monitor.set_latency_control(
+                enabled=data.get('enabled'),
+                target_latency_ms=data.get('target_latency_ms'),
+                level=data.get('level')
+            ):
+                return jsonify({
+                    'status': 'error',
+                    'message': f"无效的延迟控制档位: {data.get('level')}"
+                })
+
+        history_limit = request.args.get('history', 50, type=int)
+        return jsonify({
+            'status': 'success',
+            'latency_controller': posture_monitor.get_latency_control_state(history_limit)
+        })
+    except Exception as e:
+        print(f"延迟控制器请求出错: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'延迟控制器请求失败: {str(e)}'
+        })
+
 # 兼容路由 - 支持旧版前端
 @routes_bp.route('/get_pose_status')
+@requires('posture', 'video_stream')
 def get_pose_status_compat():
     """获取姿势状态的兼容路由（无API前缀）"""
     return get_pose_status()
 
 # 路由：获取坐姿图像记录设置
 @routes_bp.route('/api/get_posture_recording_settings')
+@requires('posture')
 def get_posture_recording_settings():
     """获取坐姿图像记录设置"""
     global posture_monitor
@@ -860,6 +1017,7 @@ def get_posture_recording_settings():
         })
 
 @routes_bp.route('/api/check_posture_time_recording', methods=['GET'])
+@requires('posture')
 def check_posture_time_recording():
     """检查坐姿时间记录设置"""
     if posture_monitor:
@@ -876,6 +1034,7 @@ def check_posture_time_recording():
 
 # 路由：更新坐姿图像记录设置
 @routes_bp.route('/api/update_posture_recording_settings', methods=['POST'])
+@requires('posture')
 def update_posture_recording_settings():
     """更新坐姿图像记录设置"""
     global posture_monitor
@@ -1031,6 +1190,7 @@ def clear_posture_images():
 
 # 路由：手动记录当前坐姿图像
 @routes_bp.route('/api/capture_posture_image', methods=['POST'])
+@requires('posture')
 def capture_posture_image():
     """手动记录当前坐姿图像"""
     global posture_monitor
@@ -1048,36 +1208,37 @@ def capture_posture_image():
         data = request.json
         notes = data.get('notes', '手动记录的坐姿图像')
         
-        # 获取当前帧
-        if not hasattr(posture_monitor, 'cap') or not posture_monitor.cap.isOpened():
-            return jsonify({
-                'status': 'error',
-                'message': '摄像头未就绪'
-            })
-            
-        # 读取当前帧
-        ret, frame = posture_monitor.cap.read()
-        if not ret:
+        # 从帧分发器获取最新帧，不直接读取摄像头；保存期间持有帧缓冲区引用，防止被复用
+        packet = posture_monitor.frame_broker.get_latest(retain=True)
+        if packet is None or packet.frame is None:
+            if packet is not None:
+                packet.release()
             return jsonify({
                 'status': 'error',
                 'message': '无法获取当前摄像头帧'
             })
         
-        # 获取当前姿势状态
-        angle = posture_monitor.pose_result.get('angle', 0)
-        is_bad_posture = posture_monitor.pose_result.get('is_bad_posture', False)
-        posture_status = f"{'Bad' if is_bad_posture else 'Good'} Posture - Angle: {angle:.1f}°"
-        emotion = posture_monitor.emotion_result.get('emotion', 'UNKNOWN')
-        
-        # 保存图像记录
-        result = save_posture_image(
-            image=frame,
-            angle=angle,
-            is_bad_posture=is_bad_posture,
-            posture_status=posture_status,
-            emotion=emotion,
-            notes=notes
-        )
+        try:
+            # 获取当前姿势状态
+            angle = posture_monitor.pose_result.get('angle', 0)
+            is_bad_posture = posture_monitor.pose_result.get('is_bad_posture', False)
+            posture_status = f"{'Bad' if is_bad_posture else 'Good'} Posture - Angle: {angle:.1f}°"
+            emotion = posture_monitor.emotion_result.get('emotion', 'UNKNOWN')
+            
+            # 保存图像记录：MJPEG原始数据模式下packet.frame是缩小解码的分析帧，
+            # 同时传入摄像头原始的全分辨率JPEG数据，按原始分辨率保存
+            result = save_posture_image(
+                image=packet.frame,
+                angle=angle,
+                is_bad_posture=is_bad_posture,
+                posture_status=posture_status,
+                emotion=emotion,
+                notes=notes,
+                jpeg_bytes=packet.jpeg_bytes,
+                device_id=posture_monitor.camera_id
+            )
+        finally:
+            packet.release()
         
         if result:
             return jsonify({
@@ -1104,11 +1265,13 @@ def posture_records_page():
 
 # 路由：获取坐姿统计数据
 @routes_bp.route('/api/get_posture_stats')
+@requires('posture')
 def get_posture_stats():
     """获取坐姿统计数据
     
     支持的参数:
-    - time_range: 预设时间范围 'day', 'week', 'month', 'custom'
+    - time_range: 预设时间范围 'day', 'week', 'month', 'custom'，
+                  或 'minute'、'hour'（最近1分钟/1小时，由进程内滚动统计提供，不查询数据库）
     - start_date: 自定义开始日期 (格式: YYYY-MM-DD，仅当time_range为'custom'时有效)
     - end_date: 自定义结束日期 (格式: YYYY-MM-DD，仅当time_range为'custom'时有效)
     - with_hourly_data: 是否返回每小时数据，'true'或'false'，默认为'false'
@@ -1118,7 +1281,7 @@ def get_posture_stats():
     try:
         # 获取时间范围参数
         time_range = request.args.get('time_range', 'day')
-        if time_range not in ['day', 'week', 'month', 'custom']:
+        if time_range not in ['day', 'week', 'month', 'custom', 'minute', 'hour']:
             time_range = 'day'
         
         # 处理自定义日期范围
@@ -1165,6 +1328,15 @@ def get_posture_stats():
                 }
             })
         
+        # 最近1分钟/1小时的统计直接使用进程内滚动统计
+        if time_range in ('minute', 'hour'):
+            stats = posture_monitor.get_posture_stats(time_range)
+            stats['time_range_description'] = "最近1分钟数据" if time_range == 'minute' else "最近1小时数据"
+            return jsonify({
+                'status': 'success',
+                'posture_stats': stats
+            })
+        
         # 直接从模块导入函数
         from modules.database_module import get_posture_stats as db_get_posture_stats
         
@@ -1212,8 +1384,42 @@ def get_posture_stats():
             }
         })
 
+# 路由：获取进程内坐姿信号滚动统计
+@routes_bp.route('/api/posture_signals', methods=['GET'])
+@requires('posture')
+def get_posture_signals():
+    """获取角度和情绪结果的滚动统计（不查询数据库）
+    
+    支持的参数:
+    - windows: 逗号分隔的窗口名称 'recent', 'minute', 'hour'，默认全部
+    - series: 是否返回各窗口按桶的时间序列，'true'或'false'，默认为'false'
+    """
+    global posture_monitor
+    
+    if not posture_monitor:
+        return jsonify({
+            'status': 'error',
+            'message': '姿势分析系统未初始化'
+        })
+    
+    try:
+        windows = request.args.get('windows')
+        window_names = [name.strip() for name in windows.split(',') if name.strip()] if windows else None
+        with_series = request.args.get('series', 'false').lower() == 'true'
+        return jsonify({
+            'status': 'success',
+            'signals': posture_monitor.get_posture_signals(window_names, with_series)
+        })
+    except Exception as e:
+        print(f"获取坐姿信号统计出错: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"获取坐姿信号统计失败: {str(e)}"
+        })
+
 # 路由：设置坐姿类型阈值
 @routes_bp.route('/api/set_posture_thresholds', methods=['POST'])
+@requires('posture')
 def set_posture_thresholds():
     """设置坐姿类型阈值"""
     global posture_monitor
@@ -1413,6 +1619,352 @@ def view_posture_history():
     """渲染坐姿历史记录页面"""
     return render_template('posture_history.html', title='坐姿历史记录')
 
+# 路由：Prometheus文本格式的指标导出
+@routes_bp.route('/metrics')
+def metrics():
+    """导出所有子系统注册的计数器、仪表和直方图"""
+    return Response(registry.expose(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# 路由：导出热路径追踪数据
+@routes_bp.route('/api/debug/trace', methods=['GET', 'POST'])
+def debug_trace():
+    """GET导出最近的追踪片段（Chrome trace-event JSON，可在chrome://tracing或Perfetto中打开），
+    ?summary=1 返回按片段名称的耗时汇总；POST设置启用状态或清空缓冲区"""
+    try:
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            if 'enabled' in data:
+                tracer.enabled = bool(data['enabled'])
+            if data.get('clear'):
+                tracer.clear()
+            return jsonify({
+                'status': 'success',
+                'trace': tracer.get_stats()
+            })
+
+        if request.args.get('summary'):
+            return jsonify({
+                'status': 'success',
+                'trace': tracer.get_stats(),
+                'summary': tracer.get_summary()
+            })
+
+        seconds = request.args.get('seconds', type=float)
+        return jsonify(tracer.export_chrome_trace(last_seconds=seconds))
+    except Exception as e:
+        print(f"导出追踪数据出错: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'导出追踪数据失败: {str(e)}'
+        })
+
+# 路由：摄像头注册表
+@routes_bp.route('/api/camera_registry', methods=['GET', 'POST'])
+@requires('posture')
+def camera_registry_info():
+    """GET返回保存的摄像头配置、各服务最近一次打开摄像头的方式和耗时以及姿势分析启动耗时；
+    POST {"reset": true} 清除保存的配置，下次启动时重新完整探测"""
+    try:
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            if data.get('reset'):
+                camera_registry.invalidate()
+        
+        return jsonify({
+            'status': 'success',
+            'camera_registry': camera_registry.get_stats(),
+            'posture_startup': posture_monitor.startup_timer.get_stats() if posture_monitor else None
+        })
+    except Exception as e:
+        print(f"摄像头注册表请求出错: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'摄像头注册表请求失败: {str(e)}'
+        })
+
+@routes_bp.route('/api/services')
+def services_info():
+    """获取各服务的加载状态、导入耗时和初始化耗时"""
+    if service_registry is None:
+        return jsonify({
+            'status': 'success',
+            'message': '未使用服务注册表，服务在启动时已全部加载',
+            'services': None
+        })
+    return jsonify({
+        'status': 'success',
+        'services': service_registry.get_stats()
+    })
+
+@routes_bp.route('/api/stream/sessions')
+@requires('video_stream')
+def stream_sessions():
+    """获取当前的视频流会话（每个观看者的分辨率、质量、实际帧率、丢帧统计、写出耗时和延迟）"""
+    if not video_stream_handler:
+        return jsonify({
+            'status': 'error',
+            'message': '视频流处理器未初始化'
+        })
+    hub = video_stream_handler.broadcast_hub
+    return jsonify({
+        'status': 'success',
+        'sessions': hub.list_sessions(),
+        'broadcast': hub.get_stats()
+    })
+
+# 多摄像头相关API
+def _get_camera(camera_id):
+    """按编号获取摄像头分析器，不存在时返回 (None, 错误响应)"""
+    if not camera_manager:
+        return None, jsonify({
+            'status': 'error',
+            'message': '姿势分析系统未初始化'
+        })
+    monitor = camera_manager.get(camera_id)
+    if monitor is None:
+        return None, jsonify({
+            'status': 'error',
+            'message': f'摄像头 {camera_id} 不存在'
+        })
+    return monitor, None
+
+@routes_bp.route('/api/cameras', methods=['GET', 'POST'])
+@requires('posture')
+def cameras():
+    """GET返回所有摄像头及其当前结果；
+    POST添加摄像头，参数见 config.POSTURE_CAMERAS：{"id": "desk2", "device": 2, "weight": 1.0, "start": true}"""
+    if not camera_manager:
+        return jsonify({
+            'status': 'error',
+            'message': '姿势分析系统未初始化'
+        })
+    
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            camera_manager.add_camera(data)
+            started = camera_manager.start_camera(str(data['id']).strip()) if data.get('start') else False
+            return jsonify({
+                'status': 'success',
+                'message': f"摄像头 {data['id']} 已添加" + ('并启动' if started else ''),
+                'cameras': camera_manager.list_cameras()
+            })
+        
+        return jsonify({
+            'status': 'success',
+            'cameras': camera_manager.list_cameras(),
+            'scheduler': camera_manager.get_stats()
+        })
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+    except Exception as e:
+        print(f"摄像头管理请求出错: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'摄像头管理请求失败: {str(e)}'
+        })
+
+@routes_bp.route('/api/cameras/scheduler', methods=['GET', 'POST'])
+@requires('posture')
+def camera_scheduler():
+    """GET返回摄像头之间的CPU分配情况；
+    POST设置总预算或权重：{"cpu_budget": 2.0, "weights": {"desk2": 2.0}}"""
+    if not camera_manager:
+        return jsonify({
+            'status': 'error',
+            'message': '姿势分析系统未初始化'
+        })
+    
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            if data.get('cpu_budget') is not None:
+                camera_manager.set_cpu_budget(data['cpu_budget'])
+            for camera_id, weight in (data.get('weights') or {}).items():
+                if not camera_manager.set_weight(camera_id, float(weight)):
+                    return jsonify({
+                        'status': 'error',
+                        'message': f'摄像头 {camera_id} 不存在'
+                    })
+        
+        return jsonify({
+            'status': 'success',
+            'scheduler': camera_manager.get_stats()
+        })
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'无效的参数: {str(e)}'
+        })
+
+@routes_bp.route('/api/cameras/<camera_id>', methods=['DELETE'])
+@requires('posture')
+def remove_camera(camera_id):
+    """停止并移除摄像头"""
+    if not camera_manager:
+        return jsonify({
+            'status': 'error',
+            'message': '姿势分析系统未初始化'
+        })
+    
+    try:
+        if not camera_manager.remove_camera(camera_id):
+            return jsonify({
+                'status': 'error',
+                'message': f'摄像头 {camera_id} 不存在'
+            })
+        return jsonify({
+            'status': 'success',
+            'message': f'摄像头 {camera_id} 已移除'
+        })
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+@routes_bp.route('/api/cameras/<camera_id>/start', methods=['POST'])
+@requires('posture')
+def start_camera(camera_id):
+    """启动摄像头的姿势分析"""
+    monitor, error = _get_camera(camera_id)
+    if error:
+        return error
+    
+    if monitor.is_running:
+        return jsonify({
+            'status': 'success',
+            'message': f'摄像头 {camera_id} 已经在运行中'
+        })
+    
+    try:
+        if camera_manager.start_camera(camera_id):
+            return jsonify({
+                'status': 'success',
+                'message': f'摄像头 {camera_id} 启动成功',
+                'inference_mode': monitor.inference_mode
+            })
+        return jsonify({
+            'status': 'error',
+            'message': f'摄像头 {camera_id} 启动失败'
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'启动摄像头 {camera_id} 出错: {str(e)}'
+        })
+
+@routes_bp.route('/api/cameras/<camera_id>/stop', methods=['POST'])
+@requires('posture')
+def stop_camera(camera_id):
+    """停止摄像头的姿势分析"""
+    monitor, error = _get_camera(camera_id)
+    if error:
+        return error
+    
+    try:
+        camera_manager.stop_camera(camera_id)
+        return jsonify({
+            'status': 'success',
+            'message': f'摄像头 {camera_id} 已停止'
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'停止摄像头 {camera_id} 出错: {str(e)}'
+        })
+
+@routes_bp.route('/api/cameras/<camera_id>/status')
+@requires('posture')
+def camera_status(camera_id):
+    """获取摄像头的当前姿势、情绪结果和滚动统计"""
+    monitor, error = _get_camera(camera_id)
+    if error:
+        return error
+    
+    return jsonify({
+        'status': 'success',
+        'camera_id': camera_id,
+        'is_running': monitor.is_running,
+        'pose_data': monitor.pose_result,
+        'emotion_data': monitor.emotion_result,
+        'signals': monitor.posture_signals.get_current()
+    })
+
+@routes_bp.route('/api/cameras/<camera_id>/params', methods=['GET', 'POST'])
+@requires('posture')
+def camera_params(camera_id):
+    """获取或更新摄像头的情绪分析参数（只影响该摄像头，默认摄像头即全局参数）"""
+    monitor, error = _get_camera(camera_id)
+    if error:
+        return error
+    
+    try:
+        if request.method == 'POST':
+            if not monitor.update_emotion_params(request.get_json(silent=True) or {}):
+                return jsonify({
+                    'status': 'error',
+                    'message': '更新情绪分析参数失败'
+                })
+        return jsonify({
+            'status': 'success',
+            'params': monitor.get_emotion_params()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'更新情绪分析参数出错: {str(e)}'
+        })
+
+@routes_bp.route('/api/cameras/<camera_id>/stats')
+@requires('posture')
+def camera_stats(camera_id):
+    """获取摄像头的性能统计（帧率、流水线、调度器）"""
+    monitor, error = _get_camera(camera_id)
+    if error:
+        return error
+    
+    try:
+        return jsonify({
+            'status': 'success',
+            'camera_id': camera_id,
+            'stats': monitor.get_performance_stats()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'获取摄像头 {camera_id} 性能统计失败: {str(e)}'
+        })
+
+@routes_bp.route('/api/cameras/<camera_id>/posture_stats')
+@requires('posture')
+def camera_posture_stats(camera_id):
+    """获取摄像头的近期坐姿统计
+    
+    支持的参数:
+    - time_range: 'minute'或'hour'，默认为'hour'（由进程内滚动统计提供，更长时间范围使用 /api/get_posture_stats）
+    """
+    monitor, error = _get_camera(camera_id)
+    if error:
+        return error
+    
+    from modules.posture_module import LIVE_STATS_RANGES
+    time_range = request.args.get('time_range', 'hour')
+    if time_range not in LIVE_STATS_RANGES:
+        return jsonify({
+            'status': 'error',
+            'message': f'不支持的时间范围: {time_range}'
+        })
+    
+    return jsonify({
+        'status': 'success',
+        'camera_id': camera_id,
+        'posture_stats': monitor.get_posture_stats(time_range)
+    })
+
 @routes_bp.route('/api/debug/posture_records')
 def debug_posture_records():
     """诊断接口：获取所有坐姿时间记录的原始数据（仅用于调试）"""
@@ -1684,6 +2236,7 @@ def get_posture_distribution():
 
 # 添加视频流控制路由
 @routes_bp.route('/api/toggle_video_stream', methods=['POST'])
+@requires('video_stream')
 def toggle_video_stream():
     """启用或禁用视频流传输"""
     global video_stream_handler
@@ -1720,6 +2273,7 @@ def toggle_video_stream():
     })
 
 @routes_bp.route('/api/get_video_stream_status', methods=['GET'])
+@requires('video_stream')
 def get_video_stream_status():
     """获取视频流传输状态"""
     global video_stream_handler
@@ -1738,6 +2292,7 @@ def get_video_stream_status():
 
 # 添加开启和停止检测服务的API
 @routes_bp.route('/api/detection/start', methods=['POST'])
+@requires('detection')
 def start_detection():
     """启动目标检测服务"""
     if not detection_service:
@@ -1771,6 +2326,7 @@ def start_detection():
         })
 
 @routes_bp.route('/api/detection/stop', methods=['POST'])
+@requires('detection')
 def stop_detection():
     """停止目标检测服务"""
     if not detection_service:
@@ -1805,6 +2361,7 @@ def stop_detection():
 
 # 语音助手相关API
 @routes_bp.route('/api/chatbot/status', methods=['GET'])
+@requires('chatbot')
 def get_chatbot_status():
     """获取语音助手状态"""
     if not chatbot_service:
@@ -1821,6 +2378,7 @@ def get_chatbot_status():
     })
 
 @routes_bp.route('/api/chatbot/send_message', methods=['POST'])
+@requires('chatbot')
 def send_chatbot_message():
     """向语音助手发送文本消息"""
     if not chatbot_service:
@@ -1852,6 +2410,7 @@ def send_chatbot_message():
         })
 
 @routes_bp.route('/api/chatbot/speak_text', methods=['POST'])
+@requires('chatbot')
 def speak_text():
     """使用语音助手朗读指定文本"""
     if not chatbot_service:
@@ -1888,6 +2447,7 @@ def speak_text():
         })
 
 @routes_bp.route('/api/chatbot/reset', methods=['POST'])
+@requires('chatbot')
 def reset_chatbot():
     """重置语音助手对话上下文"""
     if not chatbot_service:
@@ -2049,6 +2609,7 @@ def update_guardian_message_status(message_id):
 # =============================================================================
 
 @routes_bp.route('/video_feed')
+@requires('posture', 'video_stream')
 def video_feed():
     """原始视频流接口，支持分辨率参数，仅返回纯原始视频不带任何文字标记"""
     try:
@@ -2078,51 +2639,55 @@ def video_feed():
             print("DEBUG: 视频流未启用，现在启用它")
             video_stream_handler.enable_streaming()
         
+        from modules.video_stream_module import STREAM_RESOLUTION_PRESETS
+        
+        # 输出分辨率（'480p'或未知参数时保持摄像头原始分辨率）
+        width, height = (STREAM_RESOLUTION_PRESETS.get(resolution) if resolution != '480p' else None) or (None, None)
+        client = request.remote_addr
+        
         # 生成纯原始视频流（不带任何标记和处理）
         def generate_pure_raw_video_stream():
+            # 本观看者的会话（分辨率、质量和发送统计），相同参数的观看者共享编码结果
+            session = video_stream_handler.broadcast_hub.open_session(
+                'raw', width=width, height=height, quality=90, max_fps=30, client=client)
             try:
                 # 启用视频流
                 if not video_stream_handler.get_streaming_status():
                     video_stream_handler.enable_streaming()
                 
-                # 获取原始视频流帧
+                # 订阅帧分发器获取原始摄像头帧（不经过任何处理，也不与分析线程争抢摄像头）
+                subscriber = None
+                if posture_monitor and hasattr(posture_monitor, 'frame_broker'):
+                    subscriber = posture_monitor.frame_broker.subscribe('video_feed', max_fps=session.max_fps)
+                
+                # 获取原始视频流帧；读取超时时沿用上一帧及其序号（订阅者持有该帧直到下次读取），
+                # 只按保持连接的间隔重发，不会把旧帧当作新帧反复发送
+                frame = None
+                seq = -1
                 while True:
-                    # 直接使用全局姿势监测器获取原始摄像头帧（不经过任何处理）
-                    global posture_monitor
-                    frame = None
+                    packet = subscriber.read(timeout=1.0) if subscriber else None
+                    if packet is not None and packet.frame is not None and packet.frame.size > 0:
+                        frame, seq = packet.frame, packet.seq  # 共享只读帧，下面只做缩放和编码
                     
-                    if posture_monitor and hasattr(posture_monitor, 'cap') and posture_monitor.cap.isOpened():
-                        ret, raw_frame = posture_monitor.cap.read()
-                        if ret and raw_frame is not None and raw_frame.size > 0:
-                            frame = raw_frame.copy()  # 获取完全未处理的原始相机帧
-                    
-                    # 如果无法获取原始帧，使用备用空白帧
+                    # 还没有取到过原始帧时，使用备用空白帧
                     if frame is None:
                         frame = np.ones((480, 640, 3), dtype=np.uint8) * 200
                     
-                    # 调整分辨率（如果需要）
-                    if resolution != '480p':
-                        resolution_map = {
-                            'high': (720, 540),
-                            'medium': (640, 480),
-                            'low': (320, 240),
-                            '720p': (720, 540),
-                            '480p': (640, 480),
-                            '360p': (480, 360),
-                            '240p': (320, 240)
-                        }
-                        if resolution in resolution_map:
-                            width, height = resolution_map[resolution]
-                            frame = cv2.resize(frame, (width, height))
-                    
-                    # 编码并返回帧
-                    success, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 90])
-                    if success:
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                    # 缩放并编码：同一分辨率的所有观看者通过广播中心共享同一次编码，
+                    # 备用空白帧只在保持连接时重发
+                    if session.should_send(seq):
+                        encoded, _ = video_stream_handler.broadcast_hub.encode(
+                            'raw', seq, frame, *session.output_size(frame), session.quality)
+                        if encoded is not None:
+                            # 慢速客户端按写出耗时只降低本会话的分辨率
+                            write_start = time.time()
+                            yield encoded.part
+                            session.record_sent(encoded, time.time() - write_start)
+                            session.adjust_resolution()
                     
-                    # 控制帧率
-                    time.sleep(0.033)  # 约30fps
+                    # 控制帧率 - 取到帧时由订阅者限速，否则约30fps
+                    if packet is None:
+                        time.sleep(0.033)
                     
             except Exception as e:
                 print(f"生成纯原始视频流出错: {str(e)}")
@@ -2140,6 +2705,10 @@ def video_feed():
                 
                 # 防止循环过快
                 time.sleep(2)
+            finally:
+                video_stream_handler.broadcast_hub.close_session(session)
+                if subscriber:
+                    subscriber.close()
         
         # 返回视频流响应
         return Response(
@@ -2151,7 +2720,61 @@ def video_feed():
         print(f"生成纯原始视频流出错: {str(e)}")
         return "视频流生成失败", 500
 
+@routes_bp.route('/api/snapshot')
+@requires('video_stream')
+def snapshot():
+    """视频流最新一帧的JPEG快照，用于定时刷新的仪表盘缩略图
+    
+    参数: stream（raw/pose/emotion，默认raw）、resolution（如 360p，默认原始分辨率）、quality（1-100）。
+    与MJPEG观看者共享编码结果；请求头 If-None-Match 与最新帧的 ETag 一致时返回304，不编码也不传输图像。
+    """
+    from modules.video_stream_module import SNAPSHOT_STREAMS, SNAPSHOT_QUALITY, STREAM_RESOLUTION_PRESETS
+    
+    if not video_stream_handler:
+        return jsonify({
+            'status': 'error',
+            'message': '视频流处理器未初始化'
+        }), 503
+    
+    stream = request.args.get('stream', 'raw')
+    resolution = request.args.get('resolution')
+    quality = request.args.get('quality', SNAPSHOT_QUALITY, type=int)
+    if stream not in SNAPSHOT_STREAMS:
+        return jsonify({
+            'status': 'error',
+            'message': f'不支持的视频流: {stream}，可选值: {list(SNAPSHOT_STREAMS)}'
+        }), 400
+    if resolution is not None and resolution not in STREAM_RESOLUTION_PRESETS:
+        return jsonify({
+            'status': 'error',
+            'message': f'不支持的分辨率: {resolution}，可选值: {list(STREAM_RESOLUTION_PRESETS)}'
+        }), 400
+    if not 1 <= quality <= 100:
+        return jsonify({
+            'status': 'error',
+            'message': 'JPEG质量必须在1-100之间'
+        }), 400
+    
+    # 快照只读取分发器或分析视频流中已有的最新帧，不启用视频流，不改变全局的推流状态
+    etag, encoded = video_stream_handler.get_snapshot(
+        stream, STREAM_RESOLUTION_PRESETS.get(resolution), quality, request.if_none_match)
+    if etag is None:
+        return jsonify({
+            'status': 'error',
+            'message': '暂无可用的视频画面'
+        }), 503
+    
+    if encoded is None:
+        response = Response(status=304)
+    else:
+        response = Response(encoded.jpeg, mimetype='image/jpeg')
+    response.set_etag(etag)
+    # 每次都向服务器确认，画面未变化时只有304的开销
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @routes_bp.route('/api/guardian/video_status', methods=['GET'])
+@requires('video_stream')
 def get_video_status():
     """获取视频流状态"""
     try:
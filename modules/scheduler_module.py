@@ -0,0 +1,250 @@
+"""
+分析任务调度模块 - 按各分析任务声明的目标频率和优先级，在CPU预算内分配执行机会
+"""
+import time
+import threading
+
+# 调度相关配置
+DEFAULT_CPU_BUDGET = 2.0     # 分析任务可占用的CPU预算（核数，即每秒可用的CPU秒数）
+DEFAULT_MIN_HZ = 0.2         # 预算不足时任务仍保证的最低频率
+COST_EMA_ALPHA = 0.2         # 单次执行耗时的指数滑动平均系数
+MIN_SHARE = 0.1              # 公平分配时每个使用者至少分到的CPU预算（核数）
+
+
+class ScheduledTask:
+    """调度任务"""
+    def __init__(self, name, target_hz, priority, min_hz=DEFAULT_MIN_HZ):
+        """
+        Args:
+            name: 任务名称
+            target_hz: 目标执行频率
+            priority: 优先级，数值越小越优先分配预算
+            min_hz: 预算不足时仍保证的最低频率
+        """
+        self.name = name
+        self.target_hz = target_hz
+        self.priority = priority
+        self.min_hz = min_hz
+        self.enabled = True
+        self.rate_scale = 1.0          # 外部控制器施加的频率缩放比例
+        self.effective_hz = target_hz  # 按缩放比例和预算分配后的实际频率
+        self.last_run_time = None     # 从未执行过时为None，第一次检查即到期
+        self.runs = 0
+        self.avg_cost = 0.0            # 单次执行耗时的滑动平均（秒）
+
+    def get_stats(self):
+        """获取任务统计信息"""
+        return {
+            'name': self.name,
+            'enabled': self.enabled,
+            'priority': self.priority,
+            'target_hz': self.target_hz,
+            'rate_scale': self.rate_scale,
+            'effective_hz': round(self.effective_hz, 2),
+            'runs': self.runs,
+            'avg_cost_ms': round(self.avg_cost * 1000, 2)
+        }
+
+
+class AnalyzerScheduler:
+    """分析任务调度器
+
+    每个任务声明目标频率和优先级。调度器用各任务的平均耗时估算负载
+    （耗时 × 频率），按优先级从高到低分配CPU预算，预算不足时按剩余预算
+    降低低优先级任务的频率，但不低于其最低频率。
+    """
+    def __init__(self, cpu_budget=DEFAULT_CPU_BUDGET):
+        """
+        Args:
+            cpu_budget: CPU预算（核数）
+        """
+        self.cpu_budget = cpu_budget
+        self.budget_enabled = True  # 关闭后所有任务都按目标频率执行
+        self.tasks = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, target_hz, priority, min_hz=DEFAULT_MIN_HZ):
+        """注册任务"""
+        with self.lock:
+            self.tasks[name] = ScheduledTask(name, target_hz, priority, min_hz)
+
+    def set_task(self, name, target_hz=None, priority=None, enabled=None):
+        """调整任务参数
+
+        Returns:
+            任务是否存在
+        """
+        with self.lock:
+            task = self.tasks.get(name)
+            if task is None:
+                return False
+            if target_hz is not None:
+                task.target_hz = max(task.min_hz, float(target_hz))
+            if priority is not None:
+                task.priority = int(priority)
+            if enabled is not None:
+                task.enabled = bool(enabled)
+            return True
+
+    def set_rate_scale(self, scale, names=None):
+        """设置任务的频率缩放比例
+
+        Args:
+            scale: 缩放比例，1.0表示按目标频率
+            names: 只设置这些任务，None表示全部
+        """
+        with self.lock:
+            for task in self.tasks.values():
+                if names is None or task.name in names:
+                    task.rate_scale = max(0.0, float(scale))
+
+    def _allocate_locked(self):
+        """按优先级分配CPU预算，更新各任务的实际频率"""
+        remaining = self.cpu_budget
+        for task in sorted(self.tasks.values(), key=lambda t: t.priority):
+            if not task.enabled:
+                task.effective_hz = 0
+                continue
+            requested_hz = task.target_hz * task.rate_scale
+            if not self.budget_enabled or task.avg_cost <= 0:
+                # 尚未测得耗时的任务先按请求频率执行
+                task.effective_hz = requested_hz
+                remaining -= task.avg_cost * requested_hz
+                continue
+
+            demand = task.avg_cost * requested_hz
+            if demand <= remaining:
+                task.effective_hz = requested_hz
+            else:
+                task.effective_hz = min(requested_hz, max(task.min_hz, max(0.0, remaining) / task.avg_cost))
+            remaining -= task.avg_cost * task.effective_hz
+
+    def _is_due_locked(self, task, now):
+        return (task.enabled and task.effective_hz > 0
+                and (task.last_run_time is None or now - task.last_run_time >= 1.0 / task.effective_hz))
+
+    def due(self, names=None, now=None):
+        """获取当前到期的任务
+
+        Args:
+            names: 只检查这些任务，None表示全部
+            now: 当前时间，None时使用time.time()（基准测试会传入录制源的媒体时间）
+
+        Returns:
+            到期任务名称列表（按优先级排序）
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            self._allocate_locked()
+            tasks = [self.tasks[n] for n in names if n in self.tasks] if names else list(self.tasks.values())
+            return [t.name for t in sorted(tasks, key=lambda t: t.priority) if self._is_due_locked(t, now)]
+
+    def mark_run(self, name, now=None):
+        """标记任务已执行"""
+        with self.lock:
+            task = self.tasks.get(name)
+            if task:
+                task.last_run_time = time.time() if now is None else now
+                task.runs += 1
+
+    def try_run(self, name, now=None):
+        """任务到期时标记为已执行并返回True，否则返回False"""
+        now = time.time() if now is None else now
+        with self.lock:
+            task = self.tasks.get(name)
+            if task is None:
+                return False
+            self._allocate_locked()
+            if not self._is_due_locked(task, now):
+                return False
+            task.last_run_time = now
+            task.runs += 1
+            return True
+
+    def record_cost(self, name, seconds):
+        """记录任务的一次执行耗时"""
+        with self.lock:
+            task = self.tasks.get(name)
+            if task:
+                if task.avg_cost <= 0:
+                    task.avg_cost = seconds
+                else:
+                    task.avg_cost += COST_EMA_ALPHA * (seconds - task.avg_cost)
+
+    def get_target_hz(self, name):
+        """获取任务的目标频率"""
+        task = self.tasks.get(name)
+        return task.target_hz if task else 0
+
+    def get_demand(self, names=None):
+        """获取按请求频率（目标频率×缩放比例）估算的CPU需求（核数），不受预算限制
+
+        Args:
+            names: 只统计这些任务，None表示全部
+        """
+        with self.lock:
+            tasks = [self.tasks[n] for n in names if n in self.tasks] if names else list(self.tasks.values())
+            return sum(t.avg_cost * t.target_hz * t.rate_scale for t in tasks if t.enabled)
+
+    def get_load(self):
+        """获取按实际频率估算的CPU负载（核数）"""
+        with self.lock:
+            return sum(t.avg_cost * t.effective_hz for t in self.tasks.values() if t.enabled)
+
+    def get_stats(self):
+        """获取调度器统计信息"""
+        load = self.get_load()
+        demand = self.get_demand()
+        with self.lock:
+            tasks = [t.get_stats() for t in sorted(self.tasks.values(), key=lambda t: t.priority)]
+        return {
+            'cpu_budget': self.cpu_budget,
+            'budget_enabled': self.budget_enabled,
+            'estimated_load': round(load, 3),
+            'requested_load': round(demand, 3),
+            'tasks': tasks
+        }
+
+
+def fair_share(budget, demands, weights=None, min_share=MIN_SHARE):
+    """按加权最大最小公平（注水法）在多个使用者之间分配CPU预算
+
+    需求低于公平份额的使用者按需求分配，节省下来的预算再按权重分给其余使用者；
+    所有需求都满足后剩余的预算按权重平分，作为各自的余量。
+
+    Args:
+        budget: 总预算（核数）
+        demands: 使用者名称 -> 需求（核数），需求未知时为0
+        weights: 使用者名称 -> 权重，None或缺失时权重为1
+        min_share: 每个使用者的最低份额
+
+    Returns:
+        使用者名称 -> 分配的预算（核数）
+    """
+    weights = weights or {}
+    shares = {name: 0.0 for name in demands}
+    pending = {name: max(0.0, demand) for name, demand in demands.items()}
+    remaining = float(budget)
+
+    while pending and remaining > 1e-9:
+        total_weight = sum(max(weights.get(name, 1.0), 1e-6) for name in pending)
+        unit = remaining / total_weight
+        satisfied = [name for name, demand in pending.items()
+                     if demand - shares[name] <= unit * max(weights.get(name, 1.0), 1e-6)]
+        if not satisfied:
+            # 所有使用者的需求都超过公平份额，按权重分完剩余预算
+            for name in pending:
+                shares[name] += unit * max(weights.get(name, 1.0), 1e-6)
+            remaining = 0.0
+            break
+        for name in satisfied:
+            remaining -= pending[name] - shares[name]
+            shares[name] = pending.pop(name)
+
+    if remaining > 1e-9 and shares:
+        # 需求全部满足，剩余预算按权重作为余量
+        total_weight = sum(max(weights.get(name, 1.0), 1e-6) for name in shares)
+        for name in shares:
+            shares[name] += remaining * max(weights.get(name, 1.0), 1e-6) / total_weight
+
+    return {name: max(min_share, share) for name, share in shares.items()}
@@ -5,6 +5,15 @@ import queue
 import math
 import time
 from serial_handler import SerialHandler
+from modules.metrics_module import registry
+
+# 串口指标
+SERIAL_WRITE_SECONDS = registry.histogram('serial_write_seconds', '串口发送（含读取响应）耗时（秒）', ('kind',))
+SERIAL_WRITE_FAILURES = registry.counter('serial_write_failures_total', '串口发送失败次数', ('kind',))
+SERIAL_CONNECTED = registry.gauge('serial_connected', '串口是否已连接')
+
+# 预先绑定各类写入的子指标，逐帧发送时直接observe，不查找标签也不创建计时对象
+SERIAL_WRITE_SECONDS_BY_KIND = {kind: SERIAL_WRITE_SECONDS.labels(kind) for kind in ('data', 'frame', 'detection', 'command')}
 
 class SerialCommunicationHandler:
     """
@@ -17,6 +26,7 @@ class SerialCommunicationHandler:
         
         # 检查串口是否成功连接
         self.initialized = self.handler.is_connected()
+        SERIAL_CONNECTED.set_function(lambda: 1 if self.is_connected() else 0)
         
         if self.initialized:
             print(f"串口通信处理器初始化成功: {self.handler.port}")
@@ -130,13 +140,15 @@ class SerialCommunicationHandler:
     
     def send_data(self, data):
         """发送数据到串口，并返回响应"""
+        start_time = time.perf_counter()
         success = self.handler.send_data(data)
+        # 读取响应(如果有)
+        response = self.handler.read_data() if success else None
+        SERIAL_WRITE_SECONDS_BY_KIND['data'].observe(time.perf_counter() - start_time)
         if success:
-            # 读取响应(如果有)
-            response = self.handler.read_data()
             return response, "数据发送成功"
-        else:
-            return None, "发送数据失败"
+        SERIAL_WRITE_FAILURES.labels('data').inc()
+        return None, "发送数据失败"
     
     def send_frame(self, find_bool, yaw, pitch):
         """发送帧数据，转换为弧度制"""
@@ -144,13 +156,15 @@ class SerialCommunicationHandler:
         yaw_rad = math.radians(yaw)    # 将度转换为弧度
         pitch_rad = math.radians(pitch) # 将度转换为弧度
         
+        start_time = time.perf_counter()
         success = self.handler.send_yaw_pitch(find_bool, yaw_rad, pitch_rad)
+        # 读取响应(如果有)
+        response = self.handler.read_data() if success else None
+        SERIAL_WRITE_SECONDS_BY_KIND['frame'].observe(time.perf_counter() - start_time)
         if success:
-            # 读取响应(如果有)
-            response = self.handler.read_data()
             return response, "帧数据发送成功"
-        else:
-            return None, "发送帧数据失败"
+        SERIAL_WRITE_FAILURES.labels('frame').inc()
+        return None, "发送帧数据失败"
     
     def read_frame(self):
         """读取一帧数据"""
@@ -190,17 +204,19 @@ class SerialCommunicationHandler:
         confidence = position_data.get('confidence', 0.0)
         
         # 发送检测位置帧
+        start_time = time.perf_counter()
         success = self.handler.send_detection_data(detected, x, y, w, h, confidence)
+        # 读取响应(如果有)
+        response = self.handler.read_data() if success else None
+        SERIAL_WRITE_SECONDS_BY_KIND['detection'].observe(time.perf_counter() - start_time)
         
         if success:
-            # 读取响应(如果有)
-            response = self.handler.read_data()
             if detected:
                 return response, f"检测位置数据发送成功: x={x:.3f}, y={y:.3f}"
             else:
                 return response, "已发送未检测到目标的信息"
-        else:
-            return None, "发送检测位置数据失败"
+        SERIAL_WRITE_FAILURES.labels('detection').inc()
+        return None, "发送检测位置数据失败"
     
     def send_command(self, command_data):
         """
@@ -227,6 +243,7 @@ class SerialCommunicationHandler:
         eye_rest_reminder = command_data.get('eye_rest_reminder', False)
         
         # 发送命令帧
+        start_time = time.perf_counter()
         response = self.handler.send_command(
             light_on=light_on,
             light_off=light_off,
@@ -235,6 +252,9 @@ class SerialCommunicationHandler:
             posture_reminder=posture_reminder,
             eye_rest_reminder=eye_rest_reminder
         )
+        SERIAL_WRITE_SECONDS_BY_KIND['command'].observe(time.perf_counter() - start_time)
+        if not response:
+            SERIAL_WRITE_FAILURES.labels('command').inc()
         
         # 生成消息
         active_commands = []
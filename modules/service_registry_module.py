@@ -0,0 +1,216 @@
+"""
+服务注册表模块 - 姿势分析、目标检测、语音助手、串口等服务只声明，首次使用或后台预热时才导入和初始化
+
+姿势分析模块导入时加载mediapipe，目标检测加载ultralytics，语音助手加载dashscope、pyaudio和snowboy，
+全部在启动时导入会让Web服务在数秒后才能响应第一个请求。注册表只记录每个服务的模块名和创建函数，
+Flask启动后由预热线程按顺序加载；请求用到尚未加载的服务时在请求线程中加载（同一服务只加载一次），
+未用到服务的页面和接口立即可用。每个服务的导入耗时和初始化耗时都会记录并打印。
+加载失败的服务（如串口或摄像头暂时不可用）在退避间隔之后的下一次使用时重新加载，间隔按失败次数加倍。
+
+用法（应用入口，见 app.py）：
+    services = create_service_registry()
+    setup_service_registry(services)   # modules.routes
+    services.start_warmup()
+"""
+import time
+import threading
+import importlib
+
+from config import SERIAL_BAUDRATE
+from modules.metrics_module import registry
+
+# 服务加载相关配置
+WARMUP_ORDER = ('video_stream', 'posture', 'serial', 'detection', 'chatbot')  # 预热线程的加载顺序
+WARMUP_DELAY = 0.5   # 预热线程开始前的等待时间（秒），让Web服务先完成启动
+RETRY_INTERVAL = 5.0        # 服务加载失败后第一次重试前的等待时间（秒），之后每次失败加倍
+RETRY_MAX_INTERVAL = 300.0  # 重试等待时间的上限（秒）
+
+SERVICE_LOAD_SECONDS = registry.gauge('service_load_seconds', '服务的导入和初始化耗时（秒）', ('service', 'phase'))
+SERVICE_READY = registry.gauge('service_ready', '服务是否已加载完成', ('service',))
+
+# 服务状态
+STATE_PENDING = 'pending'   # 尚未加载
+STATE_LOADING = 'loading'   # 正在导入或初始化
+STATE_READY = 'ready'       # 加载完成
+STATE_FAILED = 'failed'     # 导入或初始化失败，退避间隔之后可以重新加载
+
+
+class ServiceSpec:
+    """一个服务的声明：模块名、创建函数、依赖的其他服务和加载状态"""
+    def __init__(self, name, module, factory, depends=()):
+        """
+        Args:
+            name: 服务名称
+            module: 服务所在的模块名，加载时才导入
+            factory: 创建函数 factory(module, **依赖的服务实例)，返回服务实例
+            depends: 依赖的服务名称，加载本服务前先加载
+        """
+        self.name = name
+        self.module = module
+        self.factory = factory
+        self.depends = tuple(depends)
+        self.lock = threading.Lock()
+        self.state = STATE_PENDING
+        self.instance = None
+        self.error = None
+        self.import_seconds = None
+        self.init_seconds = None
+        self.loaded_at = None     # 加载完成时距注册表创建的秒数
+        self.loaded_by = None     # 'warmup' 或 'request'
+        self.failures = 0         # 连续加载失败的次数
+        self.retry_at = 0         # 加载失败后允许重新加载的时间
+
+    def get_stats(self):
+        return {
+            'state': self.state,
+            'module': self.module,
+            'depends': list(self.depends),
+            'import_seconds': self.import_seconds,
+            'init_seconds': self.init_seconds,
+            'loaded_at': self.loaded_at,
+            'loaded_by': self.loaded_by,
+            'error': self.error,
+            'failures': self.failures,
+            'retry_in': round(max(0.0, self.retry_at - time.time()), 1) if self.state == STATE_FAILED else None
+        }
+
+
+class ServiceRegistry:
+    """服务注册表"""
+    def __init__(self, retry_interval=RETRY_INTERVAL, retry_max_interval=RETRY_MAX_INTERVAL):
+        """
+        Args:
+            retry_interval: 服务加载失败后第一次重试前的等待时间（秒）
+            retry_max_interval: 重试等待时间的上限（秒）
+        """
+        self.services = {}
+        self.retry_interval = retry_interval
+        self.retry_max_interval = retry_max_interval
+        self.created_at = time.time()
+        self.warmup_thread = None
+        self.warmup_done = threading.Event()
+
+    def register(self, name, module, factory, depends=()):
+        """声明一个服务（不导入模块）"""
+        self.services[name] = ServiceSpec(name, module, factory, depends)
+        SERVICE_READY.labels(name).set(0)
+
+    def get(self, name, timeout=None, loaded_by='request'):
+        """获取服务实例，尚未加载时在当前线程中加载
+
+        其他线程正在加载同一服务时等待其完成，最多等待timeout秒（None表示一直等待）。
+        上次加载失败且已过退避间隔时重新加载，退避间隔内直接返回None。
+
+        Returns:
+            服务实例，服务不存在、加载失败或等待超时时返回None
+        """
+        spec = self.services.get(name)
+        if spec is None:
+            return None
+        if spec.state == STATE_READY:
+            return spec.instance
+        if spec.state == STATE_FAILED and time.time() < spec.retry_at:
+            return None
+
+        if not spec.lock.acquire(timeout=-1 if timeout is None else timeout):
+            return None
+        try:
+            if spec.state == STATE_PENDING or (spec.state == STATE_FAILED and time.time() >= spec.retry_at):
+                self._load(spec, loaded_by)
+        finally:
+            spec.lock.release()
+        return spec.instance
+
+    def peek(self, name):
+        """获取已加载的服务实例，未加载时返回None（不触发加载）"""
+        spec = self.services.get(name)
+        return spec.instance if spec is not None and spec.state == STATE_READY else None
+
+    def _load(self, spec, loaded_by):
+        """导入模块并创建服务实例（调用方持有spec.lock）"""
+        spec.state = STATE_LOADING
+        try:
+            dependencies = {}
+            for dependency in spec.depends:
+                instance = self.get(dependency, loaded_by=loaded_by)
+                if instance is None:
+                    raise RuntimeError(f"依赖的服务 {dependency} 不可用")
+                dependencies[dependency] = instance
+
+            start_time = time.time()
+            module = importlib.import_module(spec.module)
+            spec.import_seconds = round(time.time() - start_time, 3)
+
+            start_time = time.time()
+            spec.instance = spec.factory(module, **dependencies)
+            spec.init_seconds = round(time.time() - start_time, 3)
+
+            spec.state = STATE_READY
+            spec.error = None
+            spec.failures = 0
+            spec.loaded_at = round(time.time() - self.created_at, 3)
+            spec.loaded_by = loaded_by
+            SERVICE_LOAD_SECONDS.labels(spec.name, 'import').set(spec.import_seconds)
+            SERVICE_LOAD_SECONDS.labels(spec.name, 'init').set(spec.init_seconds)
+            SERVICE_READY.labels(spec.name).set(1)
+            print(f"服务 {spec.name} 加载完成（{'预热' if loaded_by == 'warmup' else '首次请求'}）："
+                  f"导入 {spec.import_seconds:.3f} 秒，初始化 {spec.init_seconds:.3f} 秒")
+        except Exception as e:
+            spec.state = STATE_FAILED
+            spec.instance = None
+            spec.error = str(e)
+            spec.failures += 1
+            delay = min(self.retry_max_interval, self.retry_interval * 2 ** (spec.failures - 1))
+            spec.retry_at = time.time() + delay
+            print(f"服务 {spec.name} 加载失败（第 {spec.failures} 次）: {str(e)}，{delay:.0f} 秒后再次使用时重试")
+
+    def start_warmup(self, order=WARMUP_ORDER, delay=WARMUP_DELAY):
+        """启动预热线程，按顺序在后台加载服务"""
+        if self.warmup_thread is not None:
+            return
+        self.warmup_thread = threading.Thread(target=self._warmup, args=(order, delay),
+                                              name='service-warmup', daemon=True)
+        self.warmup_thread.start()
+
+    def _warmup(self, order, delay):
+        """预热线程：依次加载服务，完成后打印汇总"""
+        time.sleep(delay)
+        for name in order:
+            self.get(name, loaded_by='warmup')
+        self.warmup_done.set()
+        self.print_report()
+
+    def print_report(self):
+        """打印各服务的导入和初始化耗时"""
+        print("服务加载耗时:")
+        for name, spec in self.services.items():
+            if spec.state == STATE_READY:
+                print(f"  {name:<14} 导入 {spec.import_seconds:>7.3f} 秒  初始化 {spec.init_seconds:>7.3f} 秒  "
+                      f"启动后 {spec.loaded_at:>7.3f} 秒可用")
+            else:
+                print(f"  {name:<14} {spec.state}{'：' + spec.error if spec.error else ''}")
+
+    def get_stats(self):
+        """获取各服务的加载状态和耗时"""
+        return {
+            'uptime_seconds': round(time.time() - self.created_at, 3),
+            'warmup_done': self.warmup_done.is_set(),
+            'services': {name: spec.get_stats() for name, spec in self.services.items()}
+        }
+
+
+def create_service_registry():
+    """创建声明了视频流、姿势分析、串口、目标检测和语音助手服务的注册表"""
+    services = ServiceRegistry()
+    services.register('video_stream', 'modules.video_stream_module',
+                      lambda module: module.VideoStreamHandler())
+    services.register('posture', 'modules.posture_module',
+                      lambda module, video_stream: module.WebPostureMonitor(video_stream_handler=video_stream),
+                      depends=('video_stream',))
+    services.register('serial', 'modules.serial_module',
+                      lambda module: module.SerialCommunicationHandler(baudrate=SERIAL_BAUDRATE))
+    services.register('detection', 'modules.detection_module',
+                      lambda module: module.DetectionService())
+    services.register('chatbot', 'modules.chatbot_module',
+                      lambda module: module.ChatbotService())
+    return services
@@ -0,0 +1,160 @@
+"""
+坐姿抓拍保存模块 - 在独立线程中完成抓拍图像的编码/写盘、数据库插入和图片数量限制
+
+姿势线程只提交帧引用和元数据（不复制、不等待磁盘和数据库），保存线程逐个处理：
+有摄像头原始JPEG数据时直接写入，否则编码原始帧；插入 posture_images 记录后
+由 save_posture_image 按小时/按天清理一次超出数量限制的旧图片。
+"""
+import time
+import queue
+import threading
+
+from modules.metrics_module import registry
+
+# 抓拍保存相关配置
+SNAPSHOT_QUEUE_SIZE = 4   # 等待保存的抓拍数量上限，满时丢弃新的抓拍（抓拍间隔以分钟计，正常不会积压）
+
+SNAPSHOT_QUEUE_DEPTH = registry.gauge('posture_snapshot_queue_depth', '等待保存的坐姿抓拍数量')
+SNAPSHOT_SAVE_SECONDS = registry.histogram('posture_snapshot_save_seconds', '单张坐姿抓拍的保存耗时（编码、写盘、插入和清理，秒）')
+SNAPSHOTS = registry.counter('posture_snapshots_total', '坐姿抓拍的处理结果', ('result',))
+
+
+class _SnapshotJob:
+    """一次抓拍保存任务"""
+    __slots__ = ('frame', 'frame_ref', 'jpeg_bytes', 'metadata', 'label', 'submit_time')
+
+    def __init__(self, frame, frame_ref, jpeg_bytes, metadata, label):
+        self.frame = frame
+        self.frame_ref = frame_ref      # 持有引用的帧数据包，保存完成后释放
+        self.jpeg_bytes = jpeg_bytes
+        self.metadata = metadata        # save_posture_image 的其余参数
+        self.label = label
+        self.submit_time = time.time()
+
+    def release(self):
+        if self.frame_ref is not None:
+            self.frame_ref.release()
+            self.frame_ref = None
+
+
+class PostureSnapshotWriter:
+    """坐姿抓拍保存线程（多个摄像头的分析器共用，start/stop按使用者计数）"""
+    def __init__(self, queue_size=SNAPSHOT_QUEUE_SIZE):
+        """
+        Args:
+            queue_size: 等待保存的抓拍数量上限
+        """
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.is_running = False
+        self.thread = None
+        self.users = 0
+        # 保护使用者计数和线程的启动/停止，多个摄像头的分析器可能同时调用start/stop
+        self.users_lock = threading.Lock()
+
+        # 统计信息
+        self.stats = {
+            'submitted': 0,
+            'saved': 0,
+            'failed': 0,
+            'dropped': 0,
+            'last_save_ms': 0.0
+        }
+
+        SNAPSHOT_QUEUE_DEPTH.set_function(self.queue.qsize)
+
+    def start(self):
+        """启动保存线程（已在运行时只增加使用者计数）"""
+        with self.users_lock:
+            self.users += 1
+            if self.is_running:
+                return True
+            self.is_running = True
+            self.thread = threading.Thread(target=self._run, name='posture-snapshot', daemon=True)
+            self.thread.start()
+        return True
+
+    def stop(self, timeout=5.0):
+        """停止保存线程，退出前保存队列中剩余的抓拍（还有其他使用者时只减少计数）"""
+        with self.users_lock:
+            self.users = max(0, self.users - 1)
+            if not self.is_running or self.users > 0:
+                return
+            self.is_running = False
+            # 持有锁等待线程退出，避免旧线程还在保存剩余抓拍时又启动新线程
+            if self.thread:
+                self.thread.join(timeout=timeout)
+                self.thread = None
+
+    def submit(self, frame, metadata, packet=None, label=''):
+        """提交一张抓拍（不阻塞）
+
+        Args:
+            frame: 要保存的帧
+            metadata: save_posture_image 的其余参数（angle、is_bad_posture、posture_status、emotion、notes、device_id）
+            packet: frame所属的FramePacket；提供时持有其引用直到保存完成，并优先使用其中的原始JPEG数据，
+                    不提供时复制一份帧（调用方可能复用帧缓冲区）
+            label: 日志中显示的抓拍类型
+
+        Returns:
+            是否已进入保存队列
+        """
+        self.stats['submitted'] += 1
+        if packet is not None:
+            job = _SnapshotJob(frame, packet.retain(), packet.jpeg_bytes, metadata, label)
+        else:
+            job = _SnapshotJob(frame.copy(), None, None, metadata, label)
+
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except queue.Full:
+            job.release()
+            self.stats['dropped'] += 1
+            SNAPSHOTS.labels('dropped').inc()
+            print(f"抓拍保存队列已满，丢弃{label}坐姿抓拍")
+            return False
+
+    def _run(self):
+        """保存线程主循环"""
+        while self.is_running or not self.queue.empty():
+            try:
+                job = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                self._save(job)
+            finally:
+                job.release()
+
+    def _save(self, job):
+        """保存一张抓拍"""
+        from modules.database_module import save_posture_image
+
+        start_time = time.time()
+        try:
+            result = save_posture_image(image=job.frame, jpeg_bytes=job.jpeg_bytes, **job.metadata)
+        except Exception as e:
+            print(f"保存{job.label}坐姿抓拍时出错: {str(e)}")
+            result = None
+        elapsed = time.time() - start_time
+        SNAPSHOT_SAVE_SECONDS.observe(elapsed)
+        self.stats['last_save_ms'] = round(elapsed * 1000, 2)
+
+        if result:
+            self.stats['saved'] += 1
+            SNAPSHOTS.labels('saved').inc()
+            print(f"记录{job.label}坐姿图像成功，ID: {result['id']}，"
+                  f"排队 {(start_time - job.submit_time) * 1000:.0f} 毫秒，保存 {elapsed * 1000:.0f} 毫秒")
+        else:
+            self.stats['failed'] += 1
+            SNAPSHOTS.labels('failed').inc()
+            print(f"记录{job.label}坐姿图像失败")
+
+    def get_stats(self):
+        """获取抓拍保存统计信息"""
+        return {
+            **self.stats,
+            'running': self.is_running,
+            'users': self.users,
+            'queue_depth': self.queue.qsize()
+        }
@@ -0,0 +1,425 @@
+"""
+视频流广播模块 - 每个不同的 (视频流, 分辨率, 质量) 帧只编码一次，所有观看者共享同一份JPEG数据
+
+原来每个视频流生成器对每个客户端、每一帧各自调用 cv2.imencode，三个家长同时观看就要把同一幅画面编码三次。
+广播中心按 (视频流, 宽, 高, 质量) 缓存最近一次的编码结果，并记录其来源帧序号：
+观看者请求的帧序号不比缓存新时直接取缓存，否则只有一个观看者执行缩放、叠加和编码，
+同时到达的其他观看者等待其完成后复用结果。编码结果是不可变的bytes，已经拼好multipart分段头，
+生成器直接yield即可。
+
+每个观看者对应一个 StreamSession，保存自己的分辨率、JPEG质量、发送帧率和丢帧统计，
+一个慢速观看者调整自己的质量不会影响其他人；参数相同的会话共享同一份缩放和编码结果。
+"""
+import time
+import itertools
+import threading
+from collections import deque
+
+import cv2
+
+from modules.trace_module import tracer
+from modules.metrics_module import registry
+
+# 广播中心相关配置
+HUB_ENTRY_TTL = 10.0   # 编码缓存条目多久没有观看者读取就清除（秒），如分辨率或质量调整后的旧条目
+RATE_WINDOW = 5.0      # 计算编码/交付速率的时间窗口（秒）
+
+# 会话自适应质量配置（与原来全局的自适应质量控制相同的阈值）
+SESSION_QUALITY_INTERVAL = 3.0   # 质量调整间隔（秒）
+SESSION_SLOW_ENCODE = 0.02       # 单帧编码超过此时间（秒）时降低质量
+SESSION_KEEPALIVE_INTERVAL = 5.0 # 没有新帧时重发上一帧保持连接的间隔（秒）
+
+# 慢速客户端配置：写出一帧的平均耗时过长时只降低本会话的输出分辨率
+SESSION_DOWNSCALE_STEPS = (1.0, 0.75, 0.5, 0.25)  # 输出分辨率相对会话分辨率的缩放档位
+SESSION_SLOW_WRITE = 0.1         # 平均写出耗时超过此值（秒）时降一档
+SESSION_FAST_WRITE = 0.02        # 平均写出耗时低于此值（秒）时升一档
+SESSION_RESOLUTION_INTERVAL = 5.0  # 分辨率调整间隔（秒）
+
+HUB_ENCODES = registry.counter('video_stream_encodes_total', '视频流实际执行的JPEG编码次数', ('stream',))
+HUB_DELIVERIES = registry.counter('video_stream_frames_sent_total', '视频流发送给客户端的帧数', ('stream',))
+HUB_ENCODE_SECONDS = registry.histogram('video_stream_encode_seconds', '视频流单帧JPEG编码耗时（秒）', ('stream',))
+SESSION_WRITE_SECONDS = registry.histogram('video_stream_write_seconds', '视频流单帧写给客户端的耗时（秒）', ('stream',))
+
+MULTIPART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+
+
+class EncodedFrame:
+    """一帧编码结果（不可变，所有观看者共享）"""
+    __slots__ = ('seq', 'jpeg', 'part', 'width', 'height', 'quality', 'encode_seconds', 'timestamp')
+
+    def __init__(self, seq, jpeg, width, height, quality, encode_seconds):
+        self.seq = seq                  # 来源帧序号
+        self.jpeg = jpeg                # JPEG数据
+        self.part = MULTIPART_HEADER + jpeg + b'\r\n'  # multipart/x-mixed-replace 分段
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.encode_seconds = encode_seconds  # 缩放、叠加和编码耗时
+        self.timestamp = time.time()    # 编码完成时间
+
+
+class _HubEntry:
+    """一个 (视频流, 宽, 高, 质量) 的编码缓存"""
+    __slots__ = ('lock', 'frame', 'last_access')
+
+    def __init__(self):
+        self.lock = threading.Lock()   # 同一条目同时只有一个观看者编码
+        self.frame = None
+        self.last_access = time.time()
+
+
+class _RateMeter:
+    """最近一段时间内的事件速率（次/秒），没有新事件时逐渐降为0"""
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self.events = deque()
+        self.lock = threading.Lock()
+
+    def update(self, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            self.events.append(now)
+            self._trim(now)
+
+    def _trim(self, now):
+        while self.events and now - self.events[0] > self.window:
+            self.events.popleft()
+
+    def get_rate(self):
+        with self.lock:
+            self._trim(time.time())
+            return len(self.events) / self.window
+
+
+class _StreamStats:
+    """单个视频流的编码和交付统计"""
+    def __init__(self):
+        self.encodes = 0
+        self.deliveries = 0
+        self.encode_rate = _RateMeter()
+        self.delivery_rate = _RateMeter()
+        self.encode_times = deque(maxlen=50)
+        self.last_encoded_seq = -1
+
+    def get_stats(self):
+        return {
+            'encodes': self.encodes,
+            'deliveries': self.deliveries,
+            'encodes_per_second': round(self.encode_rate.get_rate(), 1),
+            'deliveries_per_second': round(self.delivery_rate.get_rate(), 1),
+            'deliveries_per_encode': round(self.deliveries / self.encodes, 2) if self.encodes else 0,
+            'avg_encode_ms': round(sum(self.encode_times) / len(self.encode_times) * 1000, 2) if self.encode_times else 0
+        }
+
+
+class StreamSession:
+    """一个观看者的视频流会话：自己的分辨率、JPEG质量、发送节奏和丢帧统计
+
+    慢速客户端的写出会阻塞自己的生成器，期间到达的新帧被跳过（下次总是发送最新帧），
+    平均写出耗时过长时本会话的输出分辨率逐档降低，不影响其他观看者和分析线程。
+    """
+    def __init__(self, session_id, stream, width=None, height=None, quality=90, max_fps=None,
+                 client='', adaptive_quality=False):
+        """
+        Args:
+            session_id: 会话编号
+            stream: 视频流名称
+            width, height: 输出分辨率，None表示与来源帧相同
+            quality: JPEG质量
+            max_fps: 最高发送帧率，None表示不限制
+            client: 客户端地址
+            adaptive_quality: 是否根据本会话的实际帧率和编码耗时自动调整质量
+        """
+        self.session_id = session_id
+        self.stream = stream
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.max_quality = quality        # 自适应质量回升的上限
+        self.max_fps = max_fps
+        self.client = client
+        self.adaptive_quality = adaptive_quality
+        self.started_at = time.time()
+
+        self.frames_sent = 0
+        self.frames_skipped = 0           # 两次发送之间被跳过的来源帧数
+        self.keepalives = 0               # 没有新帧时为保持连接重发的次数
+        self.last_seq = -1
+        self.last_send_time = 0
+        self.last_frame_size = None
+        self.send_rate = _RateMeter()
+        self.encode_times = deque(maxlen=20)
+        self.last_quality_adjust_time = 0
+
+        # 慢速客户端检测
+        self.write_times = deque(maxlen=20)  # 最近每帧写给客户端的耗时
+        self.lag = 0.0                       # 最近一帧从编码完成到写给客户端完成的时间
+        self.scale_index = 0                 # 当前的缩放档位（SESSION_DOWNSCALE_STEPS的下标）
+        self.last_resolution_adjust_time = time.time()
+
+    def output_size(self, frame):
+        """本会话输出的分辨率 (宽, 高)，按慢速客户端的缩放档位缩小"""
+        if self.width and self.height:
+            width, height = self.width, self.height
+        else:
+            width, height = frame.shape[1], frame.shape[0]
+        scale = SESSION_DOWNSCALE_STEPS[self.scale_index]
+        if scale < 1.0:
+            # 取偶数尺寸，相同档位的慢速客户端共享同一个编码变体
+            width, height = max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+        return width, height
+
+    def pace(self):
+        """按本会话的最高帧率等待到下一次发送时间"""
+        if not self.max_fps:
+            return
+        delay = self.last_send_time + 1.0 / self.max_fps - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_send(self, seq, keepalive=SESSION_KEEPALIVE_INTERVAL):
+        """序号为seq的帧是否需要发送：新帧总是发送，已发送过的帧只在距上次发送超过keepalive秒时重发"""
+        return seq != self.last_seq or time.time() - self.last_send_time >= keepalive
+
+    def record_sent(self, encoded, write_seconds=None):
+        """记录发送了一帧
+
+        Args:
+            encoded: 发送的EncodedFrame
+            write_seconds: 写给客户端的耗时（从yield到生成器恢复执行），None表示未测量
+        """
+        self.last_send_time = time.time()
+        if write_seconds is not None:
+            self.write_times.append(write_seconds)
+            SESSION_WRITE_SECONDS.labels(self.stream).observe(write_seconds)
+        if encoded.seq == self.last_seq:
+            # 重发的旧帧编码时间早，不计入延迟，否则延迟会随重发间隔不断增大
+            self.keepalives += 1
+            return
+        if write_seconds is not None:
+            self.lag = self.last_send_time - encoded.timestamp
+        if self.last_seq >= 0 and encoded.seq > self.last_seq + 1:
+            self.frames_skipped += encoded.seq - self.last_seq - 1
+        self.last_seq = encoded.seq
+        self.frames_sent += 1
+        self.last_frame_size = (encoded.width, encoded.height)
+        self.encode_times.append(encoded.encode_seconds)
+        self.send_rate.update(self.last_send_time)
+
+    def effective_fps(self):
+        """最近一段时间实际发送给本观看者的帧率"""
+        return self.send_rate.get_rate()
+
+    def adjust_quality(self, at_lowest_resolution=True):
+        """根据本会话的实际帧率和编码耗时调整JPEG质量（只影响本会话）
+
+        Args:
+            at_lowest_resolution: 分辨率是否已经是最低档，只有最低档时帧率过低才降低质量
+        """
+        if not self.adaptive_quality:
+            return
+        now = time.time()
+        if now - self.last_quality_adjust_time < SESSION_QUALITY_INTERVAL:
+            return
+        self.last_quality_adjust_time = now
+
+        fps = self.effective_fps()
+        avg_encode = sum(self.encode_times) / len(self.encode_times) if self.encode_times else 0
+        previous = self.quality
+
+        # 帧率过低且分辨率已经是最低时，逐级降低JPEG质量
+        if fps < 10 and at_lowest_resolution:
+            if self.quality > 70:
+                self.quality = 70
+            elif self.quality > 50 and fps < 7:
+                self.quality = 50
+            elif self.quality > 30 and fps < 5:
+                self.quality = 30
+        # 帧率恢复时提高JPEG质量
+        elif fps > 20:
+            self.quality = min(self.max_quality, self.quality + 10)
+        # 编码时间过长时降低质量
+        elif avg_encode > SESSION_SLOW_ENCODE and self.quality > 50:
+            self.quality = max(50, self.quality - 10)
+
+        if self.quality != previous:
+            print(f"视频流会话 {self.session_id}（{self.client}）帧率 {fps:.1f} FPS，"
+                  f"编码 {avg_encode * 1000:.1f}ms，JPEG质量 {previous} -> {self.quality}")
+
+    def adjust_resolution(self):
+        """根据写给本客户端的平均耗时升降本会话的输出分辨率（只影响本会话）"""
+        now = time.time()
+        if not self.write_times or now - self.last_resolution_adjust_time < SESSION_RESOLUTION_INTERVAL:
+            return
+        avg_write = sum(self.write_times) / len(self.write_times)
+        previous = self.scale_index
+
+        if avg_write > SESSION_SLOW_WRITE and self.scale_index < len(SESSION_DOWNSCALE_STEPS) - 1:
+            self.scale_index += 1
+        elif avg_write < SESSION_FAST_WRITE and self.scale_index > 0:
+            self.scale_index -= 1
+
+        if self.scale_index != previous:
+            self.last_resolution_adjust_time = now
+            self.write_times.clear()  # 重新测量新分辨率下的写出耗时
+            print(f"视频流会话 {self.session_id}（{self.client}）写出耗时 {avg_write * 1000:.0f}ms，"
+                  f"输出缩放 {SESSION_DOWNSCALE_STEPS[previous]} -> {SESSION_DOWNSCALE_STEPS[self.scale_index]}")
+
+    def get_stats(self):
+        """获取会话信息和统计"""
+        size = self.last_frame_size or (self.width, self.height)
+        total = self.frames_sent + self.frames_skipped
+        avg_write = sum(self.write_times) / len(self.write_times) if self.write_times else 0
+        return {
+            'id': self.session_id,
+            'stream': self.stream,
+            'client': self.client,
+            'resolution': f"{size[0]}x{size[1]}" if size[0] else 'source',
+            'quality': self.quality,
+            'adaptive_quality': self.adaptive_quality,
+            'max_fps': self.max_fps,
+            'effective_fps': round(self.effective_fps(), 1),
+            'frames_sent': self.frames_sent,
+            'frames_skipped': self.frames_skipped,
+            'skip_ratio': round(self.frames_skipped / total, 3) if total else 0,
+            'keepalives': self.keepalives,
+            'avg_write_ms': round(avg_write * 1000, 1),
+            'lag_ms': round(self.lag * 1000, 1),
+            'downscale': SESSION_DOWNSCALE_STEPS[self.scale_index],
+            'duration_seconds': round(time.time() - self.started_at, 1)
+        }
+
+
+class StreamBroadcastHub:
+    """视频流广播中心：按来源帧序号缓存编码结果，供所有观看者共享"""
+    def __init__(self, entry_ttl=HUB_ENTRY_TTL):
+        """
+        Args:
+            entry_ttl: 编码缓存条目无人读取后的保留时间（秒）
+        """
+        self.entry_ttl = entry_ttl
+        self.lock = threading.Lock()
+        self.entries = {}   # (视频流, 宽, 高, 质量) -> _HubEntry
+        self.streams = {}   # 视频流名称 -> _StreamStats
+        self.sessions = {}  # 会话编号 -> StreamSession
+        self._session_ids = itertools.count(1)
+        self.epoch = int(time.time() * 1000)  # 区分服务重启前后相同的帧序号
+
+    def _stream_stats(self, stream):
+        stats = self.streams.get(stream)
+        if stats is None:
+            stats = self.streams.setdefault(stream, _StreamStats())
+        return stats
+
+    def encode(self, stream, seq, frame, width, height, quality, render=None):
+        """获取来源帧的编码结果，同一个键和帧序号只编码一次
+
+        Args:
+            stream: 视频流名称，如 'pose'、'emotion'、'raw'
+            seq: 来源帧序号（单调递增），不大于缓存中的序号时直接返回缓存
+            frame: 来源帧（只读，不会被修改）
+            width, height: 输出分辨率，与来源帧不同时先缩放
+            quality: JPEG质量
+            render: 可选的叠加绘制函数 render(frame)，在缩放后的副本上绘制
+
+        Returns:
+            (EncodedFrame, 是否由本次调用编码)，编码失败时为 (None, False)
+        """
+        key = (stream, width, height, quality)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = _HubEntry()
+                self._evict_stale(time.time())
+            stats = self._stream_stats(stream)
+
+        encoded = False
+        with entry.lock:
+            entry.last_access = time.time()
+            cached = entry.frame
+            if cached is None or cached.seq < seq:
+                cached = self._encode(stream, seq, frame, width, height, quality, render, stats)
+                if cached is None:
+                    return None, False
+                entry.frame = cached
+                encoded = True
+
+        stats.deliveries += 1
+        stats.delivery_rate.update()
+        HUB_DELIVERIES.labels(stream).inc()
+        return cached, encoded
+
+    def _encode(self, stream, seq, frame, width, height, quality, render, stats):
+        """缩放、叠加并编码一帧（调用方持有条目锁）"""
+        start_time = time.time()
+        with tracer.span('stream.encode', 'stream'):
+            if frame.shape[1] != width or frame.shape[0] != height:
+                frame = cv2.resize(frame, (width, height))
+            elif render is not None:
+                frame = frame.copy()  # 叠加绘制不能修改共享的来源帧
+            if render is not None:
+                render(frame)
+            success, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        elapsed = time.time() - start_time
+        if not success:
+            return None
+
+        stats.encodes += 1
+        stats.encode_rate.update()
+        stats.encode_times.append(elapsed)
+        stats.last_encoded_seq = max(stats.last_encoded_seq, seq)
+        HUB_ENCODES.labels(stream).inc()
+        HUB_ENCODE_SECONDS.labels(stream).observe(elapsed)
+        return EncodedFrame(seq, buffer.tobytes(), width, height, quality, elapsed)
+
+    def _evict_stale(self, now):
+        """清除长时间无人读取的缓存条目（调用方持有self.lock）"""
+        stale = [key for key, entry in self.entries.items() if now - entry.last_access > self.entry_ttl]
+        for key in stale:
+            del self.entries[key]
+
+    def etag(self, stream, seq, width, height, quality):
+        """编码结果的ETag，不需要编码即可得到：来源帧序号在广播中心的生命周期内单调递增"""
+        return f"{stream}-{self.epoch:x}-{seq}-{width}x{height}-q{quality}"
+
+    def open_session(self, stream, **options):
+        """为一个观看者创建视频流会话，参数见 StreamSession"""
+        with self.lock:
+            session = StreamSession(next(self._session_ids), stream, **options)
+            self.sessions[session.session_id] = session
+        return session
+
+    def close_session(self, session):
+        """观看者断开时关闭会话"""
+        with self.lock:
+            self.sessions.pop(session.session_id, None)
+
+    def get_sessions(self, stream=None):
+        """获取当前的会话（可只取某个视频流的会话）"""
+        with self.lock:
+            return [s for s in self.sessions.values() if stream is None or s.stream == stream]
+
+    def list_sessions(self):
+        """获取所有会话的信息和统计"""
+        return [session.get_stats() for session in self.get_sessions()]
+
+    def last_encoded_seq(self, stream):
+        """视频流最近一次编码的来源帧序号，没有编码过时为-1"""
+        stats = self.streams.get(stream)
+        return stats.last_encoded_seq if stats else -1
+
+    def get_stats(self):
+        """获取各视频流的编码次数/速率和交付次数/速率"""
+        with self.lock:
+            variants = {}
+            for stream, width, height, quality in self.entries:
+                variants.setdefault(stream, []).append(f"{width}x{height}@{quality}")
+        streams = {}
+        for stream, stats in list(self.streams.items()):
+            streams[stream] = {**stats.get_stats(), 'variants': variants.get(stream, [])}
+        return {
+            'sessions': len(self.sessions),
+            'encodes_per_second': round(sum(s['encodes_per_second'] for s in streams.values()), 1),
+            'deliveries_per_second': round(sum(s['deliveries_per_second'] for s in streams.values()), 1),
+            'streams': streams
+        }
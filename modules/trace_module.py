@@ -0,0 +1,152 @@
+"""
+追踪模块 - 记录热路径各阶段的耗时片段（span），保存在固定大小的环形缓冲区中，可导出为Chrome trace-event JSON
+
+开销说明：每个片段只调用两次 time.perf_counter_ns() 并向 deque(maxlen) 追加一个元组，
+deque追加在GIL下是原子操作，不需要额外加锁，因此可以在生产环境中常开。
+导出结果可在 chrome://tracing 或 https://ui.perfetto.dev 中查看。
+"""
+import os
+import time
+import threading
+from collections import deque
+
+# 追踪相关配置
+TRACE_RING_SIZE = 20000   # 环形缓冲区保留的片段数量
+
+
+class _Span:
+    """片段上下文管理器"""
+    __slots__ = ('tracer', 'name', 'category', 'start_ns')
+
+    def __init__(self, tracer, name, category):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.start_ns = 0
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self.name, self.start_ns, time.perf_counter_ns(), self.category)
+        return False
+
+
+class _NullSpan:
+    """追踪关闭时使用的空上下文管理器"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """片段追踪器"""
+    def __init__(self, ring_size=TRACE_RING_SIZE):
+        """
+        Args:
+            ring_size: 环形缓冲区保留的片段数量
+        """
+        self.enabled = True
+        self._ring = deque(maxlen=ring_size)
+        self._pid = os.getpid()
+        # perf_counter_ns没有绝对起点，导出时以追踪器创建时刻为零点
+        self._origin_ns = time.perf_counter_ns()
+
+    def span(self, name, category='pipeline'):
+        """创建一个片段上下文管理器
+
+        用法：
+            with tracer.span('pose.process', 'pose'):
+                ...
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category)
+
+    def record(self, name, start_ns, end_ns, category='pipeline'):
+        """记录一个已完成的片段（时间为 time.perf_counter_ns() 的返回值）"""
+        if self.enabled:
+            self._ring.append((name, category, start_ns, end_ns - start_ns, threading.get_ident()))
+
+    def clear(self):
+        """清空环形缓冲区"""
+        self._ring.clear()
+
+    def get_summary(self):
+        """按片段名称汇总缓冲区内的调用次数和平均耗时（毫秒）"""
+        summary = {}
+        for name, _, _, duration_ns, _ in list(self._ring):
+            item = summary.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            duration_ms = duration_ns / 1e6
+            item['count'] += 1
+            item['total_ms'] += duration_ms
+            item['max_ms'] = max(item['max_ms'], duration_ms)
+        for item in summary.values():
+            item['avg_ms'] = round(item['total_ms'] / item['count'], 3)
+            item['total_ms'] = round(item['total_ms'], 3)
+            item['max_ms'] = round(item['max_ms'], 3)
+        return summary
+
+    def export_chrome_trace(self, last_seconds=None):
+        """导出为Chrome trace-event格式
+
+        Args:
+            last_seconds: 只导出最近这么多秒内的片段，None表示全部
+
+        Returns:
+            可直接序列化为JSON的字典
+        """
+        spans = list(self._ring)
+        if last_seconds is not None and spans:
+            cutoff_ns = time.perf_counter_ns() - int(last_seconds * 1e9)
+            spans = [span for span in spans if span[2] >= cutoff_ns]
+
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        events = []
+        thread_ids = set()
+        for name, category, start_ns, duration_ns, thread_id in spans:
+            thread_ids.add(thread_id)
+            events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': (start_ns - self._origin_ns) / 1000.0,  # 微秒
+                'dur': duration_ns / 1000.0,
+                'pid': self._pid,
+                'tid': thread_id
+            })
+
+        # 线程名称元数据，便于在查看器中区分分发、姿势、情绪等线程
+        for thread_id in thread_ids:
+            events.append({
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': self._pid,
+                'tid': thread_id,
+                'args': {'name': thread_names.get(thread_id, str(thread_id))}
+            })
+
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms'
+        }
+
+    def get_stats(self):
+        """获取追踪器统计信息"""
+        return {
+            'enabled': self.enabled,
+            'spans': len(self._ring),
+            'ring_size': self._ring.maxlen
+        }
+
+
+# 全局追踪器，各模块共用同一个环形缓冲区
+tracer = Tracer()
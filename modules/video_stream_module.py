@@ -6,12 +6,14 @@ import numpy as np
 import time
 import threading
 from collections import deque
-import queue
 from config import DEBUG
+from modules.trace_module import tracer
+from modules.metrics_module import registry, FPSCounter
+from modules.frame_broker_module import FrameMailbox
+from modules.stream_hub_module import StreamBroadcastHub, SESSION_KEEPALIVE_INTERVAL
 
 # 帧率和分辨率相关配置
 STREAM_FPS_TARGET = 25  # 目标流帧率
-MAX_QUEUE_SIZE = 10     # 最大队列大小
 DEFAULT_STREAM_WIDTH = 640  # 默认流宽度
 DEFAULT_STREAM_HEIGHT = 480  # 默认流高度
 
@@ -26,50 +28,26 @@ FPS_THRESHOLD_LOW = 15.0  # 低帧率阈值，低于此值降低分辨率
 FPS_THRESHOLD_HIGH = 28.0  # 高帧率阈值，高于此值可以尝试提高分辨率
 RESOLUTION_ADJUST_INTERVAL = 5.0  # 分辨率调整间隔（秒）
 
-# 帧率计算类
-class FPSCounter:
-    """计算并跟踪帧率"""
-    def __init__(self, window_size=10):  # 减小窗口大小为10以获得更实时的帧率
-        """初始化帧率计数器
-        
-        Args:
-            window_size: 计算平均帧率的时间窗口大小（帧数）
-        """
-        self.window_size = window_size
-        self.timestamps = deque(maxlen=window_size)
-        self.last_fps = 0
-        self.total_frames = 0
-    
-    def update(self):
-        """记录一帧的时间戳并更新帧率"""
-        self.timestamps.append(time.time())
-        self.total_frames += 1
-        
-        # 至少需要2个时间戳才能计算帧率
-        if len(self.timestamps) >= 2:
-            # 计算时间差（秒）
-            time_diff = self.timestamps[-1] - self.timestamps[0]
-            if time_diff > 0:
-                # 计算当前窗口内的平均帧率
-                self.last_fps = (len(self.timestamps) - 1) / time_diff
-            else:
-                self.last_fps = 0
-        
-        return self.last_fps
-    
-    def get_fps(self):
-        """获取当前帧率"""
-        return self.last_fps
-    
-    def get_total_frames(self):
-        """获取总帧数"""
-        return self.total_frames
-    
-    def reset(self):
-        """重置帧率计数器"""
-        self.timestamps.clear()
-        self.last_fps = 0
-        # 不重置total_frames，这样可以保留总计数
+# 客户端可选的分辨率参数
+STREAM_RESOLUTION_PRESETS = {
+    'high': (720, 540),     # 720p equivalent for 4:3
+    'medium': (640, 480),   # 480p 标准
+    'low': (320, 240),      # 240p 低分辨率
+    '720p': (720, 540),
+    '480p': (640, 480),
+    '360p': (480, 360),
+    '240p': (320, 240)
+}
+
+# 快照配置（仪表盘缩略图）
+SNAPSHOT_STREAMS = ('raw', 'pose', 'emotion')  # 可获取快照的视频流
+SNAPSHOT_QUALITY = 90         # 快照默认JPEG质量（与 /video_feed 相同，可共享编码结果）
+SNAPSHOT_VIEWER_LEASE = 5.0   # 请求分析视频流快照后分析线程继续发布分析帧的时间（秒）
+
+# 视频流指标（编码耗时和发送帧数由广播中心记录）
+VIDEO_DROPPED_FRAMES = registry.counter('video_stream_dropped_frames_total', '有观看者时还没发送就被新帧替换的分析视频帧数')
+VIDEO_VIEWERS = registry.gauge('video_stream_viewers', '分析视频流的当前观看者数量', ('stream',))
+VIDEO_STREAM_FPS = registry.gauge('video_stream_fps', '分析视频流的输出帧率', ('stream',))
 
 class VideoStreamHandler:
     """视频流处理类"""
@@ -81,20 +59,27 @@ class VideoStreamHandler:
             process_height: 处理高度（可选），默认使用DEFAULT_STREAM_HEIGHT
         """
         print(f"DEBUG: 初始化VideoStreamHandler，宽度={process_width}，高度={process_height}")
-        # 初始化队列
-        self.pose_frame_queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
-        self.emotion_frame_queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
-        
         # 默认空帧（灰色）
         self.default_frame = self._create_default_frame()
         print(f"DEBUG: 创建默认帧大小 {self.default_frame.shape}")
         
-        # 最后一帧（用于无帧时重复输出）
-        self.last_pose_frame = self.default_frame.copy()
-        self.last_emotion_frame = self.default_frame.copy()
+        # 最新的分析帧信箱，所有观看者阻塞等待同一路的新版本帧（版本0为默认空帧）
+        self.mailboxes = {
+            'pose': FrameMailbox('pose', self.default_frame.copy()),
+            'emotion': FrameMailbox('emotion', self.default_frame.copy())
+        }
         
         # 初始化原始帧属性
         self.last_raw_frame = None
+        self.last_raw_seq = -1
+        self._last_raw_packet = None   # 最近原始帧所在的数据包（持有一次引用，帧缓冲区不会被复用）
+        self._raw_lock = threading.Lock()
+        
+        # 广播中心 - 同一帧在相同分辨率和质量下只编码一次，所有观看者共享编码结果
+        self.broadcast_hub = StreamBroadcastHub()
+        
+        # 帧分发器（由姿势监测器设置），原始视频流通过订阅获取摄像头帧
+        self.frame_broker = None
         
         # 当前流分辨率（可动态调整）
         self.stream_width = process_width if process_width is not None else DEFAULT_STREAM_WIDTH
@@ -122,14 +107,25 @@ class VideoStreamHandler:
         # 调试信息
         self.debug = DEBUG
         
-        # 处理压缩质量
+        # 处理压缩质量（新的分析视频流会话的默认值，每个会话各自调整）
         self.jpeg_quality = 90  # 默认JPEG压缩质量
         self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
         
-        # 自适应质量控制
+        # 自适应质量控制（按会话进行，一个慢速观看者不影响其他观看者）
         self.adaptive_quality = True  # 是否启用自适应质量控制
-        self.quality_adjust_interval = 3.0  # 质量调整间隔（秒）
-        self.last_quality_adjust_time = 0
+        
+        # 分析视频流的当前观看者数量
+        self._viewers = {'pose': 0, 'emotion': 0}
+        self._viewers_lock = threading.Lock()
+        
+        # 快照请求视为短时观看：到期时间之前分析线程继续发布分析帧
+        self._snapshot_leases = {'pose': 0, 'emotion': 0}
+        
+        # 注册到指标注册表
+        VIDEO_VIEWERS.labels('pose').set_function(lambda: self._viewers['pose'])
+        VIDEO_VIEWERS.labels('emotion').set_function(lambda: self._viewers['emotion'])
+        VIDEO_STREAM_FPS.labels('pose').set_function(lambda: self.pose_stream_fps.get_fps())
+        VIDEO_STREAM_FPS.labels('emotion').set_function(lambda: self.emotion_stream_fps.get_fps())
         
         # 性能监控
         self.performance_stats = {
@@ -140,6 +136,33 @@ class VideoStreamHandler:
         
         print("DEBUG: VideoStreamHandler初始化完成")
     
+    def _viewer_connected(self, stream):
+        """记录一个分析视频流观看者连接"""
+        with self._viewers_lock:
+            self._viewers[stream] += 1
+            count = self._viewers[stream]
+        print(f"{'姿势' if stream == 'pose' else '情绪'}视频流观看者连接，当前 {count} 个")
+    
+    def _viewer_disconnected(self, stream):
+        """记录一个分析视频流观看者断开"""
+        with self._viewers_lock:
+            self._viewers[stream] = max(0, self._viewers[stream] - 1)
+            count = self._viewers[stream]
+        print(f"{'姿势' if stream == 'pose' else '情绪'}视频流观看者断开，当前 {count} 个")
+    
+    def has_viewers(self, stream):
+        """指定的分析视频流（'pose' 或 'emotion'）是否有观看者（包括最近请求过快照的客户端）
+
+        快照租约不要求开启视频流：/api/snapshot 在视频流关闭时也需要分析线程发布分析帧
+        """
+        if time.time() < self._snapshot_leases.get(stream, 0):
+            return True
+        return self.is_streaming and self._viewers.get(stream, 0) > 0
+    
+    def set_frame_broker(self, frame_broker):
+        """设置帧分发器，原始视频流从分发器订阅帧而不是直接读取摄像头"""
+        self.frame_broker = frame_broker
+    
     def _create_default_frame(self):
         """创建默认空帧（灰色背景）"""
         frame = np.ones((DEFAULT_STREAM_HEIGHT, DEFAULT_STREAM_WIDTH, 3), dtype=np.uint8) * 200
@@ -205,63 +228,50 @@ class VideoStreamHandler:
         return best_index
 
     def add_pose_frame(self, frame):
-        """添加姿势分析帧到队列"""
+        """发布新的姿势分析帧"""
         if frame is None:
             return
             
-        with self._pose_lock:
-            # 保存原始帧，确保是未经任何处理的原始摄像头图像
-            if frame is not None and frame.size > 0:
-                # 创建一个深拷贝，以确保原始帧不受后续处理的影响
-                self.last_raw_frame = frame.copy()
-            
+        with tracer.span('stream.add_pose_frame', 'stream'), self._pose_lock:
             # 处理用于流传输的帧
-            resized_frame = self._prepare_frame_for_streaming(frame)
-            self.last_pose_frame = resized_frame
-            
-            # 尝试向队列添加帧，如果队列满则丢弃旧帧
-            if self.pose_frame_queue.full():
-                try:
-                    self.pose_frame_queue.get_nowait()  # 丢弃最旧的帧
-                    self.performance_stats['dropped_frames'] += 1
-                except queue.Empty:
-                    pass
-                    
-            try:
-                self.pose_frame_queue.put_nowait(resized_frame)
-            except queue.Full:
-                # 队列已满，忽略
-                self.performance_stats['dropped_frames'] += 1
-                pass
+            self._publish_frame('pose', self._prepare_frame_for_streaming(frame))
     
     def add_emotion_frame(self, frame):
-        """添加情绪分析帧到队列"""
+        """发布新的情绪分析帧"""
         if frame is None:
             return
             
-        with self._emotion_lock:
-            resized_frame = self._prepare_frame_for_streaming(frame)
-            self.last_emotion_frame = resized_frame
-            
-            # 尝试向队列添加帧，如果队列满则丢弃旧帧
-            if self.emotion_frame_queue.full():
-                try:
-                    self.emotion_frame_queue.get_nowait()  # 丢弃最旧的帧
-                    self.performance_stats['dropped_frames'] += 1
-                except queue.Empty:
-                    pass
-                    
-            try:
-                self.emotion_frame_queue.put_nowait(resized_frame)
-            except queue.Full:
-                # 队列已满，忽略
+        with tracer.span('stream.add_emotion_frame', 'stream'), self._emotion_lock:
+            self._publish_frame('emotion', self._prepare_frame_for_streaming(frame))
+    
+    def _publish_frame(self, stream, frame):
+        """将新帧放入信箱并唤醒观看者；有观看者但上一帧还没编码发送时计为丢弃（调用方持有该视频流的锁）
+        
+        视频流帧率按发布给观看者的新帧统计，与观看者数量和各自的质量无关，
+        流分辨率（所有观看者共用的缩放结果）也在这里按帧率调整。
+        """
+        mailbox = self.mailboxes[stream]
+        previous = mailbox.version
+        if self.has_viewers(stream):
+            if previous > 0 and self._viewers[stream] > 0 and self.broadcast_hub.last_encoded_seq(stream) < previous:
                 self.performance_stats['dropped_frames'] += 1
-                pass
+                VIDEO_DROPPED_FRAMES.inc()
+            if stream == 'pose':
+                self.pose_stream_fps.update()
+                self._adjust_stream_resolution(self.pose_stream_fps.get_fps(), self.emotion_stream_fps.get_fps())
+            else:
+                self.emotion_stream_fps.update()
+        mailbox.publish(frame)
     
     def _prepare_frame_for_streaming(self, frame):
-        """准备帧用于流传输（调整尺寸和优化图像）"""
+        """准备帧用于流传输（调整尺寸和优化图像）
+        
+        返回的帧归视频流处理器所有：传入的帧可能是分析线程的池化缓冲区，
+        调用返回后会被复用，因此尺寸无需调整时也要复制一份
+        """
         if frame is None:
             return self.default_frame.copy()
+        source_frame = frame
             
         # 调整尺寸以匹配当前流分辨率
         if frame.shape[1] != self.stream_width or frame.shape[0] != self.stream_height:
@@ -291,6 +301,10 @@ class VideoStreamHandler:
             if self.jpeg_quality < 50:
                 frame = cv2.convertScaleAbs(frame, alpha=0.9, beta=10)  # 轻微提高亮度和对比度
         
+        # 没有产生新数组（或只是跳采样视图）时复制一份，避免引用调用方的缓冲区
+        if np.may_share_memory(frame, source_frame):
+            frame = frame.copy()
+        
         return frame
     
     def _adjust_stream_resolution(self, pose_fps, emotion_fps):
@@ -326,217 +340,153 @@ class VideoStreamHandler:
             self.pose_stream_fps.reset()
             self.emotion_stream_fps.reset()
     
-    def _adjust_stream_quality(self, stream_fps):
-        """根据当前帧率动态调整压缩质量"""
-        if not self.adaptive_quality:
-            return
-            
-        current_time = time.time()
-        if (current_time - self.last_quality_adjust_time) < self.quality_adjust_interval:
-            return
-            
-        # 计算平均压缩时间
-        avg_compression_time = 0
-        if self.performance_stats['compression_time']:
-            avg_compression_time = sum(self.performance_stats['compression_time']) / len(self.performance_stats['compression_time'])
-        
-        # 当帧率过低且分辨率已经是最低时，降低JPEG质量
-        if stream_fps < 10 and self.current_resolution_index >= len(STREAM_RESOLUTION_LEVELS) - 1:
-            if self.jpeg_quality > 70:
-                self.jpeg_quality = 70
-                self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
-                print(f"帧率低于10FPS，降低JPEG质量至 {self.jpeg_quality}")
-            elif self.jpeg_quality > 50 and stream_fps < 7:
-                self.jpeg_quality = 50
-                self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
-                print(f"帧率极低，进一步降低JPEG质量至 {self.jpeg_quality}")
-            elif self.jpeg_quality > 30 and stream_fps < 5:
-                self.jpeg_quality = 30
-                self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
-                print(f"帧率严重不足，将JPEG质量降至最低 {self.jpeg_quality}")
-        
-        # 当帧率恢复时提高JPEG质量
-        elif stream_fps > 20:
-            if self.jpeg_quality < 90:
-                new_quality = min(90, self.jpeg_quality + 10)
-                self.jpeg_quality = new_quality
-                self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
-                print(f"帧率恢复至 {stream_fps:.1f} FPS，提高JPEG质量至 {self.jpeg_quality}")
-        
-        # 压缩时间过长时降低质量
-        elif avg_compression_time > 0.02 and self.jpeg_quality > 50:  # 如果压缩一帧超过20ms
-            self.jpeg_quality = max(50, self.jpeg_quality - 10)
-            self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
-            print(f"压缩时间过长 ({avg_compression_time*1000:.1f}ms)，降低JPEG质量至 {self.jpeg_quality}")
-        
-        self.last_quality_adjust_time = current_time
-    
     def get_pose_frame(self):
-        """获取下一帧姿势分析帧"""
-        try:
-            frame = self.pose_frame_queue.get_nowait()
-            self.pose_stream_fps.update()
-            
-            # 获取当前帧率
-            pose_fps = self.pose_stream_fps.get_fps()
-            emotion_fps = self.emotion_stream_fps.get_fps()
-            
-            # 动态调整流分辨率
-            self._adjust_stream_resolution(pose_fps, emotion_fps)
-            
-            # 动态调整流质量
-            self._adjust_stream_quality(min(pose_fps, emotion_fps))
-            
-            return frame
-        except queue.Empty:
-            # 队列为空，返回上一帧
-            if self.debug:
-                print("姿势分析帧队列为空，重复使用上一帧")
-                
-            # 仍然更新帧率计数器（如果重复使用上一帧也计入）
-            self.pose_stream_fps.update()
-            return self.last_pose_frame
+        """获取最新的姿势分析帧及其序号 (seq, frame)，多个观看者读取同一帧"""
+        return self.mailboxes['pose'].latest()
     
     def get_emotion_frame(self):
-        """获取下一帧情绪分析帧"""
-        try:
-            frame = self.emotion_frame_queue.get_nowait()
-            self.emotion_stream_fps.update()
-            return frame
-        except queue.Empty:
-            # 队列为空，返回上一帧
-            if self.debug:
-                print("情绪分析帧队列为空，重复使用上一帧")
-                
-            # 仍然更新帧率计数器（如果重复使用上一帧也计入）
-            self.emotion_stream_fps.update()
-            return self.last_emotion_frame
+        """获取最新的情绪分析帧及其序号 (seq, frame)，多个观看者读取同一帧"""
+        return self.mailboxes['emotion'].latest()
     
-    def generate_pose_video_stream(self):
+    def generate_pose_video_stream(self, client=None):
         """生成姿势分析视频流"""
+        return self._generate_analysis_stream('pose', "姿势检测", "仅显示角度信息", client)
+    
+    def generate_emotion_video_stream(self, client=None):
+        """生成情绪分析视频流"""
+        return self._generate_analysis_stream('emotion', "情绪检测", "仅显示情绪状态", client)
+    
+    def _generate_analysis_stream(self, stream, title, info_text, client=None):
+        """生成分析视频流：每个观看者一个会话，质量和发送节奏各自调整，
+        相同分辨率和质量的会话通过广播中心共享同一次编码
+        
+        Args:
+            stream: 'pose' 或 'emotion'
+            title, info_text: 视频流禁用时显示的信息帧文字
+            client: 客户端地址（显示在会话列表中）
+        """
         if not self.is_streaming:
-            # 创建静态信息帧，只显示当前头部角度，不传输视频
-            static_frame = self._create_info_frame("姿势检测", "视频流已禁用", "仅显示角度信息")
+            # 创建静态信息帧，不传输视频
+            static_frame = self._create_info_frame(title, "视频流已禁用", info_text)
             
             # 压缩并编码为JPEG
             success, encoded_image = cv2.imencode('.jpg', static_frame, self.stream_params)
             if success:
-                # 返回静态帧
+                # 重要：只返回一帧，而不是持续生成帧
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
-                
-                # 重要：只返回一帧，而不是持续生成帧
-                return
             return
-            
-        while self.is_streaming:
-            # 获取下一帧
-            frame = self.get_pose_frame()
-            
-            # 添加帧率和质量信息
-            fps = self.pose_stream_fps.get_fps()
-            fps_text = f"FPS: {fps:.1f} Q:{self.jpeg_quality}"
-            cv2.putText(frame, fps_text, (10, frame.shape[0] - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-            
-            # 记录压缩开始时间
-            compress_start = time.time()
-            
-            # 压缩并编码为JPEG
-            success, encoded_image = cv2.imencode('.jpg', frame, self.stream_params)
-            
-            # 记录压缩时间
-            compress_time = time.time() - compress_start
-            self.performance_stats['compression_time'].append(compress_time)
-            
-            if not success:
-                continue
-            
-            # 记录传输开始时间
-            transmission_start = time.time()
+        
+        mailbox = self.mailboxes[stream]
+        session = self.broadcast_hub.open_session(
+            stream, quality=self.jpeg_quality, max_fps=STREAM_FPS_TARGET,
+            client=client or '', adaptive_quality=self.adaptive_quality)
+        
+        # 统计当前观看者，分析线程只在有观看者时绘制叠加层
+        self._viewer_connected(stream)
+        try:
+            while self.is_streaming:
+                # 限制本会话的发送帧率不超过目标帧率，然后阻塞等待比上次发送更新的分析帧；
+                # 超时仍没有新帧时重发上一帧保持连接，被禁用视频流唤醒时不发送
+                session.pace()
+                seq, frame = mailbox.wait_newer(session.last_seq, timeout=SESSION_KEEPALIVE_INTERVAL)
+                if not session.should_send(seq):
+                    continue
                 
-            # 生成帧数据
-            yield (
-                b'--frame\r\n'
-                b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n'
-            )
-            
-            # 记录传输时间
-            transmission_time = time.time() - transmission_start
-            self.performance_stats['transmission_time'].append(transmission_time)
-            
-            # 根据当前帧率动态调整帧间延迟，提高平滑度
-            # 帧率低时可以减少延迟，帧率高时增加延迟避免过多帧传输
-            if fps < 10:
-                delay = 0.01  # 非常低的帧率，使用最小延迟
-            elif fps < STREAM_FPS_TARGET:
-                delay = 0.03  # 低于目标帧率，使用较小延迟
-            else:
-                # 帧率达到或超过目标时，调整延迟以匹配目标帧率
-                delay = max(0.01, 1.0/STREAM_FPS_TARGET - compress_time - transmission_time)
+                # 添加帧率和质量信息（在广播中心的副本上绘制，每个新帧的每种质量只绘制一次）
+                quality = session.quality
+                width, height = session.output_size(frame)
+                encoded, fresh = self.broadcast_hub.encode(
+                    stream, seq, frame, width, height, quality, render=self._fps_overlay(stream, quality))
+                if encoded is None:
+                    time.sleep(1.0 / STREAM_FPS_TARGET)
+                    continue
+                if fresh:
+                    self.performance_stats['compression_time'].append(encoded.encode_seconds)
                 
-            time.sleep(delay)
-    
-    def generate_emotion_video_stream(self):
-        """生成情绪分析视频流"""
-        if not self.is_streaming:
-            # 创建静态信息帧，只显示当前情绪信息，不传输视频
-            static_frame = self._create_info_frame("情绪检测", "视频流已禁用", "仅显示情绪状态")
-            
-            # 压缩并编码为JPEG
-            success, encoded_image = cv2.imencode('.jpg', static_frame, self.stream_params)
-            if success:
-                # 返回静态帧
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
+                # 生成帧数据（慢速客户端在这里阻塞的只是自己的生成器）
+                transmission_start = time.time()
+                yield encoded.part
+                transmission_time = time.time() - transmission_start
+                self.performance_stats['transmission_time'].append(transmission_time)
                 
-                # 重要：只返回一帧，而不是持续生成帧
-                return
-            return
-            
-        while self.is_streaming:
-            # 获取下一帧
-            frame = self.get_emotion_frame()
-            
-            # 添加帧率和质量信息
-            fps = self.emotion_stream_fps.get_fps()
-            fps_text = f"FPS: {fps:.1f} Q:{self.jpeg_quality}"
-            cv2.putText(frame, fps_text, (10, frame.shape[0] - 10),
+                # 按本会话的实际帧率和写出耗时调整本会话的JPEG质量和输出分辨率
+                session.record_sent(encoded, transmission_time)
+                session.adjust_quality(
+                    at_lowest_resolution=self.current_resolution_index >= len(STREAM_RESOLUTION_LEVELS) - 1)
+                session.adjust_resolution()
+        finally:
+            self.broadcast_hub.close_session(session)
+            self._viewer_disconnected(stream)
+    
+    def _fps_overlay(self, stream, quality):
+        """分析视频流的帧率和质量叠加层（视频流和快照使用同一个，共享的编码结果保持一致）"""
+        stream_fps = self.pose_stream_fps if stream == 'pose' else self.emotion_stream_fps
+        text = f"FPS: {stream_fps.get_fps():.1f} Q:{quality}"
+        def draw_fps(image):
+            cv2.putText(image, text, (10, image.shape[0] - 10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-            
-            # 记录压缩开始时间
-            compress_start = time.time()
-            
-            # 压缩并编码为JPEG
-            success, encoded_image = cv2.imencode('.jpg', frame, self.stream_params)
-            
-            # 记录压缩时间
-            compress_time = time.time() - compress_start
-            
-            if not success:
-                continue
-            
-            # 记录传输开始时间
-            transmission_start = time.time()
-                
-            # 生成帧数据
-            yield (
-                b'--frame\r\n'
-                b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n'
-            )
-            
-            # 记录传输时间
-            transmission_time = time.time() - transmission_start
-            
-            # 根据当前帧率动态调整帧间延迟
-            if fps < 10:
-                delay = 0.01
-            elif fps < STREAM_FPS_TARGET:
-                delay = 0.03
+        return draw_fps
+    
+    def _remember_raw_packet(self, packet):
+        """保存最近一帧原始帧，供订阅超时的观看者和快照使用（持有引用，替换时释放旧帧）"""
+        packet.retain()
+        with self._raw_lock:
+            previous, self._last_raw_packet = self._last_raw_packet, packet
+            self.last_raw_frame, self.last_raw_seq = packet.frame, packet.seq
+        if previous is not None:
+            previous.release()
+    
+    def _get_last_raw(self):
+        """获取最近一帧原始帧 (seq, frame, packet)；packet不为None时已为调用方增加引用，用完后release"""
+        with self._raw_lock:
+            packet = self._last_raw_packet
+            if packet is not None:
+                return packet.seq, packet.frame, packet.retain()
+            return self.last_raw_seq, self.last_raw_frame, None
+    
+    def get_snapshot(self, stream, size=None, quality=SNAPSHOT_QUALITY, known_etags=()):
+        """获取视频流最新帧的JPEG快照，与相同分辨率和质量的观看者共享广播中心的编码结果
+        
+        Args:
+            stream: SNAPSHOT_STREAMS 之一
+            size: 输出分辨率 (宽, 高)，None表示与来源帧相同
+            quality: JPEG质量
+            known_etags: 客户端已有快照的ETag（支持in判断，如 request.if_none_match）
+        
+        Returns:
+            (ETag, EncodedFrame)；最新帧的ETag在known_etags中时不编码，EncodedFrame为None；
+            没有可用的帧或编码失败时为 (None, None)
+        """
+        packet = None
+        render = None
+        if stream == 'raw':
+            packet = self.frame_broker.get_latest(retain=True) if self.frame_broker else None
+            if packet is not None:
+                seq, frame = packet.seq, packet.frame
             else:
-                delay = max(0.01, 1.0/STREAM_FPS_TARGET - compress_time - transmission_time)
-                
-            time.sleep(delay)
+                seq, frame, packet = self._get_last_raw()
+        else:
+            # 分析线程只在有观看者时发布分析帧，快照请求续期一段时间
+            self._snapshot_leases[stream] = time.time() + SNAPSHOT_VIEWER_LEASE
+            seq, frame = self.mailboxes[stream].latest()
+            render = self._fps_overlay(stream, quality)
+        
+        try:
+            if frame is None or frame.size == 0:
+                return None, None
+            width, height = size or (frame.shape[1], frame.shape[0])
+            etag = self.broadcast_hub.etag(stream, seq, width, height, quality)
+            if etag in known_etags:
+                return etag, None
+            encoded, _ = self.broadcast_hub.encode(stream, seq, frame, width, height, quality, render=render)
+            if encoded is None:
+                return None, None
+            # 缓存中可能已是更新的帧，ETag以实际返回的帧为准
+            return self.broadcast_hub.etag(stream, encoded.seq, width, height, quality), encoded
+        finally:
+            if packet is not None:
+                packet.release()
     
     def get_fps_info(self):
         """获取视频流帧率信息"""
@@ -572,8 +522,12 @@ class VideoStreamHandler:
         
         return True
     
+    def _analysis_sessions(self):
+        """当前的姿势和情绪分析视频流会话"""
+        return [session for session in self.broadcast_hub.get_sessions() if session.stream in ('pose', 'emotion')]
+    
     def set_streaming_quality(self, quality):
-        """设置流传输质量
+        """设置流传输质量（新会话的默认质量，同时应用到当前的分析视频流会话）
         
         Args:
             quality: JPEG压缩质量，范围1-100
@@ -581,45 +535,48 @@ class VideoStreamHandler:
         if 1 <= quality <= 100:
             self.jpeg_quality = quality
             self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+            for session in self._analysis_sessions():
+                session.quality = session.max_quality = quality
             print(f"设置JPEG压缩质量为 {self.jpeg_quality}")
             return True
         return False
     
     def set_quality_mode(self, adaptive=True):
-        """设置质量调整模式
+        """设置质量调整模式（同时应用到当前的分析视频流会话）
         
         Args:
             adaptive: 是否启用自适应质量调整
         """
         self.adaptive_quality = adaptive
+        for session in self._analysis_sessions():
+            session.adaptive_quality = adaptive
         print(f"{'启用' if adaptive else '禁用'}自适应质量控制")
         return True
     
     def get_pose_frame_queue(self):
-        """获取姿势帧队列（用于路由）"""
-        print("DEBUG: 请求获取姿势帧队列")
-        return self.pose_frame_queue
+        """兼容旧路由：分析帧不再放入队列（观看者通过广播中心共享最新帧），返回None"""
+        return None
     
     def get_emotion_frame_queue(self):
-        """获取情绪帧队列（用于路由）"""
-        print("DEBUG: 请求获取情绪帧队列")
-        return self.emotion_frame_queue
+        """兼容旧路由：分析帧不再放入队列（观看者通过广播中心共享最新帧），返回None"""
+        return None
     
-    def generate_video_frames(self, frame_queue, is_pose_stream=True):
+    def generate_video_frames(self, frame_queue, is_pose_stream=True, client=None):
         """生成视频流帧
         
         这是一个兼容方法，用于支持现有的路由调用
         
         Args:
-            frame_queue: 帧队列（通常来自get_pose_frame_queue或get_emotion_frame_queue）
+            frame_queue: 不再使用（保留参数以兼容路由调用）
             is_pose_stream: 是否是姿势分析流（True）或情绪分析流（False）
+            client: 客户端地址（显示在会话列表中）
         """
         print(f"DEBUG: 开始生成{'姿势' if is_pose_stream else '情绪'}视频流")
         
         if is_pose_stream:
-            return self.generate_pose_video_stream()
+            return self.generate_pose_video_stream(client)
         else:
-            return self.generate_emotion_video_stream()
+            return self.generate_emotion_video_stream(client)
     
     def get_performance_stats(self):
         """获取性能统计信息"""
@@ -632,10 +589,19 @@ class VideoStreamHandler:
         if self.performance_stats['transmission_time']:
             avg_transmission_ms = sum(self.performance_stats['transmission_time']) / len(self.performance_stats['transmission_time']) * 1000
         
+        # 广播中心：实际编码次数与交付给观看者的帧数之比即编码复用的效果
+        broadcast = self.broadcast_hub.get_stats()
+        
         return {
             'dropped_frames': self.performance_stats['dropped_frames'],
             'avg_compression_time_ms': round(avg_compression_ms, 2),
-            'avg_transmission_time_ms': round(avg_transmission_ms, 2)
+            'avg_transmission_time_ms': round(avg_transmission_ms, 2),
+            'viewers': dict(self._viewers),
+            'sessions': broadcast['sessions'],
+            'mailboxes': {stream: mailbox.get_stats() for stream, mailbox in self.mailboxes.items()},
+            'encodes_per_second': broadcast['encodes_per_second'],
+            'frames_delivered_per_second': broadcast['deliveries_per_second'],
+            'broadcast': broadcast['streams']
         }
     
     # 新增跳采样方法
@@ -689,6 +655,9 @@ class VideoStreamHandler:
     def disable_streaming(self):
         """禁用视频流传输"""
         self.is_streaming = False
+        # 唤醒等待新帧的观看者，让生成器及时退出
+        for mailbox in self.mailboxes.values():
+            mailbox.wake_all()
         print("DEBUG: 视频流传输已禁用")
         return True
         
@@ -696,40 +665,34 @@ class VideoStreamHandler:
         """获取视频流传输状态"""
         return self.is_streaming
     
-    def generate_raw_video_stream(self, resolution_param=None):
+    def generate_raw_video_stream(self, resolution_param=None, client=None):
         """生成原始视频流（完全无处理）用于家长监护
         
+        分辨率保存在本观看者的会话中，不修改其他观看者共用的流分辨率。
+        
         Args:
             resolution_param: 分辨率参数 ('high', 'medium', 'low') 或直接的(width, height)元组
+            client: 客户端地址（显示在会话列表中）
         """
-        # 设置分辨率
-        original_width, original_height = self.stream_width, self.stream_height
+        # 默认使用当前的流分辨率
+        width, height = self.stream_width, self.stream_height
         
         # 标准化分辨率参数
         if resolution_param:
             if isinstance(resolution_param, str):
                 # 根据字符串参数设置分辨率
-                resolution_map = {
-                    'high': (720, 540),     # 720p equivalent for 4:3
-                    'medium': (640, 480),   # 480p 标准
-                    'low': (320, 240),      # 240p 低分辨率
-                    '720p': (720, 540),
-                    '480p': (640, 480),
-                    '360p': (480, 360),
-                    '240p': (320, 240)
-                }
-                if resolution_param in resolution_map:
-                    self.stream_width, self.stream_height = resolution_map[resolution_param]
+                if resolution_param in STREAM_RESOLUTION_PRESETS:
+                    width, height = STREAM_RESOLUTION_PRESETS[resolution_param]
             elif isinstance(resolution_param, tuple) and len(resolution_param) == 2:
                 # 直接使用提供的宽高
-                self.stream_width, self.stream_height = resolution_param
+                width, height = resolution_param
         
-        print(f"DEBUG: 家长监护视频流分辨率设置为 {self.stream_width}x{self.stream_height}")
+        print(f"DEBUG: 家长监护视频流分辨率设置为 {width}x{height}")
         
         # 如果视频流未启动，返回纯色帧（不添加任何文本）
         if not self.is_streaming:
             # 创建纯色帧，不添加任何文本
-            static_frame = np.ones((self.stream_height, self.stream_width, 3), dtype=np.uint8) * 220
+            static_frame = np.ones((height, width, 3), dtype=np.uint8) * 220
             
             # 压缩并编码为JPEG
             success, encoded_image = cv2.imencode('.jpg', static_frame, self.stream_params)
@@ -737,106 +700,113 @@ class VideoStreamHandler:
                 # 返回静态帧
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
-            
-            # 恢复原始分辨率
-            self.stream_width, self.stream_height = original_width, original_height
             return
         
         # 计数器，用于周期性检查视频流状态
         frame_count = 0
         
+        # 订阅帧分发器 - 不再直接读取摄像头，避免与分析线程争抢帧
+        subscriber = None
+        if self.frame_broker:
+            subscriber = self.frame_broker.subscribe('raw_stream', max_fps=min(STREAM_FPS_TARGET, 15))
+        
+        # 本观看者的会话：使用高质量设置以保持原始画面质量，不做自适应调整
+        session = self.broadcast_hub.open_session(
+            'raw', width=width, height=height, quality=95, max_fps=min(STREAM_FPS_TARGET, 15), client=client or '')
+        
         # 主循环 - 只要流处于活动状态就继续生成帧
-        while self.is_streaming:
-            try:
-                # 获取原始摄像头帧 - 完全不添加任何处理
-                frame = None
-                
-                # 直接访问姿势监测器的摄像头
+        held = None  # 本次使用的最近原始帧数据包（持有引用）
+        try:
+            while self.is_streaming:
+                if held is not None:
+                    held.release()
+                    held = None
                 try:
-                    from app import posture_monitor
-                    if posture_monitor and hasattr(posture_monitor, 'cap') and posture_monitor.cap.isOpened():
-                        ret, raw_frame = posture_monitor.cap.read()
-                        if ret and raw_frame is not None and raw_frame.size > 0:
-                            frame = raw_frame.copy()  # 获取完全未处理的原始相机帧
-                            # 保存为最新原始帧
-                            self.last_raw_frame = frame.copy()
-                except Exception as e:
-                    print(f"ERROR: 直接访问摄像头失败: {str(e)}")
+                    # 获取原始摄像头帧 - 完全不添加任何处理
+                    frame = None
+                    packet = None
+                    seq = -1
                 
-                # 如果直接获取失败，尝试使用最近保存的原始帧
-                if frame is None and hasattr(self, 'last_raw_frame') and self.last_raw_frame is not None:
-                    frame = self.last_raw_frame.copy()
+                    if subscriber:
+                        packet = subscriber.read(timeout=1.0)
+                        if packet is not None and packet.frame is not None and packet.frame.size > 0:
+                            # 分发器中的帧为共享只读帧，后续只做缩放和编码，不需要复制
+                            frame, seq = packet.frame, packet.seq
+                            self._remember_raw_packet(packet)
                 
-                # 如果没有有效的原始帧，使用纯色帧
-                if frame is None or frame.size == 0:
-                    frame = np.ones((self.stream_height, self.stream_width, 3), dtype=np.uint8) * 220
+                    # 如果订阅获取失败，尝试使用最近保存的原始帧（广播中心已有其编码结果时不会重新编码）
+                    if frame is None:
+                        seq, frame, held = self._get_last_raw()
                 
-                # 仅调整分辨率，不添加任何文本或叠加
-                if frame.shape[1] != self.stream_width or frame.shape[0] != self.stream_height:
-                    try:
-                        frame = cv2.resize(frame, (self.stream_width, self.stream_height))
-                    except Exception as e:
-                        print(f"ERROR: 调整帧大小时出错: {str(e)}")
-                        # 使用纯色帧
-                        frame = np.ones((self.stream_height, self.stream_width, 3), dtype=np.uint8) * 220
+                    # 如果没有有效的原始帧，使用纯色帧
+                    if frame is None or frame.size == 0:
+                        frame, seq = np.ones((height, width, 3), dtype=np.uint8) * 220, -1
                 
-                # 压缩并编码为JPEG - 使用高质量设置以保持原始画面质量
-                stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), 95]
-                success, encoded_image = cv2.imencode('.jpg', frame, stream_params)
-                if success:
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
-                else:
-                    print("WARNING: 帧编码失败，使用备用帧")
-                    # 使用纯色备用帧
-                    backup_frame = np.ones((self.stream_height, self.stream_width, 3), dtype=np.uint8) * 200
-                    success, backup_encoded = cv2.imencode('.jpg', backup_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-                    if success:
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + backup_encoded.tobytes() + b'\r\n')
+                    # 已发送过的帧（订阅超时后的最近帧或纯色帧）只在保持连接时重发
+                    if session.should_send(seq):
+                        encoded, _ = self.broadcast_hub.encode('raw', seq, frame, *session.output_size(frame), session.quality)
+                        if encoded is not None:
+                            write_start = time.time()
+                            yield encoded.part
+                            session.record_sent(encoded, time.time() - write_start)
+                            session.adjust_resolution()
+                        else:
+                            print("WARNING: 帧编码失败，使用备用帧")
+                            # 使用纯色备用帧
+                            backup_frame = np.ones((height, width, 3), dtype=np.uint8) * 200
+                            success, backup_encoded = cv2.imencode('.jpg', backup_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+                            if success:
+                                yield (b'--frame\r\n'
+                                       b'Content-Type: image/jpeg\r\n\r\n' + backup_encoded.tobytes() + b'\r\n')
                 
-                # 每隔50帧检查一次视频流状态
-                frame_count += 1
-                if frame_count % 50 == 0:
-                    if not self.is_streaming:
-                        print("DEBUG: 视频流已停止，结束流生成")
-                        break
+                    # 每隔50帧检查一次视频流状态
+                    frame_count += 1
+                    if frame_count % 50 == 0:
+                        if not self.is_streaming:
+                            print("DEBUG: 视频流已停止，结束流生成")
+                            break
                 
-                # 控制帧率 - 基于当前系统性能动态调整
-                try:
-                    # 低性能设备使用较低帧率
-                    target_fps = min(STREAM_FPS_TARGET, 15)  # 最高15fps以减轻系统负担
-                    sleep_time = max(1.0 / target_fps - 0.01, 0.01)  # 确保至少有一些延迟
-                    time.sleep(sleep_time)
-                except:
-                    # 出错时使用安全的默认值
-                    time.sleep(0.067)  # 约15fps
+                    # 控制帧率 - 从分发器取到帧时由订阅者按帧率限速，否则基于当前系统性能动态调整
+                    if packet is not None:
+                        continue
+                    try:
+                        # 低性能设备使用较低帧率
+                        target_fps = min(STREAM_FPS_TARGET, 15)  # 最高15fps以减轻系统负担
+                        sleep_time = max(1.0 / target_fps - 0.01, 0.01)  # 确保至少有一些延迟
+                        time.sleep(sleep_time)
+                    except:
+                        # 出错时使用安全的默认值
+                        time.sleep(0.067)  # 约15fps
                 
-            except Exception as e:
-                print(f"ERROR: 生成原始视频流出错: {str(e)}")
-                # 发送纯色错误帧
-                error_frame = np.ones((self.stream_height, self.stream_width, 3), dtype=np.uint8) * 180
+                except Exception as e:
+                    print(f"ERROR: 生成原始视频流出错: {str(e)}")
+                    # 发送纯色错误帧
+                    error_frame = np.ones((height, width, 3), dtype=np.uint8) * 180
                 
-                try:
-                    # 使用高质量设置以确保可以编码
-                    success, encoded_image = cv2.imencode('.jpg', error_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-                    if success:
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
-                except:
-                    # 如果连错误帧都无法编码，使用最简单的空白帧
                     try:
-                        blank_frame = np.ones((240, 320, 3), dtype=np.uint8) * 220
-                        success, encoded_image = cv2.imencode('.jpg', blank_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
+                        # 使用高质量设置以确保可以编码
+                        success, encoded_image = cv2.imencode('.jpg', error_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
                         if success:
                             yield (b'--frame\r\n'
                                    b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
                     except:
-                        pass
+                        # 如果连错误帧都无法编码，使用最简单的空白帧
+                        try:
+                            blank_frame = np.ones((240, 320, 3), dtype=np.uint8) * 220
+                            success, encoded_image = cv2.imencode('.jpg', blank_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
+                            if success:
+                                yield (b'--frame\r\n'
+                                       b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
+                        except:
+                            pass
                 
-                # 错误后等待较长时间再重试
-                time.sleep(2)
-        
-        # 恢复原始分辨率设置
-        self.stream_width, self.stream_height = original_width, original_height
-        print("DEBUG: 原始视频流生成结束，已恢复分辨率设置")
\ No newline at end of file
+                    # 错误后等待较长时间再重试
+                    time.sleep(2)
+        finally:
+            if held is not None:
+                held.release()
+            self.broadcast_hub.close_session(session)
+            if subscriber:
+                subscriber.close()
+        
+        print("DEBUG: 原始视频流生成结束")
\ No newline at end of file
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""姿势分析流水线基准测试
+
+用录制的视频文件或图片目录代替摄像头，回放完整的 缩放 -> 运动门控 -> 姿势 -> 情绪 -> 记录 路径，
+输出吞吐量、各阶段延迟分位数（p50/p95/p99）和结果校验和。数据库写入替换为内存记录器，
+不需要MySQL，也不会污染线上数据。
+
+两种模式：
+    sync     - 单线程逐帧执行各阶段，调度器和运动门控使用源的媒体时间，延迟控制器固定档位，
+               同一个输入和参数下校验和可复现，适合对比优化前后结果是否一致、耗时是否下降
+    threaded - 通过 WebPostureMonitor.set_capture_source() 运行真实的多线程流水线（帧分发器、
+               最新优先队列、调度器、延迟控制器全部生效），反映线上的吞吐和延迟，结果不保证可复现
+
+用法：
+    python pipeline_benchmark.py recording.mp4
+    python pipeline_benchmark.py frames/ --fps 15 --max-frames 300
+    python pipeline_benchmark.py recording.mp4 --mode threaded --pacing realtime
+    python pipeline_benchmark.py recording.mp4 --every-frame --level 0 --json
+"""
+import sys
+import time
+import json
+import hashlib
+import argparse
+
+from modules.capture_source_module import open_capture_source, PACING_MODES
+
+# 校验和中角度保留的小数位数，避免浮点末位差异导致校验和变化
+CHECKSUM_ANGLE_DECIMALS = 1
+
+
+class InMemorySink:
+    """内存记录器，替换数据库模块中的坐姿时间批量写入、图像保存和图像清理函数"""
+    def __init__(self, encode_images=True):
+        """
+        Args:
+            encode_images: 保存图像时是否做JPEG编码（保留编码开销，使记录阶段耗时接近真实情况）
+        """
+        self.encode_images = encode_images
+        self.posture_records = []
+        self.images = []
+        self.cleanup_calls = 0
+
+    def record_posture_times_batch(self, records):
+        for start_time, end_time, duration_seconds, angle, posture_type, notes, *device_id in records:
+            self.posture_records.append((posture_type, round(duration_seconds, 3), round(angle, CHECKSUM_ANGLE_DECIMALS)))
+        return len(records)
+
+    def save_posture_image(self, image, angle, is_bad_posture, posture_status, emotion, notes="", jpeg_bytes=None,
+                           device_id=None):
+        size = 0
+        if jpeg_bytes is not None:
+            size = len(jpeg_bytes)
+        elif self.encode_images:
+            import cv2
+            ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            size = len(buffer) if ret else 0
+        self.images.append((round(angle, CHECKSUM_ANGLE_DECIMALS), bool(is_bad_posture), emotion, size))
+        return {"id": len(self.images), "path": f"memory/{len(self.images)}.jpg"}
+
+    def cleanup_images(self, *args, **kwargs):
+        self.cleanup_calls += 1
+
+    def install(self):
+        """替换数据库模块中的函数（姿势模块在调用时才导入这些函数，因此替换模块属性即可生效）"""
+        import modules.database_module as database_module
+        import modules.new_cleanup_functions as cleanup_module
+        database_module.record_posture_times_batch = self.record_posture_times_batch
+        database_module.save_posture_image = self.save_posture_image
+        cleanup_module.cleanup_hourly_images = self.cleanup_images
+        cleanup_module.cleanup_daily_images = self.cleanup_images
+
+    def get_stats(self):
+        return {
+            'posture_records': len(self.posture_records),
+            'images': len(self.images),
+            'image_bytes': sum(item[3] for item in self.images),
+            'cleanup_calls': self.cleanup_calls
+        }
+
+
+class StageTimer:
+    """记录各阶段每次执行的耗时并计算分位数"""
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    @staticmethod
+    def _percentile(sorted_values, percent):
+        """最近秩法分位数"""
+        if not sorted_values:
+            return 0.0
+        rank = max(0, min(len(sorted_values) - 1, int(round(percent / 100.0 * len(sorted_values) + 0.5)) - 1))
+        return sorted_values[rank]
+
+    def summary(self):
+        """各阶段的次数、平均值和p50/p95/p99（毫秒）"""
+        result = {}
+        for stage, values in self.samples.items():
+            ordered = sorted(values)
+            result[stage] = {
+                'count': len(ordered),
+                'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+                'p50_ms': round(self._percentile(ordered, 50) * 1000, 3),
+                'p95_ms': round(self._percentile(ordered, 95) * 1000, 3),
+                'p99_ms': round(self._percentile(ordered, 99) * 1000, 3),
+                'max_ms': round(ordered[-1] * 1000, 3)
+            }
+        return result
+
+
+class ResultChecksum:
+    """逐帧累积分析结果（取整后的角度、坐姿类型、情绪）的SHA-256"""
+    def __init__(self):
+        self._hash = hashlib.sha256()
+        self.frames = 0
+
+    def update(self, frame_index, pose_result, emotion_result):
+        angle = pose_result.get('angle')
+        angle = 'none' if angle is None else f"{angle:.{CHECKSUM_ANGLE_DECIMALS}f}"
+        line = f"{frame_index}|{angle}|{pose_result.get('posture_type')}|{pose_result.get('is_occluded')}|{emotion_result.get('emotion')}\n"
+        self._hash.update(line.encode('utf-8'))
+        self.frames += 1
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def _create_monitor(args):
+    """创建姿势分析器并按参数固定性能配置"""
+    from modules.posture_module import WebPostureMonitor, POSTURE_MODULE_AVAILABLE
+    if not POSTURE_MODULE_AVAILABLE:
+        print("姿势分析模块不可用，无法运行基准测试")
+        sys.exit(1)
+
+    monitor = WebPostureMonitor()
+    monitor.set_performance_mode(motion_gate=not args.no_motion_gate)
+    return monitor
+
+
+def run_sync(args, source, sink):
+    """单线程逐帧回放，结果可复现"""
+    import cv2
+    from modules.posture_module import INFERENCE_TASKS
+
+    monitor = _create_monitor(args)
+    monitor.inference_mode = monitor._create_inference_models('thread')
+    # 固定延迟控制档位，关闭按实测耗时的预算分配，使每帧执行哪些阶段只取决于输入和参数
+    monitor.set_latency_control(enabled=False, level=args.level)
+    monitor.scheduler.budget_enabled = False
+    monitor._sync_pose_model_complexity()
+    monitor.posture_writer.start()
+    monitor.snapshot_writer.start()
+
+    timer = StageTimer()
+    checksum = ResultChecksum()
+    processed_frames = {name: 0 for name in INFERENCE_TASKS}
+    frames = 0
+
+    start_time = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        ret, frame = source.read()
+        if not ret:
+            break
+        t1 = time.perf_counter()
+        timer.add('read', t1 - t0)
+        media_time = source.get_timestamp()
+
+        if args.every_frame:
+            due_tasks = list(INFERENCE_TASKS)
+        else:
+            due_tasks = monitor.scheduler.due(INFERENCE_TASKS, media_time)
+
+        if due_tasks:
+            resize_start = time.perf_counter()
+            if monitor.resize_method == 'subsampling':
+                processed = monitor._resize_with_subsampling(frame, monitor.process_width, monitor.process_height)
+            else:
+                processed = cv2.resize(frame, (monitor.process_width, monitor.process_height))
+            gate_start = time.perf_counter()
+            timer.add('resize', gate_start - resize_start)
+            should_process = monitor.motion_gate.should_process(processed, media_time)
+            timer.add('motion_gate', time.perf_counter() - gate_start)
+
+            if should_process:
+                # 与分析线程一致：通过运动门控后才标记任务已执行
+                if not args.every_frame:
+                    for name in due_tasks:
+                        monitor.scheduler.mark_run(name, media_time)
+                if 'pose' in due_tasks:
+                    stage_start = time.perf_counter()
+                    pose_results = monitor._process_pose(processed)
+                    monitor._update_face_roi(pose_results['landmark_array'], processed.shape)
+                    timer.add('pose', time.perf_counter() - stage_start)
+                    processed_frames['pose'] += 1
+                    monitor.pose_result = {
+                        'angle': pose_results['angle'] if pose_results['angle'] is not None else 0,
+                        'is_bad_posture': pose_results['is_bad_posture'],
+                        'is_occluded': pose_results['is_occluded'],
+                        'status': pose_results['status'],
+                        'posture_type': pose_results['posture_type']
+                    }
+
+                    stage_start = time.perf_counter()
+                    monitor._run_recording_tasks(frame, pose_results, media_time)
+                    timer.add('recording', time.perf_counter() - stage_start)
+
+                if 'emotion' in due_tasks:
+                    stage_start = time.perf_counter()
+                    emotion_results = monitor._process_emotion(processed)
+                    timer.add('emotion', time.perf_counter() - stage_start)
+                    processed_frames['emotion'] += 1
+                    monitor.emotion_result = {
+                        'emotion': emotion_results['emotion'].name if emotion_results['emotion'] else 'UNKNOWN',
+                        'emotion_code': emotion_results['emotion'].value if emotion_results['emotion'] else -1
+                    }
+
+        # 校验和按帧累积当前对外发布的结果（被跳过的帧沿用上一次结果，与线上行为一致）
+        checksum.update(source.frame_index, monitor.pose_result, monitor.emotion_result)
+        timer.add('total', time.perf_counter() - t0)
+        frames += 1
+    elapsed = time.perf_counter() - start_time
+    monitor.posture_writer.stop()
+    monitor.snapshot_writer.stop()
+
+    return {
+        'mode': 'sync',
+        'frames': frames,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_fps': round(frames / elapsed, 2) if elapsed > 0 else 0,
+        'processed_frames': processed_frames,
+        'stages': timer.summary(),
+        'checksum': checksum.hexdigest(),
+        'motion_gate': monitor.motion_gate.get_stats(),
+        'latency_level': monitor.latency_controller.get_current_level().to_dict()
+    }
+
+
+def run_threaded(args, source, sink):
+    """通过帧分发器运行真实的多线程流水线"""
+    monitor = _create_monitor(args)
+    if not monitor.set_capture_source(source):
+        sys.exit(1)
+    if args.level is not None:
+        monitor.set_latency_control(level=args.level)
+
+    start_time = time.perf_counter()
+    if not monitor.start(inference_mode=args.inference_mode):
+        sys.exit(1)
+    try:
+        while not source.finished:
+            time.sleep(0.1)
+        # 等待最后一帧处理完
+        time.sleep(0.5)
+    finally:
+        stats = monitor.get_performance_stats()
+        latency = monitor.get_latency_control_state(history_limit=0)
+        elapsed = time.perf_counter() - start_time
+        monitor.stop()
+
+    timer = StageTimer()
+    for stage, times in monitor.performance_stats['processing_times'].items():
+        for value in times:
+            timer.add(stage, value)
+    frames = source.frame_index + 1
+
+    return {
+        'mode': 'threaded',
+        'frames': frames,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_fps': round(frames / elapsed, 2) if elapsed > 0 else 0,
+        'processed_frames': {
+            'pose': monitor.pose_process_fps.get_total_frames(),
+            'emotion': monitor.emotion_process_fps.get_total_frames()
+        },
+        # 阶段耗时来自流水线保留的最近样本
+        'stages': timer.summary(),
+        'end_to_end_latency': {
+            'p50_ms': latency['latency_p50_ms'],
+            'p95_ms': latency['latency_p95_ms'],
+            'final_level': latency['current']
+        },
+        'checksum': None,
+        'scheduler': stats.get('scheduler')
+    }
+
+
+def _print_report(report, source, sink):
+    print("\n=== 流水线基准测试结果 ===")
+    print(f"模式: {report['mode']}，采集源: {source.get_stats()}")
+    print(f"帧数: {report['frames']}，耗时: {report['elapsed_seconds']} 秒，吞吐量: {report['throughput_fps']} FPS")
+    print(f"推理帧数: {report['processed_frames']}")
+    print(f"{'阶段':<12}{'次数':>8}{'平均':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'最大':>10}  (毫秒)")
+    for stage, item in report['stages'].items():
+        print(f"{stage:<12}{item['count']:>8}{item['mean_ms']:>10}{item['p50_ms']:>10}"
+              f"{item['p95_ms']:>10}{item['p99_ms']:>10}{item['max_ms']:>10}")
+    if report.get('end_to_end_latency'):
+        print(f"端到端延迟: {report['end_to_end_latency']}")
+    print(f"记录器: {sink.get_stats()}")
+    if report['checksum']:
+        print(f"结果校验和: {report['checksum']}")
+    else:
+        print("结果校验和: 多线程模式下结果不可复现，不计算校验和")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='姿势分析流水线基准测试')
+    parser.add_argument('source', help='视频文件路径或图片目录')
+    parser.add_argument('--mode', choices=('sync', 'threaded'), default='sync', help='运行模式')
+    parser.add_argument('--pacing', choices=PACING_MODES, default=None,
+                        help='发帧节奏，默认sync模式为fast、threaded模式为realtime')
+    parser.add_argument('--fps', type=float, default=None, help='源帧率（图片目录默认30）')
+    parser.add_argument('--max-frames', type=int, default=None, help='最多处理的帧数')
+    parser.add_argument('--loop', action='store_true', help='读到末尾后循环（需配合--max-frames）')
+    parser.add_argument('--level', type=int, default=None, help='延迟控制档位，sync模式默认使用初始档位')
+    parser.add_argument('--every-frame', action='store_true', help='sync模式下每帧都执行姿势和情绪推理，忽略调度频率')
+    parser.add_argument('--no-motion-gate', action='store_true', help='关闭运动门控')
+    parser.add_argument('--no-encode', action='store_true', help='内存记录器保存图像时不做JPEG编码')
+    parser.add_argument('--inference-mode', choices=('thread', 'process'), default='thread',
+                        help='threaded模式的推理后端')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    if args.loop and args.max_frames is None:
+        parser.error('--loop 需要同时指定 --max-frames')
+
+    pacing = args.pacing or ('fast' if args.mode == 'sync' else 'realtime')
+    source = open_capture_source(args.source, fps=args.fps, pacing=pacing, loop=args.loop, max_frames=args.max_frames)
+    if not source.isOpened():
+        sys.exit(1)
+
+    sink = InMemorySink(encode_images=not args.no_encode)
+    sink.install()
+
+    try:
+        if args.mode == 'sync':
+            report = run_sync(args, source, sink)
+        else:
+            report = run_threaded(args, source, sink)
+    finally:
+        source.release()
+
+    report['sink'] = sink.get_stats()
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        _print_report(report, source, sink)
+
+
+if __name__ == "__main__":
+    main()
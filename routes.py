@@ -381,15 +381,31 @@ def set_performance_mode():
         # 解析参数
         skip_frames = data.get('skip_frames')
         use_separate_grab = data.get('use_separate_grab')
+        motion_gate = data.get('motion_gate')
+        motion_threshold = data.get('motion_threshold')
+        motion_refresh_interval = data.get('motion_refresh_interval')
+        face_roi = data.get('face_roi')
+        cpu_budget = data.get('cpu_budget')
+        analyzer_rates = data.get('analyzer_rates')
+        raw_mjpeg = data.get('raw_mjpeg')
+        decode_scale = data.get('decode_scale')
         
         # 设置性能模式
-        posture_monitor.set_performance_mode(skip_frames, use_separate_grab)
+        if not posture_monitor.set_performance_mode(skip_frames, use_separate_grab, motion_gate,
+                                                    motion_threshold, motion_refresh_interval, face_roi,
+                                                    cpu_budget, analyzer_rates, raw_mjpeg, decode_scale):
+            return jsonify({
+                'status': 'error',
+                'message': f'无效的解码缩小倍数: {decode_scale}'
+            })
             
         return jsonify({
             'status': 'success',
             'message': '性能模式已更新',
             'skip_frames': skip_frames,
-            'use_separate_grab': use_separate_grab
+            'use_separate_grab': use_separate_grab,
+            'motion_gate': posture_monitor.motion_gate.get_stats(),
+            'scheduler': posture_monitor.scheduler.get_stats()
         })
     except Exception as e:
         print(f"设置性能模式出错: {str(e)}")
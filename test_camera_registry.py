@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""测试摄像头注册表：保存实测过的配置，下次按配置只打开一次验证，验证失败时回退完整探测"""
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+import modules.camera_registry_module as camera_registry_module
+from modules.camera_registry_module import CameraRegistry
+
+
+class FakeCapture:
+    """模拟摄像头：记录设置的参数，读取时按 frame_size 返回帧"""
+    opened = []
+
+    def __init__(self, device=0, backend=cv2.CAP_ANY, frame_size=(640, 480), is_open=True):
+        self.device = device
+        self.backend = backend
+        self.frame_size = frame_size
+        self.is_open = is_open
+        self.released = False
+        self.props = {
+            cv2.CAP_PROP_FOURCC: cv2.VideoWriter_fourcc(*'MJPG'),
+            cv2.CAP_PROP_FRAME_WIDTH: frame_size[0],
+            cv2.CAP_PROP_FRAME_HEIGHT: frame_size[1],
+            cv2.CAP_PROP_FPS: 30.0,
+        }
+        FakeCapture.opened.append(self)
+
+    def isOpened(self):
+        return self.is_open
+
+    def get(self, prop):
+        return self.props.get(prop, 0)
+
+    def set(self, prop, value):
+        self.props[prop] = value
+        return True
+
+    def read(self):
+        width, height = self.frame_size
+        return True, np.zeros((height, width, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+def open_with(registry, frame_size=(640, 480), **kwargs):
+    """用模拟摄像头代替cv2.VideoCapture调用open_cached"""
+    original = camera_registry_module.cv2.VideoCapture
+    camera_registry_module.cv2.VideoCapture = lambda device, backend: FakeCapture(device, backend, frame_size)
+    FakeCapture.opened = []
+    try:
+        return registry.open_cached(**kwargs)
+    finally:
+        camera_registry_module.cv2.VideoCapture = original
+
+
+def test_save_requires_measured_fps():
+    """没有实测帧率的配置不保存；保存后可以读回"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = CameraRegistry(os.path.join(tmp_dir, 'camera.json'))
+        cap = FakeCapture(2, cv2.CAP_V4L2)
+        assert registry.save(cap, 2, cv2.CAP_V4L2) is None
+        assert registry.load() is None
+
+        profile = registry.save(cap, 2, cv2.CAP_V4L2, measured_fps=29.76)
+        loaded = registry.load()
+        print(f"保存的配置: {loaded}")
+        assert loaded == profile
+        assert loaded['device'] == 2 and loaded['backend_name'] == 'V4L2'
+        assert loaded['fourcc'] == 'MJPG' and (loaded['width'], loaded['height']) == (640, 480)
+        assert loaded['measured_fps'] == 29.8
+
+        assert registry.invalidate()
+        assert registry.load() is None
+        assert not registry.invalidate()
+
+
+def test_open_cached_applies_profile():
+    """按保存的配置打开摄像头，设置格式和分辨率并读取一帧验证"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = CameraRegistry(os.path.join(tmp_dir, 'camera.json'))
+        registry.save(FakeCapture(1, cv2.CAP_V4L2, (1280, 720)), 1, cv2.CAP_V4L2, measured_fps=30)
+
+        cap, profile = open_with(registry, frame_size=(1280, 720), buffer_size=2)
+        assert cap is FakeCapture.opened[0] and not cap.released
+        assert (cap.device, cap.backend) == (1, cv2.CAP_V4L2)
+        assert cap.props[cv2.CAP_PROP_BUFFERSIZE] == 2
+        assert cap.props[cv2.CAP_PROP_FOURCC] == cv2.VideoWriter_fourcc(*'MJPG')
+        assert profile['width'] == 1280
+
+
+def test_open_cached_falls_back():
+    """没有配置、指定了其他设备或实际分辨率与配置不一致时返回 (None, None)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = CameraRegistry(os.path.join(tmp_dir, 'camera.json'))
+        assert open_with(registry) == (None, None)
+
+        registry.save(FakeCapture(0, cv2.CAP_ANY), 0, cv2.CAP_ANY, measured_fps=30)
+        assert open_with(registry, device='/dev/video2') == (None, None)
+        assert FakeCapture.opened == []  # 设备不同时不打开摄像头
+
+        assert open_with(registry, frame_size=(320, 240)) == (None, None)
+        assert FakeCapture.opened[0].released  # 验证失败的摄像头被释放
+
+
+def test_corrupt_registry_and_open_stats():
+    """注册表文件损坏时按没有配置处理；记录各消费者的打开方式和耗时"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'camera.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{not json')
+        registry = CameraRegistry(path)
+        assert registry.load() is None
+
+        registry.record_open('posture', 'cache', 0.123456)
+        stats = registry.get_stats()
+        assert stats['profile'] is None
+        assert stats['opens']['posture']['source'] == 'cache'
+        assert stats['opens']['posture']['seconds'] == 0.123
+
+
+if __name__ == "__main__":
+    test_save_requires_measured_fps()
+    test_open_cached_applies_profile()
+    test_open_cached_falls_back()
+    test_corrupt_registry_and_open_stats()
+    print("\n所有测试通过!")
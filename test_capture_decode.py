@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""测试MJPEG原始数据采集：按摄像头实际分辨率选择解码缩小倍数，解码帧不小于最高处理分辨率，保留原始JPEG"""
+import time
+
+import cv2
+import numpy as np
+
+from modules.frame_broker_module import FrameBroker, DECODE_SCALE_AUTO
+
+MIN_DECODE_SIZE = (640, 480)  # 与姿势分析最高的处理分辨率一致
+
+
+class FakeMJPEGCapture:
+    """模拟输出MJPEG原始数据的摄像头"""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        image = np.zeros((height, width, 3), dtype=np.uint8)
+        cv2.rectangle(image, (width // 4, height // 4), (width // 2, height // 2), (255, 255, 255), -1)
+        self.jpeg = cv2.imencode('.jpg', image)[1].reshape(1, -1)
+        self.convert_rgb = 1
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def get(self, prop):
+        return {
+            cv2.CAP_PROP_FOURCC: cv2.VideoWriter_fourcc(*'MJPG'),
+            cv2.CAP_PROP_FRAME_WIDTH: self.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+        }.get(prop, 0)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_CONVERT_RGB:
+            self.convert_rgb = value
+            return True
+        return False
+
+    def grab(self):
+        time.sleep(0.005)
+        return True
+
+    def retrieve(self, image=None):
+        return True, self.jpeg.copy()
+
+    def release(self):
+        self.opened = False
+
+
+def make_broker(decode_scale=DECODE_SCALE_AUTO):
+    broker = FrameBroker()
+    broker.set_decode_mode(True, decode_scale, min_decode_size=MIN_DECODE_SIZE)
+    return broker
+
+
+def test_auto_scale_never_below_processing_resolution():
+    """自动选择的缩小倍数使解码帧的宽和高都不小于最小解码尺寸"""
+    broker = make_broker()
+    cases = {
+        (640, 480): 1,     # 摄像头分辨率等于最高处理分辨率时按原始分辨率解码
+        (1280, 720): 1,    # 640x360 的高度低于480，不缩小
+        (1280, 960): 2,
+        (1920, 1080): 2,
+        (2592, 1944): 4,
+    }
+    for (width, height), expected in cases.items():
+        scale = broker.resolve_decode_scale(width, height)
+        print(f"{width}x{height} -> 1/{scale}")
+        assert scale == expected
+
+
+def test_requested_scale_is_upper_limit():
+    """指定的缩小倍数是上限，仍不会使解码帧小于最小解码尺寸；不支持的倍数被拒绝"""
+    broker = make_broker(decode_scale=2)
+    assert broker.resolve_decode_scale(2592, 1944) == 2
+    assert broker.resolve_decode_scale(640, 480) == 1
+    assert not broker.set_decode_mode(decode_scale=3)
+    assert broker.decode_scale == 2
+
+
+def test_raw_capture_keeps_full_resolution_jpeg():
+    """采集到的帧按选择的倍数解码，数据包保留摄像头输出的全分辨率JPEG"""
+    for (width, height), expected_scale in (((640, 480), 1), ((1280, 960), 2)):
+        cap = FakeMJPEGCapture(width, height)
+        broker = make_broker()
+        assert broker.start(cap)
+        subscriber = broker.subscribe('test')
+        try:
+            packet = subscriber.read(timeout=2.0)
+            assert packet is not None
+            assert packet.decode_scale == expected_scale
+            assert packet.frame.shape[:2] == (height // expected_scale, width // expected_scale)
+            full = cv2.imdecode(packet.jpeg_bytes, cv2.IMREAD_COLOR)
+            assert full.shape[:2] == (height, width)
+            assert broker.get_stats()['decode_scale'] == expected_scale
+            assert cap.convert_rgb == 0
+        finally:
+            subscriber.close()
+            broker.stop()
+
+
+if __name__ == "__main__":
+    test_auto_scale_never_below_processing_resolution()
+    test_requested_scale_is_upper_limit()
+    test_raw_capture_keeps_full_resolution_jpeg()
+    print("\n所有测试通过!")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""测试帧分发器：唯一读取摄像头，多个订阅者按各自速率读取最新帧；池化帧缓冲区的引用计数与复用"""
+import time
+import threading
+
+import numpy as np
+
+from modules.frame_broker_module import FrameBroker
+from modules.frame_pool_module import FrameBufferPool
+
+
+class FakeCapture:
+    """模拟摄像头：每帧的像素值等于帧编号（取模256），记录读取次数"""
+    def __init__(self, shape=(48, 64, 3), interval=0.005):
+        self.shape = shape
+        self.interval = interval
+        self.count = 0
+        self.opened = True
+        self.lock = threading.Lock()
+
+    def isOpened(self):
+        return self.opened
+
+    def grab(self):
+        time.sleep(self.interval)
+        with self.lock:
+            self.count += 1
+        return self.opened
+
+    def retrieve(self, image=None):
+        value = self.count % 256
+        if image is None:
+            image = np.empty(self.shape, dtype=np.uint8)
+        image[...] = value
+        return True, image
+
+    def read(self, image=None):
+        self.grab()
+        return self.retrieve(image)
+
+    def get(self, prop):
+        return 0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.opened = False
+
+
+def test_subscribers_share_single_capture():
+    """两个订阅者读取同一摄像头，摄像头读取次数等于发布帧数，与订阅者数量无关"""
+    cap = FakeCapture()
+    broker = FrameBroker()
+    assert broker.start(cap)
+    fast = broker.subscribe('fast')
+    slow = broker.subscribe('slow', max_fps=20)
+    try:
+        fast_seqs, slow_seqs = [], []
+        deadline = time.time() + 0.5
+        while time.time() < deadline:
+            packet = fast.read(timeout=1.0)
+            assert packet is not None
+            fast_seqs.append(packet.seq)
+            if len(fast_seqs) % 5 == 0:
+                packet = slow.read(timeout=1.0)
+                slow_seqs.append(packet.seq)
+    finally:
+        fast.close()
+        slow.close()
+        broker.stop()
+
+    print(f"摄像头读取 {cap.count} 次，发布 {broker.stats['frames_published']} 帧，"
+          f"快订阅者读取 {len(fast_seqs)} 帧，慢订阅者读取 {len(slow_seqs)} 帧，跳过 {slow.frames_missed} 帧")
+    assert fast_seqs == sorted(set(fast_seqs))  # 不会重复读到同一帧
+    assert slow_seqs == sorted(set(slow_seqs))
+    assert slow.frames_missed > 0               # 慢订阅者只拿最新帧，中间的帧被跳过
+    assert broker.stats['frames_published'] <= cap.count
+    assert not cap.opened                       # 停止时释放摄像头
+
+
+def test_read_returns_latest_frame_and_times_out():
+    """read 返回最新一帧；没有新帧时等待超时返回None"""
+    broker = FrameBroker(ring_size=4)
+    subscriber = broker.subscribe('viewer')
+    broker.is_running = True
+    for value in range(3):
+        broker._publish(np.full((4, 4, 3), value, dtype=np.uint8), time.time())
+
+    packet = subscriber.read(timeout=0.1)
+    assert packet.seq == 3 and packet.frame[0, 0, 0] == 2
+
+    start_time = time.time()
+    assert subscriber.read(timeout=0.1) is None
+    assert time.time() - start_time >= 0.09
+
+    # 另一个线程发布新帧时立即唤醒等待者
+    timer = threading.Timer(0.05, broker._publish, (np.zeros((4, 4, 3), dtype=np.uint8), time.time()))
+    timer.start()
+    packet = subscriber.read(timeout=2.0)
+    timer.join()
+    assert packet is not None and packet.seq == 4
+    subscriber.close()
+    assert broker.get_stats()['subscribers'] == []
+
+
+def test_pool_reuses_released_buffers():
+    """引用计数归零的缓冲区归还缓冲池，下次获取同尺寸缓冲区时复用而不是重新分配"""
+    pool = FrameBufferPool('test', max_free_buffers=2)
+    first = pool.acquire((4, 4, 3))
+    first.retain()
+    first.release()
+    assert pool.stats['in_use'] == 1      # 还有一次引用，没有归还
+
+    first.release()
+    assert pool.stats['in_use'] == 0
+    second = pool.acquire((4, 4, 3))
+    assert second is first and second.refs == 1
+    assert pool.stats['allocations'] == 1 and pool.stats['reuses'] == 1
+
+    other = pool.acquire((8, 8, 3))       # 不同尺寸单独分配
+    assert other is not first and pool.stats['allocations'] == 2
+    second.release()
+    other.release()
+    assert pool.get_stats()['free_buffers'] == 2
+
+
+def test_retained_packet_survives_ring_eviction():
+    """环形缓冲区挤出旧帧后，仍持有引用的消费者看到的帧内容不会被新帧覆盖"""
+    cap = FakeCapture(interval=0.002)
+    broker = FrameBroker(ring_size=2)
+    assert broker.start(cap)
+    subscriber = broker.subscribe('holder')
+    try:
+        packet = subscriber.read(timeout=1.0).retain()
+        value = int(packet.frame[0, 0, 0])
+        held_array = packet.buffer.array
+        # 等环形缓冲区轮换多次，缓冲池复用其他缓冲区
+        while broker.stats['frames_published'] < packet.seq + 20:
+            subscriber.read(timeout=1.0)
+        assert int(packet.frame[0, 0, 0]) == value
+        assert packet.buffer.array is held_array and packet.buffer.refs >= 1
+        packet.release()
+    finally:
+        subscriber.close()
+        broker.stop()
+
+    stats = broker.frame_pool.get_stats()
+    print(f"缓冲池: 分配 {stats['allocations']} 次，复用 {stats['reuses']} 次，使用中 {stats['in_use']}")
+    assert stats['in_use'] == 0               # 停止后所有引用都已释放
+    assert stats['reuses'] > stats['allocations']
+
+
+if __name__ == "__main__":
+    test_subscribers_share_single_capture()
+    test_read_returns_latest_frame_and_times_out()
+    test_pool_reuses_released_buffers()
+    test_retained_packet_survives_ring_eviction()
+    print("\n所有测试通过!")
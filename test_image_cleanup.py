@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""测试多摄像头时坐姿图片按摄像头分别清理，各摄像头保留各自的数量"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import modules.new_cleanup_functions as cleanup_module
+
+
+class FakeCursor:
+    """把MySQL风格的 %s 占位符转换为sqlite的 ? 后执行"""
+    def __init__(self, conn):
+        self.cursor = conn.cursor()
+
+    def execute(self, sql, params=()):
+        self.cursor.execute(sql.replace('%s', '?'), params)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return FakeCursor(self.conn)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        pass
+
+
+def make_database(counts, start):
+    """创建内存数据库，按 {摄像头: 图片数} 每分钟插入一张图片"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute("""CREATE TABLE posture_images (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        image_path TEXT, timestamp TIMESTAMP, device_id TEXT NOT NULL DEFAULT 'default')""")
+    for device_id, count in counts.items():
+        for i in range(count):
+            conn.execute("INSERT INTO posture_images (image_path, timestamp, device_id) VALUES (?, ?, ?)",
+                         (f"/static/posture_images/missing_{device_id}_{i}.jpg", start + timedelta(minutes=i), device_id))
+    conn.commit()
+    return conn
+
+
+def count_by_device(conn):
+    rows = conn.execute("SELECT device_id, COUNT(*) FROM posture_images GROUP BY device_id").fetchall()
+    return dict(rows)
+
+
+def run_with_database(conn, func, *args, **kwargs):
+    original_connect = cleanup_module.mysql.connector.connect
+    cleanup_module.mysql.connector.connect = lambda **config: FakeConnection(conn)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        cleanup_module.mysql.connector.connect = original_connect
+
+
+def test_hourly_cleanup_keeps_quota_per_device():
+    """一个摄像头的图片多不会挤掉另一个摄像头的图片"""
+    hour = datetime(2024, 5, 1, 10)
+    conn = make_database({'cam0': 30, 'cam1': 5}, hour)
+
+    deleted = run_with_database(conn, cleanup_module.cleanup_hourly_images, hour, 20, device_id='cam0')
+    print(f"cam0 删除 {deleted} 张，剩余: {count_by_device(conn)}")
+    assert deleted == 10
+    assert count_by_device(conn) == {'cam0': 20, 'cam1': 5}
+
+    deleted = run_with_database(conn, cleanup_module.cleanup_hourly_images, hour, 20, device_id='cam1')
+    assert deleted == 0
+    assert count_by_device(conn) == {'cam0': 20, 'cam1': 5}
+
+
+def test_daily_cleanup_keeps_newest_per_device():
+    """按天清理只删除该摄像头最旧的图片"""
+    day = datetime(2024, 5, 1)
+    conn = make_database({'cam0': 8, 'cam1': 8}, day)
+
+    run_with_database(conn, cleanup_module.cleanup_daily_images, day, 3, device_id='cam1')
+    remaining = conn.execute(
+        "SELECT timestamp FROM posture_images WHERE device_id = 'cam1' ORDER BY timestamp").fetchall()
+    print(f"cam1 剩余: {[row[0] for row in remaining]}")
+    assert count_by_device(conn) == {'cam0': 8, 'cam1': 3}
+    assert [row[0] for row in remaining] == [str(day + timedelta(minutes=i)) for i in range(5, 8)]
+
+
+def test_cleanup_without_device_counts_all():
+    """未指定摄像头时保持原来的行为，所有图片一起计算"""
+    hour = datetime(2024, 5, 1, 10)
+    conn = make_database({'cam0': 15, 'cam1': 15}, hour)
+
+    deleted = run_with_database(conn, cleanup_module.cleanup_hourly_images, hour, 20)
+    assert deleted == 10
+    assert sum(count_by_device(conn).values()) == 20
+
+
+if __name__ == "__main__":
+    test_hourly_cleanup_keeps_quota_per_device()
+    test_daily_cleanup_keeps_newest_per_device()
+    test_cleanup_without_device_counts_all()
+    print("\n所有测试通过!")
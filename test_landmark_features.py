@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""测试关键点特征模块：关键点对象转换为数组、遮挡/头部角度/面部特征的单帧与批量计算结果一致"""
+from types import SimpleNamespace
+
+import numpy as np
+
+from modules.landmark_features_module import (
+    pose_landmarks_to_array, face_feature_array, compact_face_array,
+    occlusion_status, occlusion_codes, head_angle, head_angles, face_features,
+    FACE_FEATURE_INDICES, POSE_NOSE, POSE_LEFT_EYE, POSE_LEFT_SHOULDER, POSE_RIGHT_SHOULDER,
+    OCCLUSION_CLEAR, OCCLUSION_SHOULDER, OCCLUSION_FACE, OCCLUSION_FULL
+)
+
+FRAME_SHAPE = (480, 640)
+THRESHOLD = 0.5
+
+
+def make_pose(nose=(0.5, 0.3), visibility=1.0):
+    """双肩中点在 (0.5, 0.6) 的姿势关键点数组"""
+    pose = np.zeros((33, 4))
+    pose[:, 3] = visibility
+    pose[POSE_LEFT_SHOULDER, :2] = (0.4, 0.6)
+    pose[POSE_RIGHT_SHOULDER, :2] = (0.6, 0.6)
+    pose[POSE_NOSE, :2] = nose
+    return pose
+
+
+def test_landmark_objects_to_array():
+    """关键点对象（或NormalizedLandmarkList）转换为数组，缺失时返回None；面部只取特征点"""
+    pose = make_pose()
+    points = [SimpleNamespace(x=x, y=y, z=z, visibility=v) for x, y, z, v in pose]
+    assert np.array_equal(pose_landmarks_to_array(points), pose)
+    assert np.array_equal(pose_landmarks_to_array(SimpleNamespace(landmark=points)), pose)
+    assert pose_landmarks_to_array(None) is None and pose_landmarks_to_array([]) is None
+
+    mesh = np.random.default_rng(0).uniform(size=(478, 3))
+    face_points = [SimpleNamespace(x=x, y=y) for x, y, _ in mesh]
+    compact = face_feature_array(face_points)
+    assert compact.shape == (len(FACE_FEATURE_INDICES), 2)
+    assert np.array_equal(compact, mesh[FACE_FEATURE_INDICES, :2])
+    assert np.array_equal(face_feature_array(mesh), compact)
+
+
+def test_occlusion_codes():
+    """按肩部和面部关键点的可见度得到遮挡状态，批量结果与单帧一致"""
+    clear = make_pose()
+    shoulder = make_pose()
+    shoulder[POSE_RIGHT_SHOULDER, 3] = 0.2
+    face = make_pose()
+    face[POSE_LEFT_EYE, 3] = 0.2
+    full = make_pose(visibility=0.1)
+
+    batch = np.stack([clear, shoulder, face, full])
+    codes = occlusion_codes(batch, THRESHOLD)
+    assert list(codes) == [OCCLUSION_CLEAR, OCCLUSION_SHOULDER, OCCLUSION_FACE, OCCLUSION_FULL]
+    assert [occlusion_codes(pose, THRESHOLD) for pose in batch] == list(codes)
+
+    assert occlusion_status(clear, THRESHOLD) == (False, "Clear")
+    assert occlusion_status(full, THRESHOLD) == (True, "Full Occlusion")
+    assert occlusion_status(None, THRESHOLD) == (True, "Detection Failed")
+
+
+def test_head_angles():
+    """头部角度按像素坐标计算，鼻子正上方为0度；超过阈值时标记，批量结果与单帧一致"""
+    upright = make_pose(nose=(0.5, 0.3))
+    # 像素坐标下鼻子相对双肩中点向右 144、向上 144，夹角45度
+    tilted = make_pose(nose=(0.5 + 144 / 640, 0.6 - 144 / 480))
+
+    angle, exceeded, points = head_angle(upright, FRAME_SHAPE, 30)
+    assert abs(angle) < 1e-9 and not exceeded
+    assert list(points['mid_shoulder']) == [320, 288] and list(points['nose']) == [320, 144]
+
+    angle, exceeded, _ = head_angle(tilted, FRAME_SHAPE, 30)
+    print(f"头部角度: {angle:.3f}°")
+    assert abs(angle - 45.0) < 1e-9 and exceeded
+
+    angles = head_angles(np.stack([upright, tilted]), FRAME_SHAPE)[0]
+    assert np.allclose(angles, [0.0, 45.0])
+    assert head_angle(None, FRAME_SHAPE, 30) == (None, False, {})
+
+
+def test_face_features_batch_matches_single():
+    """面部特征批量计算与逐帧计算一致，分母为0时特征为0"""
+    mesh = np.random.default_rng(1).uniform(0.3, 0.7, size=(5, 478, 3))
+    h, w = FRAME_SHAPE
+    mouth, eye, brow = face_features(compact_face_array(mesh), h, w)
+    for i in range(len(mesh)):
+        single = face_features(face_feature_array(mesh[i]), h, w)
+        assert np.allclose(single, (mouth[i], eye[i], brow[i]))
+
+    flat = np.full((478, 2), 0.5)
+    mouth, eye, brow = face_features(face_feature_array(flat), h, w)
+    assert mouth == 0.0 and eye == 0.0 and brow == 240.0
+
+
+if __name__ == "__main__":
+    test_landmark_objects_to_array()
+    test_occlusion_codes()
+    test_head_angles()
+    test_face_features_batch_matches_single()
+    print("\n所有测试通过!")
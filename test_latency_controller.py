@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""测试延迟控制器：持续超标时降档、持续有余量时升档，换档带保持时间和最短停留时间"""
+from modules.latency_controller_module import (
+    LatencyController, LatencyLevel,
+    DEGRADE_HOLD_SECONDS, UPGRADE_HOLD_SECONDS, MIN_DWELL_SECONDS
+)
+
+LADDER = [
+    LatencyLevel(2, 1.0, 1),
+    LatencyLevel(1, 1.0, 1),
+    LatencyLevel(1, 0.5, 0),
+]
+START = 1000.0  # 控制器用时间戳比较，从非零时间开始
+
+
+def make_controller(latency, initial_level=1):
+    controller = LatencyController(LADDER, target_latency_ms=100, initial_level=initial_level)
+    controller.observe(latency)
+    return controller
+
+
+def test_degrades_after_hold():
+    """延迟持续超过目标一段时间后才降一档，换档后最短停留时间内不再换档"""
+    controller = make_controller(0.2)
+    assert controller.update(now=START) is None
+    assert controller.update(now=START + DEGRADE_HOLD_SECONDS - 0.1) is None
+
+    level = controller.update(now=START + DEGRADE_HOLD_SECONDS)
+    assert level is LADDER[2] and controller.level == 2
+    assert controller.history[-1]['reason'] == 'degrade'
+
+    # 已经是最低开销档，继续超标也不再变化
+    later = START + DEGRADE_HOLD_SECONDS + MIN_DWELL_SECONDS
+    assert controller.update(now=later) is None
+    assert controller.update(now=later + DEGRADE_HOLD_SECONDS) is None
+    assert controller.level == 2
+
+
+def test_upgrade_is_slower_than_degrade():
+    """延迟明显低于目标时升档，但需要比降档更长的保持时间"""
+    controller = make_controller(0.03)
+    assert controller.update(now=START) is None
+    assert controller.update(now=START + DEGRADE_HOLD_SECONDS) is None
+    assert controller.update(now=START + UPGRADE_HOLD_SECONDS - 0.1) is None
+    assert controller.update(now=START + UPGRADE_HOLD_SECONDS) is LADDER[0]
+    assert controller.history[-1]['reason'] == 'upgrade'
+
+
+def test_hysteresis_band_holds_level():
+    """延迟处于滞回区间时保持档位，并清除之前累计的超标计时"""
+    controller = make_controller(0.2)
+    controller.update(now=START)
+    controller.latency_ema = 0.1          # 回到目标附近
+    assert controller.update(now=START + 1.0) is None
+    controller.latency_ema = 0.2          # 再次超标，重新开始计时
+    assert controller.update(now=START + 1.5) is None
+    assert controller.update(now=START + 1.5 + DEGRADE_HOLD_SECONDS - 0.1) is None
+    assert controller.level == 1
+
+
+def test_manual_level_and_state():
+    """手动指定档位、关闭控制器，以及状态中的延迟分位数"""
+    controller = LatencyController(LADDER, target_latency_ms=100)
+    for latency in (0.05, 0.1, 0.2, 0.4):
+        controller.observe(latency)
+    assert controller.set_level(2) is LADDER[2]
+    assert controller.set_level(5) is None
+
+    controller.enabled = False
+    controller.latency_ema = 1.0
+    assert controller.update(now=START + 100) is None
+
+    state = controller.get_state()
+    print(f"延迟分位数: p50 {state['latency_p50_ms']}ms，p95 {state['latency_p95_ms']}ms")
+    assert state['level'] == 2 and state['current'] == LADDER[2].to_dict()
+    assert state['latency_p50_ms'] == 200.0 and state['latency_p95_ms'] == 400.0
+    assert state['history'][-1]['reason'] == 'manual'
+
+
+if __name__ == "__main__":
+    test_degrades_after_hold()
+    test_upgrade_is_slower_than_degrade()
+    test_hysteresis_band_holds_level()
+    test_manual_level_and_state()
+    print("\n所有测试通过!")
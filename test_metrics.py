@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""测试指标注册表：Prometheus文本格式导出、直方图累计分桶、同名指标复用和timed装饰器"""
+from modules.metrics_module import MetricsRegistry, timed
+
+
+def test_counter_and_gauge_exposition():
+    """计数器和仪表按标签分别导出，标签值中的引号和换行被转义"""
+    registry = MetricsRegistry()
+    requests = registry.counter('test_requests_total', '请求次数', ('route',))
+    requests.labels('/api/status').inc()
+    requests.labels(route='/api/status').inc(2)
+    requests.labels('say "hi"\n').inc()
+    depth = registry.gauge('test_queue_depth', '队列深度')
+    depth.set_function(lambda: 7)
+
+    text = registry.expose()
+    print(text)
+    lines = text.splitlines()
+    assert '# HELP test_queue_depth 队列深度' in lines
+    assert '# TYPE test_queue_depth gauge' in lines
+    assert 'test_queue_depth 7' in lines
+    assert '# TYPE test_requests_total counter' in lines
+    assert 'test_requests_total{route="/api/status"} 3' in lines
+    assert 'test_requests_total{route="say \\"hi\\"\\n"} 1' in lines
+    assert text.endswith('\n')
+    # 指标族按名称排序输出
+    assert text.index('test_queue_depth') < text.index('test_requests_total')
+
+
+def test_histogram_cumulative_buckets():
+    """直方图导出累计桶计数，边界上的样本计入该边界的桶，最后是+Inf、_sum和_count"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram('test_seconds', '耗时', ('stage',), buckets=(0.1, 0.5, 1.0))
+    child = histogram.labels('pose')
+    for value in (0.05, 0.1, 0.3, 2.0):
+        child.observe(value)
+
+    lines = registry.expose().splitlines()
+    assert lines[:2] == ['# HELP test_seconds 耗时', '# TYPE test_seconds histogram']
+    assert lines[2:] == [
+        'test_seconds_bucket{stage="pose",le="0.1"} 2',
+        'test_seconds_bucket{stage="pose",le="0.5"} 3',
+        'test_seconds_bucket{stage="pose",le="1"} 3',
+        'test_seconds_bucket{stage="pose",le="+Inf"} 4',
+        'test_seconds_sum{stage="pose"} 2.45',
+        'test_seconds_count{stage="pose"} 4',
+    ]
+
+
+def test_get_or_create_and_label_checks():
+    """同名同类型重复注册返回同一个指标，类型或标签不同时报错，标签数量不对时报错"""
+    registry = MetricsRegistry()
+    first = registry.counter('test_events_total', '事件', ('kind',))
+    assert registry.counter('test_events_total', '事件', ('kind',)) is first
+    for create in (lambda: registry.gauge('test_events_total', '事件', ('kind',)),
+                   lambda: registry.counter('test_events_total', '事件', ('other',)),
+                   lambda: first.labels('a', 'b')):
+        try:
+            create()
+        except ValueError:
+            continue
+        raise AssertionError("应当抛出ValueError")
+
+
+def test_timed_decorator():
+    """timed记录每次调用的耗时（包括抛出异常的调用），并保留被装饰函数的名称和文档"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram('test_call_seconds', '调用耗时')
+
+    @timed(histogram)
+    def work(fail=False):
+        """工作函数"""
+        if fail:
+            raise RuntimeError('失败')
+        return 42
+
+    assert work() == 42
+    try:
+        work(fail=True)
+    except RuntimeError:
+        pass
+    assert work.__name__ == 'work' and work.__doc__ == '工作函数'
+    assert 'test_call_seconds_count 2' in registry.expose().splitlines()
+
+
+if __name__ == "__main__":
+    test_counter_and_gauge_exposition()
+    test_histogram_cumulative_buckets()
+    test_get_or_create_and_label_checks()
+    test_timed_decorator()
+    print("\n所有测试通过!")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""测试运动门控：静止画面跳过推理，画面变化或到达强制刷新间隔时放行"""
+import numpy as np
+
+from modules.motion_gate_module import MotionGate
+
+
+def make_frame(value, box=None):
+    """纯色帧，可在指定区域 (x, y, w, h) 画一个白色方块"""
+    frame = np.full((240, 320, 3), value, dtype=np.uint8)
+    if box is not None:
+        x, y, w, h = box
+        frame[y:y + h, x:x + w] = 255
+    return frame
+
+
+def test_static_scene_is_skipped():
+    """首帧放行，之后相同画面在刷新间隔内被跳过"""
+    gate = MotionGate(threshold=3.0, refresh_interval=2.0)
+    frame = make_frame(80)
+
+    assert gate.should_process(frame, now=0.0)
+    assert not gate.should_process(frame, now=0.5)
+    assert not gate.should_process(make_frame(81), now=1.0)  # 轻微亮度变化低于阈值
+    assert gate.stats['hits'] == 2
+
+
+def test_motion_passes_and_updates_reference():
+    """画面变化超过阈值时放行，并以该帧作为新的参考图"""
+    gate = MotionGate(threshold=3.0, refresh_interval=10.0)
+    assert gate.should_process(make_frame(80), now=0.0)
+
+    moved = make_frame(80, box=(100, 60, 120, 120))
+    assert gate.should_process(moved, now=0.1)
+    print(f"画面变化时的帧差: {gate.last_diff:.1f}")
+    assert gate.last_diff >= 3.0
+
+    # 参考图已更新为变化后的画面
+    assert not gate.should_process(moved, now=0.2)
+
+
+def test_forced_refresh_on_static_scene():
+    """静止画面到达强制刷新间隔时仍放行一次"""
+    gate = MotionGate(threshold=3.0, refresh_interval=2.0)
+    frame = make_frame(50)
+    assert gate.should_process(frame, now=0.0)
+    assert not gate.should_process(frame, now=1.9)
+    assert gate.should_process(frame, now=2.0)
+    assert gate.stats['forced_refreshes'] == 1
+    assert not gate.should_process(frame, now=2.5)  # 刷新后重新计时
+
+
+def test_disabled_and_reset():
+    """关闭门控时每帧都放行；reset 后下一帧必定放行"""
+    gate = MotionGate()
+    frame = make_frame(120)
+    gate.enabled = False
+    assert all(gate.should_process(frame, now=t) for t in (0.0, 0.1, 0.2))
+    assert gate.stats['checks'] == 0
+
+    gate.enabled = True
+    assert gate.should_process(frame, now=0.3)
+    assert not gate.should_process(frame, now=0.4)
+    gate.reset()
+    assert gate.should_process(frame, now=0.5)
+    assert gate.get_stats()['hit_rate'] == round(1 / 3, 3)
+
+
+if __name__ == "__main__":
+    test_static_scene_is_skipped()
+    test_motion_passes_and_updates_reference()
+    test_forced_refresh_on_static_scene()
+    test_disabled_and_reset()
+    print("\n所有测试通过!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""测试坐姿信号统计：滚动窗口累计与过期、坐姿类型时长、角度分位数、指数滑动平均和滚动投票"""
+import math
+
+from modules.posture_signal_module import PostureSignalEngine, RollingVote, SIGNAL_EMA_TIME_CONSTANT
+
+WINDOWS = {'recent': (10, 1), 'minute': (60, 5)}
+START = 1000.0
+
+
+def test_posture_seconds_and_expiry():
+    """相邻结果的间隔计入上一次结果的类型，超过最大间隔不计入；移出窗口的数据从累计值中减去"""
+    engine = PostureSignalEngine(WINDOWS)
+    for offset, angle, posture in ((0, 10, 'good'), (1, 20, 'fair'), (2, 30, 'poor'), (10, 40, 'bad')):
+        engine.observe_pose(angle, posture, now=START + offset)
+
+    recent = engine.get_summary(now=START + 10)['windows']['recent']
+    print(f"最近10秒: {recent['samples']} 个样本，均值 {recent['angle_mean']}，时长 {recent['posture_seconds']}")
+    assert recent['samples'] == 4 and recent['angle_mean'] == 25.0
+    assert recent['posture_seconds'] == {'good': 1.0, 'mild': 1.0, 'moderate': 0.0, 'severe': 0.0}
+    assert recent['posture_percentage']['good'] == 50.0
+
+    # 前三个结果移出最近10秒窗口，1分钟窗口仍保留
+    summary = engine.get_summary(now=START + 13)['windows']
+    assert summary['recent']['samples'] == 1 and summary['recent']['angle_mean'] == 40.0
+    assert summary['recent']['tracked_seconds'] == 0.0
+    assert summary['minute']['samples'] == 4
+
+    # 全部移出后窗口清空
+    summary = engine.get_summary(now=START + 25)['windows']
+    assert summary['recent']['samples'] == 0 and summary['recent']['angle_mean'] is None
+    assert engine.get_posture_stats('minute', now=START + 25)['good']['seconds'] == 1.0
+    assert engine.get_posture_stats('missing') is None
+
+
+def test_angle_percentiles():
+    """角度分位数按直方图最近秩计算，超过最大角度的计入最后一格"""
+    engine = PostureSignalEngine(WINDOWS)
+    for i in range(10):
+        engine.observe_pose(i + 0.2, 'good', now=START + i * 0.1)
+    percentiles = engine.get_summary(now=START + 1)['windows']['recent']['angle_percentiles']
+    assert percentiles == {'p50': 4.5, 'p90': 8.5, 'p95': 9.5}
+
+    engine.observe_pose(500, 'good', now=START + 1)
+    assert engine.get_current(now=START + 1)['angle_p90_minute'] == 9.5
+    assert engine.windows['recent'].percentile(100) == 120.5
+
+
+def test_ema_emotion_and_reset():
+    """角度滑动平均按时间间隔计算；无效角度中断时长统计；reset清空所有统计"""
+    engine = PostureSignalEngine(WINDOWS)
+    engine.observe_pose(10, 'good', now=START)
+    engine.observe_pose(20, 'good', now=START + SIGNAL_EMA_TIME_CONSTANT)
+    expected = 10 + (1 - math.exp(-1)) * 10
+    assert engine.get_current(now=START + 5)['angle_ema'] == round(expected, 1)
+
+    engine.observe_pose(None, 'good', now=START + 6)
+    engine.observe_pose(30, 'poor', now=START + 7)   # 无效角度之后的间隔不计入任何类型
+    engine.observe_emotion('HAPPY', now=START + 7)
+    engine.observe_emotion('HAPPY', now=START + 7)
+    engine.observe_emotion('SAD', now=START + 7)
+    current = engine.get_current(now=START + 7)
+    assert current['posture_category'] == 'moderate' and current['emotion'] == 'SAD'
+    minute = engine.get_summary(['minute'], now=START + 7)['windows']['minute']
+    assert minute['posture_seconds']['good'] == 1.0
+    assert minute['emotion_counts'] == {'HAPPY': 2, 'SAD': 1}
+
+    engine.reset()
+    current = engine.get_current(now=START + 7)
+    assert current['angle_ema'] is None and current['emotion'] is None
+    assert engine.get_summary(now=START + 7)['windows']['minute']['samples'] == 0
+
+
+def test_rolling_vote():
+    """滚动投票淘汰最早的值，票数相同时取靠前的取值；缩短窗口时同步淘汰"""
+    vote = RollingVote(('good', 'poor'), maxlen=3)
+    for value in ('poor', 'poor', 'good'):
+        vote.append(value)
+    assert vote.most_common() == 'poor'
+    vote.append('good')                 # 淘汰第一个poor
+    assert vote.most_common() == 'good' and len(vote) == 3
+    vote.resize(2)
+    assert list(vote) == ['good', 'good'] and vote.counts == {'good': 2, 'poor': 0}
+
+
+if __name__ == "__main__":
+    test_posture_seconds_and_expiry()
+    test_angle_percentiles()
+    test_ema_emotion_and_reset()
+    test_rolling_vote()
+    print("\n所有测试通过!")
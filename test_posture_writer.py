@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""测试坐姿时间批量写入器：攒批写入、数据库不可用时写入本地日志、恢复后按顺序补写"""
+import os
+import sys
+import time
+import types
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from modules.posture_writer_module import PostureTimeWriter
+
+
+@contextmanager
+def fake_database(**functions):
+    """用只包含给定函数的模块临时代替 modules.database_module，测试不连接MySQL"""
+    module = types.ModuleType('modules.database_module')
+    for name, func in functions.items():
+        setattr(module, name, func)
+    original = sys.modules.get('modules.database_module')
+    sys.modules['modules.database_module'] = module
+    try:
+        yield module
+    finally:
+        if original is not None:
+            sys.modules['modules.database_module'] = original
+        else:
+            del sys.modules['modules.database_module']
+
+
+def make_record(index):
+    start = datetime(2024, 5, 1, 10) + timedelta(minutes=index)
+    return (start, start + timedelta(seconds=30), 30.0, float(index), 'good', '', 'cam0')
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def test_writer_flushes_batches():
+    """攒够批量大小立即写入，停止时写入剩余记录"""
+    batches = []
+
+    def record_posture_times_batch(records):
+        batches.append(list(records))
+        return len(records)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            fake_database(record_posture_times_batch=record_posture_times_batch):
+        writer = PostureTimeWriter(journal_path=os.path.join(tmp_dir, 'journal.jsonl'),
+                                   batch_size=3, flush_interval=10.0)
+        writer.start()
+        for i in range(5):
+            writer.submit(*make_record(i))
+        assert wait_until(lambda: len(batches) == 1)
+        writer.stop()
+
+        print(f"写入批次: {[len(batch) for batch in batches]}")
+        assert [len(batch) for batch in batches] == [3, 2]
+        assert [record[3] for batch in batches for record in batch] == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert writer.stats['written'] == 5 and writer.stats['journaled'] == 0
+        assert not os.path.exists(writer.journal_path)
+
+
+def test_writer_journals_and_replays():
+    """数据库不可用时整批写入本地日志，恢复后按原顺序补写并删除日志"""
+    db_state = {'available': False}
+    written = []
+
+    def record_posture_times_batch(records):
+        if not db_state['available']:
+            return None
+        written.extend(records)
+        return len(records)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            fake_database(record_posture_times_batch=record_posture_times_batch):
+        writer = PostureTimeWriter(journal_path=os.path.join(tmp_dir, 'journal.jsonl'),
+                                   batch_size=2, flush_interval=0.1, retry_interval=0.2)
+        writer.start()
+        for i in range(4):
+            writer.submit(*make_record(i))
+        assert wait_until(lambda: writer.journal_pending == 4)
+
+        with open(writer.journal_path, 'r', encoding='utf-8') as f:
+            assert len(f.readlines()) == 4
+        print(f"数据库不可用，日志中有 {writer.journal_pending} 条记录")
+
+        db_state['available'] = True
+        writer.submit(*make_record(4))
+        assert wait_until(lambda: len(written) == 5)
+        writer.stop()
+
+        print(f"数据库恢复后补写 {writer.stats['replayed']} 条，写入 {writer.stats['written']} 条")
+        assert [record[3] for record in written] == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert written[0] == make_record(0)  # 日志中的记录完整还原（包括时间和摄像头编号）
+        # 重试间隔内到达的新记录也先写入日志，保证顺序
+        assert writer.stats['replayed'] >= 4 and writer.stats['replayed'] + writer.stats['written'] == 5
+        assert writer.journal_pending == 0
+        assert not os.path.exists(writer.journal_path) and not os.path.exists(writer.replay_path)
+
+
+if __name__ == "__main__":
+    test_writer_flushes_batches()
+    test_writer_journals_and_replays()
+    print("\n所有测试通过!")
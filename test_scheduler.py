@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""测试分析任务调度器：按目标频率到期、按优先级分配CPU预算；多个摄像头之间公平分配CPU预算"""
+from modules.scheduler_module import AnalyzerScheduler, fair_share
+
+
+def make_scheduler(cpu_budget=1.0):
+    scheduler = AnalyzerScheduler(cpu_budget=cpu_budget)
+    scheduler.register('pose', target_hz=10, priority=0)
+    scheduler.register('emotion', target_hz=5, priority=1, min_hz=1)
+    return scheduler
+
+
+def test_tasks_run_at_target_rate():
+    """任务第一次检查即到期，之后按目标频率到期"""
+    scheduler = make_scheduler()
+    assert scheduler.due(now=0.0) == ['pose', 'emotion']
+
+    assert scheduler.try_run('pose', now=0.0)
+    assert not scheduler.try_run('pose', now=0.05)   # 10Hz，间隔0.1秒
+    assert scheduler.try_run('pose', now=0.1)
+
+    scheduler.mark_run('emotion', now=0.0)
+    assert scheduler.due(now=0.15) == []
+    assert scheduler.due(now=0.2) == ['pose', 'emotion']
+    assert scheduler.due(['emotion'], now=0.2) == ['emotion']
+
+
+def test_due_does_not_consume_slot():
+    """due只查询不占用执行机会，mark_run之后才开始计算下一次到期时间"""
+    scheduler = make_scheduler()
+    assert 'pose' in scheduler.due(now=0.0)
+    assert 'pose' in scheduler.due(now=0.01)
+    scheduler.mark_run('pose', now=0.01)
+    assert 'pose' not in scheduler.due(now=0.05)
+    assert scheduler.tasks['pose'].runs == 1
+
+
+def test_budget_throttles_lower_priority():
+    """预算不足时先满足高优先级任务，低优先级任务降频但不低于最低频率"""
+    scheduler = make_scheduler(cpu_budget=1.0)
+    scheduler.record_cost('pose', 0.08)     # 10Hz × 0.08秒 = 0.8核
+    scheduler.record_cost('emotion', 0.1)   # 5Hz × 0.1秒 = 0.5核，只剩0.2核
+    scheduler.due(now=0.0)
+
+    pose, emotion = scheduler.tasks['pose'], scheduler.tasks['emotion']
+    print(f"pose {pose.effective_hz:.2f}Hz，emotion {emotion.effective_hz:.2f}Hz")
+    assert pose.effective_hz == 10
+    assert abs(emotion.effective_hz - 2.0) < 1e-6
+    assert abs(scheduler.get_load() - 1.0) < 1e-6
+    assert abs(scheduler.get_demand() - 1.3) < 1e-6
+
+    # 预算几乎耗尽时仍保证最低频率
+    scheduler.record_cost('pose', 0.2)
+    scheduler.due(now=0.0)
+    assert emotion.effective_hz == emotion.min_hz
+
+    # 关闭预算后按目标频率执行
+    scheduler.budget_enabled = False
+    scheduler.due(now=0.0)
+    assert emotion.effective_hz == 5
+
+
+def test_rate_scale_and_disable():
+    """外部频率缩放降低实际频率；禁用的任务不再到期"""
+    scheduler = make_scheduler()
+    scheduler.set_rate_scale(0.5, names=['pose'])
+    scheduler.mark_run('pose', now=0.0)
+    assert not scheduler.try_run('pose', now=0.15)
+    assert scheduler.try_run('pose', now=0.2)        # 5Hz
+
+    assert scheduler.set_task('emotion', enabled=False)
+    assert 'emotion' not in scheduler.due(now=10.0)
+    assert not scheduler.set_task('missing', enabled=False)
+
+
+def test_fair_share_between_cameras():
+    """需求低的摄像头按需求分配，节省的预算按权重分给其他摄像头；需求全部满足后余量按权重平分"""
+    shares = fair_share(2.0, {'cam0': 0.2, 'cam1': 1.5, 'cam2': 1.5})
+    print(f"预算分配: {shares}")
+    assert abs(shares['cam0'] - 0.2) < 1e-9
+    assert abs(shares['cam1'] - 0.9) < 1e-9 and abs(shares['cam2'] - 0.9) < 1e-9
+
+    shares = fair_share(3.0, {'cam0': 2.0, 'cam1': 2.0}, weights={'cam0': 2.0})
+    assert abs(shares['cam0'] - 2.0) < 1e-9 and abs(shares['cam1'] - 1.0) < 1e-9
+
+    shares = fair_share(2.0, {'cam0': 0.5, 'cam1': 0.0}, weights={'cam0': 3.0})
+    assert abs(shares['cam0'] - 1.625) < 1e-9 and abs(shares['cam1'] - 0.375) < 1e-9
+    assert abs(sum(shares.values()) - 2.0) < 1e-9
+
+    # 预算为0时每个摄像头仍保留最低份额
+    shares = fair_share(0.0, {'cam0': 1.0}, min_share=0.05)
+    assert shares == {'cam0': 0.05}
+
+
+if __name__ == "__main__":
+    test_tasks_run_at_target_rate()
+    test_due_does_not_consume_slot()
+    test_budget_throttles_lower_priority()
+    test_rate_scale_and_disable()
+    test_fair_share_between_cameras()
+    print("\n所有测试通过!")
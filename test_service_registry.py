@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""测试服务注册表：服务只加载一次、加载失败后退避重试、@requires 声明的服务在请求前加载"""
+import time
+import threading
+
+from modules.service_registry_module import ServiceRegistry, STATE_READY, STATE_FAILED
+from test_posture_writer import fake_database
+
+
+class FlakyFactory:
+    """前 failures 次创建失败的服务创建函数"""
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, module, **dependencies):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise RuntimeError('设备暂时不可用')
+        return {'module': module.__name__, 'dependencies': dependencies}
+
+
+def test_service_loads_once():
+    """多个线程同时获取同一个服务时只加载一次；依赖的服务先加载"""
+    services = ServiceRegistry()
+    base, service = FlakyFactory(), FlakyFactory(delay=0.05)
+    services.register('base', 'json', base)
+    services.register('service', 'json', service, depends=('base',))
+    assert services.peek('service') is None
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(services.get('service'))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert base.calls == 1 and service.calls == 1
+    assert len({id(result) for result in results}) == 1
+    assert results[0]['dependencies'] == {'base': services.peek('base')}
+    stats = services.get_stats()['services']['service']
+    assert stats['state'] == STATE_READY and stats['loaded_by'] == 'request'
+    assert services.get('missing') is None
+
+
+def test_failed_service_retries_after_backoff():
+    """加载失败后退避间隔内不重试，之后再次使用时重新加载；间隔按失败次数加倍"""
+    services = ServiceRegistry(retry_interval=0.1, retry_max_interval=0.15)
+    factory = FlakyFactory(failures=2)
+    services.register('serial', 'json', factory)
+
+    assert services.get('serial') is None
+    spec = services.services['serial']
+    assert spec.state == STATE_FAILED and spec.failures == 1
+    assert services.get('serial') is None and factory.calls == 1   # 退避间隔内直接返回
+
+    time.sleep(0.12)
+    assert services.get('serial') is None and factory.calls == 2
+    assert 0.1 < spec.retry_at - time.time() <= 0.15               # 第二次失败的间隔加倍，但不超过上限
+    print(f"失败 {spec.failures} 次，{services.get_stats()['services']['serial']['retry_in']} 秒后重试")
+
+    time.sleep(0.16)
+    assert services.get('serial') is not None and factory.calls == 3
+    assert spec.state == STATE_READY and spec.failures == 0 and spec.error is None
+
+
+def test_requires_loads_services_per_request():
+    """@requires 声明的服务在请求前加载并绑定；未声明服务的接口不触发加载；失败的服务退避后在下一次请求时重试"""
+    with fake_database(save_record_to_db=None, get_history_records=None,
+                       clear_history=None, clear_all_posture_records=None):
+        import modules.routes as routes
+        from app import create_app
+    from modules.video_stream_module import VideoStreamHandler
+
+    services = ServiceRegistry(retry_interval=0.1)
+    factory = FlakyFactory(failures=1)
+    services.register('video_stream', 'modules.video_stream_module',
+                      lambda module: factory(module) and VideoStreamHandler())
+    original_handler = routes.video_stream_handler
+    routes.video_stream_handler = None
+    try:
+        app = create_app(services, warmup=False)
+        client = app.test_client()
+
+        response = client.get('/api/services')
+        assert response.get_json()['services']['services']['video_stream']['state'] == 'pending'
+        assert factory.calls == 0
+
+        response = client.get('/api/stream/sessions')
+        assert response.get_json()['status'] == 'error' and factory.calls == 1
+        response = client.get('/api/stream/sessions')
+        assert response.get_json()['status'] == 'error' and factory.calls == 1   # 退避间隔内不重试
+
+        time.sleep(0.12)
+        response = client.get('/api/stream/sessions')
+        print(f"重试后: {response.get_json()['status']}")
+        assert response.get_json()['status'] == 'success' and factory.calls == 2
+        assert routes.video_stream_handler is services.peek('video_stream')
+        assert services.get_stats()['services']['video_stream']['loaded_by'] == 'request'
+    finally:
+        routes.video_stream_handler = original_handler
+        routes.service_registry = None
+
+
+if __name__ == "__main__":
+    test_service_loads_once()
+    test_failed_service_retries_after_backoff()
+    test_requires_loads_services_per_request()
+    print("\n所有测试通过!")
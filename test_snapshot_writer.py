@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""测试坐姿抓拍保存线程：停止时保存队列中剩余的抓拍并释放帧数据包；共用的写入线程按使用者计数启动和停止"""
+import os
+import time
+import tempfile
+import threading
+
+import numpy as np
+
+from modules.snapshot_module import PostureSnapshotWriter
+from modules.posture_writer_module import PostureTimeWriter
+from test_posture_writer import fake_database
+
+
+class FakePacket:
+    """带引用计数的帧数据包"""
+    def __init__(self, jpeg_bytes):
+        self.jpeg_bytes = jpeg_bytes
+        self.refs = 1
+
+    def retain(self):
+        self.refs += 1
+        return self
+
+    def release(self):
+        self.refs -= 1
+
+
+def test_snapshot_writer_saves_queue_on_stop():
+    """停止时保存队列中剩余的抓拍，保存完成后释放帧数据包"""
+    saved = []
+
+    def save_posture_image(image, jpeg_bytes=None, **metadata):
+        time.sleep(0.05)
+        saved.append((image.shape, jpeg_bytes, metadata))
+        return {'id': len(saved), 'path': f"memory/{len(saved)}.jpg"}
+
+    with fake_database(save_posture_image=save_posture_image):
+        writer = PostureSnapshotWriter(queue_size=4)
+        packet = FakePacket(b'\xff\xd8jpeg')
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        writer.start()
+        assert writer.submit(frame, {'angle': 10.0, 'device_id': 'cam0'}, packet=packet, label='不良')
+        assert writer.submit(frame, {'angle': 20.0, 'device_id': 'cam1'})
+        writer.stop()
+
+        print(f"已保存 {writer.stats['saved']} 张抓拍")
+        assert writer.stats['saved'] == 2 and writer.stats['failed'] == 0
+        assert saved[0][1] == b'\xff\xd8jpeg' and saved[0][2]['device_id'] == 'cam0'
+        assert saved[1][1] is None and saved[1][2]['angle'] == 20.0
+        assert packet.refs == 1  # 保存线程持有的引用已释放
+
+
+def check_shared_start_stop(writer, thread_name, users=8, rounds=3):
+    """多个使用者同时start/stop时计数准确，任何时候最多只有一个工作线程"""
+    barrier = threading.Barrier(users)
+    errors = []
+
+    def worker_threads():
+        return [t for t in threading.enumerate() if t.name == thread_name]
+
+    def user():
+        for _ in range(rounds):
+            barrier.wait()
+            writer.start()
+            barrier.wait()
+            if len(worker_threads()) != 1 or not writer.is_running:
+                errors.append(writer.users)
+            barrier.wait()
+            writer.stop()
+
+    threads = [threading.Thread(target=user) for _ in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"{thread_name}: {users} 个使用者 × {rounds} 轮，异常 {len(errors)} 次")
+    assert errors == []
+    assert writer.users == 0 and not writer.is_running and writer.thread is None
+    assert worker_threads() == []
+
+
+def test_shared_writers_count_users():
+    """坐姿时间写入器和抓拍保存线程被多个摄像头的分析器同时启动和停止"""
+    check_shared_start_stop(PostureSnapshotWriter(), 'posture-snapshot')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        writer = PostureTimeWriter(journal_path=os.path.join(tmp_dir, 'journal.jsonl'), flush_interval=0.05)
+        check_shared_start_stop(writer, 'posture-writer')
+
+
+if __name__ == "__main__":
+    test_snapshot_writer_saves_queue_on_stop()
+    test_shared_writers_count_users()
+    print("\n所有测试通过!")
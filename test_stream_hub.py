@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""测试视频流广播中心、观看者会话和分析帧信箱：同一帧只编码一次，没有新帧时只按间隔重发，新帧到达时唤醒观看者，慢速客户端只降低自己的分辨率；/api/snapshot 快照接口"""
+import time
+import threading
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+from flask import Flask
+
+from modules.stream_hub_module import StreamBroadcastHub
+from modules.frame_broker_module import FrameMailbox
+from modules.video_stream_module import VideoStreamHandler
+from test_posture_writer import fake_database
+
+
+def test_concurrent_encode_once():
+    """同一个键和帧序号被多个观看者同时请求时只编码一次，所有人拿到同一份结果"""
+    hub = StreamBroadcastHub()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    viewers = 8
+    barrier = threading.Barrier(viewers)
+    results = []
+    lock = threading.Lock()
+
+    def slow_render(image):
+        time.sleep(0.05)  # 让其他观看者在编码期间到达
+
+    def viewer():
+        barrier.wait()
+        encoded, did_encode = hub.encode('raw', 7, frame, 320, 240, 80, render=slow_render)
+        with lock:
+            results.append((encoded, did_encode))
+
+    threads = [threading.Thread(target=viewer) for _ in range(viewers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"{viewers} 个观看者，实际编码 {sum(1 for _, did in results if did)} 次")
+    assert sum(1 for _, did in results if did) == 1
+    assert len({id(encoded) for encoded, _ in results}) == 1
+    assert hub.streams['raw'].encodes == 1
+    assert hub.streams['raw'].deliveries == viewers
+
+    # 更新的帧序号重新编码，旧序号直接取缓存
+    _, did_encode = hub.encode('raw', 8, frame, 320, 240, 80)
+    assert did_encode
+    encoded, did_encode = hub.encode('raw', 7, frame, 320, 240, 80)
+    assert not did_encode and encoded.seq == 8
+
+
+def test_should_send_and_keepalive():
+    """新帧总是发送；同一帧只按保持连接间隔重发，重发计入keepalives而不是发送帧数"""
+    hub = StreamBroadcastHub()
+    session = hub.open_session('raw', quality=80)
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+
+    assert session.should_send(1)
+    encoded, _ = hub.encode('raw', 1, frame, 160, 120, 80)
+    session.record_sent(encoded, write_seconds=0.001)
+    assert session.frames_sent == 1 and session.last_seq == 1 and session.keepalives == 0
+
+    # 同一帧在保持连接间隔内不重发，新帧立即发送
+    assert not session.should_send(1)
+    assert session.should_send(2)
+
+    # 超过保持连接间隔后重发同一帧
+    assert session.should_send(1, keepalive=0)
+    session.record_sent(encoded, write_seconds=0.001)
+    print(f"发送 {session.frames_sent} 帧，保持连接重发 {session.keepalives} 次")
+    assert session.keepalives == 1
+    assert session.frames_sent == 1
+
+    # 跳过的来源帧计入丢帧统计
+    encoded, _ = hub.encode('raw', 5, frame, 160, 120, 80)
+    session.record_sent(encoded, write_seconds=0.001)
+    assert session.frames_sent == 2 and session.frames_skipped == 3
+
+    hub.close_session(session)
+    assert hub.get_sessions() == []
+
+
+def test_mailbox_wakes_on_publish():
+    """等待中的观看者在发布新帧时被唤醒并拿到新帧"""
+    mailbox = FrameMailbox('pose')
+    received = []
+
+    def waiter():
+        received.append(mailbox.wait_newer(0, timeout=5.0))
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    start_time = time.time()
+    mailbox.publish('frame-1')
+    thread.join(timeout=2.0)
+
+    assert not thread.is_alive()
+    assert received == [(1, 'frame-1')]
+    assert time.time() - start_time < 1.0
+    assert mailbox.stats['idle_wakeups'] == 0
+
+
+def test_mailbox_wakes_on_wake_all():
+    """wake_all 唤醒等待者（如停止推流时），没有新帧时返回原版本号"""
+    mailbox = FrameMailbox('emotion', frame='initial')
+    received = []
+
+    def waiter():
+        received.append(mailbox.wait_newer(0, timeout=5.0))
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    start_time = time.time()
+    mailbox.wake_all()
+    thread.join(timeout=2.0)
+
+    assert not thread.is_alive()
+    assert received == [(0, 'initial')]
+    assert time.time() - start_time < 1.0
+    assert mailbox.stats['idle_wakeups'] == 1
+
+
+def test_session_lag_and_slow_client_downscale():
+    """延迟只按新帧计算，重发的旧帧不计入；写出耗时过长时只降低本会话的输出分辨率，恢复后逐档升回"""
+    hub = StreamBroadcastHub()
+    slow = hub.open_session('raw', quality=80)
+    fast = hub.open_session('raw', quality=80)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    encoded, _ = hub.encode('raw', 1, frame, 640, 480, 80)
+    time.sleep(0.02)
+    slow.record_sent(encoded, write_seconds=0.2)
+    lag = slow.lag
+    assert lag >= 0.02
+
+    time.sleep(0.02)
+    slow.record_sent(encoded, write_seconds=0.2)   # 保持连接重发
+    assert slow.lag == lag
+
+    for _ in range(5):
+        fast.record_sent(encoded, write_seconds=0.001)
+    for session in (slow, fast):
+        session.last_resolution_adjust_time = 0     # 跳过调整间隔
+        session.adjust_resolution()
+    print(f"慢速会话输出 {slow.output_size(frame)}，正常会话输出 {fast.output_size(frame)}")
+    assert slow.output_size(frame) == (480, 360)
+    assert fast.output_size(frame) == (640, 480)
+    assert slow.get_stats()['downscale'] == 0.75 and slow.get_stats()['lag_ms'] == round(lag * 1000, 1)
+
+    slow.last_resolution_adjust_time = 0
+    slow.record_sent(encoded, write_seconds=0.001)
+    slow.adjust_resolution()
+    assert slow.output_size(frame) == (640, 480)
+
+
+@contextmanager
+def snapshot_client(handler):
+    """注册路由的测试客户端，/api/snapshot 使用给定的视频流处理器"""
+    with fake_database(save_record_to_db=None, get_history_records=None,
+                       clear_history=None, clear_all_posture_records=None):
+        import modules.routes as routes
+    app = Flask(__name__)
+    app.register_blueprint(routes.routes_bp)
+    original_handler = routes.video_stream_handler
+    routes.video_stream_handler = handler
+    try:
+        yield app.test_client()
+    finally:
+        routes.video_stream_handler = original_handler
+
+
+def test_snapshot_not_modified():
+    """/api/snapshot 请求头 If-None-Match 与最新帧的ETag一致时返回304，且不启用视频流"""
+    handler = VideoStreamHandler()
+    handler.mailboxes['pose'].publish(np.zeros((480, 640, 3), dtype=np.uint8))
+    with snapshot_client(handler) as client:
+        response = client.get('/api/snapshot?stream=pose&resolution=360p')
+        etag = response.headers.get('ETag')
+        print(f"首次请求: {response.status_code}，{len(response.data)} 字节，ETag {etag}")
+        assert response.status_code == 200
+        assert response.mimetype == 'image/jpeg' and response.data[:2] == b'\xff\xd8'
+
+        response = client.get('/api/snapshot?stream=pose&resolution=360p', headers={'If-None-Match': etag})
+        print(f"带ETag请求: {response.status_code}")
+        assert response.status_code == 304
+        assert response.data == b''
+        assert handler.broadcast_hub.streams['pose'].encodes == 1
+
+        # 发布新帧后ETag变化，重新返回图像
+        handler.mailboxes['pose'].publish(np.ones((480, 640, 3), dtype=np.uint8))
+        response = client.get('/api/snapshot?stream=pose&resolution=360p', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers.get('ETag') != etag
+
+        assert not handler.get_streaming_status()
+
+
+def test_pose_snapshot_without_streaming():
+    """视频流关闭时，请求姿势快照后分析线程也会发布分析帧，之后的快照返回分析画面而不是默认画面"""
+    handler = VideoStreamHandler()
+    handler.is_streaming = False
+    assert not handler.has_viewers('pose')
+
+    with snapshot_client(handler) as client:
+        response = client.get('/api/snapshot?stream=pose')
+        assert response.status_code == 200
+        default_etag = response.headers.get('ETag')
+
+        # 快照租约期间分析线程认为有观看者（与 WebPostureMonitor._has_stream_viewers 相同的判断）
+        assert handler.has_viewers('pose') and not handler.has_viewers('emotion')
+        analysis_frame = np.full((480, 640, 3), 200, dtype=np.uint8)
+        if handler.has_viewers('pose'):
+            handler.add_pose_frame(analysis_frame)
+
+        response = client.get('/api/snapshot?stream=pose', headers={'If-None-Match': default_etag})
+        print(f"发布分析帧后: {response.status_code}，ETag {response.headers.get('ETag')}")
+        assert response.status_code == 200 and response.headers.get('ETag') != default_etag
+        image = cv2.imdecode(np.frombuffer(response.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert abs(float(image.mean()) - 200) < 10
+        assert not handler.get_streaming_status()
+
+    # 租约到期且没有观看者时不再发布
+    handler._snapshot_leases['pose'] = 0
+    assert not handler.has_viewers('pose')
+
+
+if __name__ == "__main__":
+    test_concurrent_encode_once()
+    test_should_send_and_keepalive()
+    test_mailbox_wakes_on_publish()
+    test_mailbox_wakes_on_wake_all()
+    test_session_lag_and_slow_client_downscale()
+    test_snapshot_not_modified()
+    test_pose_snapshot_without_streaming()
+    print("\n所有测试通过!")